@@ -53,8 +53,7 @@ def execute_mode(query, mode, model):
             }
         else:
             # LLM-based modes
-            os.environ['OPENAI_MODEL'] = model
-            result = llm_handler.query_llm(query, mode)
+            result = llm_handler.query_llm(query, mode, model=model)
             
             return {
                 'success': result.get('success', True),
@@ -8,27 +8,31 @@ import os
 import sys
 import json
 import time
+import html
 from datetime import datetime
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Add project to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
 
-from wincasa.core.llm_handler import WincasaLLMHandler
-from wincasa.core.wincasa_query_engine import WincasaQueryEngine
+from wincasa.core.component_registry import get_component
+from wincasa.monitoring.wincasa_query_logger import QueryLogEntry, get_query_logger
 from wincasa.utils.text_to_table_parser import extract_table_from_answer, is_table_data
 
-# Initialize handlers
-llm_handler = WincasaLLMHandler()
-query_engine = WincasaQueryEngine()
-
 class BenchmarkHandler(BaseHTTPRequestHandler):
     def do_GET(self):
         """Serve static files"""
-        if self.path == '/' or self.path == '/index.html':
+        parsed = urlparse(self.path)
+        if parsed.path == '/' or parsed.path == '/index.html':
             self.serve_file('benchmark.html', 'text/html')
+        elif parsed.path == '/api/suggest':
+            self.handle_suggest(parse_qs(parsed.query))
+        elif parsed.path == '/api/stream':
+            self.handle_stream(parse_qs(parsed.query))
         else:
             self.send_error(404)
     
@@ -86,16 +90,111 @@ class BenchmarkHandler(BaseHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(html.encode())
     
+    def handle_suggest(self, params):
+        """Type-ahead for tenant, owner and property names (fires on every keystroke)"""
+        prefix = (params.get('q') or params.get('query') or [''])[0]
+        try:
+            k = int(params.get('k', ['5'])[0])
+        except ValueError:
+            k = 5
+        
+        # Free-text questions: complete the trailing words ('Wer wohnt in der Aach...')
+        words = prefix.split()
+        suggestions, head = [], ''
+        for size in range(min(len(words), 3), 0, -1):
+            suggestions = get_component("optimized_search").suggest(' '.join(words[-size:]), k)
+            if suggestions:
+                head = ' '.join(words[:-size]) + ' ' if len(words) > size else ''
+                break
+        
+        if params.get('format', [''])[0] == 'json':
+            body = json.dumps({'prefix': prefix, 'suggestions': suggestions}, ensure_ascii=False)
+            content_type = 'application/json'
+        else:
+            body = ''.join(
+                f'<button type="button" class="btn btn-example" '
+                f'onclick="setQuery({html.escape(json.dumps(head + s["label"]))})">'
+                f'{html.escape(s["label"])} <small>{html.escape(s["entity_type"])}</small></button>'
+                for s in suggestions
+            )
+            content_type = 'text/html'
+        
+        data = body.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', len(data))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def send_event(self, event, data):
+        """Write one Server-Sent Event and push it to the client immediately"""
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode())
+        self.wfile.flush()
+    
+    def handle_stream(self, params):
+        """Stream the unified engine's answer as Server-Sent Events (token, done, error)"""
+        query = params.get('query', [''])[0]
+        force_mode = params.get('force_mode', [None])[0]
+        if not query:
+            self.send_error(400, 'Query is required')
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('X-Accel-Buffering', 'no')
+        self.end_headers()
+        
+        start_time = time.time()
+        stream = get_component("query_engine").process_query_stream(query, force_mode=force_mode)
+        chunks = iter(stream)
+        try:
+            for chunk in chunks:
+                self.send_event('token', chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client closed the EventSource - cancel the LLM stream and join the worker now
+            chunks.close()
+            return
+        except Exception as e:
+            self.send_event('error', {'error': str(e), 'time': round(time.time() - start_time, 2)})
+            return
+        
+        result = stream.result
+        self.send_event('done', {
+            'answer': result.answer,
+            'processing_mode': result.processing_mode,
+            'time': round(time.time() - start_time, 2),
+            'ttft_ms': result.time_to_first_token_ms,
+            'confidence': result.confidence,
+            'cost': result.cost_estimate
+        })
+        get_query_logger().log_query(QueryLogEntry(
+            timestamp=result.timestamp.isoformat(),
+            query=query,
+            mode=result.processing_mode,
+            model=get_component("config").get_llm_config().get('model', 'unknown'),
+            user_id='anonymous',
+            session_id='htmx_stream',
+            response_time_ms=result.processing_time_ms,
+            result_count=result.result_count,
+            confidence=result.confidence,
+            cost_estimate=result.cost_estimate,
+            success=not result.error_details,
+            error=result.error_details,
+            answer_preview=result.answer[:200],
+            source_data=result.processing_mode,
+            time_to_first_token_ms=result.time_to_first_token_ms,
+            route=result.route
+        ))
+    
     def run_benchmark(self, query, model):
         """Run benchmark across all modes"""
-        results = {}
         modes = ['json_standard', 'json_vanilla', 'sql_standard', 'sql_vanilla', 'unified']
         
-        for mode in modes:
-            results[mode] = self.execute_mode(query, mode, model)
-            time.sleep(0.1)  # Avoid conflicts
-        
-        return results
+        # Mode and model are request-scoped in the LLM handler - modes can run in parallel
+        with ThreadPoolExecutor(max_workers=len(modes), thread_name_prefix="wincasa-benchmark") as pool:
+            answers = pool.map(lambda mode: self.execute_mode(query, mode, model), modes)
+            return dict(zip(modes, answers))
     
     def execute_mode(self, query, mode, model):
         """Execute query in a single mode"""
@@ -103,7 +202,7 @@ class BenchmarkHandler(BaseHTTPRequestHandler):
         
         try:
             if mode == 'unified':
-                result = query_engine.process_query(query)
+                result = get_component("query_engine").process_query(query)
                 return {
                     'success': True,
                     'answer': result.answer,
@@ -112,8 +211,7 @@ class BenchmarkHandler(BaseHTTPRequestHandler):
                     'cost': result.cost_estimate
                 }
             else:
-                os.environ['OPENAI_MODEL'] = model
-                result = llm_handler.query_llm(query, mode)
+                result = get_component("llm_handler").query_llm(query, mode, model=model)
                 return {
                     'success': result.get('success', True),
                     'answer': result.get('answer', 'No answer'),
@@ -380,12 +478,21 @@ class BenchmarkHandler(BaseHTTPRequestHandler):
         
         return html
 
+def warm_up():
+    """Build shared components in the background: search index and suggest lists first, LLM last"""
+    get_component("optimized_search").suggest('a')
+    get_component("query_engine").warm_up(background=False)
+
 def main():
     """Run the server"""
     port = 8669
-    server = HTTPServer(('0.0.0.0', port), BenchmarkHandler)
+    # One thread per connection - a long-running event stream must not block other requests
+    server = ThreadingHTTPServer(('0.0.0.0', port), BenchmarkHandler)
     print(f"🔬 HTMX Benchmark Server running on http://0.0.0.0:{port}")
     print(f"📍 Access at: http://localhost:{port} or http://192.168.178.4:{port}")
+    # Listening already; requests arriving during warm-up build only what they need
+    if os.environ.get("WINCASA_WARM_UP", "1") != "0":
+        threading.Thread(target=warm_up, name="wincasa-warmup", daemon=True).start()
     server.serve_forever()
 
 if __name__ == '__main__':
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+WINCASA Adaptive Router
+Lernt aus query_logs.db, welcher Verarbeitungspfad pro Query-Muster am
+schnellsten/günstigsten ausreichende Qualität liefert
+
+Pfade: semantic (Semantic Template Engine), unified (Templates + Structured
+Search), legacy (LLM). Das Modell wird offline trainiert
+
+    python -m wincasa.core.adaptive_router --db wincasa_data/query_logs.db
+
+und beim Start des Query Engines geladen (adaptive_routing.model_path).
+Ohne Modell oder für unbekannte Muster gilt die feste Kaskade.
+"""
+
+import argparse
+import json
+import logging
+import random
+import sqlite3
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from wincasa.core.answer_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+PATHS = ("semantic", "unified", "legacy")
+DEFAULT_ORDER = PATHS
+# Shared results (answer cache, coalesced followers): ~0ms and $0 under the original
+# processing_mode - they say nothing about the path and stay out of training
+REPLAYED_ROUTES = ("cache", "coalesced")
+MODEL_VERSION = 1
+
+# Fallback-Muster, wenn kein Semantic Pattern greift (Keywords in fold_text-Form)
+PATTERN_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("mieter", ("mieter", "wohnt", "bewohner")),
+    ("eigentuemer", ("eigentuemer", "besitzer", "portfolio")),
+    ("leerstand", ("leerstand", "frei", "leer")),
+    ("finanzen", ("miete", "kosten", "rueckst", "zahlung", "konto", "saldo")),
+    ("objekt", ("objekt", "haus", "gebaeude", "wohnung", "adresse")),
+)
+OTHER_PATTERN = "sonstige"
+
+
+def detect_query_pattern(query: str, semantic_engine=None) -> str:
+    """Muster einer Query: Semantic Pattern, sonst Keyword-Kategorie, sonst 'sonstige'"""
+    if semantic_engine:
+        pattern_id = semantic_engine.detect_pattern(query)
+        if pattern_id:
+            return pattern_id
+    folded = normalize_query(query)
+    for category, keywords in PATTERN_KEYWORDS:
+        if any(keyword in folded for keyword in keywords):
+            return f"kw_{category}"
+    return OTHER_PATTERN
+
+
+def path_for_mode(processing_mode: str) -> Tuple[Optional[str], bool]:
+    """
+    processing_mode aus dem Log -> (Pfad, Pfad lieferte selbst die Antwort)
+
+    legacy_fallback zählt als Fehlschlag des unified-Pfads.
+    """
+    if processing_mode == "semantic_template":
+        return "semantic", True
+    if processing_mode in ("template", "structured_search", "unified", "sql_template", "optimized_search"):
+        return "unified", True
+    if processing_mode == "legacy_fallback":
+        return "unified", False
+    if processing_mode.startswith(("legacy_", "json_", "sql_")):
+        return "legacy", True
+    return None, False
+
+
+@dataclass
+class PathStats:
+    """Beobachtete Kennzahlen eines Pfads für ein Muster"""
+    samples: int
+    success_rate: float
+    latency_ms: float  # Mittelwert = erwartete Latenz
+    p90_latency_ms: float
+    cost_usd: float
+
+
+@dataclass
+class RoutingDecision:
+    """Reihenfolge der Pfade für eine Query"""
+    pattern: str
+    order: Tuple[str, ...]
+    skipped: Tuple[str, ...] = ()
+    learned: bool = False  # False = feste Kaskade (kein Modell/zu wenig Daten/Exploration)
+    scores: Dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _path_stats(rows: List[Tuple[float, bool, float]]) -> PathStats:
+    latencies = sorted(latency for latency, _, _ in rows)
+    return PathStats(
+        samples=len(rows),
+        success_rate=round(sum(success for _, success, _ in rows) / len(rows), 4),
+        latency_ms=round(sum(latencies) / len(latencies), 2),
+        p90_latency_ms=round(latencies[min(len(latencies) - 1, int(0.9 * len(latencies)))], 2),
+        cost_usd=round(sum(cost for _, _, cost in rows) / len(rows), 6)
+    )
+
+
+def train_model(records: Iterable[Tuple[str, str, float, bool, float]], semantic_engine=None) -> Dict[str, Any]:
+    """
+    Aggregiert Log-Zeilen (query, processing_mode, response_time_ms, success, cost)
+    zu Kennzahlen pro (Muster, Pfad)
+    """
+    grouped: Dict[str, Dict[str, List[Tuple[float, bool, float]]]] = {}
+    used = skipped = 0
+    for query, mode, response_time_ms, success, cost in records:
+        path, answered = path_for_mode(mode or "")
+        if path is None or response_time_ms is None:
+            skipped += 1
+            continue
+        pattern = detect_query_pattern(query, semantic_engine)
+        grouped.setdefault(pattern, {}).setdefault(path, []).append(
+            (float(response_time_ms), bool(success) and answered, float(cost or 0.0)))
+        used += 1
+
+    return {
+        "version": MODEL_VERSION,
+        "trained_at": datetime.now().isoformat(),
+        "rows": used,
+        "skipped_rows": skipped,
+        "patterns": {
+            pattern: {path: asdict(_path_stats(rows)) for path, rows in paths.items()}
+            for pattern, paths in sorted(grouped.items())
+        }
+    }
+
+
+def load_log_records(db_path: Path, days: Optional[int] = None) -> List[Tuple[str, str, float, bool, float]]:
+    """Liest (query, mode, response_time_ms, success, cost_estimate) aus query_logs (ohne Cache-/Coalescing-Treffer)"""
+    with sqlite3.connect(str(db_path)) as conn:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(query_logs)")}
+        sql = "SELECT query, mode, response_time_ms, success, cost_estimate FROM query_logs WHERE 1=1"
+        params: List[Any] = []
+        if "route" in columns:
+            sql += f" AND (route IS NULL OR route NOT IN ({', '.join('?' * len(REPLAYED_ROUTES))}))"
+            params.extend(REPLAYED_ROUTES)
+        if days:
+            sql += " AND timestamp >= ?"
+            params.append((datetime.now() - timedelta(days=days)).isoformat())
+        return conn.execute(sql, params).fetchall()
+
+
+class AdaptiveRouter:
+    """
+    Wählt die Pfad-Reihenfolge pro Query-Muster
+
+    - Pfade mit genug Daten (min_samples) und Erfolgsquote >= min_success_rate
+      werden nach erwarteter Latenz + Kosten (cost_weight_ms_per_usd) sortiert
+    - Pfade, die für das Muster historisch scheitern, werden übersprungen
+    - Pfade mit zu wenig Daten folgen in Kaskaden-Reihenfolge
+    - explore_rate: Anteil Queries, die trotzdem die feste Kaskade nehmen,
+      damit übersprungene Pfade neue Daten für das nächste Training liefern
+    """
+
+    def __init__(self, model: Dict[str, Any], min_samples: int = 20, min_success_rate: float = 0.8,
+                 cost_weight_ms_per_usd: float = 100_000.0, explore_rate: float = 0.05):
+        if model.get("version") != MODEL_VERSION:
+            raise ValueError(f"Router-Modell Version {model.get('version')} nicht unterstützt")
+        self.model = model
+        self.min_samples = min_samples
+        self.min_success_rate = min_success_rate
+        self.cost_weight_ms_per_usd = cost_weight_ms_per_usd
+        self.explore_rate = explore_rate
+        self.patterns: Dict[str, Dict[str, PathStats]] = {
+            pattern: {path: PathStats(**stats) for path, stats in paths.items() if path in PATHS}
+            for pattern, paths in model.get("patterns", {}).items()
+        }
+
+    @classmethod
+    def load(cls, model_path: Path, **settings) -> Optional["AdaptiveRouter"]:
+        """Lädt ein trainiertes Modell (None, wenn keins vorhanden oder unlesbar)"""
+        model_path = Path(model_path)
+        if not model_path.exists():
+            logger.info(f"Kein Router-Modell unter {model_path} - feste Kaskade")
+            return None
+        try:
+            with open(model_path, 'r', encoding='utf-8') as f:
+                router = cls(json.load(f), **settings)
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning(f"⚠️ Router-Modell {model_path} unbrauchbar: {e}")
+            return None
+        logger.info(f"🧭 Router-Modell geladen: {len(router.patterns)} Muster, "
+                     f"{router.model.get('rows', 0)} Log-Zeilen, trainiert {router.model.get('trained_at')}")
+        return router
+
+    def score(self, stats: PathStats) -> float:
+        """Erwartete Latenz inkl. Kosten in ms (kleiner = besser)"""
+        return stats.latency_ms + stats.cost_usd * self.cost_weight_ms_per_usd
+
+    def route(self, pattern: str) -> RoutingDecision:
+        paths = self.patterns.get(pattern)
+        if not paths or random.random() < self.explore_rate:
+            return RoutingDecision(pattern=pattern, order=DEFAULT_ORDER)
+
+        qualified, failing, unknown = [], [], []
+        for path in DEFAULT_ORDER:
+            stats = paths.get(path)
+            if stats is None or stats.samples < self.min_samples:
+                unknown.append(path)
+            elif stats.success_rate >= self.min_success_rate:
+                qualified.append(path)
+            else:
+                failing.append(path)
+
+        if not qualified and not unknown:
+            # Everything fails for this pattern - keep the cascade rather than giving up
+            return RoutingDecision(pattern=pattern, order=DEFAULT_ORDER)
+
+        scores = {path: round(self.score(paths[path]), 2) for path in qualified}
+        order = tuple(sorted(qualified, key=scores.get)) + tuple(unknown)
+        return RoutingDecision(pattern=pattern, order=order, skipped=tuple(failing), learned=True, scores=scores)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "trained_at": self.model.get("trained_at"),
+            "rows": self.model.get("rows", 0),
+            "patterns": len(self.patterns),
+            "min_samples": self.min_samples,
+            "min_success_rate": self.min_success_rate,
+            "explore_rate": self.explore_rate
+        }
+
+
+def main():
+    """Offline-Training aus query_logs.db (z.B. nächtlich per Cron)"""
+    parser = argparse.ArgumentParser(description="Trainiert das Router-Modell aus query_logs.db")
+    parser.add_argument("--db", default="wincasa_data/query_logs.db")
+    parser.add_argument("--out", default="wincasa_data/router_model.json")
+    parser.add_argument("--days", type=int, default=30, help="nur Logs der letzten N Tage (0 = alle)")
+    args = parser.parse_args()
+
+    from wincasa.core.semantic_template_engine import SemanticTemplateEngine
+    records = load_log_records(Path(args.db), args.days or None)
+    model = train_model(records, SemanticTemplateEngine())
+
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_suffix(".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(model, f, indent=2, ensure_ascii=False)
+    tmp_path.replace(out_path)
+
+    print(f"🧭 Router-Modell geschrieben: {out_path}")
+    print(f"   📊 {model['rows']} Log-Zeilen, {len(model['patterns'])} Muster "
+          f"({model['skipped_rows']} Zeilen ohne Pfad übersprungen)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+WINCASA Answer Cache
+Benutzerübergreifender Cache für fertige Antworten des Query Engines
+
+Key: normalisierte Query + geroutetes Verfahren + LLM-Modell. Jeder Eintrag
+trägt die Datenversion (Exporte / Datenbank-Datei), aus der er entstanden
+ist - ändert sich die Version, wird der Cache automatisch geleert.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from wincasa.data.layer4_search_index import fold_text
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+
+
+def normalize_query(query: str) -> str:
+    """'  Freie Wohnungen in ESSEN? ' -> 'freie wohnungen in essen'"""
+    folded = fold_text(query or "")
+    folded = re.sub(r'[?!.,;:]+(\s|$)', r'\1', folded)
+    return re.sub(r'\s+', ' ', folded).strip()
+
+
+def default_data_sources() -> List[Path]:
+    """Layer 4 Exporte (inkl. rag_data) und Firebird-Datei laut config/sql_paths.json"""
+    with open(PROJECT_ROOT / 'config' / 'sql_paths.json', 'r') as f:
+        path_config = json.load(f)
+    return [PROJECT_ROOT / path_config['json_exports_dir'],
+            PROJECT_ROOT / path_config['database_path']]
+
+
+class DataVersionTracker:
+    """
+    Datenversion aus Größe/mtime der Quellen
+
+    Verzeichnisse werden rekursiv nach *.json durchsucht. Die Prüfung ist
+    gedrosselt (check_interval), dazwischen gilt die zuletzt berechnete Version.
+    """
+
+    def __init__(self, sources: List[Path], check_interval: float = 5.0):
+        self.sources = [Path(source) for source in sources]
+        self.check_interval = check_interval
+        self._version: Optional[str] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _signature(self) -> List[Tuple[str, int, int]]:
+        signature = []
+        for source in self.sources:
+            paths = sorted(source.rglob("*.json")) if source.is_dir() else [source]
+            for path in paths:
+                try:
+                    stat = path.stat()
+                    signature.append((str(path), stat.st_size, stat.st_mtime_ns))
+                except FileNotFoundError:
+                    continue
+        return signature
+
+    def current(self) -> str:
+        """Aktuelle Datenversion (kurzer Hash)"""
+        now = time.monotonic()
+        if self._version is not None and now - self._last_check < self.check_interval:
+            return self._version
+        with self._lock:
+            if self._version is None or now - self._last_check >= self.check_interval:
+                signature = json.dumps(self._signature()).encode()
+                self._version = hashlib.sha1(signature).hexdigest()[:12]
+                self._last_check = now
+            return self._version
+
+
+@dataclass
+class CacheEntry:
+    """Gecachte Antwort samt Herkunft"""
+    value: Dict[str, Any]
+    data_version: str
+    created_at: float = field(default_factory=time.monotonic)
+    hits: int = 0
+
+
+class AnswerCache:
+    """
+    LRU-Cache mit TTL und Datenversion
+
+    - get()/put() prüfen die Datenversion; bei Änderung wird alles verworfen
+    - put() mit der vor der Berechnung geholten Version (current_version())
+      verwirft Antworten, deren Daten sich währenddessen geändert haben
+    - max_entries begrenzt die Größe (älteste Nutzung fliegt zuerst)
+    - ttl_seconds begrenzt das Alter eines Eintrags
+    Thread-safe, Statistiken über get_stats().
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 900.0,
+                 version_provider: Optional[Callable[[], str]] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._version_provider = version_provider or DataVersionTracker(default_data_sources()).current
+        self._entries: "OrderedDict[Tuple[str, str, str], CacheEntry]" = OrderedDict()
+        self._data_version: Optional[str] = None
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0,
+                      "expirations": 0, "invalidations": 0, "stale_puts": 0}
+
+    @staticmethod
+    def make_key(query: str, mode: str, model: str) -> Tuple[str, str, str]:
+        return normalize_query(query), mode, model
+
+    def _check_version(self) -> str:
+        # Caller holds the lock
+        version = self._version_provider()
+        if version != self._data_version:
+            if self._entries:
+                logger.info(f"🔄 Datenversion {self._data_version} -> {version}: "
+                            f"{len(self._entries)} Cache-Einträge verworfen")
+                self.stats["invalidations"] += 1
+            self._entries.clear()
+            self._data_version = version
+        return version
+
+    def get(self, query: str, mode: str, model: str) -> Optional[Dict[str, Any]]:
+        """Gecachter Wert oder None"""
+        key = self.make_key(query, mode, model)
+        with self._lock:
+            version = self._check_version()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if entry.data_version != version or time.monotonic() - entry.created_at > self.ttl_seconds:
+                del self._entries[key]
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            entry.hits += 1
+            self.stats["hits"] += 1
+            return entry.value
+
+    def current_version(self) -> str:
+        """Aktuelle Datenversion - vor der Berechnung holen und an put() übergeben"""
+        with self._lock:
+            return self._check_version()
+
+    def put(self, query: str, mode: str, model: str, value: Dict[str, Any],
+            data_version: Optional[str] = None):
+        """
+        Speichert einen Wert unter der aktuellen Datenversion
+
+        data_version: Version, aus der der Wert berechnet wurde - weicht sie
+        von der aktuellen ab, wird der Wert nicht gespeichert
+        """
+        key = self.make_key(query, mode, model)
+        with self._lock:
+            version = self._check_version()
+            if data_version is not None and data_version != version:
+                logger.debug(f"Antwort aus Datenversion {data_version} verworfen (aktuell {version})")
+                self.stats["stale_puts"] += 1
+                return
+            self._entries[key] = CacheEntry(value=value, data_version=version)
+            self._entries.move_to_end(key)
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def invalidate(self):
+        """Verwirft alle Einträge (z.B. nach manuellem Re-Export)"""
+        with self._lock:
+            if self._entries:
+                self.stats["invalidations"] += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "data_version": self._data_version
+            }
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+WINCASA Async Executors
+Begrenzte Thread-Pools für blockierende Arbeit im asyncio-Pfad
+
+- DB-Executor: genau ein Thread - Firebird Embedded erlaubt nur eine
+  Verbindung pro Prozess, Datenbank-Arbeit wird daher serialisiert
+- IO-Executor: kleiner Pool für Datei-, Index- und synchrone Subsystem-Arbeit
+
+Synchrone Subsysteme im IO-Pool (z.B. Unified System) schicken nur ihre
+SQL-Ausführung per call_db() auf den DB-Thread.
+
+LLM-Calls laufen nativ async (AsyncOpenAI) und belegen keinen Thread; ihre
+Parallelität kann pro Aufrufer (z.B. Batch) über llm_concurrency_limit begrenzt werden.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DB_WORKERS = 1
+IO_WORKERS = int(os.environ.get('WINCASA_IO_WORKERS', '8'))
+
+# Global singleton instances
+_db_executor: Optional[ThreadPoolExecutor] = None
+_io_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# Marks the DB worker thread - call_db() runs inline there instead of queueing behind itself
+_db_thread = threading.local()
+
+# LLM-Parallelitätslimit des laufenden Aufrufers (None = unbegrenzt)
+_llm_limit: contextvars.ContextVar[Optional[asyncio.Semaphore]] = contextvars.ContextVar(
+    "wincasa_llm_limit", default=None)
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """Single-Thread Executor für alle Datenbank-Zugriffe"""
+    global _db_executor
+    if _db_executor is None:
+        with _executor_lock:
+            if _db_executor is None:
+                _db_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="wincasa-db",
+                                                  initializer=_mark_db_thread)
+    return _db_executor
+
+
+def _mark_db_thread():
+    _db_thread.active = True
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Begrenzter Executor für Datei- und CPU-leichte Sync-Arbeit"""
+    global _io_executor
+    if _io_executor is None:
+        with _executor_lock:
+            if _io_executor is None:
+                _io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="wincasa-io")
+    return _io_executor
+
+
+async def _run_in(executor: ThreadPoolExecutor, func: Callable, *args, **kwargs) -> Any:
+    # Context variables (e.g. request context) follow the call into the worker thread
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(executor, call)
+
+
+async def run_db(func: Callable, *args, **kwargs) -> Any:
+    """Führt blockierende Datenbank-Arbeit im DB-Executor aus"""
+    return await _run_in(get_db_executor(), func, *args, **kwargs)
+
+
+async def run_io(func: Callable, *args, **kwargs) -> Any:
+    """Führt blockierende Datei-/Sync-Arbeit im IO-Executor aus"""
+    return await _run_in(get_io_executor(), func, *args, **kwargs)
+
+
+def call_db(func: Callable, *args, **kwargs) -> Any:
+    """
+    Synchrones Gegenstück zu run_db für Sync-Code (z.B. im IO-Pool)
+
+    Blockiert den aufrufenden Thread, bis die DB-Arbeit auf dem DB-Thread
+    fertig ist; auf dem DB-Thread selbst wird direkt ausgeführt.
+    """
+    if getattr(_db_thread, "active", False):
+        return func(*args, **kwargs)
+    # Context variables (deadline) follow the call into the DB thread
+    context = contextvars.copy_context()
+    return get_db_executor().submit(context.run, func, *args, **kwargs).result()
+
+
+@contextmanager
+def llm_concurrency_limit(limit: int) -> Iterator[asyncio.Semaphore]:
+    """Begrenzt gleichzeitige LLM-Calls aller Tasks, die im Block erzeugt werden"""
+    token = _llm_limit.set(asyncio.Semaphore(limit))
+    try:
+        yield _llm_limit.get()
+    finally:
+        _llm_limit.reset(token)
+
+
+@asynccontextmanager
+async def llm_slot() -> AsyncIterator[None]:
+    """Belegt einen LLM-Slot, falls ein Limit aktiv ist"""
+    semaphore = _llm_limit.get()
+    if semaphore is None:
+        yield
+        return
+    async with semaphore:
+        yield
+
+
+def shutdown_executors(wait: bool = True):
+    """Beendet beide Executors (z.B. beim Worker-Shutdown)"""
+    global _db_executor, _io_executor
+    with _executor_lock:
+        for executor in (_db_executor, _io_executor):
+            if executor is not None:
+                executor.shutdown(wait=wait)
+        _db_executor = None
+        _io_executor = None
@@ -6,7 +6,6 @@ Compares all 5 modes with proper database handling
 
 import json
 import logging
-import os
 import time
 import pandas as pd
 from datetime import datetime
@@ -24,10 +23,7 @@ logger = logging.getLogger(__name__)
 
 # Import WINCASA modules with error handling
 try:
-    from wincasa.core.llm_handler import WincasaLLMHandler
-    from wincasa.core.wincasa_query_engine import WincasaQueryEngine
-    from wincasa.data.layer4_json_loader import Layer4JSONLoader
-    from wincasa.utils.config_loader import WincasaConfig
+    from wincasa.core.component_registry import get_component
 except ImportError as e:
     logger.error(f"Import error: {e}")
     st.error(f"Failed to import WINCASA modules: {e}")
@@ -86,18 +82,17 @@ class BenchmarkStreamlit:
             return
         
         try:
-            # Initialize config first
-            self.config = WincasaConfig()
+            # Shared process-wide instances (built once, reused across reruns)
+            self.config = get_component("config")
             
-            # Initialize handlers one by one
             logger.info("Initializing LLM handler...")
-            self._llm_handler = WincasaLLMHandler()
+            self._llm_handler = get_component("llm_handler")
             
             logger.info("Initializing Layer4 loader...")
-            self._layer4_loader = Layer4JSONLoader()
+            self._layer4_loader = get_component("layer4_json_loader")
             
             logger.info("Initializing Query engine...")
-            self._query_engine = WincasaQueryEngine()
+            self._query_engine = get_component("query_engine")
             
             self._initialized = True
             logger.info("✅ All handlers initialized successfully")
@@ -134,27 +129,16 @@ class BenchmarkStreamlit:
                 if not self._llm_handler:
                     raise Exception("LLM handler not initialized")
                 
-                # Set model temporarily
-                original_model = os.environ.get('OPENAI_MODEL')
-                os.environ['OPENAI_MODEL'] = model
+                # Model applies to this request only
+                result = self._llm_handler.query_llm(query, mode, model=model)
                 
-                try:
-                    # Execute query
-                    result = self._llm_handler.query_llm(query, mode)
-                    
-                    return {
-                        'success': result.get('success', True),
-                        'answer': result.get('answer', 'No answer'),
-                        'time': time.time() - start_time,
-                        'cost': self.estimate_cost(result, model),
-                        'source': result.get('source', mode)
-                    }
-                finally:
-                    # Restore original model
-                    if original_model:
-                        os.environ['OPENAI_MODEL'] = original_model
-                    else:
-                        os.environ.pop('OPENAI_MODEL', None)
+                return {
+                    'success': result.get('success', True),
+                    'answer': result.get('answer', 'No answer'),
+                    'time': time.time() - start_time,
+                    'cost': self.estimate_cost(result, model),
+                    'source': result.get('source', mode)
+                }
                 
         except Exception as e:
             logger.error(f"Error in mode {mode}: {e}")
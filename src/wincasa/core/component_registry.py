@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+WINCASA Component Registry
+Prozessweiter Container für schwere Komponenten (Search-Index, LLM Handler, Query Engine)
+
+Jede Komponente wird beim ersten Zugriff genau einmal gebaut und danach
+überall injiziert - statt dass jede Schicht ihre eigene Instanz erzeugt.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Komponenten mit diesem API-Key werden geteilt, andere Konfigurationen bauen eigene Instanzen
+DEFAULT_API_KEY_FILE = "/home/envs/openai.env"
+
+
+def _build_config():
+    from wincasa.utils.config_loader import WincasaConfig
+    return WincasaConfig()
+
+
+def _build_layer4_json_loader():
+    from wincasa.data.layer4_json_loader import Layer4JSONLoader
+    return Layer4JSONLoader()
+
+
+def _build_optimized_search():
+    from wincasa.core.wincasa_optimized_search import WincasaOptimizedSearch
+    return WincasaOptimizedSearch()
+
+
+def _build_llm_client_pool():
+    from wincasa.core.llm_client_pool import LLMClientPool
+    return LLMClientPool(**get_component("config").get_llm_pool_config())
+
+
+def _build_llm_handler():
+    from wincasa.core.llm_handler import WincasaLLMHandler
+    return WincasaLLMHandler()
+
+
+def _build_unified_template_system():
+    from wincasa.core.unified_template_system import UnifiedTemplateSystem
+    return UnifiedTemplateSystem()
+
+
+def _build_semantic_template_engine():
+    from wincasa.core.semantic_template_engine import SemanticTemplateEngine
+    return SemanticTemplateEngine()
+
+
+def _build_query_engine():
+    from wincasa.core.wincasa_query_engine import WincasaQueryEngine
+    return WincasaQueryEngine()
+
+
+# Komponenten-Name -> Factory (Imports erst beim Bauen, keine Import-Zyklen)
+DEFAULT_FACTORIES: Dict[str, Callable[[], Any]] = {
+    "config": _build_config,
+    "layer4_json_loader": _build_layer4_json_loader,
+    "optimized_search": _build_optimized_search,
+    "llm_client_pool": _build_llm_client_pool,
+    "llm_handler": _build_llm_handler,
+    "unified_template_system": _build_unified_template_system,
+    "semantic_template_engine": _build_semantic_template_engine,
+    "query_engine": _build_query_engine,
+}
+
+
+class ComponentRegistry:
+    """
+    Lazy Dependency Container
+
+    - get(): baut eine Komponente beim ersten Zugriff (Double-Checked Locking pro Name)
+    - provide(): injiziert eine fertige Instanz (z.B. Mock in Tests)
+    - Factories dürfen selbst get() aufrufen; Zyklen werden erkannt
+    """
+
+    def __init__(self, factories: Optional[Dict[str, Callable[[], Any]]] = None):
+        self._factories: Dict[str, Callable[[], Any]] = dict(DEFAULT_FACTORIES if factories is None else factories)
+        self._instances: Dict[str, Any] = {}
+        self._build_times: Dict[str, float] = {}
+        self._locks: Dict[str, threading.RLock] = {}
+        self._lock = threading.Lock()
+        self._building = threading.local()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        """Registriert (oder ersetzt) die Factory einer Komponente"""
+        with self._lock:
+            self._factories[name] = factory
+
+    def provide(self, name: str, instance: Any):
+        """Setzt eine fertige Instanz - nachfolgende get() liefern genau diese"""
+        with self._lock:
+            self._instances[name] = instance
+
+    def _component_lock(self, name: str) -> threading.RLock:
+        with self._lock:
+            return self._locks.setdefault(name, threading.RLock())
+
+    def get(self, name: str) -> Any:
+        """Gibt die (einmalig gebaute) Komponente zurück"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        if name not in self._factories:
+            raise KeyError(f"Unbekannte Komponente: {name}")
+
+        building = getattr(self._building, "names", None)
+        if building is None:
+            building = self._building.names = []
+        if name in building:
+            raise RuntimeError(f"Zyklische Abhängigkeit: {' -> '.join(building + [name])}")
+
+        with self._component_lock(name):
+            instance = self._instances.get(name)
+            if instance is None:
+                building.append(name)
+                try:
+                    start_time = time.time()
+                    instance = self._factories[name]()
+                    self._build_times[name] = round((time.time() - start_time) * 1000, 2)
+                finally:
+                    building.pop()
+                with self._lock:
+                    self._instances[name] = instance
+                logger.info(f"🧩 Komponente '{name}' gebaut ({self._build_times[name]}ms)")
+        return instance
+
+    def is_built(self, name: str) -> bool:
+        return name in self._instances
+
+    def reset(self, name: Optional[str] = None):
+        """Verwirft eine (oder alle) Instanzen - nächster get() baut neu"""
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+                self._build_times.clear()
+            else:
+                self._instances.pop(name, None)
+                self._build_times.pop(name, None)
+
+    def warm_up(self, names: Optional[List[str]] = None) -> Dict[str, float]:
+        """Baut Komponenten vorab (z.B. beim Worker-Start)"""
+        for name in names or list(self._factories):
+            self.get(name)
+        return self.get_stats()["build_times_ms"]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "registered": sorted(self._factories),
+            "built": sorted(self._instances),
+            "build_times_ms": dict(self._build_times)
+        }
+
+
+# Global singleton instance
+_registry: Optional[ComponentRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ComponentRegistry:
+    """Gibt die prozessweite Component Registry zurück"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ComponentRegistry()
+    return _registry
+
+
+def get_component(name: str) -> Any:
+    """Kurzform für get_registry().get(name)"""
+    return get_registry().get(name)
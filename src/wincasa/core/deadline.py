@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+WINCASA Request Deadlines
+Latenz-Budget einer Query, das durch alle Verarbeitungsstufen fließt
+
+Der Query Engine setzt pro Anfrage eine Deadline (performance.max_processing_time_ms)
+in eine ContextVar. Jede Stufe prüft das Restbudget und reicht es als Timeout
+an HTTP- (OpenAI) und DB-Aufrufe (Firebird Statement-Timeout) weiter. Über
+contextvars folgt die Deadline auch in asyncio-Tasks und Executor-Threads.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """Latenz-Budget der Anfrage ist aufgebraucht"""
+
+    def __init__(self, stage: str, budget_ms: float):
+        self.stage = stage
+        self.budget_ms = budget_ms
+        super().__init__(f"Zeitbudget von {budget_ms:.0f}ms in Stufe '{stage}' überschritten")
+
+
+class Deadline:
+    """Absoluter Zeitpunkt, bis zu dem eine Anfrage beantwortet sein muss"""
+
+    def __init__(self, budget_ms: float):
+        self.budget_ms = budget_ms
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + budget_ms / 1000
+
+    def remaining(self) -> float:
+        """Restbudget in Sekunden (nie negativ)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def remaining_ms(self) -> float:
+        return self.remaining() * 1000
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def elapsed_ms(self) -> float:
+        return (time.monotonic() - self.started_at) * 1000
+
+    def check(self, stage: str):
+        """Wirft DeadlineExceeded, wenn das Budget aufgebraucht ist"""
+        if self.expired:
+            raise DeadlineExceeded(stage, self.budget_ms)
+
+    def timeout(self, stage: str, cap: Optional[float] = None) -> float:
+        """Timeout in Sekunden für einen Aufruf (Restbudget, optional gedeckelt)"""
+        self.check(stage)
+        remaining = self.remaining()
+        return remaining if cap is None else min(remaining, cap)
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("wincasa_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Deadline der laufenden Anfrage (None = unbegrenzt)"""
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Setzt die Deadline für alles, was innerhalb des Blocks aufgerufen wird"""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def check_deadline(stage: str):
+    """Prüft die aktuelle Deadline (ohne Deadline: no-op)"""
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def remaining_timeout(stage: str, default: Optional[float] = None) -> Optional[float]:
+    """Timeout in Sekunden für HTTP/DB-Aufrufe: Restbudget, gedeckelt durch default"""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return default
+    return deadline.timeout(stage, default)
+
+
+def raise_if_deadline_caused(stage: str, error: Exception):
+    """Übersetzt einen Fehler in DeadlineExceeded, falls das Budget abgelaufen ist"""
+    deadline = _current_deadline.get()
+    if deadline is not None and deadline.expired and not isinstance(error, DeadlineExceeded):
+        raise DeadlineExceeded(stage, deadline.budget_ms) from error
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+WINCASA LLM Client Pool
+Prozessweiter OpenAI Client mit abgestimmtem HTTP Connection-Pool
+
+Statt pro Anfrage einen neuen Client (und meist eine neue TLS-Verbindung)
+aufzubauen, teilen sich alle LLM-Konsumenten (LLM Handler, Optimized Search,
+Semantic Template Engine) einen Client pro API Key. Verbindungen bleiben per
+Keep-Alive offen und werden wiederverwendet.
+
+Auslastung (belegte Verbindungen, Spitzenwert, Wartefälle am Pool-Limit,
+neu geöffnete vs. wiederverwendete Verbindungen) wird gemessen, damit die
+Pool-Größe an der realen Parallelität ausgerichtet werden kann.
+"""
+
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Any, Callable, Dict
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+_BaseTransport = httpx.BaseTransport if httpx else object
+_AsyncBaseTransport = httpx.AsyncBaseTransport if httpx else object
+_SyncByteStream = httpx.SyncByteStream if httpx else object
+_AsyncByteStream = httpx.AsyncByteStream if httpx else object
+
+
+def _opens_connection(event_name: str) -> bool:
+    """httpcore Trace-Event für eine neu aufgebaute Verbindung (TCP oder Unix Socket)"""
+    return event_name.startswith("connection.connect_") and event_name.endswith(".complete")
+
+
+class PoolMeter:
+    """
+    Auslastung eines Connection-Pools
+
+    Ein Request belegt eine Verbindung vom Senden bis zum Schließen der
+    Antwort (HTTP/1.1: eine Anfrage pro Verbindung). Thread-safe.
+    """
+
+    def __init__(self, max_connections: int):
+        self.max_connections = max_connections
+        self.in_use = 0
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "peak_in_use": 0, "saturated": 0, "connections_opened": 0, "errors": 0}
+
+    def acquire(self):
+        with self._lock:
+            if self.in_use >= self.max_connections:
+                # Pool voll - Request wartet auf eine freie Verbindung
+                self.stats["saturated"] += 1
+            self.in_use += 1
+            self.stats["requests"] += 1
+            self.stats["peak_in_use"] = max(self.stats["peak_in_use"], self.in_use)
+
+    def release(self, error: bool = False):
+        with self._lock:
+            self.in_use -= 1
+            if error:
+                self.stats["errors"] += 1
+
+    def connection_opened(self, event_name: str):
+        if _opens_connection(event_name):
+            with self._lock:
+                self.stats["connections_opened"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self.stats["requests"]
+            reused = max(0, requests - self.stats["connections_opened"])
+            return {
+                **self.stats,
+                "in_use": self.in_use,
+                "max_connections": self.max_connections,
+                "utilization": round(self.in_use / self.max_connections, 3),
+                "peak_utilization": round(self.stats["peak_in_use"] / self.max_connections, 3),
+                "connection_reuse_rate": round(reused / requests, 3) if requests else 0.0
+            }
+
+
+class _MeteredStream(_SyncByteStream):
+    """Antwort-Body, der beim Schließen die Verbindung im Meter freigibt"""
+
+    def __init__(self, stream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            release, self._release = self._release, None
+            if release:
+                release()
+
+
+class _AsyncMeteredStream(_AsyncByteStream):
+    def __init__(self, stream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            release, self._release = self._release, None
+            if release:
+                release()
+
+
+class MeteredTransport(_BaseTransport):
+    """httpx Transport mit Pool-Messung (delegiert an den eigentlichen Transport)"""
+
+    def __init__(self, transport, meter: PoolMeter):
+        self._transport = transport
+        self.meter = meter
+
+    def handle_request(self, request):
+        outer_trace = request.extensions.get("trace")
+
+        def trace(event_name, info):
+            self.meter.connection_opened(event_name)
+            if outer_trace:
+                outer_trace(event_name, info)
+
+        request.extensions = {**request.extensions, "trace": trace}
+        self.meter.acquire()
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException:
+            self.meter.release(error=True)
+            raise
+        if response.is_closed:
+            # Body already in memory - the connection is free again
+            self.meter.release()
+        else:
+            response.stream = _MeteredStream(response.stream, self.meter.release)
+        return response
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncMeteredTransport(_AsyncBaseTransport):
+    """Async-Variante von MeteredTransport"""
+
+    def __init__(self, transport, meter: PoolMeter):
+        self._transport = transport
+        self.meter = meter
+
+    async def handle_async_request(self, request):
+        outer_trace = request.extensions.get("trace")
+
+        async def trace(event_name, info):
+            self.meter.connection_opened(event_name)
+            if outer_trace:
+                await outer_trace(event_name, info)
+
+        request.extensions = {**request.extensions, "trace": trace}
+        self.meter.acquire()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self.meter.release(error=True)
+            raise
+        if response.is_closed:
+            # Body already in memory - the connection is free again
+            self.meter.release()
+        else:
+            response.stream = _AsyncMeteredStream(response.stream, self.meter.release)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class LLMClientPool:
+    """
+    Geteilte OpenAI Clients mit Keep-Alive Connection-Pool
+
+    - get_client(): ein synchroner Client pro API Key für den ganzen Prozess
+    - get_async_client(): ein AsyncOpenAI Client pro Event-Loop und API Key
+      (httpx Async-Pools sind an ihre Loop gebunden)
+    - Pool-Größe und Timeouts konfigurierbar (WincasaConfig.get_llm_pool_config)
+    """
+
+    def __init__(self, max_connections: int = 20, max_keepalive_connections: int = 10,
+                 keepalive_expiry: float = 60.0, connect_timeout: float = 5.0,
+                 read_timeout: float = 60.0, max_retries: int = 2):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self._clients: Dict[str, Any] = {}
+        # AsyncOpenAI clients are bound to their event loop: loop -> {api_key: client}
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.sync_meter = PoolMeter(max_connections)
+        self.async_meter = PoolMeter(max_connections)
+
+    def _limits(self):
+        return httpx.Limits(max_connections=self.max_connections,
+                            max_keepalive_connections=self.max_keepalive_connections,
+                            keepalive_expiry=self.keepalive_expiry)
+
+    def _timeout(self):
+        if httpx is None:
+            return self.read_timeout
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+
+    def _build_client(self, api_key: str):
+        if httpx is None:
+            return openai.OpenAI(api_key=api_key, timeout=self._timeout(), max_retries=self.max_retries)
+        http_client = openai.DefaultHttpxClient(
+            transport=MeteredTransport(httpx.HTTPTransport(limits=self._limits()), self.sync_meter),
+            timeout=self._timeout())
+        return openai.OpenAI(api_key=api_key, timeout=self._timeout(), max_retries=self.max_retries,
+                             http_client=http_client)
+
+    def _build_async_client(self, api_key: str):
+        if httpx is None:
+            return openai.AsyncOpenAI(api_key=api_key, timeout=self._timeout(), max_retries=self.max_retries)
+        http_client = openai.DefaultAsyncHttpxClient(
+            transport=AsyncMeteredTransport(httpx.AsyncHTTPTransport(limits=self._limits()), self.async_meter),
+            timeout=self._timeout())
+        return openai.AsyncOpenAI(api_key=api_key, timeout=self._timeout(), max_retries=self.max_retries,
+                                  http_client=http_client)
+
+    def get_client(self, api_key: str):
+        """Geteilter synchroner OpenAI Client für api_key"""
+        if not openai:
+            raise ImportError("OpenAI package nicht installiert: pip install openai")
+        client = self._clients.get(api_key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(api_key)
+                if client is None:
+                    client = self._clients[api_key] = self._build_client(api_key)
+                    logger.info(f"🔌 OpenAI Client erstellt (Pool: {self.max_connections} Verbindungen, "
+                                f"Keep-Alive {self.keepalive_expiry}s)")
+        return client
+
+    def get_async_client(self, api_key: str):
+        """Geteilter AsyncOpenAI Client für api_key in der laufenden Event-Loop"""
+        if not openai:
+            raise ImportError("OpenAI package nicht installiert: pip install openai")
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            if api_key not in clients:
+                clients[api_key] = self._build_async_client(api_key)
+            return clients[api_key]
+
+    def close(self):
+        """Schließt die synchronen Clients (z.B. beim Herunterfahren)"""
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            client.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "settings": {
+                "max_connections": self.max_connections,
+                "max_keepalive_connections": self.max_keepalive_connections,
+                "keepalive_expiry": self.keepalive_expiry,
+                "connect_timeout": self.connect_timeout,
+                "read_timeout": self.read_timeout,
+                "max_retries": self.max_retries,
+                "metered": httpx is not None
+            },
+            "clients": {"sync": len(self._clients),
+                        "async": sum(len(clients) for clients in list(self._async_clients.values()))},
+            "sync": self.sync_meter.get_stats(),
+            "async": self.async_meter.get_stats()
+        }
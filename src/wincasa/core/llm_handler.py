@@ -4,12 +4,18 @@ WINCASA Layer 2 LLM Handler
 Echte LLM-Integration für alle Provider
 """
 
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import itertools
 import json
 import logging
 import os
 import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
 
 # LLM Provider Imports
 try:
@@ -32,11 +38,17 @@ try:
 except ImportError:
     pd = None
 
+from wincasa.data.db_singleton import execute_on_cursor, free_statement
 from wincasa.data.json_exporter import get_connection
 # from wincasa.tools.wincasa_tools import WincasaTools  # Missing - comment out for now
 
-from wincasa.utils.config_loader import WincasaConfig
-from wincasa.data.layer4_json_loader import Layer4JSONLoader
+from wincasa.core.async_executors import get_db_executor, get_io_executor, run_db, run_io
+from wincasa.core.component_registry import get_component
+from wincasa.core.answer_cache import normalize_query
+from wincasa.core.deadline import (Deadline, DeadlineExceeded, check_deadline, current_deadline,
+                                   deadline_scope, raise_if_deadline_caused, remaining_timeout)
+from wincasa.core.prompt_cache import PromptCache
+from wincasa.core.singleflight import SingleFlight
 
 # Import query path logger if available
 try:
@@ -48,15 +60,80 @@ except ImportError:
 logger = logging.getLogger('llm_handler')
 perf_logger = logging.getLogger('performance')
 
+_query_counter = itertools.count(1)
+
+
+@dataclass(frozen=True)
+class LLMRequestContext:
+    """
+    Zustand einer einzelnen LLM-Anfrage
+    
+    Wird durch _query_openai und _execute_function gereicht statt
+    os.environ['SYSTEM_MODE'] / self.system_prompt umzuschalten - parallele
+    Anfragen in verschiedenen Modi oder Modellen beeinflussen sich nicht.
+    """
+    query_id: str
+    mode: str  # effektiver Mode (Default: SYSTEM_MODE)
+    system_prompt: str
+    llm_config: Dict[str, Any]  # inkl. Modell-Override der Anfrage
+    
+    @property
+    def is_json_mode(self) -> bool:
+        return 'json' in self.mode
+    
+    @property
+    def model(self) -> str:
+        return self.llm_config.get('model', 'unknown')
+
+
+class ToolCall(NamedTuple):
+    """Ein Tool-Aufruf des Modells (arguments: JSON-String wie von der API geliefert)"""
+    id: str
+    name: str
+    arguments: str
+
+
+@dataclass(frozen=True)
+class ToolLoopLimits:
+    """
+    Obergrenzen der Tool-Schleife pro Anfrage (WincasaConfig.get_tool_loop_config)
+    
+    Nach max_rounds Tool-Runden oder verbrauchtem time_budget (Sekunden
+    Tool-Ausführung) muss das Modell mit den vorhandenen Daten antworten.
+    """
+    max_rounds: int = 3
+    time_budget: float = 20.0
+    max_result_chars: int = 20000  # Tool-Ergebnis im Prompt (Tokens = Latenz)
+
+
 class WincasaLLMHandler:
     """Echte LLM-Integration für alle WINCASA Modi"""
     
+    # Tools mit Datenbank-Zugriff laufen auf der DB-Lane, alle anderen im IO-Executor
+    DB_FUNCTIONS = frozenset({"search_tenants_by_address", "search_owners_by_address", "execute_sql_query"})
+    
+    ALL_FUNCTIONS = frozenset({"search_json_data", "search_all_json_files", "list_available_json_queries",
+                               "search_tenants_by_address", "search_owners_by_address", "execute_sql_query"})
+    
+    # Modi mit eigenem System-Prompt (einmalig gebaut, siehe PromptCache)
+    PROMPT_MODES = ('json_standard', 'json_vanilla', 'sql_standard', 'sql_vanilla')
+    DEFAULT_PROMPT = 'default'
+    
+    tool_limits = ToolLoopLimits()
+    
     def __init__(self):
-        self.config = WincasaConfig()
-        self.system_prompt = self._load_system_prompt()
+        self.config = get_component("config")
+        # Full prompts per mode, rebuilt only when a prompt file changes
+        self.prompts = self._build_prompt_cache()
+        self.system_prompt = self._system_prompt_for_mode(None)
         # SQL functionality provided by database_connection module
         self.json_exporter = None
-        self.layer4_json_loader = Layer4JSONLoader()
+        self.layer4_json_loader = get_component("layer4_json_loader")
+        # Process-wide OpenAI clients with keep-alive connection pool
+        self.client_pool = get_component("llm_client_pool")
+        # Identical concurrent queries (normalized query, mode, model) share one LLM call
+        self.inflight = SingleFlight("llm_handler")
+        self.tool_limits = ToolLoopLimits(**self.config.get_tool_loop_config())
         # self.tools = WincasaTools()  # Missing - comment out for now
         
     def _load_system_prompt(self) -> str:
@@ -81,8 +158,31 @@ Wichtige Regeln:
 - Deutsche WEG-Terminologie verwenden
 - Präzise und hilfsbereite Antworten geben"""
 
-    def _load_system_prompt_for_mode(self, mode: str) -> str:
-        """Lädt System-Prompt für spezifischen Mode ohne Config neu zu laden"""
+    def _build_prompt_cache(self) -> PromptCache:
+        """Registriert und baut die System-Prompts aller Modi (inkl. KB-Kontext) einmalig"""
+        prompts = PromptCache()
+        for mode in self.PROMPT_MODES:
+            prompts.register(mode, self._prompt_candidates(mode),
+                             functools.partial(self._load_system_prompt_for_mode, mode))
+        prompts.register(self.DEFAULT_PROMPT, self._default_prompt_sources(), self._load_system_prompt)
+        prompts.warm_up()
+        return prompts
+    
+    def _default_prompt_sources(self) -> list:
+        try:
+            return [Path(self.config.get_system_prompt_path())]
+        except Exception:
+            return []
+    
+    def _system_prompt_for_mode(self, mode: Optional[str]) -> str:
+        """Fertiger System-Prompt für mode (None = Standard-Prompt) - Lookup ohne Datei-I/O"""
+        key = mode or self.DEFAULT_PROMPT
+        if key not in self.prompts:
+            return self._get_fallback_prompt()
+        return self.prompts.get(key)
+    
+    def _prompt_candidates(self, mode: str) -> list:
+        """Prompt-Dateien für mode in Prioritätsreihenfolge (Enhanced Layer 4, Layer 4, Layer 2)"""
         base_path = Path(__file__).parent.parent / 'utils'
         
         # Check for Enhanced Layer 4 prompts first, fall back to standard Layer 4, then Layer 2
@@ -110,16 +210,17 @@ Wichtige Regeln:
         }
         
         if mode not in prompt_files:
+            return []
+        return [prompt_files[mode], layer4_fallback[mode], layer2_prompts[mode]]
+    
+    def _load_system_prompt_for_mode(self, mode: str) -> str:
+        """Lädt System-Prompt für spezifischen Mode ohne Config neu zu laden (Builder für PromptCache)"""
+        candidates = self._prompt_candidates(mode)
+        if not candidates:
             return self._get_fallback_prompt()
         
-        prompt_path = prompt_files[mode]
-        
         # Try Enhanced Layer 4 first, fall back to standard Layer 4, then Layer 2
-        if not prompt_path.exists() and mode in layer4_fallback:
-            prompt_path = layer4_fallback[mode]
-        
-        if not prompt_path.exists() and mode in layer2_prompts:
-            prompt_path = layer2_prompts[mode]
+        prompt_path = next((path for path in candidates if path.exists()), candidates[-1])
         
         try:
             with open(prompt_path, 'r', encoding='utf-8') as f:
@@ -246,7 +347,7 @@ Wichtige Regeln:
 
             # Determine data source based on mode
             source = "sql" if mode and 'sql' in mode else "json"
-            data_access = get_data_access(source=source)
+            data_access = get_data_access(source=source, json_loader=self.layer4_json_loader)
             
             logger.info(f"[{query_id}] Using unified data access with source: {source}")
             
@@ -416,42 +517,50 @@ Wichtige Regeln:
         return response
     
     
-    def query_llm(self, user_query: str, mode: str = None) -> Dict[str, Any]:
-        """Führt echte LLM-Abfrage aus"""
-        query_id = f"{int(time.time()*1000)}"  # Unique query ID
-        logger.info(f"[{query_id}] LLM Query gestartet - Mode: {mode}, Query: {user_query[:100]}...")
+    def _request_context(self, mode: Optional[str] = None, model: Optional[str] = None) -> LLMRequestContext:
+        """Baut den Kontext einer Anfrage (Mode, Prompt, Modell) - ohne globalen Zustand zu ändern"""
+        llm_config = self.config.get_llm_config()
+        if model:
+            llm_config = dict(llm_config, model=model)
+        return LLMRequestContext(
+            query_id=f"{int(time.time()*1000)}-{next(_query_counter)}",  # Unique even for parallel queries
+            mode=mode or os.environ.get('SYSTEM_MODE', 'json_standard'),
+            system_prompt=self._system_prompt_for_mode(mode),
+            llm_config=llm_config
+        )
+    
+    def _inflight_key(self, user_query: str, mode: Optional[str], model: Optional[str] = None) -> tuple:
+        effective_mode = mode or os.environ.get('SYSTEM_MODE', 'json_standard')
+        return normalize_query(user_query), effective_mode, model or self.config.get_llm_config().get('model', 'unknown')
+    
+    def query_llm(self, user_query: str, mode: str = None, model: str = None) -> Dict[str, Any]:
+        """
+        Führt echte LLM-Abfrage aus (gleichzeitige identische Anfragen teilen sich einen Call)
         
-        old_mode = None
-        if mode:
-            # Temporär Mode ändern
-            old_mode = os.environ.get('SYSTEM_MODE')
-            os.environ['SYSTEM_MODE'] = mode
-            logger.debug(f"[{query_id}] Mode temporär geändert: {old_mode} -> {mode}")
-            # Lade nur System-Prompt neu, nicht ganze Config
-            self.system_prompt = self._load_system_prompt_for_mode(mode)
-            logger.debug(f"[{query_id}] System-Prompt geladen für Mode: {mode}")
+        Mode und Modell gelten nur für diese Anfrage - parallele Aufrufe aus
+        mehreren Threads oder Tasks beeinflussen sich nicht.
+        """
+        result, coalesced = self.inflight.do(self._inflight_key(user_query, mode, model),
+                                             self._query_llm, user_query, mode, model)
+        return dict(result, coalesced=True) if coalesced else result
+    
+    def _query_llm(self, user_query: str, mode: str = None, model: str = None) -> Dict[str, Any]:
+        context = self._request_context(mode, model)
+        query_id = context.query_id
+        llm_config = context.llm_config
+        logger.info(f"[{query_id}] LLM Query gestartet - Mode: {mode}, Query: {user_query[:100]}...")
         
         start_time = time.time()
         
         try:
-            llm_config = self.config.get_llm_config()
-            
             # Comprehensive logging
             logger.info(f"[{query_id}] LLM Config - Provider: {llm_config.get('provider')}, Model: {llm_config.get('model')}")
             logger.debug(f"[{query_id}] API Key present: {bool(llm_config.get('api_key'))}")
             logger.debug(f"[{query_id}] Temperature: {llm_config.get('temperature')}, Max Tokens: {llm_config.get('max_tokens')}")
-            logger.debug(f"[{query_id}] System Prompt Length: {len(self.system_prompt)} chars")
+            logger.debug(f"[{query_id}] System Prompt Length: {len(context.system_prompt)} chars")
             
             # Enhance query with knowledge base context
-            enhanced_context = ""
-            try:
-                from wincasa.knowledge.knowledge_base_loader import get_knowledge_base
-                kb = get_knowledge_base()
-                enhanced_context = kb.enhance_prompt_with_knowledge(user_query)
-                if enhanced_context:
-                    logger.info(f"[{query_id}] Added knowledge base context to query")
-            except Exception as e:
-                logger.debug(f"Could not enhance with knowledge base: {str(e)}")
+            enhanced_context = self._knowledge_context_for_query(user_query, query_id)
             
             # Check if this is a tenant search query that we can handle directly
             if self._is_tenant_search_query(user_query):
@@ -467,7 +576,7 @@ Wichtige Regeln:
                 else:
                     enhanced_query = user_query
                     
-                response = self._query_openai(enhanced_query, llm_config, query_id)
+                response = self._query_openai(enhanced_query, context)
             
             response_time = time.time() - start_time
             
@@ -488,18 +597,121 @@ Wichtige Regeln:
             logger.error(f"[{query_id}] LLM Query fehlgeschlagen nach {response_time:.2f}s: {str(e)}")
             perf_logger.info(f"Query {query_id} | Mode: {mode} | Response Time: {response_time:.2f}s | Success: False | Error: {str(e)[:100]}")
             
-            # NO FALLBACKS - Propagate the error
+            # NO FALLBACKS - Propagate the error (budget overruns stay recognizable)
+            if isinstance(e, DeadlineExceeded):
+                raise
+            raise_if_deadline_caused("llm", e)
             raise Exception(f"LLM API Fehler: {str(e)}") from e
+    
+    async def query_llm_async(self, user_query: str, mode: str = None, model: str = None) -> Dict[str, Any]:
+        """Async-Variante von query_llm (teilt laufende Calls auch mit synchronen Aufrufern)"""
+        result, coalesced = await self.inflight.do_async(self._inflight_key(user_query, mode, model),
+                                                         self._query_llm_async, user_query, mode, model)
+        return dict(result, coalesced=True) if coalesced else result
+    
+    async def _query_llm_async(self, user_query: str, mode: str = None, model: str = None) -> Dict[str, Any]:
+        """
+        Async-Variante von _query_llm
         
-        finally:
-            # Mode zurücksetzen
-            if mode and old_mode:
-                os.environ['SYSTEM_MODE'] = old_mode
-                self.system_prompt = self._load_system_prompt()
-                logger.debug(f"[{query_id}] Mode zurückgesetzt: {mode} -> {old_mode}")
-    
-    def _query_openai(self, user_query: str, config: Dict, query_id: str = "unknown") -> str:
-        """OpenAI API Abfrage mit Function Calling Support"""
+        Der OpenAI-Call läuft nativ über AsyncOpenAI, Datei-Arbeit (KB-Kontext)
+        im IO-Executor, Datenbank-Zugriffe im DB-Executor.
+        """
+        context = self._request_context(mode, model)
+        query_id = context.query_id
+        llm_config = context.llm_config
+        logger.info(f"[{query_id}] Async LLM Query gestartet - Mode: {mode}, Query: {user_query[:100]}...")
+        
+        start_time = time.time()
+        
+        try:
+            if self._is_tenant_search_query(user_query):
+                logger.info(f"[{query_id}] Erkenne Mieter-Suchanfrage - führe direkte Datenbankabfrage aus")
+                run = run_db if mode and 'sql' in mode else run_io
+                response = await run(self._handle_tenant_search, user_query, mode, query_id)
+            else:
+                enhanced_context = await run_io(self._knowledge_context_for_query, user_query, query_id)
+                if enhanced_context:
+                    enhanced_query = f"{user_query}\n\n[KONTEXT AUS DATENBANK-ANALYSE]:\n{enhanced_context}"
+                else:
+                    enhanced_query = user_query
+                
+                logger.info(f"[{query_id}] Sende async Anfrage an OpenAI API...")
+                response = await self._query_openai_async(enhanced_query, context)
+            
+            response_time = time.time() - start_time
+            perf_logger.info(f"Query {query_id} | Mode: {mode} | Response Time: {response_time:.2f}s | Success: True | Model: {llm_config.get('model')} | Async")
+            
+            return {
+                'answer': response,
+                'source': f"OpenAI - {llm_config.get('model', 'unknown')}",
+                'response_time': response_time,
+                'mode': mode or self.config.get('system_mode'),
+                'success': True
+            }
+            
+        except Exception as e:
+            response_time = time.time() - start_time
+            logger.error(f"[{query_id}] Async LLM Query fehlgeschlagen nach {response_time:.2f}s: {str(e)}")
+            perf_logger.info(f"Query {query_id} | Mode: {mode} | Response Time: {response_time:.2f}s | Success: False | Error: {str(e)[:100]} | Async")
+            
+            # NO FALLBACKS - Propagate the error (budget overruns stay recognizable)
+            if isinstance(e, DeadlineExceeded):
+                raise
+            raise_if_deadline_caused("llm", e)
+            raise Exception(f"LLM API Fehler: {str(e)}") from e
+    
+    def query_llm_stream(self, user_query: str, mode: str = None, model: str = None) -> Iterator[str]:
+        """
+        Streaming-Variante von query_llm: liefert die Antwort stückweise, sobald
+        Tokens von OpenAI eintreffen
+        
+        Tool-Aufrufe werden aus den Deltas zusammengesetzt und ausgeführt, die
+        finale Antwort wird wieder gestreamt. Kein Coalescing - jeder Stream
+        hat seinen eigenen Call.
+        """
+        context = self._request_context(mode, model)
+        query_id = context.query_id
+        llm_config = context.llm_config
+        logger.info(f"[{query_id}] LLM Stream gestartet - Mode: {mode}, Query: {user_query[:100]}...")
+        
+        start_time = time.time()
+        
+        try:
+            if self._is_tenant_search_query(user_query):
+                logger.info(f"[{query_id}] Erkenne Mieter-Suchanfrage - führe direkte Datenbankabfrage aus")
+                yield self._handle_tenant_search(user_query, mode, query_id)
+            else:
+                enhanced_context = self._knowledge_context_for_query(user_query, query_id)
+                if enhanced_context:
+                    enhanced_query = f"{user_query}\n\n[KONTEXT AUS DATENBANK-ANALYSE]:\n{enhanced_context}"
+                else:
+                    enhanced_query = user_query
+                
+                logger.info(f"[{query_id}] Sende Streaming-Anfrage an OpenAI API...")
+                yield from self._stream_openai(enhanced_query, context)
+            
+            response_time = time.time() - start_time
+            perf_logger.info(f"Query {query_id} | Mode: {mode} | Response Time: {response_time:.2f}s | Success: True | Model: {llm_config.get('model')} | Stream")
+            
+        except Exception as e:
+            response_time = time.time() - start_time
+            logger.error(f"[{query_id}] LLM Stream fehlgeschlagen nach {response_time:.2f}s: {str(e)}")
+            perf_logger.info(f"Query {query_id} | Mode: {mode} | Response Time: {response_time:.2f}s | Success: False | Error: {str(e)[:100]} | Stream")
+            
+            # NO FALLBACKS - Propagate the error (budget overruns stay recognizable)
+            if isinstance(e, DeadlineExceeded):
+                raise
+            raise_if_deadline_caused("llm", e)
+            raise Exception(f"LLM API Fehler: {str(e)}") from e
+    
+    def _request_timeout(self):
+        """HTTP-Timeout für OpenAI: Restbudget der Anfrage (ohne Deadline: Client-Default)"""
+        timeout = remaining_timeout("llm")
+        return openai.NOT_GIVEN if timeout is None else timeout
+    
+    async def _query_openai_async(self, user_query: str, context: LLMRequestContext) -> str:
+        """Async-Variante von _query_openai (Tools parallel auf DB-Lane bzw. IO-Executor)"""
+        config, query_id = context.llm_config, context.query_id
         if not openai:
             logger.error(f"[{query_id}] OpenAI package nicht installiert")
             raise ImportError("OpenAI package nicht installiert: pip install openai")
@@ -508,11 +720,33 @@ Wichtige Regeln:
             logger.error(f"[{query_id}] OpenAI API Key fehlt")
             raise ValueError("OpenAI API Key fehlt")
         
-        # Determine current mode
-        current_mode = os.environ.get('SYSTEM_MODE', 'json_standard')
-        is_json_mode = 'json' in current_mode
+        client = self.client_pool.get_async_client(config['api_key'])
+        messages = self._initial_messages(user_query, context)
+        tool_time = 0.0
+        
+        try:
+            for round_number in itertools.count(1):
+                tools_allowed = self._tools_allowed(round_number, tool_time, query_id)
+                api_start_time = time.time()
+                response = await client.chat.completions.create(
+                    **self._chat_request(messages, context, tools_allowed))
+                logger.debug(f"[{query_id}] OpenAI API Response Time (Runde {round_number}): {time.time() - api_start_time:.2f}s")
+                
+                tool_calls, content = self._unpack_response(response, query_id)
+                if not tool_calls or not tools_allowed:
+                    return self._final_answer(content, query_id)
+                
+                tool_start = time.time()
+                results = await self._run_tool_calls_async(tool_calls, context, self._tool_budget(tool_time))
+                tool_time += time.time() - tool_start
+                messages.extend(self._tool_messages(tool_calls, results, content))
         
-        # Define available functions based on mode
+        except Exception as e:
+            logger.error(f"[{query_id}] OpenAI API Unbekannter Fehler: {str(e)}")
+            raise
+    
+    def _function_definitions(self, is_json_mode: bool) -> list:
+        """Function-Calling Definitionen für JSON- bzw. SQL-Modus"""
         if is_json_mode:
             # JSON mode - search in pre-exported JSON files
             functions = [
@@ -608,73 +842,333 @@ Wichtige Regeln:
             }
         ]
         
-        # Initialize OpenAI client
-        client = openai.OpenAI(api_key=config['api_key'])
+        return functions
+    
+    def _knowledge_context_for_query(self, user_query: str, query_id: str) -> str:
+        """Knowledge-Base Kontext zur Anfrage (leer falls nicht verfügbar)"""
+        try:
+            from wincasa.knowledge.knowledge_base_loader import get_knowledge_base
+            kb = get_knowledge_base()
+            enhanced_context = kb.enhance_prompt_with_knowledge(user_query)
+            if enhanced_context:
+                logger.info(f"[{query_id}] Added knowledge base context to query")
+            return enhanced_context
+        except Exception as e:
+            logger.debug(f"Could not enhance with knowledge base: {str(e)}")
+            return ""
+    
+    def _query_openai(self, user_query: str, context: LLMRequestContext) -> str:
+        """
+        OpenAI API Abfrage mit Tool-Schleife
+        
+        Das Modell kann pro Runde mehrere Tools anfordern; sie laufen parallel,
+        ihre Ergebnisse gehen zurück an das Modell, bis es antwortet. Runden und
+        Tool-Zeit sind begrenzt (ToolLoopLimits), danach wird ohne Tools geantwortet.
+        """
+        config, query_id = context.llm_config, context.query_id
+        if not openai:
+            logger.error(f"[{query_id}] OpenAI package nicht installiert")
+            raise ImportError("OpenAI package nicht installiert: pip install openai")
+        
+        if not config.get('api_key'):
+            logger.error(f"[{query_id}] OpenAI API Key fehlt")
+            raise ValueError("OpenAI API Key fehlt")
+        
+        # Shared client - reuses keep-alive connections
+        client = self.client_pool.get_client(config['api_key'])
         
         logger.debug(f"[{query_id}] OpenAI Request - Model: {config['model']}")
         logger.debug(f"[{query_id}] User Query Length: {len(user_query)} chars")
         
-        api_start_time = time.time()
+        messages = self._initial_messages(user_query, context)
+        tool_time = 0.0
         
         try:
-            response = client.chat.completions.create(
-                model=config['model'],
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_query}
-                ],
-                functions=functions,
-                function_call="auto",
-                temperature=config['temperature'],
-                max_tokens=config['max_tokens']
-            )
-            
-            api_time = time.time() - api_start_time
-            logger.debug(f"[{query_id}] OpenAI API Response Time: {api_time:.2f}s")
-            
-            choice = response.choices[0]
-            message = choice.message
-            
-            # Check if LLM wants to call a function
-            if message.function_call:
-                function_name = message.function_call.name
-                function_args = json.loads(message.function_call.arguments)
-                
-                logger.info(f"[{query_id}] LLM called function: {function_name} with args: {function_args}")
+            for round_number in itertools.count(1):
+                tools_allowed = self._tools_allowed(round_number, tool_time, query_id)
+                api_start_time = time.time()
+                response = client.chat.completions.create(**self._chat_request(messages, context, tools_allowed))
+                logger.debug(f"[{query_id}] OpenAI API Response Time (Runde {round_number}): {time.time() - api_start_time:.2f}s")
                 
-                # Execute the function
-                function_result = self._execute_function(function_name, function_args, query_id)
+                tool_calls, content = self._unpack_response(response, query_id)
+                if not tool_calls or not tools_allowed:
+                    return self._final_answer(content, query_id)
                 
-                # Return function result as response
-                return function_result
-            
-            # Regular text response
-            elif message.content:
-                response_content = message.content.strip()
-                logger.debug(f"[{query_id}] Response Length: {len(response_content)} chars")
-                
-                # Usage logging
-                if response.usage:
-                    usage = response.usage
-                    logger.info(f"[{query_id}] Token Usage - Prompt: {usage.prompt_tokens}, Completion: {usage.completion_tokens}, Total: {usage.total_tokens}")
-                
-                return response_content
-            
-            else:
-                logger.error(f"[{query_id}] Unexpected message format: {message}")
-                raise Exception("Unexpected message format")
+                tool_start = time.time()
+                results = self._run_tool_calls(tool_calls, context, self._tool_budget(tool_time))
+                tool_time += time.time() - tool_start
+                messages.extend(self._tool_messages(tool_calls, results, content))
         
         except Exception as e:
             logger.error(f"[{query_id}] OpenAI API Unbekannter Fehler: {str(e)}")
             raise
     
+    def _stream_openai(self, user_query: str, context: LLMRequestContext) -> Iterator[str]:
+        """OpenAI Streaming-Abfrage: Text-Deltas direkt, Tool-Aufrufe aus Deltas zusammengesetzt (Tool-Schleife wie _query_openai)"""
+        config, query_id = context.llm_config, context.query_id
+        if not openai:
+            logger.error(f"[{query_id}] OpenAI package nicht installiert")
+            raise ImportError("OpenAI package nicht installiert: pip install openai")
+        
+        if not config.get('api_key'):
+            logger.error(f"[{query_id}] OpenAI API Key fehlt")
+            raise ValueError("OpenAI API Key fehlt")
+        
+        client = self.client_pool.get_client(config['api_key'])
+        messages = self._initial_messages(user_query, context)
+        tool_time = 0.0
+        api_start_time = time.time()
+        first_token_time = None
+        
+        for round_number in itertools.count(1):
+            tools_allowed = self._tools_allowed(round_number, tool_time, query_id)
+            stream = client.chat.completions.create(**self._chat_request(messages, context, tools_allowed),
+                                                    stream=True)
+            
+            # Tool calls arrive in pieces per index: id and name first, then argument fragments
+            pending: Dict[int, Dict[str, Any]] = {}
+            content_parts = []
+            try:
+                for chunk in stream:
+                    check_deadline("llm_stream")
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+                    
+                    for call_delta in getattr(delta, 'tool_calls', None) or []:
+                        call = pending.setdefault(call_delta.index, {"id": None, "name": None, "arguments": []})
+                        call["id"] = call_delta.id or call["id"]
+                        if call_delta.function:
+                            call["name"] = call_delta.function.name or call["name"]
+                            call["arguments"].append(call_delta.function.arguments or "")
+                    
+                    if delta.content:
+                        if first_token_time is None:
+                            first_token_time = time.time()
+                            logger.debug(f"[{query_id}] OpenAI Time to First Token: {first_token_time - api_start_time:.2f}s")
+                        content_parts.append(delta.content)
+                        yield delta.content
+            finally:
+                # Abbruch durch den Konsumenten: Verbindung sofort freigeben
+                close = getattr(stream, 'close', None)
+                if close:
+                    close()
+            
+            tool_calls = [ToolCall(call["id"] or f"call_{index}", call["name"], "".join(call["arguments"]))
+                          for index, call in sorted(pending.items()) if call["name"]]
+            if not tool_calls or not tools_allowed:
+                logger.debug(f"[{query_id}] OpenAI Stream Time: {time.time() - api_start_time:.2f}s")
+                return
+            
+            logger.info(f"[{query_id}] LLM requested tools: {[call.name for call in tool_calls]}")
+            tool_start = time.time()
+            results = self._run_tool_calls(tool_calls, context, self._tool_budget(tool_time))
+            tool_time += time.time() - tool_start
+            messages.extend(self._tool_messages(tool_calls, results, "".join(content_parts) or None))
+    
+    def _initial_messages(self, user_query: str, context: LLMRequestContext) -> List[Dict[str, Any]]:
+        return [
+            {"role": "system", "content": context.system_prompt},
+            {"role": "user", "content": user_query}
+        ]
+    
+    def _chat_request(self, messages: list, context: LLMRequestContext, tools_allowed: bool) -> Dict[str, Any]:
+        """Parameter eines Chat-Completion Calls; ohne erlaubte Tools muss das Modell antworten"""
+        config = context.llm_config
+        return {
+            "model": config['model'],
+            "messages": messages,
+            "tools": [{"type": "function", "function": function}
+                      for function in self._function_definitions(context.is_json_mode)],
+            "tool_choice": "auto" if tools_allowed else "none",
+            "temperature": config['temperature'],
+            "max_tokens": config['max_tokens'],
+            "timeout": self._request_timeout()
+        }
+    
+    def _tools_allowed(self, round_number: int, tool_time: float, query_id: str) -> bool:
+        """Weitere Tool-Runde erlaubt? (Runden- und Zeitlimit der Anfrage)"""
+        if round_number > self.tool_limits.max_rounds:
+            logger.info(f"[{query_id}] Tool-Limit erreicht ({self.tool_limits.max_rounds} Runden) - finale Antwort ohne Tools")
+            return False
+        if tool_time >= self.tool_limits.time_budget:
+            logger.info(f"[{query_id}] Tool-Zeitbudget verbraucht ({tool_time:.2f}s) - finale Antwort ohne Tools")
+            return False
+        return True
+    
+    def _tool_budget(self, tool_time: float) -> float:
+        """Verbleibende Tool-Zeit: Rest des Tool-Budgets, höchstens Restbudget der Anfrage"""
+        check_deadline("tools")
+        budget = self.tool_limits.time_budget - tool_time
+        deadline_timeout = remaining_timeout("tools")
+        return budget if deadline_timeout is None else min(budget, deadline_timeout)
+    
+    def _run_tool(self, call: ToolCall, context: LLMRequestContext, deadline: Optional[Deadline] = None) -> str:
+        """
+        Führt einen Tool-Aufruf aus; Fehler gehen als Text an das Modell zurück
+        
+        deadline ist die Deadline der Tool-Runde: sie begrenzt das Tool (SQL:
+        Statement-Timeout) auf das Tool-Budget. Läuft nur sie ab, bekommt das
+        Modell eine Zeitlimit-Meldung; läuft die Anfrage-Deadline ab, bricht die Anfrage ab.
+        """
+        try:
+            function_args = json.loads(call.arguments or "{}")
+        except json.JSONDecodeError as e:
+            logger.error(f"[{context.query_id}] Invalid arguments for {call.name}: {call.arguments[:200]}")
+            return f"Fehler: Ungültige Argumente für '{call.name}': {e}"
+        
+        request_deadline = current_deadline()
+        try:
+            with deadline_scope(deadline or request_deadline):
+                result = self._execute_function(call.name, function_args, context)
+        except DeadlineExceeded:
+            if request_deadline is not None and request_deadline.expired:
+                raise
+            return self._tool_timeout_result(call, context.query_id)
+        limit = self.tool_limits.max_result_chars
+        if len(result) > limit:
+            logger.info(f"[{context.query_id}] Tool-Ergebnis {call.name} gekürzt ({len(result)} -> {limit} Zeichen)")
+            result = result[:limit] + "\n... (gekürzt)"
+        return result
+    
+    def _tool_timeout_result(self, call: ToolCall, query_id: str) -> str:
+        logger.warning(f"[{query_id}] Tool {call.name} hat das Zeitbudget überschritten")
+        return f"Fehler: Zeitlimit für '{call.name}' überschritten - bitte mit den vorhandenen Daten antworten."
+    
+    def _submit_tools(self, tool_calls: List[ToolCall], context: LLMRequestContext,
+                      budget: float) -> List[concurrent.futures.Future]:
+        """Startet die Tool-Aufrufe einer Runde (SQL: DB-Executor, JSON: IO-Executor)"""
+        # One deadline for the round: caps the Firebird statement timeout of the DB tools at the budget
+        deadline = Deadline(max(0.0, budget) * 1000)
+        futures = []
+        for call in tool_calls:
+            executor = get_db_executor() if call.name in self.DB_FUNCTIONS else get_io_executor()
+            # Context variables (deadline) follow the call into the worker thread
+            futures.append(executor.submit(contextvars.copy_context().run, self._run_tool, call, context, deadline))
+        return futures
+    
+    def _stop_tools(self, tool_calls: List[ToolCall], futures: List[concurrent.futures.Future],
+                    not_done: set) -> List[concurrent.futures.Future]:
+        """
+        Bricht noch wartende Tools ab
+        
+        Returns:
+            Laufende DB-Tools - sie belegen den DB-Thread bis zu ihrem Statement-Timeout
+            und werden abgewartet statt als Zeitüberschreitung gemeldet
+        """
+        running = []
+        for call, future in zip(tool_calls, futures):
+            if future in not_done and not future.cancel() and call.name in self.DB_FUNCTIONS:
+                running.append(future)
+        return running
+    
+    def _tool_results(self, tool_calls: List[ToolCall], futures: List[concurrent.futures.Future],
+                      query_id: str) -> List[str]:
+        return [future.result() if future.done() and not future.cancelled()
+                else self._tool_timeout_result(call, query_id)
+                for call, future in zip(tool_calls, futures)]
     
-    def _execute_function(self, function_name: str, function_args: Dict[str, Any], query_id: str) -> str:
+    def _run_tool_calls(self, tool_calls: List[ToolCall], context: LLMRequestContext, budget: float) -> List[str]:
+        """
+        Führt die Tool-Aufrufe einer Runde parallel aus
+        
+        Wartet höchstens budget Sekunden; nicht gestartete Tools werden abgebrochen,
+        laufende JSON-Tools liefern eine Zeitlimit-Meldung. Laufende DB-Tools sind
+        über den Statement-Timeout auf das Budget begrenzt und werden abgewartet.
+        """
+        futures = self._submit_tools(tool_calls, context, budget)
+        _, not_done = concurrent.futures.wait(futures, timeout=max(0.0, budget))
+        concurrent.futures.wait(self._stop_tools(tool_calls, futures, not_done))
+        return self._tool_results(tool_calls, futures, context.query_id)
+    
+    async def _run_tool_calls_async(self, tool_calls: List[ToolCall], context: LLMRequestContext,
+                                    budget: float) -> List[str]:
+        """Async-Variante von _run_tool_calls"""
+        futures = self._submit_tools(tool_calls, context, budget)
+        waiters = {asyncio.wrap_future(future): future for future in futures}
+        _, pending = await asyncio.wait(list(waiters), timeout=max(0.0, budget))
+        running = set(self._stop_tools(tool_calls, futures, {waiters[waiter] for waiter in pending}))
+        if running:
+            await asyncio.wait([waiter for waiter, future in waiters.items() if future in running])
+        return self._tool_results(tool_calls, futures, context.query_id)
+    
+    def _tool_messages(self, tool_calls: List[ToolCall], results: List[str],
+                       content: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Assistant-Nachricht mit den Tool-Aufrufen plus je eine Tool-Nachricht mit dem Ergebnis"""
+        messages = [{
+            "role": "assistant",
+            "content": content,
+            "tool_calls": [{"id": call.id, "type": "function",
+                            "function": {"name": call.name, "arguments": call.arguments}}
+                           for call in tool_calls]
+        }]
+        messages.extend({"role": "tool", "tool_call_id": call.id, "content": result}
+                        for call, result in zip(tool_calls, results))
+        return messages
+    
+    def _call_openai_api(self, messages: list, **kwargs):
+        """Einfacher Chat-Completion Call über den geteilten Client (z.B. Intent-Erkennung)"""
+        config = self.config.get_llm_config()
+        if not config.get('api_key'):
+            raise ValueError("OpenAI API Key fehlt")
+        if kwargs.get('timeout', openai.NOT_GIVEN) is None:
+            # Keine Deadline -> Timeout des Pools statt unbegrenzt
+            del kwargs['timeout']
+        return self.client_pool.get_client(config['api_key']).chat.completions.create(
+            model=config['model'], messages=messages, **kwargs)
+
+    def _unpack_response(self, response, query_id: str) -> tuple:
+        """
+        Zerlegt eine Chat-Completion
+        
+        Returns:
+            ([ToolCall, ...], Begleittext oder None) wenn das Modell Tools anfordert,
+            sonst ([], Antworttext)
+        """
+        message = response.choices[0].message
+        
+        # Usage logging
+        if response.usage:
+            usage = response.usage
+            logger.info(f"[{query_id}] Token Usage - Prompt: {usage.prompt_tokens}, Completion: {usage.completion_tokens}, Total: {usage.total_tokens}")
+        
+        # Check if LLM wants to call tools (possibly several at once)
+        tool_calls = [ToolCall(call.id, call.function.name, call.function.arguments)
+                      for call in getattr(message, 'tool_calls', None) or []]
+        if tool_calls:
+            logger.info(f"[{query_id}] LLM requested tools: {[call.name for call in tool_calls]}")
+            return tool_calls, message.content
+        
+        # Regular text response
+        if message.content:
+            response_content = message.content.strip()
+            logger.debug(f"[{query_id}] Response Length: {len(response_content)} chars")
+            return [], response_content
+        
+        logger.error(f"[{query_id}] Unexpected message format: {message}")
+        raise Exception("Unexpected message format")
+    
+    def _final_answer(self, content: Optional[str], query_id: str) -> str:
+        if content:
+            return content.strip()
+        # Tool calls although no more tools were allowed and no text
+        logger.error(f"[{query_id}] Keine Antwort nach Tool-Schleife")
+        raise Exception("Unexpected message format")
+    
+    
+    def _execute_function(self, function_name: str, function_args: Dict[str, Any],
+                          context: LLMRequestContext) -> str:
         """
         Execute LLM-called function and return formatted results.
-        This gives the LLM tool execution capabilities like Claude Code.
+        Only functions offered in the request's mode are executed.
         """
-        logger.info(f"[{query_id}] Executing function: {function_name} with args: {function_args}")
+        query_id = context.query_id
+        logger.info(f"[{query_id}] Executing function: {function_name} with args: {function_args} (Mode: {context.mode})")
+        
+        offered = {function["name"] for function in self._function_definitions(context.is_json_mode)}
+        if function_name not in offered and function_name in self.ALL_FUNCTIONS:
+            logger.error(f"[{query_id}] Function {function_name} not available in mode {context.mode}")
+            return f"Fehler: Funktion '{function_name}' ist im Modus {context.mode} nicht verfügbar."
         
         try:
             # JSON mode functions
@@ -709,7 +1203,10 @@ Wichtige Regeln:
                 logger.info(f"[{query_id}] Available functions: {', '.join(available_functions)}")
                 
                 return f"Fehler: Unbekannte Funktion '{function_name}'. Verfügbare Funktionen: {', '.join(available_functions)}"
-                
+        
+        except DeadlineExceeded:
+            # Budget exhausted - abort the request instead of feeding the error back to the model
+            raise
         except Exception as e:
             error_msg = f"Function execution failed: {str(e)}"
             logger.error(f"[{query_id}] {error_msg}")
@@ -729,16 +1226,8 @@ Wichtige Regeln:
             sql_query = self._build_tenant_search_sql(address_info)
             logger.info(f"[{query_id}] Function calling tenant search SQL: {sql_query}")
             
-            # Execute with sophisticated SQL engine
-            # Execute SQL query directly
-            conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute(sql_query)
-            rows = cursor.fetchall()
-            columns = [desc[0] for desc in cursor.description] if cursor.description else []
-            result = {'columns': columns, 'data': rows, 'success': True, 'error': None}
-            cursor.close()
-            conn.close()
+            # Execute SQL query directly (statement timeout from the request deadline)
+            result = self._fetch_tool_sql(sql_query)
             
             if result['success']:
                 # Format result for function calling context
@@ -750,8 +1239,11 @@ Wichtige Regeln:
                 error_msg = result.get('error', 'Unknown error')
                 return f"Fehler bei der Mieter-Suche: {error_msg}"
                 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"[{query_id}] Tenant search function failed: {str(e)}")
+            raise_if_deadline_caused("sql", e)
             return f"Fehler bei der Mieter-Suche: {str(e)}"
     
     def _execute_owner_search_function(self, args: Dict[str, Any], query_id: str) -> str:
@@ -760,7 +1252,7 @@ Wichtige Regeln:
             from wincasa.data.data_access_layer import get_data_access
 
             # Use unified data access with SQL source
-            data_access = get_data_access(source="sql")
+            data_access = get_data_access(source="sql", json_loader=self.layer4_json_loader)
             
             result = data_access.search_owners_by_address(
                 street=args.get('street'),
@@ -830,15 +1322,8 @@ Wichtige Regeln:
             
             # SQL validation is now handled by knowledge base above
             
-            # Execute SQL query
-            conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute(sql_query)
-            rows = cursor.fetchall()
-            columns = [desc[0] for desc in cursor.description] if cursor.description else []
-            result = {'columns': columns, 'data': rows, 'success': True, 'error': None}
-            cursor.close()
-            conn.close()
+            # Execute SQL query (statement timeout from the request deadline)
+            result = self._fetch_tool_sql(sql_query)
             
             if result['success']:
                 # Format result for function calling context
@@ -850,10 +1335,29 @@ Wichtige Regeln:
                 error_msg = result.get('error', 'Unknown error')
                 return f"Fehler bei der SQL-Ausführung: {error_msg}"
                 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"[{query_id}] SQL function execution failed: {str(e)}")
+            raise_if_deadline_caused("sql", e)
             return f"Fehler bei der SQL-Ausführung: {str(e)}"
     
+    def _fetch_tool_sql(self, sql_query: str) -> dict:
+        """Run a tool SQL query; the prepared deadline statement is freed after the fetch"""
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            statement = execute_on_cursor(cursor, sql_query)
+            try:
+                rows = cursor.fetchall()
+                columns = [desc[0] for desc in cursor.description] if cursor.description else []
+            finally:
+                free_statement(statement)
+            cursor.close()
+        finally:
+            conn.close()
+        return {'columns': columns, 'data': rows, 'success': True, 'error': None}
+    
     def _format_sql_result(self, result: dict) -> str:
         """Format SQL result for display"""
         if not result['data']:
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+WINCASA Prompt Cache
+Fertig zusammengesetzte System-Prompts pro Mode, gebaut einmal beim Start
+
+Jeder Eintrag kennt seine Quelldateien (inkl. noch nicht existierender
+Varianten, z.B. ENHANCED-Prompts). Geändert, angelegt oder gelöscht wird
+über die mtimes erkannt - geprüft höchstens alle check_interval Sekunden,
+dazwischen ist get() ein reiner Dictionary-Lookup ohne Datei-I/O.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _mtimes(paths: Sequence[Path]) -> Tuple[Optional[int], ...]:
+    """mtime pro Quelldatei (None = existiert nicht)"""
+    signature = []
+    for path in paths:
+        try:
+            signature.append(path.stat().st_mtime_ns)
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+@dataclass
+class _PromptEntry:
+    sources: Tuple[Path, ...]
+    build: Callable[[], str]
+    prompt: Optional[str] = None
+    signature: Optional[Tuple[Optional[int], ...]] = None
+    checked_at: float = 0.0
+
+
+class PromptCache:
+    """
+    Memoisierte System-Prompts mit Invalidierung über Datei-mtimes
+
+    - register(): Key + Quelldateien + Builder (liest Dateien, hängt KB-Kontext an)
+    - get(): fertiger Prompt; Rebuild nur, wenn sich eine Quelle geändert hat
+    Thread-safe.
+    """
+
+    def __init__(self, check_interval: float = 5.0):
+        self.check_interval = check_interval
+        self._entries: Dict[str, _PromptEntry] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "builds": 0, "checks": 0}
+
+    def register(self, key: str, sources: Sequence[Path], build: Callable[[], str]):
+        with self._lock:
+            self._entries[key] = _PromptEntry(tuple(Path(path) for path in sources), build)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def _rebuild(self, key: str, entry: _PromptEntry, signature: Tuple[Optional[int], ...]):
+        # Caller holds the lock
+        start_time = time.time()
+        entry.prompt = entry.build()
+        entry.signature = signature
+        self.stats["builds"] += 1
+        logger.debug(f"System-Prompt '{key}' gebaut ({len(entry.prompt)} Zeichen, "
+                     f"{(time.time() - start_time) * 1000:.1f}ms)")
+
+    def get(self, key: str) -> str:
+        """Gibt den fertigen Prompt für key zurück (KeyError für unbekannte Keys)"""
+        entry = self._entries[key]
+        now = time.monotonic()
+        if entry.prompt is not None and now - entry.checked_at < self.check_interval:
+            self.stats["hits"] += 1
+            return entry.prompt
+
+        with self._lock:
+            if entry.prompt is None or now - entry.checked_at >= self.check_interval:
+                signature = _mtimes(entry.sources)
+                self.stats["checks"] += 1
+                if entry.prompt is None or signature != entry.signature:
+                    self._rebuild(key, entry, signature)
+                entry.checked_at = now
+            else:
+                self.stats["hits"] += 1
+            return entry.prompt
+
+    def warm_up(self) -> List[str]:
+        """Baut alle registrierten Prompts vorab; liefert die fehlgeschlagenen Keys"""
+        failed = []
+        for key in list(self._entries):
+            try:
+                self.get(key)
+            except Exception as e:
+                logger.warning(f"⚠️ System-Prompt '{key}' konnte nicht gebaut werden: {e}")
+                failed.append(key)
+        return failed
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "prompts": sorted(key for key, entry in self._entries.items()
+                                                if entry.prompt is not None)}
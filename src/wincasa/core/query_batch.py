@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+WINCASA Query Batch
+Massenverarbeitung vieler Queries mit begrenzter Parallelität
+
+Identische Queries (gleiche Normalisierung wie im Answer Cache) werden nur
+einmal verarbeitet. LLM-gebundene Arbeit (auch das Unified System) läuft
+parallel bis zum Limit `concurrency`, nur SQL bleibt auf der seriellen
+DB-Lane (run_db/call_db). Ergebnisse kommen in Fertigstellungs-Reihenfolge
+zurück, die Durchsatz-Statistik steht nach vollständiger Iteration in `stats`.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional
+
+from wincasa.core.answer_cache import normalize_query
+from wincasa.core.async_executors import llm_concurrency_limit
+from wincasa.monitoring.latency_histogram import StreamingHistogram
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 8
+
+_DONE = object()
+
+
+@dataclass
+class BatchItem:
+    """Ein Ergebnis des Batches (index = Position in der Eingabe)"""
+    index: int
+    query: str
+    result: Optional[Any]  # QueryEngineResult
+    error: Optional[str] = None
+    duplicate_of: Optional[int] = None  # Index der Query, deren Ergebnis geteilt wird
+
+
+class QueryBatch:
+    """
+    Ergebnisstrom von WincasaQueryEngine.process_queries
+
+    Iterierbar synchron (`for item in batch`, Verarbeitung in eigenem
+    Thread mit eigener Event-Loop) und asynchron (`async for item in batch`).
+    Ein Batch kann nur einmal durchlaufen werden.
+    """
+
+    def __init__(self, engine, queries: Iterable[str], concurrency: int = DEFAULT_CONCURRENCY,
+                 **query_options):
+        if concurrency < 1:
+            raise ValueError(f"concurrency muss >= 1 sein, nicht {concurrency}")
+        self.engine = engine
+        self.queries: List[str] = list(queries)
+        self.concurrency = concurrency
+        self.query_options = query_options
+
+        # Normalisierte Query -> Eingabe-Indizes (erste Position wird verarbeitet)
+        self.groups: Dict[str, List[int]] = {}
+        for index, query in enumerate(self.queries):
+            self.groups.setdefault(normalize_query(query), []).append(index)
+
+        self.stats: Dict[str, Any] = {}
+        self._started = False
+        self._stop = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self.queries)
+
+    def _claim(self):
+        if self._started:
+            raise RuntimeError("QueryBatch wurde bereits durchlaufen")
+        self._started = True
+
+    async def _process(self, indexes: List[int]):
+        query = self.queries[indexes[0]]
+        try:
+            return indexes, await self.engine.process_query_async(query, **self.query_options), None
+        except Exception as e:
+            logger.warning(f"Batch-Query '{query}' fehlgeschlagen: {e}")
+            return indexes, None, str(e)
+
+    async def _run(self) -> AsyncIterator[BatchItem]:
+        start_time = time.monotonic()
+        latency = StreamingHistogram()
+        by_mode: Dict[str, int] = {}
+        completed = errors = 0
+        total_cost = 0.0
+
+        # Tasks erben das LLM-Limit über ihren Kontext
+        with llm_concurrency_limit(self.concurrency):
+            tasks = [asyncio.ensure_future(self._process(indexes)) for indexes in self.groups.values()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                indexes, result, error = await next_done
+                completed += 1
+                if result is None:
+                    errors += 1
+                else:
+                    latency.record(result.processing_time_ms)
+                    by_mode[result.processing_mode] = by_mode.get(result.processing_mode, 0) + 1
+                    total_cost += result.cost_estimate
+                for position, index in enumerate(indexes):
+                    yield BatchItem(index=index, query=self.queries[index], result=result, error=error,
+                                    duplicate_of=indexes[0] if position else None)
+        finally:
+            for task in tasks:
+                task.cancel()
+            wall_time = time.monotonic() - start_time
+            self.stats = {
+                "queries": len(self.queries),
+                "unique_queries": len(self.groups),
+                "duplicates": len(self.queries) - len(self.groups),
+                "completed": completed,
+                "errors": errors,
+                "concurrency": self.concurrency,
+                "wall_time_ms": round(wall_time * 1000, 2),
+                "throughput_qps": round(len(self.queries) / wall_time, 2) if wall_time else 0.0,
+                "latency_ms": latency.to_dict(),
+                "by_processing_mode": by_mode,
+                "total_cost": round(total_cost, 4)
+            }
+
+    def __aiter__(self) -> AsyncIterator[BatchItem]:
+        self._claim()
+        return self._run()
+
+    def __iter__(self) -> Iterator[BatchItem]:
+        self._claim()
+        items: "queue.Queue" = queue.Queue()
+        runner = []  # (loop, task) des Worker-Threads, sobald er läuft
+
+        async def pump():
+            runner.append((asyncio.get_running_loop(), asyncio.current_task()))
+            if self._stop.is_set():
+                return
+            stream = self._run()
+            try:
+                async for item in stream:
+                    items.put(item)
+            finally:
+                await stream.aclose()
+
+        def worker():
+            try:
+                asyncio.run(pump())
+            except BaseException as e:
+                items.put(e)
+            finally:
+                items.put(_DONE)
+
+        thread = threading.Thread(target=worker, name="wincasa-batch", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = items.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # Abbruch durch den Aufrufer: offene Queries sofort verwerfen statt auf das nächste Ergebnis zu warten
+            self._stop.set()
+            for loop, task in runner:
+                try:
+                    loop.call_soon_threadsafe(task.cancel)
+                except RuntimeError:
+                    pass  # Event-Loop bereits beendet
+            thread.join()
+
+    def results(self) -> List[BatchItem]:
+        """Alle Ergebnisse in Eingabe-Reihenfolge (blockiert bis zum Ende)"""
+        return sorted(self, key=lambda item: item.index)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+WINCASA Query Stream
+Antwort-Tokens einer Query, sobald sie vom LLM eintreffen
+
+Die Engine verarbeitet die Query wie gewohnt (process_query) in einem
+eigenen Thread. Der LLM-Pfad findet über einen ContextVar-Sink heraus, dass
+jemand mitliest, und reicht jedes Stück sofort weiter. Pfade ohne LLM
+(Cache, Templates, Structured Search) liefern ihre Antwort als ein Stück.
+Time-to-First-Token wird am Ergebnis vermerkt (time_to_first_token_ms).
+"""
+
+import contextvars
+import logging
+import queue
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+_token_sink: ContextVar[Optional[Callable[[str], None]]] = ContextVar("wincasa_token_sink", default=None)
+
+
+def current_token_sink() -> Optional[Callable[[str], None]]:
+    """Empfänger für gestreamte Antwort-Stücke der laufenden Query (None = kein Streaming)"""
+    return _token_sink.get()
+
+
+class StreamCancelled(Exception):
+    """Der Leser des Streams hat aufgehört - die Verarbeitung wird abgebrochen"""
+
+
+class QueryStream:
+    """
+    Ergebnisstrom von WincasaQueryEngine.process_query_stream
+
+    `for chunk in stream` liefert die Antwort stückweise, danach stehen das
+    QueryEngineResult in `result` und die Time-to-First-Token in
+    `time_to_first_token_ms`. Ein Stream kann nur einmal durchlaufen werden;
+    bricht der Leser ab, endet der LLM-Stream beim nächsten Token.
+    """
+
+    def __init__(self, engine, query: str, **query_options):
+        self.engine = engine
+        self.query = query
+        self.query_options = query_options
+        self.result: Optional[Any] = None  # QueryEngineResult
+        self.time_to_first_token_ms: Optional[float] = None
+        self.chunks = 0
+        self._started = False
+        self._cancelled = threading.Event()
+
+    def _claim(self):
+        if self._started:
+            raise RuntimeError("QueryStream wurde bereits durchlaufen")
+        self._started = True
+
+    def __iter__(self) -> Iterator[str]:
+        self._claim()
+        items: "queue.Queue" = queue.Queue()
+        start_time = time.time()
+
+        def emit(chunk: str):
+            if self._cancelled.is_set():
+                raise StreamCancelled("Stream vom Leser abgebrochen")
+            items.put(chunk)
+
+        def work():
+            _token_sink.set(emit)
+            return self.engine.process_query(self.query, **self.query_options)
+
+        def worker():
+            try:
+                # Own context: the sink stays invisible to other queries on this thread
+                items.put(("result", contextvars.copy_context().run(work)))
+            except BaseException as e:
+                items.put(e)
+            finally:
+                items.put(_DONE)
+
+        thread = threading.Thread(target=worker, name="wincasa-stream", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = items.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                if isinstance(item, tuple):
+                    self.result = item[1]
+                    if not self.chunks and self.result.answer:
+                        # Nothing streamed (cache, templates, search) - whole answer at once
+                        self._first_token(start_time)
+                        self.chunks += 1
+                        yield self.result.answer
+                    continue
+                if not self.chunks:
+                    self._first_token(start_time)
+                self.chunks += 1
+                yield item
+        finally:
+            self._cancelled.set()
+            thread.join()
+            # Aborted early: the result may still be waiting in the queue
+            while self.result is None and not items.empty():
+                item = items.get()
+                if isinstance(item, tuple):
+                    self.result = item[1]
+            if self.result is not None:
+                self.result.time_to_first_token_ms = self.time_to_first_token_ms
+
+    def _first_token(self, start_time: float):
+        self.time_to_first_token_ms = round((time.time() - start_time) * 1000, 2)
+        logger.debug(f"Time to First Token: {self.time_to_first_token_ms}ms")
@@ -0,0 +1,794 @@
+#!/usr/bin/env python3
+"""
+WINCASA Search Index Primitives
+Sortierte Term-Arrays mit bisect-basierter Präfixsuche für das Optimized Search System
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import sys
+import threading
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from pathlib import Path
+from heapq import merge
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Obergrenze für Präfix-Bereiche im sortierten Term-Array
+_PREFIX_UPPER_BOUND = "\U0010ffff"
+
+# Posting-Layout (Doc-IDs und Gewichte als parallele Arrays)
+DOC_ID_DTYPE = np.dtype("<u4")
+WEIGHT_DTYPE = np.dtype("<f4")
+OFFSET_DTYPE = np.dtype("<u4")
+
+# Snapshot-Format (bei Layout-Änderungen erhöhen)
+SNAPSHOT_MAGIC = b"WCSIDX"
+SNAPSHOT_FORMAT_VERSION = 3
+_SNAPSHOT_PREAMBLE = len(SNAPSHOT_MAGIC) + 2 + 8  # magic + version (u16) + header length (u64)
+_SECTION_ALIGNMENT = 8
+
+
+class PrefixIndex:
+    """
+    Sortiertes Term-Array mit CSR-Postings
+
+    Gespeichert werden nur vollständige Wörter. Alle Terme mit gemeinsamem
+    Präfix liegen im sortierten Array zusammenhängend, daher laufen exakte
+    und Präfix-Lookups per bisect in O(log n + Treffer). Die Postings aller
+    Terme liegen in zwei flachen Arrays (Doc-IDs, Gewichte); ein Präfix-Bereich
+    ist damit ein einziger zusammenhängender Slice.
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, List[Tuple[int, float]]] = {}
+        self._terms: Sequence = []
+        self._offsets = np.zeros(1, dtype=OFFSET_DTYPE)
+        self._doc_ids = np.empty(0, dtype=DOC_ID_DTYPE)
+        self._weights = np.empty(0, dtype=WEIGHT_DTYPE)
+
+    @classmethod
+    def from_arrays(cls, terms: Sequence, offsets: np.ndarray,
+                    doc_ids: np.ndarray, weights: np.ndarray) -> "PrefixIndex":
+        """Erzeugt einen Index direkt aus fertigen (z.B. gemappten) Arrays"""
+        index = cls()
+        index._terms = terms
+        index._offsets = offsets
+        index._doc_ids = doc_ids
+        index._weights = weights
+        return index
+
+    def add(self, term: str, doc_id: int, weight: float):
+        """Fügt ein Posting hinzu (wird beim nächsten Lookup einsortiert)"""
+        self._pending.setdefault(term, []).append((doc_id, weight))
+
+    def freeze(self):
+        """Sortiert ausstehende Terme in das Term-Array ein"""
+        if not self._pending:
+            return
+
+        merged: Dict[str, List[Tuple[int, float]]] = {}
+        for position, term in enumerate(self._terms):
+            ids, weights = self.postings_at(position)
+            merged[term] = list(zip(ids.tolist(), weights.tolist()))
+        for term, entries in self._pending.items():
+            merged.setdefault(term, []).extend(entries)
+        self._pending = {}
+
+        terms = sorted(merged)
+        counts = np.fromiter((len(merged[term]) for term in terms), dtype=np.int64, count=len(terms))
+        offsets = np.zeros(len(terms) + 1, dtype=OFFSET_DTYPE)
+        np.cumsum(counts, out=offsets[1:])
+
+        total = int(offsets[-1])
+        doc_ids = np.empty(total, dtype=DOC_ID_DTYPE)
+        weights = np.empty(total, dtype=WEIGHT_DTYPE)
+        for position, term in enumerate(terms):
+            start = int(offsets[position])
+            entries = merged[term]
+            doc_ids[start:start + len(entries)] = [doc_id for doc_id, _ in entries]
+            weights[start:start + len(entries)] = [weight for _, weight in entries]
+
+        self._terms = terms
+        self._offsets = offsets
+        self._doc_ids = doc_ids
+        self._weights = weights
+
+    def term_range(self, prefix: str) -> Tuple[int, int]:
+        """Positionsbereich [lo, hi) aller Terme mit dem Präfix"""
+        self.freeze()
+        lo = bisect_left(self._terms, prefix)
+        hi = bisect_left(self._terms, prefix + _PREFIX_UPPER_BOUND, lo)
+        return lo, hi
+
+    def term_at(self, position: int) -> str:
+        return self._terms[position]
+
+    def postings_range(self, lo: int, hi: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(doc_ids, weights) aller Terme im Bereich [lo, hi) als Views"""
+        start = int(self._offsets[lo])
+        stop = int(self._offsets[hi])
+        return self._doc_ids[start:stop], self._weights[start:stop]
+
+    def postings_at(self, position: int) -> Tuple[np.ndarray, np.ndarray]:
+        return self.postings_range(position, position + 1)
+
+    def lookup(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Exakter Lookup eines Terms"""
+        lo, hi = self.term_range(term)
+        if lo < hi and self.term_at(lo) == term:
+            return self.postings_at(lo)
+        return None
+
+    def prefix_items(self, prefix: str) -> Iterator[Tuple[str, np.ndarray, np.ndarray]]:
+        """Alle (term, doc_ids, weights) Tripel mit dem gegebenen Präfix"""
+        lo, hi = self.term_range(prefix)
+        for position in range(lo, hi):
+            yield (self.term_at(position),) + self.postings_at(position)
+
+    @property
+    def nbytes(self) -> int:
+        """Größe der Posting-Arrays in Bytes"""
+        self.freeze()
+        return self._offsets.nbytes + self._doc_ids.nbytes + self._weights.nbytes
+
+    def __contains__(self, term: str) -> bool:
+        return self.lookup(term) is not None
+
+    def __len__(self) -> int:
+        self.freeze()
+        return len(self._terms)
+
+    def __iter__(self) -> Iterator[str]:
+        self.freeze()
+        return iter(self._terms)
+
+
+class SegmentedIndex:
+    """
+    Basis-Segment plus Delta-Segment für inkrementelle Updates
+
+    Das Basis-Segment ist der gefrorene (ggf. gemappte) Bulk-Index, neue
+    Postings landen im kleinen Delta-Segment. Schreiber ersetzen das Delta
+    copy-on-write und tauschen das Segment-Tupel atomar, Leser greifen
+    ohne Lock auf ``segments`` zu.
+    """
+
+    def __init__(self, base: Optional[PrefixIndex] = None):
+        self._segments: Tuple[PrefixIndex, PrefixIndex] = (base or PrefixIndex(), PrefixIndex())
+
+    @property
+    def segments(self) -> Tuple[PrefixIndex, PrefixIndex]:
+        return self._segments
+
+    @property
+    def base(self) -> PrefixIndex:
+        return self._segments[0]
+
+    @property
+    def delta(self) -> PrefixIndex:
+        return self._segments[1]
+
+    def add(self, term: str, doc_id: int, weight: float):
+        """Bulk-Aufbau des Basis-Segments (vor dem ersten Lookup)"""
+        self.base.add(term, doc_id, weight)
+
+    def freeze(self):
+        for segment in self._segments:
+            segment.freeze()
+
+    def add_postings(self, postings: Iterable[Tuple[str, int, float]]):
+        """Fügt Postings copy-on-write in ein neues Delta-Segment ein"""
+        base, delta = self._segments
+        delta.freeze()
+        new_delta = PrefixIndex.from_arrays(delta._terms, delta._offsets, delta._doc_ids, delta._weights)
+        for term, doc_id, weight in postings:
+            new_delta.add(term, doc_id, weight)
+        new_delta.freeze()
+        self._segments = (base, new_delta)
+
+    def compact(self, live_mask=None):
+        """Führt Basis und Delta zusammen und verwirft Postings entfernter Doc-IDs"""
+        self._segments = (self.merged(live_mask), PrefixIndex())
+
+    def merged(self, live_mask=None, doc_id_map: Optional[np.ndarray] = None) -> PrefixIndex:
+        """
+        Basis und Delta als ein gefrorenes Segment (die Segmente bleiben unverändert)
+
+        live_mask verwirft Postings entfernter Doc-IDs, doc_id_map nummeriert
+        die übrigen Doc-IDs um (z.B. auf das Layout von EntityTable.compacted).
+        """
+        segments = self._segments
+        for segment in segments:
+            segment.freeze()
+
+        terms = []
+        doc_id_parts = []
+        weight_parts = []
+        counts = []
+        for term in self:
+            found = [postings for postings in (segment.lookup(term) for segment in segments) if postings]
+            doc_ids = np.concatenate([doc_ids for doc_ids, _ in found])
+            weights = np.concatenate([weights for _, weights in found])
+            if live_mask is not None:
+                keep = live_mask(doc_ids)
+                doc_ids, weights = doc_ids[keep], weights[keep]
+            if not len(doc_ids):
+                continue
+            terms.append(term)
+            doc_id_parts.append(doc_ids if doc_id_map is None else doc_id_map[doc_ids])
+            weight_parts.append(weights)
+            counts.append(len(doc_ids))
+
+        if not terms:
+            return PrefixIndex()
+        offsets = np.zeros(len(terms) + 1, dtype=OFFSET_DTYPE)
+        np.cumsum(counts, out=offsets[1:])
+        return PrefixIndex.from_arrays(terms, offsets,
+                                       np.concatenate(doc_id_parts).astype(DOC_ID_DTYPE, copy=False),
+                                       np.concatenate(weight_parts).astype(WEIGHT_DTYPE, copy=False))
+
+    @property
+    def posting_counts(self) -> Tuple[int, int]:
+        """(Basis, Delta) Anzahl Postings"""
+        return tuple(len(segment._doc_ids) for segment in self._segments)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(segment.nbytes for segment in self._segments)
+
+    def __contains__(self, term: str) -> bool:
+        return any(term in segment for segment in self._segments)
+
+    def __len__(self) -> int:
+        base, delta = self._segments
+        return len(base) + sum(1 for term in delta if term not in base)
+
+    def __iter__(self) -> Iterator[str]:
+        """Sortierte, eindeutige Terme beider Segmente"""
+        previous = None
+        for term in merge(*self._segments):
+            if term != previous:
+                yield term
+                previous = term
+
+
+def max_score_per_doc(doc_ids: np.ndarray, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Reduziert (doc_id, score) Paare auf den höchsten Score je Doc-ID"""
+    if len(doc_ids) == 0:
+        return doc_ids, scores
+    order = np.lexsort((-scores, doc_ids))
+    sorted_ids = doc_ids[order]
+    first = np.empty(len(sorted_ids), dtype=bool)
+    first[0] = True
+    np.not_equal(sorted_ids[1:], sorted_ids[:-1], out=first[1:])
+    return sorted_ids[first], scores[order][first]
+
+
+def sum_score_per_doc(doc_ids: np.ndarray, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Summiert Scores je Doc-ID (Multi-Field Boost)"""
+    unique_ids, inverse = np.unique(doc_ids, return_inverse=True)
+    return unique_ids, np.bincount(inverse, weights=scores, minlength=len(unique_ids))
+
+
+def top_k(doc_ids: np.ndarray, scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positionen der k besten Scores, absteigend (Gleichstand nach Doc-ID)
+
+    Selektion per np.partition in O(n), sortiert werden nur die k Gewinner.
+    """
+    if k <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.intp)
+    if len(scores) > k:
+        threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+        candidates = np.flatnonzero(scores >= threshold)
+    else:
+        candidates = np.arange(len(scores))
+    order = np.lexsort((doc_ids[candidates], -scores[candidates]))
+    return candidates[order[:k]]
+
+
+def max_edit_distance(length: int) -> int:
+    """Erlaubte Tippfehler je Termlänge (kurze Terme nur exakt)"""
+    if length < 4:
+        return 0
+    if length < 8:
+        return 1
+    return 2
+
+
+def damerau_levenshtein(a: str, b: str, max_distance: int) -> int:
+    """
+    Optimal-String-Alignment Distanz mit Abbruch
+
+    Liefert max_distance + 1, sobald die Schranke sicher überschritten ist.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class FuzzyTermIndex:
+    """
+    SymSpell-artiges Deletion-Dictionary für Tippfehler-Toleranz
+
+    Für jeden Term werden alle Varianten mit bis zu max_edit_distance(len)
+    gelöschten Zeichen (auf den ersten prefix_length Zeichen) gespeichert.
+    Eine Abfrage erzeugt dieselben Varianten für den Suchbegriff und prüft
+    die Kandidaten per Damerau-Levenshtein - Aufwand unabhängig von der
+    Vokabulargröße.
+    """
+
+    def __init__(self, terms: Iterator[str] = (), prefix_length: int = 7):
+        self.prefix_length = prefix_length
+        self._terms: List[str] = []
+        self._known: set = set()
+        self._deletes: Dict[str, List[int]] = {}
+        for term in terms:
+            self.add(term)
+
+    def add(self, term: str):
+        if len(term) < 3 or term in self._known:
+            return
+        self._known.add(term)
+        term_id = len(self._terms)
+        self._terms.append(term)
+        for variant in self._delete_variants(term[:self.prefix_length], max_edit_distance(len(term))):
+            self._deletes.setdefault(variant, []).append(term_id)
+
+    @staticmethod
+    def _delete_variants(word: str, max_distance: int) -> set:
+        variants = {word}
+        frontier = {word}
+        for _ in range(max_distance):
+            frontier = {candidate[:i] + candidate[i + 1:]
+                        for candidate in frontier for i in range(len(candidate))}
+            variants |= frontier
+        return variants
+
+    def lookup(self, term: str) -> List[Tuple[str, int]]:
+        """Alle (vokabular_term, distanz) innerhalb der Tippfehler-Schranke, sortiert"""
+        max_distance = max_edit_distance(len(term))
+        if max_distance == 0:
+            return []
+
+        candidate_ids = set()
+        for variant in self._delete_variants(term[:self.prefix_length], max_distance):
+            candidate_ids.update(self._deletes.get(variant, ()))
+
+        matches = []
+        for term_id in candidate_ids:
+            candidate = self._terms[term_id]
+            distance = damerau_levenshtein(term, candidate, max_distance)
+            if 0 < distance <= max_distance:
+                matches.append((candidate, distance))
+        return sorted(matches, key=lambda match: (match[1], match[0]))
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+
+class _EntityTypeView(Sequence):
+    """Live-Sicht auf alle nicht entfernten Entities eines Typs"""
+
+    def __init__(self, table: "EntityTable", entity_type: str):
+        self._table = table
+        self._entity_type = entity_type
+        self._cached: Tuple[int, List[int]] = (-1, [])
+
+    def _doc_ids(self) -> List[int]:
+        version, doc_ids = self._cached
+        if version != self._table.version:
+            version = self._table.version
+            doc_ids = list(self._table.live_doc_ids(self._entity_type))
+            self._cached = (version, doc_ids)
+        return doc_ids
+
+    def __len__(self) -> int:
+        return len(self._doc_ids())
+
+    def __getitem__(self, position):
+        doc_ids = self._doc_ids()
+        if isinstance(position, slice):
+            return [self._table[doc_id] for doc_id in doc_ids[position]]
+        return self._table[doc_ids[position]]
+
+    def __iter__(self) -> Iterator[Dict]:
+        for doc_id in self._doc_ids():
+            yield self._table[doc_id]
+
+
+class EntityTable:
+    """
+    Dichte Entity-Tabelle: Doc-ID -> (entity_type, entity)
+
+    Die Basis-Entities jedes Typs liegen zusammenhängend, inkrementell
+    hinzugefügte Entities werden angehängt. Entfernte Doc-IDs werden per
+    Tombstone-Maske ausgeblendet (copy-on-write, Doc-IDs werden nie
+    wiederverwendet). Die Postings der Indizes referenzieren nur die Doc-ID.
+    """
+
+    def __init__(self, entities: Optional[Sequence] = None,
+                 type_ranges: Optional[List[Tuple[str, int, int]]] = None):
+        self.entities = entities if entities is not None else []
+        self.type_ranges: List[Tuple[str, int, int]] = list(type_ranges or [])
+        self.version = 0
+        self._appended: List[Dict] = []
+        self._appended_types: List[str] = []
+        self._dead = np.zeros(len(self.entities), dtype=bool)
+
+    def extend(self, entity_type: str, entities: List[Dict]) -> int:
+        """Hängt alle Basis-Entities eines Typs an und liefert die erste Doc-ID"""
+        start = len(self.entities)
+        self.entities.extend(entities)
+        self.type_ranges.append((entity_type, start, len(self.entities)))
+        self._dead = np.zeros(len(self.entities), dtype=bool)
+        self.version += 1
+        return start
+
+    def append(self, entity_type: str, entity: Dict) -> int:
+        """Fügt eine Entity inkrementell hinzu und liefert ihre neue Doc-ID"""
+        doc_id = len(self)
+        self._appended.append(entity)
+        self._appended_types.append(entity_type)
+        self.version += 1
+        return doc_id
+
+    def remove(self, doc_ids: Iterable[int]):
+        """Markiert Doc-IDs als entfernt (neue Maske, atomarer Tausch)"""
+        dead = np.zeros(len(self), dtype=bool)
+        dead[:len(self._dead)] = self._dead
+        dead[list(doc_ids)] = True
+        self._dead = dead
+        self.version += 1
+
+    def live_mask(self, doc_ids: np.ndarray) -> np.ndarray:
+        """Bool-Maske: welche Doc-IDs sind nicht entfernt"""
+        dead = self._dead
+        known = doc_ids < len(dead)
+        mask = np.ones(len(doc_ids), dtype=bool)
+        mask[known] = ~dead[doc_ids[known]]
+        return mask
+
+    def is_live(self, doc_id: int) -> bool:
+        dead = self._dead
+        return doc_id >= len(dead) or not dead[doc_id]
+
+    @property
+    def live_count(self) -> int:
+        return len(self) - int(self._dead.sum())
+
+    @property
+    def is_dense(self) -> bool:
+        """Keine angehängten oder entfernten Entities (Tabelle entspricht dem Snapshot-Layout)"""
+        return not self._appended and not self._dead.any()
+
+    def compacted(self) -> Tuple["EntityTable", np.ndarray]:
+        """
+        Dichte Kopie der Live-Entities, je Typ wieder zusammenhängend
+
+        Returns:
+            (neue Tabelle, Abbildung alte Doc-ID -> neue Doc-ID für Live-Entities)
+        """
+        doc_id_map = np.zeros(len(self), dtype=DOC_ID_DTYPE)
+        table = EntityTable()
+        entity_types = dict.fromkeys([name for name, _, _ in self.type_ranges] + self._appended_types)
+        for entity_type in entity_types:
+            doc_ids = list(self.live_doc_ids(entity_type))
+            start = table.extend(entity_type, [self[doc_id] for doc_id in doc_ids])
+            doc_id_map[doc_ids] = np.arange(start, start + len(doc_ids), dtype=DOC_ID_DTYPE)
+        return table, doc_id_map
+
+    def live_doc_ids(self, entity_type: Optional[str] = None) -> Iterator[int]:
+        """Doc-IDs aller nicht entfernten Entities (optional eines Typs)"""
+        for name, start, stop in self.type_ranges:
+            if entity_type in (None, name):
+                for doc_id in range(start, stop):
+                    if self.is_live(doc_id):
+                        yield doc_id
+        base_count = len(self.entities)
+        for offset, name in enumerate(self._appended_types):
+            if entity_type in (None, name) and self.is_live(base_count + offset):
+                yield base_count + offset
+
+    def entity_type(self, doc_id: int) -> str:
+        base_count = len(self.entities)
+        if doc_id >= base_count:
+            return self._appended_types[doc_id - base_count]
+        position = bisect_right([stop for _, _, stop in self.type_ranges], doc_id)
+        return self.type_ranges[position][0]
+
+    def of_type(self, entity_type: str) -> Sequence:
+        return _EntityTypeView(self, entity_type)
+
+    def __getitem__(self, doc_id: int) -> Dict:
+        base_count = len(self.entities)
+        if doc_id >= base_count:
+            return self._appended[doc_id - base_count]
+        return self.entities[doc_id]
+
+    def __len__(self) -> int:
+        return len(self.entities) + len(self._appended)
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Alle Basis-Entities in Doc-ID Reihenfolge (Snapshot-Layout)"""
+        return iter(self.entities)
+
+
+class _BlobTable(Sequence):
+    """Read-only Sequenz über einen Byte-Blob mit Offset-Array (ohne Vorab-Dekodierung)"""
+
+    def __init__(self, blob: memoryview, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    def raw(self, position: int) -> bytes:
+        return bytes(self._blob[int(self._offsets[position]):int(self._offsets[position + 1])])
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, position: int) -> str:
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return self.raw(position).decode("utf-8")
+
+
+class SnapshotEntityList(Sequence):
+    """
+    Entity-Liste aus einem Snapshot
+
+    Entities werden erst beim Zugriff aus dem gemappten JSON-Blob dekodiert
+    und danach gecacht, damit jede Doc-ID stets dasselbe Dict-Objekt liefert.
+    """
+
+    def __init__(self, blobs: _BlobTable):
+        self._blobs = blobs
+        self._cache: List[Optional[Dict]] = [None] * len(blobs)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+
+        entity = self._cache[position]
+        if entity is None:
+            with self._lock:
+                entity = self._cache[position]
+                if entity is None:
+                    entity = json.loads(self._blobs.raw(position))
+                    self._cache[position] = entity
+        return entity
+
+    def __iter__(self) -> Iterator[Dict]:
+        for position in range(len(self)):
+            yield self[position]
+
+
+def compute_source_signature(source_files: List[Path], with_hash: bool = True,
+                             known: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """
+    Größe, mtime und SHA-256 der Quelldateien (fehlende Dateien mit size -1)
+
+    known: bereits bekannte Signatur (z.B. aus dem Snapshot-Header) - bei
+    gleicher Größe und mtime wird deren Hash übernommen statt neu gelesen.
+    """
+    known_entries = {entry["name"]: entry for entry in known or []}
+    signature = []
+    for file_path in source_files:
+        entry = {"name": Path(file_path).name, "size": -1, "mtime_ns": 0, "sha256": None}
+        try:
+            stat = os.stat(file_path)
+            entry["size"] = stat.st_size
+            entry["mtime_ns"] = stat.st_mtime_ns
+            previous = known_entries.get(entry["name"])
+            if with_hash and previous and previous.get("sha256") and \
+                    (previous["size"], previous["mtime_ns"]) == (entry["size"], entry["mtime_ns"]):
+                entry["sha256"] = previous["sha256"]
+            elif with_hash:
+                with open(file_path, "rb") as f:
+                    entry["sha256"] = hashlib.sha256(f.read()).hexdigest()
+        except FileNotFoundError:
+            pass
+        signature.append(entry)
+    return signature
+
+
+def signature_matches(stored: List[Dict[str, Any]], source_files: List[Path]) -> bool:
+    """
+    Prüft ob die Quelldateien zum gespeicherten Stand passen
+
+    Schnellpfad über Größe + mtime, bei Abweichung entscheidet der Content-Hash.
+    """
+    current = compute_source_signature(source_files, with_hash=False)
+    if len(current) != len(stored):
+        return False
+    if all(c["name"] == s["name"] and c["size"] == s["size"] and c["mtime_ns"] == s["mtime_ns"]
+           for c, s in zip(current, stored)):
+        return True
+
+    # Only files with a different size/mtime are read
+    hashed = compute_source_signature(source_files, with_hash=True, known=stored)
+    return all(c["name"] == s["name"] and c["sha256"] == s["sha256"] for c, s in zip(hashed, stored))
+
+
+class IndexSnapshot:
+    """
+    Versionierter, memory-mappable Snapshot der Search-Indizes
+
+    Layout: Magic, Format-Version, JSON-Header (Quell-Signatur, Sektionen),
+    danach 8-Byte-ausgerichtete Binär-Sektionen (NumPy dtypes, Bytes).
+    Die CSR-Arrays werden per np.frombuffer ohne Kopie auf das Mapping gelegt,
+    mehrere Worker-Prozesse teilen sich so die Seiten des Files.
+    """
+
+    def __init__(self, path: Path, mm: mmap.mmap, header: Dict[str, Any]):
+        self.path = path
+        self.header = header
+        self.metadata: Dict[str, Any] = header.get("metadata", {})
+        self._mm = mm
+
+        entity_blobs = _BlobTable(self._section("entities"), self._section("entity_offsets"))
+        self.entity_table = EntityTable(SnapshotEntityList(entity_blobs),
+                                        [tuple(r) for r in header["entity_ranges"]])
+
+        self.indices: Dict[str, PrefixIndex] = {}
+        for index_name in header["indices"]:
+            self.indices[index_name] = PrefixIndex.from_arrays(
+                terms=_BlobTable(self._section(f"{index_name}.terms"),
+                                 self._section(f"{index_name}.term_offsets")),
+                offsets=self._section(f"{index_name}.offsets"),
+                doc_ids=self._section(f"{index_name}.doc_ids"),
+                weights=self._section(f"{index_name}.weights")
+            )
+
+    def _section(self, name: str):
+        offset, length, dtype = self.header["sections"][name]
+        if dtype == "bytes":
+            return memoryview(self._mm)[offset:offset + length]
+        dtype = np.dtype(dtype)
+        if length == 0:
+            return np.empty(0, dtype=dtype)
+        return np.frombuffer(self._mm, dtype=dtype, count=length // dtype.itemsize, offset=offset)
+
+    @classmethod
+    def open(cls, path: Path, source_files: List[Path]) -> Optional["IndexSnapshot"]:
+        """Öffnet einen gültigen Snapshot oder liefert None (fehlend/veraltet/inkompatibel)"""
+        path = Path(path)
+        if not path.exists():
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Snapshot {path} nicht lesbar: {e}")
+            return None
+
+        try:
+            if mm[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                raise ValueError("unbekanntes Dateiformat")
+            version = int.from_bytes(mm[len(SNAPSHOT_MAGIC):len(SNAPSHOT_MAGIC) + 2], "little")
+            if version != SNAPSHOT_FORMAT_VERSION:
+                raise ValueError(f"Format-Version {version} != {SNAPSHOT_FORMAT_VERSION}")
+            header_length = int.from_bytes(mm[len(SNAPSHOT_MAGIC) + 2:_SNAPSHOT_PREAMBLE], "little")
+            header = json.loads(mm[_SNAPSHOT_PREAMBLE:_SNAPSHOT_PREAMBLE + header_length])
+            if header.get("byteorder") != sys.byteorder:
+                raise ValueError("abweichende Byte-Order")
+            if not signature_matches(header["sources"], source_files):
+                logger.info(f"Snapshot {path.name} veraltet - Quelldateien geändert")
+                mm.close()
+                return None
+            return cls(path, mm, header)
+        except Exception as e:
+            logger.warning(f"Snapshot {path} verworfen: {e}")
+            mm.close()
+            return None
+
+    @staticmethod
+    def write(path: Path,
+              source_files: List[Path],
+              entity_table: EntityTable,
+              indices: Dict[str, PrefixIndex],
+              metadata: Optional[Dict[str, Any]] = None,
+              source_signature: Optional[List[Dict[str, Any]]] = None):
+        """Schreibt den Snapshot atomar (tmp-Datei + os.replace)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        sections: Dict[str, bytes] = {}
+        dtypes: Dict[str, str] = {}
+
+        def add_section(name: str, data):
+            if isinstance(data, np.ndarray):
+                dtypes[name] = data.dtype.str
+                sections[name] = data.tobytes()
+            else:
+                dtypes[name] = "bytes"
+                sections[name] = bytes(data)
+
+        def add_blob_table(name: str, offsets_name: str, values):
+            blob = bytearray()
+            offsets = [0]
+            for value in values:
+                blob += value
+                offsets.append(len(blob))
+            add_section(name, blob)
+            add_section(offsets_name, np.asarray(offsets, dtype=OFFSET_DTYPE))
+
+        # Entity table: one JSON blob per doc id
+        add_blob_table("entities", "entity_offsets",
+                       (json.dumps(entity, ensure_ascii=False).encode("utf-8") for entity in entity_table))
+
+        # Indices: sorted terms + CSR postings
+        for index_name, index in indices.items():
+            index.freeze()
+            add_blob_table(f"{index_name}.terms", f"{index_name}.term_offsets",
+                           (term.encode("utf-8") for term in index))
+            add_section(f"{index_name}.offsets", index._offsets.astype(OFFSET_DTYPE, copy=False))
+            add_section(f"{index_name}.doc_ids", index._doc_ids.astype(DOC_ID_DTYPE, copy=False))
+            add_section(f"{index_name}.weights", index._weights.astype(WEIGHT_DTYPE, copy=False))
+
+        header = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "byteorder": sys.byteorder,
+            "sources": compute_source_signature(source_files, known=source_signature),
+            "entity_ranges": entity_table.type_ranges,
+            "indices": list(indices),
+            "metadata": metadata or {},
+            "sections": {}
+        }
+
+        # Section offsets depend on header length - iterate until stable
+        header_bytes = b""
+        for _ in range(5):
+            offset = _SNAPSHOT_PREAMBLE + len(header_bytes)
+            layout = {}
+            for name, data in sections.items():
+                offset += -offset % _SECTION_ALIGNMENT
+                layout[name] = [offset, len(data), dtypes[name]]
+                offset += len(data)
+            header["sections"] = layout
+            layout_length = len(header_bytes)
+            header_bytes = json.dumps(header).encode("utf-8")
+            if len(header_bytes) == layout_length:
+                break
+
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp_path, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(SNAPSHOT_FORMAT_VERSION.to_bytes(2, "little"))
+            f.write(len(header_bytes).to_bytes(8, "little"))
+            f.write(header_bytes)
+            for name, data in sections.items():
+                f.write(b"\0" * (header["sections"][name][0] - f.tell()))
+                f.write(data)
+        os.replace(tmp_path, path)
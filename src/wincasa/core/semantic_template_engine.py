@@ -13,6 +13,8 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+from wincasa.core.deadline import check_deadline, remaining_timeout
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -66,17 +68,30 @@ class SemanticTemplateEngine:
         # Load SQL templates
         self.sql_templates = self._load_sql_templates()
         
-        # Initialize LLM handler for intent extraction
-        self.llm_handler = None
-        self._init_llm_handler()
+        # LLM handler for intent extraction - only needed when no pattern matches,
+        # so it is resolved on first use
+        self._llm_handler = None
+        self._llm_handler_loaded = False
         
         logger.info("✅ SemanticTemplateEngine initialized successfully")
-        
+    
+    @property
+    def llm_handler(self):
+        """LLM handler for intent extraction (lazy, None if unavailable)"""
+        if not self._llm_handler_loaded:
+            self._init_llm_handler()
+        return self._llm_handler
+    
+    @llm_handler.setter
+    def llm_handler(self, handler):
+        self._llm_handler = handler
+        self._llm_handler_loaded = True
+    
     def _init_llm_handler(self):
         """Initialize LLM handler for intent extraction"""
         try:
-            from wincasa.core.llm_handler import WincasaLLMHandler
-            self.llm_handler = WincasaLLMHandler()
+            from wincasa.core.component_registry import get_component
+            self.llm_handler = get_component("llm_handler")
             logger.info("✅ LLM handler initialized for intent extraction")
         except ImportError as e:
             logger.warning(f"⚠️ Could not import LLM handler: {e}")
@@ -285,6 +300,11 @@ class SemanticTemplateEngine:
         
         return can_handle, confidence
     
+    def detect_pattern(self, query: str) -> Optional[str]:
+        """Pattern-ID per Regex (ohne LLM), z.B. für Routing-Statistiken"""
+        pattern, confidence = self._match_pattern_regex(query)
+        return pattern.pattern_id if pattern is not None and confidence >= 0.6 else None
+
     def _match_pattern_regex(self, query: str) -> Tuple[Optional[SemanticPattern], float]:
         """Versucht Query mit Regex-Patterns zu matchen"""
         
@@ -353,7 +373,8 @@ Nur wenn du sicher bist (>70% Konfidenz), gib ein Pattern zurück.
             result = self.llm_handler._call_openai_api(
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=200,
-                temperature=0.1
+                temperature=0.1,
+                timeout=remaining_timeout("semantic_llm")
             )
             
             response_text = result.choices[0].message.content.strip()
@@ -383,6 +404,8 @@ Nur wenn du sicher bist (>70% Konfidenz), gib ein Pattern zurück.
         if self.debug_mode:
             print(f"\n🧩 Semantic Template Engine: '{query}'")
         
+        check_deadline("semantic")
+        
         try:
             # Step 1: Pattern matching (regex first, LLM fallback)
             pattern, confidence = self._match_pattern_regex(query)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+WINCASA Singleflight
+Bündelt gleichzeitige, identische Anfragen auf eine laufende Berechnung
+
+Der erste Aufrufer eines Keys (Leader) rechnet, alle weiteren, die während
+der Berechnung mit demselben Key kommen, warten auf dessen Ergebnis (oder
+Exception). Funktioniert für Threads (do) und asyncio (do_async) - auch
+gemischt. Jeder Wartende bleibt an seine eigene Deadline gebunden.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from wincasa.core.deadline import DeadlineExceeded, current_deadline, remaining_timeout
+
+logger = logging.getLogger(__name__)
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class _Flight:
+    """Eine laufende Berechnung samt Wartenden"""
+    __slots__ = ("future", "loop", "task", "waiters", "refs")
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.loop = loop  # Event-Loop des async Leaders (None = Thread)
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+        self.refs = 1  # Leader + Wartende, die noch auf das Ergebnis warten
+
+
+class SingleFlight:
+    """
+    Request Coalescing pro Key
+
+    - do()/do_async() liefern (Ergebnis, coalesced) - coalesced=True für Wartende
+    - Bricht ein async Leader ab, läuft die Berechnung für die Wartenden weiter;
+      sie wird erst abgebrochen, wenn niemand mehr wartet
+    - Statistik pro Key (höchstens max_tracked_keys, zuletzt genutzte zuerst)
+    Thread-safe.
+    """
+
+    def __init__(self, name: str, max_tracked_keys: int = 256):
+        self.name = name
+        self.max_tracked_keys = max_tracked_keys
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._key_stats: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"flights": 0, "coalesced": 0, "errors": 0, "uncoalesced_in_loop": 0}
+
+    @staticmethod
+    def _label(key: Hashable) -> str:
+        return " | ".join(map(str, key)) if isinstance(key, tuple) else str(key)
+
+    def _track(self, key: Hashable) -> Dict[str, int]:
+        # Caller holds the lock
+        label = self._label(key)
+        key_stats = self._key_stats.get(label)
+        if key_stats is None:
+            key_stats = self._key_stats[label] = {"flights": 0, "waiters": 0, "max_waiters": 0}
+            while len(self._key_stats) > self.max_tracked_keys:
+                self._key_stats.popitem(last=False)
+        self._key_stats.move_to_end(label)
+        return key_stats
+
+    def _join(self, key: Hashable, loop: Optional[asyncio.AbstractEventLoop]) -> Tuple[_Flight, bool]:
+        """Tritt einer laufenden Berechnung bei oder startet eine neue (True = Leader)"""
+        with self._lock:
+            key_stats = self._track(key)
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight(loop)
+                self.stats["flights"] += 1
+                key_stats["flights"] += 1
+                return flight, True
+            flight.waiters += 1
+            flight.refs += 1
+            self.stats["coalesced"] += 1
+            key_stats["waiters"] += 1
+            key_stats["max_waiters"] = max(key_stats["max_waiters"], flight.waiters)
+            return flight, False
+
+    def _complete(self, key: Hashable, flight: _Flight, result: Any = None,
+                  error: Optional[BaseException] = None):
+        # Neue Aufrufer starten ab jetzt eine frische Berechnung
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            if error is not None:
+                self.stats["errors"] += 1
+        if error is None:
+            flight.future.set_result(result)
+        elif isinstance(error, asyncio.CancelledError):
+            flight.future.cancel()
+        else:
+            flight.future.set_exception(error)
+
+    def _release(self, flight: _Flight):
+        """Ein Teilnehmer wartet nicht mehr - ohne Teilnehmer wird die Berechnung abgebrochen"""
+        with self._lock:
+            flight.refs -= 1
+            abandoned = flight.refs == 0
+        if abandoned and flight.task is not None and flight.loop is not None:
+            flight.loop.call_soon_threadsafe(flight.task.cancel)
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Tuple[Any, bool]:
+        """Führt fn einmal pro gleichzeitigem Key aus (synchron, für Threads)"""
+        loop = _running_loop()
+        with self._lock:
+            flight = self._flights.get(key)
+            blocking_own_loop = flight is not None and loop is not None and flight.loop is loop
+            if blocking_own_loop:
+                self.stats["uncoalesced_in_loop"] += 1
+        if blocking_own_loop:
+            # Warten würde die Event-Loop blockieren, in der der Leader läuft
+            return fn(*args, **kwargs), False
+
+        flight, leader = self._join(key, None)
+        if leader:
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                self._complete(key, flight, error=e)
+                raise
+            self._complete(key, flight, result)
+            return result, False
+
+        try:
+            done, _ = concurrent.futures.wait([flight.future], remaining_timeout("coalesced"))
+            if not done:
+                raise DeadlineExceeded("coalesced", current_deadline().budget_ms)
+            return flight.future.result(), True
+        finally:
+            self._release(flight)
+
+    async def do_async(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Tuple[Any, bool]:
+        """Async-Variante von do (fn liefert ein Awaitable)"""
+        loop = asyncio.get_running_loop()
+        flight, leader = self._join(key, loop)
+        if leader:
+            async def run():
+                try:
+                    result = await fn(*args, **kwargs)
+                except BaseException as e:
+                    self._complete(key, flight, error=e)
+                    raise
+                self._complete(key, flight, result)
+                return result
+
+            # Eigener Task (erbt den Kontext des Leaders) - überlebt den Abbruch des Leaders
+            flight.task = loop.create_task(run())
+            flight.task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+        # Der Leader ist an seine Deadline im Task gebunden, Wartende an ihre eigene
+        waiting = asyncio.shield(asyncio.wrap_future(flight.future))
+        try:
+            done, _ = await asyncio.wait({waiting}, timeout=None if leader else remaining_timeout("coalesced"))
+            if not done:
+                raise DeadlineExceeded("coalesced", current_deadline().budget_ms)
+            return waiting.result(), not leader
+        finally:
+            if not waiting.done():
+                waiting.cancel()
+            self._release(flight)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self.stats["flights"] + self.stats["coalesced"]
+            return {
+                **self.stats,
+                "coalesce_rate": round(self.stats["coalesced"] / calls, 3) if calls else 0.0,
+                "in_flight": {self._label(key): flight.waiters for key, flight in self._flights.items()},
+                "keys": {label: dict(key_stats) for label, key_stats in self._key_stats.items()}
+            }
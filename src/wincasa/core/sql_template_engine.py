@@ -19,6 +19,9 @@ try:
 except ImportError:
     JINJA2_AVAILABLE = False
 
+from wincasa.core.async_executors import call_db
+from wincasa.core.deadline import DeadlineExceeded
+from wincasa.data.db_singleton import execute_query
 from wincasa.data.json_exporter import get_connection
 
 
@@ -483,12 +486,15 @@ ROWS {{ limit|default(10)|int }}
             result_count = 0
             
             try:
-                query_results = execute_query(generated_sql)
+                # Only the SQL itself occupies the single DB thread
+                query_results = call_db(execute_query, generated_sql)
                 result_count = len(query_results) if query_results else 0
                 
                 if self.debug_mode:
                     print(f"   ✅ SQL executed: {result_count} results")
                     
+            except DeadlineExceeded:
+                raise
             except Exception as e:
                 if self.debug_mode:
                     print(f"   ⚠️  SQL execution error: {e}")
@@ -13,6 +13,8 @@ from typing import Any, Dict, List, Optional, Union
 # Import WINCASA components
 # from hierarchical_intent_router import HierarchicalIntentRouter, RouterResult
 
+from wincasa.core.component_registry import get_component
+from wincasa.core.deadline import DeadlineExceeded, check_deadline, current_deadline
 from wincasa.core.sql_template_engine import SQLTemplateEngine, TemplateResult
 from wincasa.core.wincasa_optimized_search import SearchResponse, WincasaOptimizedSearch
 
@@ -73,7 +75,8 @@ class UnifiedTemplateSystem:
     
     def __init__(self, 
                  api_key_file="/home/envs/openai.env",
-                 debug_mode=False):
+                 debug_mode=False,
+                 search_system=None):
         
         self.debug_mode = debug_mode
         
@@ -89,8 +92,9 @@ class UnifiedTemplateSystem:
         # Level 2: Template Engine  
         self.template_engine = SQLTemplateEngine(debug_mode=debug_mode)
         
-        # Level 3: Optimized Search (Fallback)
-        self.search_system = WincasaOptimizedSearch(debug_mode=debug_mode)
+        # Level 3: Optimized Search (Fallback) - shared index from the component registry,
+        # loaded on first search so template queries do not wait for it
+        self._search_system = search_system
         
         # Performance tracking
         self.query_stats = {
@@ -123,6 +127,9 @@ class UnifiedTemplateSystem:
         if self.debug_mode:
             print(f"\n🔍 Unified Query: '{query}'")
         
+        check_deadline("unified")
+        deadline_exceeded = False
+        
         # Step 1: Intent Classification
         intent_result = self.intent_router.route_intent(query)
         
@@ -132,8 +139,12 @@ class UnifiedTemplateSystem:
         search_result = None
         
         if processing_path == "template" and intent_result.template_available:
-            # Template-basierte Verarbeitung
-            template_result = self._process_template_query(intent_result)
+            # Template-basierte Verarbeitung (SQL läuft mit dem Restbudget als Timeout)
+            try:
+                template_result = self._process_template_query(intent_result)
+            except DeadlineExceeded:
+                # Budget aufgebraucht: In-Memory-Suche als beste Teilantwort
+                deadline_exceeded = True
             if template_result and template_result.validation_passed and template_result.result_count > 0:
                 final_answer = self._format_template_response(template_result)
                 confidence = 0.9
@@ -177,7 +188,8 @@ class UnifiedTemplateSystem:
             "intent_time_ms": intent_result.processing_time_ms,
             "template_time_ms": template_result.processing_time_ms if template_result else 0,
             "search_time_ms": search_result.processing_time_ms if search_result else 0,
-            "total_time_ms": processing_time
+            "total_time_ms": processing_time,
+            "deadline_exceeded": deadline_exceeded
         }
         
         if self.debug_mode:
@@ -307,6 +319,16 @@ class UnifiedTemplateSystem:
             results.append(result)
         return results
     
+    @property
+    def search_system(self):
+        if self._search_system is None:
+            self._search_system = get_component("optimized_search")
+        return self._search_system
+    
+    @search_system.setter
+    def search_system(self, search_system):
+        self._search_system = search_system
+    
     def get_system_stats(self) -> Dict[str, Any]:
         """Umfassende System-Statistiken"""
         
@@ -4,14 +4,30 @@ WINCASA Phase 2.2 - Optimized Structured Search System
 Hochperformante Alternative zu RAG für strukturierte Business Queries
 """
 
+import hashlib
 import json
+import math
 import os
 import re
+import threading
 import time
+from collections import Counter, defaultdict
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import numpy as np
+
+from wincasa.core.component_registry import get_component
+from wincasa.core.deadline import remaining_timeout
+from wincasa.core.search_index import (EntityTable, FuzzyTermIndex,
+                                       IndexSnapshot, SegmentedIndex,
+                                       compute_source_signature,
+                                       max_edit_distance, max_score_per_doc,
+                                       signature_matches, sum_score_per_doc,
+                                       top_k)
+from wincasa.data.address_index import AddressIndex
 
 # Load OpenAI client
 try:
@@ -48,17 +64,80 @@ class WincasaOptimizedSearch:
     - Prefix-Trees für Auto-Complete
     - Multi-Threaded Search (falls nötig)
     - Sub-100ms Response Times
+    - Persistierter mmap-Snapshot der Indizes (kein Rebuild bei Kaltstart)
+    - Tippfehler-Toleranz über Deletion-Dictionary (Muller -> Müller)
+    - BM25F Ranking mit Feld-Boosts und Top-k Selektion
+    - Inkrementelle Updates (upsert/remove, Export-Diff) ohne Rebuild
+    - Strukturierter Adress-Index (Straße + Hausnummer + PLZ) für Adressfragen
+    - Type-Ahead über vorberechnete Top-k Listen pro Präfix
     """
     
+    SOURCE_FILES = ("mieter.json", "eigentuemer.json", "objekte.json")
+    ENTITY_TYPES = ("mieter", "eigentuemer", "objekte")
+    INDEX_NAMES = ("name_index", "address_index", "city_index",
+                   "email_index", "phone_index", "status_index")
+    
+    # Durchsuchte Indizes mit Feld-Boost (Name hat höchste Priorität)
+    SEARCH_WEIGHTS = (("name_index", 1.0), ("address_index", 0.8), ("city_index", 0.6),
+                      ("email_index", 0.7), ("status_index", 0.5))
+    PARTIAL_MATCH_FACTOR = 0.8
+    
+    # BM25F Parameter (Sättigung der Term-Frequenz, Längen-Normalisierung)
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+    
+    # Tippfehler-Toleranz: Score-Faktor je Edit-Distanz, max. Korrekturen pro Term
+    FUZZY_DISTANCE_FACTORS = {1: 0.6, 2: 0.4}
+    FUZZY_MAX_CANDIDATES = 8
+    
+    # Score-Bonus für exakte Adress-Treffer (Straße + Hausnummer) - immer vor BM25-Treffern
+    ADDRESS_MATCH_BOOST = 100.0
+    ADDRESS_ENTITY_TYPES = ("mieter", "objekte")
+    
+    # Autocomplete: Top-k Vorschläge pro Präfix bis zu dieser Länge vorberechnet
+    SUGGEST_MAX_K = 10
+    SUGGEST_MAX_PREFIX = 12
+    
+    # Obergrenze für den LLM-Antwortschritt, auch ohne Request-Deadline
+    LLM_TIMEOUT_SECONDS = 30.0
+    
+    # Field -> Index routing
+    FIELD_INDICES = {
+        "name": "name_index",
+        "partner": "name_index",
+        "firma": "name_index",
+        "owner": "name_index",
+        "address": "address_index",
+        "city": "city_index",
+        "email": "email_index",
+        "phone": "phone_index",
+        "status": "status_index"
+    }
+    
+    # Delta-Segment wird ab diesem Anteil der Basis-Postings kompaktiert
+    COMPACTION_RATIO = 0.25
+    
     def __init__(self, 
                  rag_data_dir="exports/rag_data",
                  api_key_file="/home/envs/openai.env",
                  model_name="gpt-4o-mini",
-                 debug_mode=False):
+                 debug_mode=False,
+                 snapshot_dir="wincasa_data/search_index",
+                 source_check_interval=5.0):
         
         self.rag_data_dir = Path(rag_data_dir)
         self.model_name = model_name
         self.debug_mode = debug_mode
+        self.snapshot_dir = Path(snapshot_dir) if snapshot_dir else None
+        self.source_check_interval = source_check_interval
+        self.snapshot = None
+        self.fuzzy_index = None
+        self.street_index = None
+        self.suggest_index = None
+        self._rebuild_lock = threading.RLock()
+        self._fuzzy_lock = threading.Lock()
+        self._street_lock = threading.Lock()
+        self._suggest_lock = threading.Lock()
         
         # Load API Key
         if OPENAI_AVAILABLE and os.path.exists(api_key_file):
@@ -66,26 +145,22 @@ class WincasaOptimizedSearch:
                 for line in f:
                     if line.startswith('OPENAI_API_KEY='):
                         api_key = line.split('=', 1)[1].strip()
-                        self.client = OpenAI(api_key=api_key)
+                        self.client = get_component("llm_client_pool").get_client(api_key)
                         break
         else:
             self.client = None
             if self.debug_mode:
                 print("⚠️  OpenAI Client nicht verfügbar")
         
-        # Load and index data
+        # Load and index data (snapshot if valid, otherwise rebuild)
         start_time = time.time()
-        self.mieter_data = self._load_json_data("mieter.json")
-        self.eigentuemer_data = self._load_json_data("eigentuemer.json")
-        self.objekte_data = self._load_json_data("objekte.json")
-        
-        # Build optimized indices
-        self._build_optimized_indices()
+        self._load_or_build_indices()
         
         indexing_time = round((time.time() - start_time) * 1000, 2)
         
         if self.debug_mode:
-            print(f"✅ Optimized Search System initialisiert ({indexing_time}ms):")
+            source = "Snapshot" if self.snapshot else "Rebuild"
+            print(f"✅ Optimized Search System initialisiert ({indexing_time}ms, {source}):")
             print(f"   📊 {len(self.mieter_data)} Mieter")
             print(f"   👥 {len(self.eigentuemer_data)} Eigentümer")
             print(f"   🏢 {len(self.objekte_data)} Objekte")
@@ -93,6 +168,266 @@ class WincasaOptimizedSearch:
             print(f"   📍 {len(self.address_index)} Adressen im Index")
             print(f"   🏙️  {len(self.city_index)} Städte im Index")
     
+    @property
+    def source_files(self) -> List[Path]:
+        return [self.rag_data_dir / filename for filename in self.SOURCE_FILES]
+    
+    @property
+    def snapshot_path(self) -> Optional[Path]:
+        """Snapshot-Datei pro Datenverzeichnis (Inhalt wird über Quell-Hashes validiert)"""
+        if not self.snapshot_dir:
+            return None
+        dir_key = hashlib.sha1(str(self.rag_data_dir.resolve()).encode("utf-8")).hexdigest()[:12]
+        return self.snapshot_dir / f"optimized_search_{dir_key}.idx"
+    
+    def _load_or_build_indices(self):
+        """Öffnet den Index-Snapshot oder baut die Indizes neu und persistiert sie"""
+        self.fuzzy_index = None
+        self.street_index = None
+        self.suggest_index = None
+        self._doc_keys = None
+        
+        snapshot = IndexSnapshot.open(self.snapshot_path, self.source_files) if self.snapshot_path else None
+        # Unchanged size/mtime: hashes come from the snapshot header, no file is read
+        self._source_signature = compute_source_signature(
+            self.source_files, known=snapshot.header["sources"] if snapshot else None)
+        self._last_source_check = time.monotonic()
+        if snapshot:
+            self.snapshot = snapshot
+            self.entity_table = snapshot.entity_table
+            for index_name in self.INDEX_NAMES:
+                setattr(self, index_name, SegmentedIndex(snapshot.indices[index_name]))
+            self.avg_field_lengths = snapshot.metadata.get("avg_field_lengths", {})
+        else:
+            self.snapshot = None
+            self.mieter_data = self._load_json_data("mieter.json")
+            self.eigentuemer_data = self._load_json_data("eigentuemer.json")
+            self.objekte_data = self._load_json_data("objekte.json")
+            
+            # Build optimized indices
+            self._build_optimized_indices()
+            self._write_snapshot()
+        
+        # Live views - reflect incremental updates
+        self.mieter_data = self.entity_table.of_type("mieter")
+        self.eigentuemer_data = self.entity_table.of_type("eigentuemer")
+        self.objekte_data = self.entity_table.of_type("objekte")
+    
+    def _write_snapshot(self):
+        """
+        Persistiert den aktuellen Stand der Indizes
+        
+        Frisch gebaute Indizes werden direkt geschrieben. Nach inkrementellen
+        Änderungen werden Basis und Delta ohne entfernte Entities zusammengeführt
+        und die Doc-IDs auf eine dichte Entity-Tabelle umnummeriert.
+        """
+        if self.snapshot_path:
+            indices = {index_name: getattr(self, index_name) for index_name in self.INDEX_NAMES}
+            if self.entity_table.is_dense and not any(index.posting_counts[1] for index in indices.values()):
+                entity_table = self.entity_table
+                segments = {index_name: index.base for index_name, index in indices.items()}
+            else:
+                entity_table, doc_id_map = self.entity_table.compacted()
+                segments = {index_name: index.merged(self.entity_table.live_mask, doc_id_map)
+                            for index_name, index in indices.items()}
+            try:
+                IndexSnapshot.write(
+                    self.snapshot_path,
+                    self.source_files,
+                    entity_table,
+                    segments,
+                    metadata={"avg_field_lengths": self.avg_field_lengths},
+                    source_signature=self._source_signature
+                )
+            except OSError as e:
+                if self.debug_mode:
+                    print(f"⚠️  Index-Snapshot konnte nicht geschrieben werden: {e}")
+    
+    def _refresh_if_sources_changed(self):
+        """Gleicht die Indizes ab, wenn sich eine Quell-JSON geändert hat (gedrosselt)"""
+        now = time.monotonic()
+        if now - self._last_source_check < self.source_check_interval:
+            return
+        
+        with self._rebuild_lock:
+            if now - self._last_source_check < self.source_check_interval:
+                return
+            self._last_source_check = now
+            if signature_matches(self._source_signature, self.source_files):
+                return
+            
+            if self.debug_mode:
+                print("🔄 RAG-Daten geändert - Search-Indizes werden inkrementell abgeglichen")
+            self.sync_with_export()
+    
+    @staticmethod
+    def _content_key(entity: Dict) -> str:
+        """Inhalts-Hash einer Entity (rag_data Exporte haben keine stabilen IDs)"""
+        canonical = json.dumps(entity, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+    
+    def _keyed_entities(self, entities) -> Dict[str, Any]:
+        """Key je Entity: Inhalts-Hash, bei identischen Duplikaten mit laufender Nummer"""
+        keyed = {}
+        occurrences = Counter()
+        for entity in entities:
+            content_key = self._content_key(entity)
+            occurrences[content_key] += 1
+            suffix = f"#{occurrences[content_key]}" if occurrences[content_key] > 1 else ""
+            keyed[content_key + suffix] = entity
+        return keyed
+    
+    def _ensure_doc_keys(self) -> Dict[tuple, int]:
+        """(entity_type, key) -> Doc-ID aller Live-Entities (lazy)"""
+        if self._doc_keys is None:
+            doc_keys = {}
+            for entity_type in self.ENTITY_TYPES:
+                doc_ids = list(self.entity_table.live_doc_ids(entity_type))
+                keyed = self._keyed_entities(self.entity_table[doc_id] for doc_id in doc_ids)
+                for key, doc_id in zip(keyed, doc_ids):
+                    doc_keys[(entity_type, key)] = doc_id
+            self._doc_keys = doc_keys
+        return self._doc_keys
+    
+    def entity_key(self, entity_type: str, entity: Dict) -> Optional[str]:
+        """Key einer indexierten Entity (für upsert_entity/remove_entity)"""
+        with self._rebuild_lock:
+            for (key_type, key), doc_id in self._ensure_doc_keys().items():
+                if key_type == entity_type and self.entity_table[doc_id] is entity:
+                    return key
+        return None
+    
+    def upsert_entity(self, entity_type: str, entity: Dict, key: Optional[str] = None) -> str:
+        """
+        Fügt eine Entity hinzu oder ersetzt die Entity mit gleichem Key
+        
+        Nur die Postings der betroffenen Entity werden geschrieben.
+        
+        Returns:
+            Key der Entity (Default: Inhalts-Hash)
+        """
+        if entity_type not in self.ENTITY_TYPES:
+            raise ValueError(f"Unbekannter Entity-Typ: {entity_type}")
+        
+        with self._rebuild_lock:
+            key = key or self._content_key(entity)
+            previous = self._ensure_doc_keys().get((entity_type, key))
+            self._apply_changes([] if previous is None else [previous], [(entity_type, key, entity)])
+        return key
+    
+    def remove_entity(self, entity_type: str, key: str) -> bool:
+        """Entfernt eine Entity aus allen Indizes (Tombstone)"""
+        with self._rebuild_lock:
+            doc_id = self._ensure_doc_keys().get((entity_type, key))
+            if doc_id is None:
+                return False
+            self._apply_changes([doc_id], [])
+        return True
+    
+    def sync_with_export(self) -> Dict[str, int]:
+        """
+        Gleicht die Indizes mit dem aktuellen rag_data Export ab
+        
+        Vergleicht die Inhalts-Hashes der Export-Dateien mit den Live-Entities
+        und wendet nur die Differenz an (geänderte Entities = entfernen + hinzufügen).
+        Danach wird der Snapshot neu geschrieben, damit der nächste Start ihn
+        wieder laden kann statt neu zu bauen.
+        """
+        start_time = time.time()
+        stats = {"added": 0, "removed": 0, "unchanged": 0}
+        
+        with self._rebuild_lock:
+            signature = compute_source_signature(self.source_files, known=self._source_signature)
+            doc_keys = self._ensure_doc_keys()
+            removals = []
+            additions = []
+            skipped = False
+            
+            for entity_type, filename in zip(self.ENTITY_TYPES, self.SOURCE_FILES):
+                live_keys = {key: doc_id for (key_type, key), doc_id in doc_keys.items()
+                             if key_type == entity_type}
+                fresh = self._load_json_data(filename)
+                if not fresh and live_keys:
+                    # Missing or unreadable export must not wipe the index
+                    if self.debug_mode:
+                        print(f"⚠️  {filename} leer oder nicht lesbar - Abgleich übersprungen")
+                    skipped = True
+                    continue
+                
+                fresh_keys = self._keyed_entities(fresh)
+                removals.extend(doc_id for key, doc_id in live_keys.items() if key not in fresh_keys)
+                additions.extend((entity_type, key, entity) for key, entity in fresh_keys.items()
+                                 if key not in live_keys)
+                stats["unchanged"] += sum(1 for key in fresh_keys if key in live_keys)
+            
+            self._apply_changes(removals, additions)
+            self._source_signature = signature
+            self._last_source_check = time.monotonic()
+            # A skipped export is not reflected in the index - the snapshot would not match its sources
+            if not skipped:
+                self._write_snapshot()
+        
+        stats["added"] = len(additions)
+        stats["removed"] = len(removals)
+        stats["sync_time_ms"] = round((time.time() - start_time) * 1000, 2)
+        if self.debug_mode:
+            print(f"✅ Export-Abgleich: +{stats['added']} / -{stats['removed']} Entities "
+                  f"({stats['sync_time_ms']}ms)")
+        return stats
+    
+    def _apply_changes(self, removals: List[int], additions: List[tuple]):
+        """
+        Schreibt Änderungen in Entity-Tabelle und Delta-Segmente
+        
+        Reihenfolge: neue Entities anhängen (noch unsichtbar), Delta-Segmente
+        tauschen, dann alte Doc-IDs per Tombstone ausblenden - Leser sehen nie
+        einen veralteten Stand, höchstens kurz alte und neue Version zugleich.
+        """
+        doc_keys = self._ensure_doc_keys()
+        
+        self._field_rows = []
+        for entity_type, key, entity in additions:
+            doc_id = self.entity_table.append(entity_type, entity)
+            self._index_entity(doc_id, self._entity_field_config(entity_type, entity))
+            doc_keys[(entity_type, key)] = doc_id
+        
+        postings = defaultdict(list)
+        for field_name, term, doc_id, weight in self._bm25f_postings(self._field_rows):
+            postings[self.FIELD_INDICES[field_name]].append((term, doc_id, weight))
+        self._field_rows = []
+        
+        for index_name, index_postings in postings.items():
+            getattr(self, index_name).add_postings(index_postings)
+        
+        if removals:
+            removed = set(removals)
+            self.entity_table.remove(removed)
+            for doc_key in [doc_key for doc_key, doc_id in doc_keys.items() if doc_id in removed]:
+                del doc_keys[doc_key]
+        
+        if self.fuzzy_index is not None:
+            for index_postings in postings.values():
+                for term, _, _ in index_postings:
+                    self.fuzzy_index.add(term)
+        
+        # Suggest lists are ranked globally - rebuilt lazily on next keystroke
+        self.suggest_index = None
+        
+        if self.street_index is not None:
+            for entity_type, key, entity in additions:
+                if entity_type in self.ADDRESS_ENTITY_TYPES:
+                    self._add_street_entry(self.street_index, doc_keys[(entity_type, key)], entity)
+        
+        self._compact_if_needed()
+    
+    def _compact_if_needed(self):
+        """Führt Delta-Segmente in die Basis über, sobald sie zu groß werden"""
+        for index_name in self.INDEX_NAMES:
+            index = getattr(self, index_name)
+            base_postings, delta_postings = index.posting_counts
+            if delta_postings > max(1000, self.COMPACTION_RATIO * base_postings):
+                index.compact(self.entity_table.live_mask)
+    
     def _load_json_data(self, filename: str) -> List[Dict]:
         """Lädt JSON-Daten"""
         file_path = self.rag_data_dir / filename
@@ -125,25 +460,26 @@ class WincasaOptimizedSearch:
         return normalized
     
     def _extract_searchable_terms(self, text: str) -> Set[str]:
-        """Extrahiert suchbare Begriffe aus Text"""
+        """
+        Extrahiert suchbare Begriffe aus Text
+        
+        Nur vollständige Wörter - Partial Matches laufen über den
+        Präfix-Bereich im sortierten PrefixIndex.
+        """
         if not text:
             return set()
         
-        normalized = self._normalize_text(text)
-        
-        # Split into words
-        words = re.findall(r'\w+', normalized)
+        return set(self._extract_term_counts(text))
+    
+    def _extract_term_counts(self, text: str) -> Counter:
+        """Term-Frequenzen der suchbaren Begriffe eines Feldes"""
+        if not text:
+            return Counter()
         
-        # Create term variations
-        terms = set()
-        for word in words:
-            if len(word) >= 2:  # Minimum length
-                terms.add(word)
-                # Add prefixes for partial matching
-                for i in range(3, len(word) + 1):
-                    terms.add(word[:i])
+        normalized = self._normalize_text(text)
         
-        return terms
+        # Split into words (minimum length 2)
+        return Counter(word for word in re.findall(r'\w+', normalized) if len(word) >= 2)
     
     def _get_nested_field(self, data: Dict, field_path: str) -> str:
         """Holt Wert aus nested Dict"""
@@ -162,17 +498,46 @@ class WincasaOptimizedSearch:
     def _build_optimized_indices(self):
         """Baut hochoptimierte In-Memory Indizes"""
         
-        # Multi-field indices
-        self.name_index = {}        # name -> [(entity_type, entity, score_weight)]
-        self.address_index = {}     # address_term -> [(entity_type, entity, score_weight)]
-        self.city_index = {}        # city -> [(entity_type, entity, score_weight)]
-        self.email_index = {}       # email_part -> [(entity_type, entity, score_weight)]
-        self.phone_index = {}       # phone_part -> [(entity_type, entity, score_weight)]
-        self.status_index = {}      # status -> [(entity_type, entity, score_weight)]
-        
-        # Index Mieter
-        for entity in self.mieter_data:
-            self._index_entity(entity, "mieter", {
+        # Dense entity table - postings reference entities by doc id only
+        self.entity_table = EntityTable()
+        mieter_start = self.entity_table.extend("mieter", self.mieter_data)
+        eigentuemer_start = self.entity_table.extend("eigentuemer", self.eigentuemer_data)
+        objekte_start = self.entity_table.extend("objekte", self.objekte_data)
+        
+        # Multi-field indices (sorted term arrays, full words only)
+        self.name_index = SegmentedIndex()     # name -> [(doc_id, score_weight)]
+        self.address_index = SegmentedIndex()  # address_term -> [(doc_id, score_weight)]
+        self.city_index = SegmentedIndex()     # city -> [(doc_id, score_weight)]
+        self.email_index = SegmentedIndex()    # email_part -> [(doc_id, score_weight)]
+        self.phone_index = SegmentedIndex()    # phone_part -> [(doc_id, score_weight)]
+        self.status_index = SegmentedIndex()   # status -> [(doc_id, score_weight)]
+        
+        # Collect per-field term frequencies, then write BM25F postings
+        self._field_rows = []
+        for entity_type, entities, first_doc_id in (("mieter", self.mieter_data, mieter_start),
+                                                    ("eigentuemer", self.eigentuemer_data, eigentuemer_start),
+                                                    ("objekte", self.objekte_data, objekte_start)):
+            for doc_id, entity in enumerate(entities, first_doc_id):
+                self._index_entity(doc_id, self._entity_field_config(entity_type, entity))
+        
+        field_lengths = defaultdict(list)
+        for _, field_name, term_counts, _ in self._field_rows:
+            field_lengths[field_name].append(sum(term_counts.values()))
+        self.avg_field_lengths = {field_name: sum(lengths) / len(lengths)
+                                  for field_name, lengths in field_lengths.items()}
+        
+        for field_name, term, doc_id, weight in self._bm25f_postings(self._field_rows):
+            getattr(self, self.FIELD_INDICES[field_name]).add(term, doc_id, weight)
+        self._field_rows = []
+        
+        # Sort term arrays once after bulk indexing
+        for index_name in self.INDEX_NAMES:
+            getattr(self, index_name).freeze()
+    
+    def _entity_field_config(self, entity_type: str, entity: Dict) -> Dict[str, tuple]:
+        """Suchbare Felder einer Entität mit Feld-Boost"""
+        if entity_type == "mieter":
+            return {
                 "name": (entity.get("name", ""), 1.0),
                 "partner": (entity.get("partner", ""), 0.8),
                 "address": (entity.get("adresse", ""), 0.7),
@@ -180,170 +545,348 @@ class WincasaOptimizedSearch:
                 "email": (self._get_nested_field(entity, "kontakt.email"), 0.6),
                 "phone": (self._get_nested_field(entity, "kontakt.telefon"), 0.4),
                 "status": (self._get_nested_field(entity, "vertrag.zahlungsstatus"), 0.5)
-            })
-        
-        # Index Eigentümer
-        for entity in self.eigentuemer_data:
-            self._index_entity(entity, "eigentuemer", {
+            }
+        if entity_type == "eigentuemer":
+            return {
                 "name": (entity.get("name", ""), 1.0),
                 "firma": (entity.get("firma", ""), 0.9),
                 "address": (entity.get("plz_ort", ""), 0.6),
                 "email": (self._get_nested_field(entity, "kontakt.email"), 0.6),
                 "status": (self._get_nested_field(entity, "portfolio.kategorie"), 0.5)
-            })
-        
-        # Index Objekte
-        for entity in self.objekte_data:
-            self._index_entity(entity, "objekte", {
+            }
+        if entity_type == "objekte":
+            return {
                 "address": (entity.get("adresse", ""), 1.0),
                 "city": (entity.get("stadt", ""), 0.7),
                 "status": (self._get_nested_field(entity, "vermietung.status"), 0.6),
                 "owner": (self._get_nested_field(entity, "eigentuemer.name"), 0.8),
                 "verwalter": (self._get_nested_field(entity, "verwaltung.verwalter_name"), 0.7)
-            })
+            }
+        return {}
     
-    def _index_entity(self, entity: Dict, entity_type: str, field_config: Dict[str, tuple]):
-        """Indexiert eine Entität in alle relevanten Indizes"""
+    def _index_entity(self, doc_id: int, field_config: Dict[str, tuple]):
+        """Sammelt die Term-Frequenzen einer Entität je indexiertem Feld"""
         
         for field_name, (field_value, weight) in field_config.items():
             if not field_value or field_value.strip() == "":
                 continue
             
-            terms = self._extract_searchable_terms(field_value)
-            entry = (entity_type, entity, weight)
-            
-            # Route to appropriate indices
-            if field_name in ["name", "partner", "firma", "owner"]:
-                for term in terms:
-                    if term not in self.name_index:
-                        self.name_index[term] = []
-                    self.name_index[term].append(entry)
-            
-            elif field_name in ["address"]:
-                for term in terms:
-                    if term not in self.address_index:
-                        self.address_index[term] = []
-                    self.address_index[term].append(entry)
-            
-            elif field_name in ["city"]:
-                for term in terms:
-                    if term not in self.city_index:
-                        self.city_index[term] = []
-                    self.city_index[term].append(entry)
-            
-            elif field_name in ["email"]:
-                for term in terms:
-                    if term not in self.email_index:
-                        self.email_index[term] = []
-                    self.email_index[term].append(entry)
-            
-            elif field_name in ["phone"]:
-                for term in terms:
-                    if term not in self.phone_index:
-                        self.phone_index[term] = []
-                    self.phone_index[term].append(entry)
+            if field_name not in self.FIELD_INDICES:
+                continue
             
-            elif field_name in ["status"]:
-                for term in terms:
-                    if term not in self.status_index:
-                        self.status_index[term] = []
-                    self.status_index[term].append(entry)
+            term_counts = self._extract_term_counts(field_value)
+            if term_counts:
+                self._field_rows.append((doc_id, field_name, term_counts, weight))
     
-    def _search_index(self, query: str, index: Dict, base_score: float = 1.0) -> Dict[str, tuple]:
-        """Durchsucht einen Index hochoptimiert"""
-        query_normalized = self._normalize_text(query)
-        query_terms = self._extract_searchable_terms(query_normalized)
+    def _bm25f_postings(self, field_rows: List[tuple]) -> Iterator[tuple]:
+        """
+        BM25F-Postings (field_name, term, doc_id, weight) gesammelter Felder
         
-        entity_scores = {}  # entity_id -> (entity_type, entity, max_score)
+        Gewicht je Posting = Feld-Boost * tf / (1 - b + b * len / avg_len),
+        zur Query-Zeit werden die Gewichte eines Dokuments summiert und gesättigt.
+        """
+        for doc_id, field_name, term_counts, boost in field_rows:
+            length = sum(term_counts.values())
+            avg_length = self.avg_field_lengths.get(field_name) or length
+            length_norm = 1 - self.BM25_B + self.BM25_B * length / avg_length
+            for term, tf in term_counts.items():
+                yield field_name, term, doc_id, boost * tf / length_norm
+    
+    def _get_fuzzy_index(self) -> FuzzyTermIndex:
+        """Deletion-Dictionary über das Vokabular der durchsuchten Indizes (lazy)"""
+        fuzzy_index = self.fuzzy_index
+        if fuzzy_index is None:
+            with self._fuzzy_lock:
+                if self.fuzzy_index is None:
+                    vocabulary = set()
+                    for index_name, _ in self.SEARCH_WEIGHTS:
+                        vocabulary.update(getattr(self, index_name))
+                    self.fuzzy_index = FuzzyTermIndex(sorted(vocabulary))
+                fuzzy_index = self.fuzzy_index
+        return fuzzy_index
+    
+    def _get_street_index(self) -> AddressIndex:
+        """Adress-Index (Straße, Hausnummer, PLZ) -> Doc-IDs über Mieter und Objekte (lazy)"""
+        street_index = self.street_index
+        if street_index is None:
+            with self._street_lock:
+                if self.street_index is None:
+                    street_index = AddressIndex()
+                    for doc_id in range(len(self.entity_table)):
+                        if self.entity_table.entity_type(doc_id) in self.ADDRESS_ENTITY_TYPES:
+                            self._add_street_entry(street_index, doc_id, self.entity_table[doc_id])
+                    self.street_index = street_index
+                street_index = self.street_index
+        return street_index
+    
+    @staticmethod
+    def _add_street_entry(street_index: AddressIndex, doc_id: int, entity: Dict):
+        address = entity.get("adresse")
+        if address:
+            postal_city = f"{entity.get('plz') or ''} {entity.get('stadt') or ''}"
+            street_index.add(str(address), doc_id, postal_city)
+    
+    def _address_matches(self, query: str) -> np.ndarray:
+        """Doc-IDs, deren Adresse (Straße + Hausnummer) in der Query vorkommt"""
+        if not any(char.isdigit() for char in query):
+            return np.empty(0, dtype=np.int64)
+        doc_ids = np.array(self._get_street_index().find_in_text(query), dtype=np.int64)
+        return doc_ids[self.entity_table.live_mask(doc_ids)] if len(doc_ids) else doc_ids
+    
+    def _suggest_labels(self, entity_type: str, entity: Dict) -> Iterator[tuple]:
+        """Anzeigbare Namen/Adressen einer Entität: (Feld, Label)"""
+        if entity_type == "mieter":
+            fields = (("name", entity.get("name")), ("partner", entity.get("partner")))
+        elif entity_type == "eigentuemer":
+            fields = (("name", entity.get("name")), ("firma", entity.get("firma")))
+        elif entity_type == "objekte":
+            fields = (("adresse", entity.get("adresse")),)
+        else:
+            return
+        for field_name, value in fields:
+            # Export names carry padding and dangling '&' from empty partner slots
+            label = re.sub(r'[\s&]+$', '', re.sub(r'\s+', ' ', str(value or ''))).strip()
+            if len(label) >= 2:
+                yield field_name, label
+    
+    def _get_suggest_index(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Vorberechnete Top-k Vorschläge pro Präfix (lazy)
+        
+        Präfixe jedes Wortanfangs eines Labels ('mue', 'marvin mue') bis
+        SUGGEST_MAX_PREFIX Zeichen. Rangfolge: Treffer am Label-Anfang vor
+        Treffern im Label, dann Anzahl Entitäten mit diesem Label, dann alphabetisch.
+        """
+        suggest_index = self.suggest_index
+        if suggest_index is None:
+            with self._suggest_lock:
+                if self.suggest_index is None:
+                    label_counts = Counter()
+                    for doc_id in np.flatnonzero(self.entity_table.live_mask(
+                            np.arange(len(self.entity_table)))).tolist():
+                        entity_type = self.entity_table.entity_type(doc_id)
+                        for field_name, label in self._suggest_labels(entity_type, self.entity_table[doc_id]):
+                            label_counts[(label, entity_type, field_name)] += 1
+                    
+                    candidates = defaultdict(dict)
+                    for (label, entity_type, field_name), count in label_counts.items():
+                        label_norm = self._normalize_text(label)
+                        suggestion = {"label": label, "entity_type": entity_type,
+                                      "field": field_name, "count": count}
+                        for match in re.finditer(r'\w+', label_norm):
+                            tail = label_norm[match.start():]
+                            rank = (match.start() > 0, -count, label_norm)
+                            for length in range(1, min(len(tail), self.SUGGEST_MAX_PREFIX) + 1):
+                                entries = candidates[tail[:length]]
+                                key = (label, entity_type, field_name)
+                                if key not in entries or rank < entries[key][0]:
+                                    entries[key] = (rank, suggestion)
+                    
+                    self.suggest_index = {
+                        prefix: [suggestion for _, suggestion in sorted(entries.values(), key=lambda e: e[0])
+                                 [:self.SUGGEST_MAX_K]]
+                        for prefix, entries in candidates.items()
+                    }
+                suggest_index = self.suggest_index
+        return suggest_index
+    
+    def suggest(self, prefix: str, k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Type-Ahead für Mieter-, Eigentümer- und Objektnamen
+        
+        Ein Dict-Lookup auf die vorberechnete Liste; längere Präfixe werden in
+        der Liste ihres SUGGEST_MAX_PREFIX-Präfixes nachgefiltert.
+        
+        Returns:
+            Bis zu k Vorschläge (label, entity_type, field, count)
+        """
+        prefix_norm = self._normalize_text(prefix)
+        if not prefix_norm:
+            return []
+        k = max(0, min(k, self.SUGGEST_MAX_K))
+        
+        suggestions = self._get_suggest_index().get(prefix_norm[:self.SUGGEST_MAX_PREFIX], [])
+        if len(prefix_norm) > self.SUGGEST_MAX_PREFIX:
+            suggestions = [suggestion for suggestion in suggestions
+                           if re.search(r'(?<!\w)' + re.escape(prefix_norm),
+                                        self._normalize_text(suggestion["label"]))]
+        return [dict(suggestion) for suggestion in suggestions[:k]]
+    
+    def _fuzzy_corrections(self, query_terms: Set[str]) -> Dict[str, Dict[str, float]]:
+        """
+        Korrekturkandidaten für Terme ohne exakten Treffer
+        
+        Returns:
+            Dict query_term -> {vokabular_term: Score-Faktor (Penalty nach Edit-Distanz)}
+        """
+        indices = [getattr(self, index_name) for index_name, _ in self.SEARCH_WEIGHTS]
+        corrections = {}
         
         for term in query_terms:
-            # Exact matches
-            if term in index:
-                for entity_type, entity, weight in index[term]:
-                    entity_id = f"{entity_type}_{id(entity)}"
-                    score = base_score * weight
-                    if entity_id not in entity_scores or entity_scores[entity_id][2] < score:
-                        entity_scores[entity_id] = (entity_type, entity, score)
+            if max_edit_distance(len(term)) == 0 or any(term in index for index in indices):
+                continue
             
-            # Prefix matches for partial queries
-            for index_term in index:
-                if index_term.startswith(term) and index_term != term:
-                    for entity_type, entity, weight in index[index_term]:
-                        entity_id = f"{entity_type}_{id(entity)}"
-                        score = base_score * weight * 0.8  # Slight penalty for partial match
-                        if entity_id not in entity_scores or entity_scores[entity_id][2] < score:
-                            entity_scores[entity_id] = (entity_type, entity, score)
+            matches = self._get_fuzzy_index().lookup(term)[:self.FUZZY_MAX_CANDIDATES]
+            if matches:
+                corrections[term] = {candidate: self.FUZZY_DISTANCE_FACTORS[distance]
+                                     for candidate, distance in matches}
         
-        return entity_scores
+        return corrections
     
-    def optimized_search(self, query: str, max_results: int = 10) -> List[SearchResult]:
-        """Hochoptimierte Multi-Index Suche"""
+    def _search_index(self, term: str, index: SegmentedIndex, boost: float = 1.0,
+                      corrections: Optional[Dict[str, float]] = None) -> tuple:
+        """
+        Postings eines Query-Terms in einem Index (bisect, O(log n + Treffer))
         
-        if not query or len(query.strip()) < 2:
-            return []
+        Returns:
+            ((doc_ids, weights) exakter Treffer, (doc_ids, weights) Präfix-/Tippfehler-Treffer)
+        """
+        empty = (np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.float64))
+        exact_ids = []
+        exact_weights = []
+        id_parts = []
+        weight_parts = []
         
-        # Search all indices in parallel
-        all_entity_scores = {}
+        for segment in index.segments:
+            # Exact match and prefix matches share one contiguous term range
+            lo, hi = segment.term_range(term)
+            if lo < hi:
+                if segment.term_at(lo) == term:
+                    doc_ids, weights = segment.postings_at(lo)
+                    exact_ids.append(doc_ids)
+                    exact_weights.append(weights * boost)
+                    lo += 1
+                # Slight penalty for partial match
+                doc_ids, weights = segment.postings_range(lo, hi)
+                id_parts.append(doc_ids)
+                weight_parts.append(weights * (boost * self.PARTIAL_MATCH_FACTOR))
+            
+            # Typo corrections only match whole terms
+            for corrected_term, factor in (corrections or {}).items():
+                postings = segment.lookup(corrected_term)
+                if postings is not None:
+                    doc_ids, weights = postings
+                    id_parts.append(doc_ids)
+                    weight_parts.append(weights * (boost * factor))
         
-        # Name search (highest priority)
-        name_scores = self._search_index(query, self.name_index, 1.0)
-        all_entity_scores.update(name_scores)
+        exact = (np.concatenate(exact_ids), np.concatenate(exact_weights)) if exact_ids else empty
+        partial = (np.concatenate(id_parts), np.concatenate(weight_parts)) if id_parts else empty
+        return exact, partial
+    
+    def _score_term(self, term: str, corrections: Optional[Dict[str, float]] = None) -> tuple:
+        """
+        BM25F Beitrag eines Query-Terms zu allen Kandidaten
         
-        # Address search
-        address_scores = self._search_index(query, self.address_index, 0.8)
-        for entity_id, (entity_type, entity, score) in address_scores.items():
-            if entity_id in all_entity_scores:
-                # Boost score for multi-field matches
-                all_entity_scores[entity_id] = (entity_type, entity, all_entity_scores[entity_id][2] + score)
-            else:
-                all_entity_scores[entity_id] = (entity_type, entity, score)
+        Die geboosteten, längen-normalisierten Feld-Frequenzen exakter Treffer
+        werden über alle Indizes summiert; Präfix- und Tippfehler-Treffer zählen
+        nur mit ihrer besten Variante. Danach Sättigung und IDF-Gewichtung.
+        Unabhängig von der restlichen Query - im Batch pro Term nur einmal berechnet.
         
-        # City search
-        city_scores = self._search_index(query, self.city_index, 0.6)
-        for entity_id, (entity_type, entity, score) in city_scores.items():
-            if entity_id in all_entity_scores:
-                all_entity_scores[entity_id] = (entity_type, entity, all_entity_scores[entity_id][2] + score)
-            else:
-                all_entity_scores[entity_id] = (entity_type, entity, score)
+        Returns:
+            (doc_ids, scores)
+        """
+        exact_ids, exact_weights, partial_ids, partial_weights = [], [], [], []
+        for index_name, boost in self.SEARCH_WEIGHTS:
+            (doc_ids, weights), (p_ids, p_weights) = self._search_index(
+                term, getattr(self, index_name), boost, corrections)
+            exact_ids.append(doc_ids)
+            exact_weights.append(weights)
+            partial_ids.append(p_ids)
+            partial_weights.append(p_weights)
         
-        # Email search
-        email_scores = self._search_index(query, self.email_index, 0.7)
-        for entity_id, (entity_type, entity, score) in email_scores.items():
-            if entity_id in all_entity_scores:
-                all_entity_scores[entity_id] = (entity_type, entity, all_entity_scores[entity_id][2] + score)
-            else:
-                all_entity_scores[entity_id] = (entity_type, entity, score)
+        exact = sum_score_per_doc(np.concatenate(exact_ids), np.concatenate(exact_weights))
+        partial = max_score_per_doc(np.concatenate(partial_ids), np.concatenate(partial_weights))
+        doc_ids, tf = max_score_per_doc(np.concatenate((exact[0], partial[0])),
+                                        np.concatenate((exact[1], partial[1])))
         
-        # Status search
-        status_scores = self._search_index(query, self.status_index, 0.5)
-        for entity_id, (entity_type, entity, score) in status_scores.items():
-            if entity_id in all_entity_scores:
-                all_entity_scores[entity_id] = (entity_type, entity, all_entity_scores[entity_id][2] + score)
-            else:
-                all_entity_scores[entity_id] = (entity_type, entity, score)
+        # Drop removed entities (tombstones)
+        live = self.entity_table.live_mask(doc_ids)
+        doc_ids, tf = doc_ids[live], tf[live]
+        if not len(doc_ids):
+            return doc_ids, tf
+        
+        total_docs = max(self.entity_table.live_count, 1)
+        doc_freq = len(doc_ids)
+        idf = math.log(1 + (total_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+        return doc_ids, idf * tf * (self.BM25_K1 + 1) / (self.BM25_K1 + tf)
+    
+    def _rank_query(self, query: str, query_terms: Set[str],
+                    term_scores: Dict[str, tuple], max_results: int) -> List[SearchResult]:
+        """
+        Summiert die Term-Scores einer Query und baut die Top-k Ergebnisse
         
-        # Convert to SearchResult objects and sort
+        Exakte Adress-Treffer (Straße + Hausnummer) erhalten ADDRESS_MATCH_BOOST.
+        """
+        id_parts = [term_scores[term][0] for term in query_terms]
+        score_parts = [term_scores[term][1] for term in query_terms]
+        address_ids = self._address_matches(query)
+        if len(address_ids):
+            id_parts.append(address_ids)
+            score_parts.append(np.full(len(address_ids), self.ADDRESS_MATCH_BOOST))
+        if not id_parts:
+            return []
+        doc_ids, scores = sum_score_per_doc(np.concatenate(id_parts), np.concatenate(score_parts))
+        
+        # Annotations only for the k returned results, query normalized once
+        query_norm = self._normalize_text(query)
         results = []
-        for entity_id, (entity_type, entity, score) in all_entity_scores.items():
+        for position in top_k(doc_ids, scores, max_results):
+            doc_id = int(doc_ids[position])
+            entity_type = self.entity_table.entity_type(doc_id)
+            entity = self.entity_table[doc_id]
+            matched_fields, exact_matches = self._annotate_matches(query_norm, entity, entity_type)
+            if doc_id in address_ids:
+                matched_fields = matched_fields if "adresse" in matched_fields else matched_fields + ["adresse"]
+                exact_matches = exact_matches if "adresse" in exact_matches else exact_matches + ["adresse"]
             results.append(SearchResult(
                 entity_type=entity_type,
                 entity_data=entity,
-                relevance_score=score,
-                matched_fields=self._identify_matched_fields(query, entity, entity_type),
-                exact_matches=self._identify_exact_matches(query, entity, entity_type)
+                relevance_score=round(float(scores[position]), 4),
+                matched_fields=matched_fields,
+                exact_matches=exact_matches
             ))
         
-        # Sort by relevance score (descending)
-        results.sort(key=lambda x: x.relevance_score, reverse=True)
+        return results
+    
+    def optimized_search(self, query: str, max_results: int = 10) -> List[SearchResult]:
+        """Hochoptimierte Multi-Index Suche (BM25F, Top-k)"""
+        return self.optimized_search_many([query], max_results)[0]
+    
+    def optimized_search_many(self, queries: List[str], max_results: int = 10) -> List[List[SearchResult]]:
+        """
+        Batch-Suche für mehrere Queries
+        
+        Queries werden dedupliziert und vorab tokenisiert, jeder Term wird
+        über alle Queries hinweg nur einmal in den Indizes nachgeschlagen.
+        
+        Returns:
+            Ergebnislisten in Reihenfolge der Eingabe-Queries
+        """
+        self._refresh_if_sources_changed()
         
-        return results[:max_results]
+        tokenized = {}
+        for query in dict.fromkeys(queries):
+            if query and len(query.strip()) >= 2:
+                tokenized[query] = self._extract_searchable_terms(query)
+        
+        all_terms = set().union(*tokenized.values())
+        fuzzy_terms = self._fuzzy_corrections(all_terms)
+        term_scores = {term: self._score_term(term, fuzzy_terms.get(term)) for term in all_terms}
+        
+        ranked = {query: self._rank_query(query, query_terms, term_scores, max_results)
+                  for query, query_terms in tokenized.items()}
+        return [list(ranked.get(query, [])) for query in queries]
     
-    def _identify_matched_fields(self, query: str, entity: Dict, entity_type: str) -> List[str]:
-        """Identifiziert welche Felder gematcht haben"""
-        query_norm = self._normalize_text(query)
-        matched_fields = []
+    def _annotate_matches(self, query_norm: str, entity: Dict, entity_type: str) -> tuple:
+        """
+        Identifiziert gematchte und exakt gematchte Felder
         
-        # Define fields to check per entity type
+        Jedes Feld wird genau einmal normalisiert.
+        
+        Returns:
+            (matched_fields, exact_matches)
+        """
+        # Define fields to check per entity type (last entry: exact-match field)
         if entity_type == "mieter":
             check_fields = [
                 ("name", entity.get("name", "")),
@@ -352,6 +895,7 @@ class WincasaOptimizedSearch:
                 ("stadt", entity.get("stadt", "")),
                 ("email", self._get_nested_field(entity, "kontakt.email"))
             ]
+            exact_field = "name"
         elif entity_type == "eigentuemer":
             check_fields = [
                 ("name", entity.get("name", "")),
@@ -359,6 +903,7 @@ class WincasaOptimizedSearch:
                 ("plz_ort", entity.get("plz_ort", "")),
                 ("email", self._get_nested_field(entity, "kontakt.email"))
             ]
+            exact_field = "name"
         elif entity_type == "objekte":
             check_fields = [
                 ("adresse", entity.get("adresse", "")),
@@ -366,31 +911,20 @@ class WincasaOptimizedSearch:
                 ("status", self._get_nested_field(entity, "vermietung.status")),
                 ("eigentuemer", self._get_nested_field(entity, "eigentuemer.name"))
             ]
+            exact_field = "adresse"
         else:
-            return []
+            return [], []
         
+        matched_fields = []
+        exact_matches = []
         for field_name, field_value in check_fields:
-            if field_value and query_norm in self._normalize_text(field_value):
+            field_norm = self._normalize_text(field_value) if field_value else ""
+            if field_norm and query_norm in field_norm:
                 matched_fields.append(field_name)
+            if field_name == exact_field and query_norm == field_norm:
+                exact_matches.append(field_name)
         
-        return matched_fields
-    
-    def _identify_exact_matches(self, query: str, entity: Dict, entity_type: str) -> List[str]:
-        """Identifiziert exakte Matches"""
-        query_norm = self._normalize_text(query)
-        exact_matches = []
-        
-        if entity_type == "mieter":
-            if query_norm == self._normalize_text(entity.get("name", "")):
-                exact_matches.append("name")
-        elif entity_type == "eigentuemer":
-            if query_norm == self._normalize_text(entity.get("name", "")):
-                exact_matches.append("name")
-        elif entity_type == "objekte":
-            if query_norm == self._normalize_text(entity.get("adresse", "")):
-                exact_matches.append("adresse")
-        
-        return exact_matches
+        return matched_fields, exact_matches
     
     def _format_results_for_llm(self, results: List[SearchResult]) -> str:
         """Formatiert Ergebnisse für LLM"""
@@ -474,7 +1008,9 @@ Bitte beantworte die Anfrage basierend auf diesen Daten."""
                         {"role": "user", "content": user_prompt}
                     ],
                     temperature=0.1,
-                    max_tokens=400
+                    max_tokens=400,
+                    # Restbudget als HTTP-Timeout; abgelaufen -> Trefferliste als Teilantwort
+                    timeout=remaining_timeout("search_llm", self.LLM_TIMEOUT_SECONDS)
                 )
                 
                 answer = response.choices[0].message.content
@@ -518,6 +1054,8 @@ Bitte beantworte die Anfrage basierend auf diesen Daten."""
                 "eigentuemer": len(self.eigentuemer_data),
                 "objekte": len(self.objekte_data)
             },
+            "index_bytes": sum(getattr(self, index_name).nbytes for index_name in self.INDEX_NAMES),
+            "street_addresses": len(self.street_index) if self.street_index is not None else None,
             "indices": {
                 "names": len(self.name_index),
                 "addresses": len(self.address_index),
@@ -4,20 +4,34 @@ WINCASA Phase 2.4 - Unified Query Engine
 Hauptklasse die alle Query-Modi intelligent routet und verwaltet
 """
 
+import asyncio
 import hashlib
 import json
 import logging
+import threading
 import time
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
 # Import WINCASA Phase 2 Components
+from wincasa.core.adaptive_router import (DEFAULT_ORDER, OTHER_PATTERN, AdaptiveRouter,
+                                          RoutingDecision, detect_query_pattern)
+from wincasa.core.answer_cache import AnswerCache, normalize_query
+from wincasa.core.async_executors import llm_slot, run_io
+from wincasa.core.component_registry import (DEFAULT_API_KEY_FILE, get_component,
+                                             get_registry)
+from wincasa.core.deadline import (Deadline, DeadlineExceeded, check_deadline,
+                                   current_deadline, deadline_scope)
+from wincasa.core.query_batch import QueryBatch
+from wincasa.core.query_stream import QueryStream, StreamCancelled, current_token_sink
+from wincasa.core.singleflight import SingleFlight
 from wincasa.core.unified_template_system import UnifiedResponse, UnifiedTemplateSystem
 from wincasa.core.wincasa_optimized_search import SearchResponse, WincasaOptimizedSearch
+from wincasa.monitoring.latency_histogram import WINDOWS, PerformanceHistograms
 
 # Legacy Mode Integration
 try:
@@ -25,10 +39,18 @@ try:
 
     # Create a wrapper function to match expected interface
     def query_wincasa_system(query: str, mode: str) -> Dict[str, Any]:
-        handler = WincasaLLMHandler()
+        handler = get_component("llm_handler")
         result = handler.query_llm(query, mode=mode)
         return result
     
+    async def query_wincasa_system_async(query: str, mode: str) -> Dict[str, Any]:
+        handler = get_component("llm_handler")
+        return await handler.query_llm_async(query, mode=mode)
+    
+    def query_wincasa_system_stream(query: str, mode: str) -> Iterator[str]:
+        handler = get_component("llm_handler")
+        return handler.query_llm_stream(query, mode=mode)
+    
     LEGACY_SYSTEM_AVAILABLE = True
 except ImportError as e:
     LEGACY_SYSTEM_AVAILABLE = False
@@ -41,6 +63,26 @@ except ImportError as e:
             "processing_time": 1500,
             "mode": mode
         }
+    
+    async def query_wincasa_system_async(query: str, mode: str) -> Dict[str, Any]:
+        return query_wincasa_system(query, mode)
+    
+    def query_wincasa_system_stream(query: str, mode: str) -> Iterator[str]:
+        yield query_wincasa_system(query, mode)["answer"]
+
+class _Subsystem:
+    """Descriptor: Subsystem wird beim ersten Zugriff gebaut (pro Engine-Instanz)"""
+    
+    def __set_name__(self, owner, name: str):
+        self.name = name
+    
+    def __get__(self, engine, owner=None):
+        if engine is None:
+            return self
+        return engine._subsystem(self.name)
+    
+    def __set__(self, engine, value):
+        engine._subsystems[self.name] = value
 
 @dataclass
 class QueryEngineResult:
@@ -67,6 +109,10 @@ class QueryEngineResult:
     timestamp: datetime
     feature_flags: Dict[str, bool]
     error_details: Optional[str]
+    speculative_details: Optional[Dict[str, Any]] = None  # Speculative mode: winner, hedge, wasted work
+    routing_decision: Optional[Dict[str, Any]] = None  # Adaptive router: pattern, path order, skipped paths
+    time_to_first_token_ms: Optional[float] = None  # Streaming: first answer chunk visible to the caller
+    route: Optional[str] = None  # Path that produced the answer, or "cache"/"coalesced" for shared results
 
 # Shadow mode removed - dataclass removed
 
@@ -82,36 +128,72 @@ class WincasaQueryEngine:
     Performance-Ziel: <200ms für 95% der Queries
     """
     
+    # Geschätzte Kosten eines abgebrochenen Pfads (Speculative Mode)
+    INFLIGHT_COST_ESTIMATES = {"semantic": 0.01, "unified": 0.01}
+    ROUTE_ORDER = ("semantic", "unified", "legacy")
+    
+    # Lazy Subsysteme in Warm-up-Reihenfolge: Search-Index zuerst (Structured
+    # Search als schneller Pfad), Semantic Engine samt LLM Handler zuletzt
+    SUBSYSTEMS = ("search_system", "unified_system", "semantic_engine")
+    search_system = _Subsystem()
+    unified_system = _Subsystem()
+    semantic_engine = _Subsystem()
+    
     def __init__(self, 
                  config_file: str = "config/query_engine.json",
                  api_key_file: str = "/home/envs/openai.env",
-                 debug_mode: bool = False):
+                 debug_mode: bool = False,
+                 unified_system: Optional[UnifiedTemplateSystem] = None,
+                 semantic_engine=None,
+                 search_system: Optional[WincasaOptimizedSearch] = None,
+                 answer_cache: Optional[AnswerCache] = None,
+                 router: Optional[AdaptiveRouter] = None):
         
         self.debug_mode = debug_mode
         self.config = self._load_config(config_file)
         
         print("🚀 Initialisiere WINCASA Unified Query Engine...")
         
-        # Initialize Unified Template System (Phase 2.3)
-        self.unified_system = UnifiedTemplateSystem(
-            api_key_file=api_key_file,
-            debug_mode=debug_mode
-        )
+        # Subsystems are built on first use (or by warm_up()); they come from the
+        # process-wide registry unless injected, a non-default API key file gets its own instances
+        self.api_key_file = api_key_file
+        self._shared = api_key_file == DEFAULT_API_KEY_FILE
+        self._subsystems: Dict[str, Any] = {}
+        self._subsystem_locks = {name: threading.Lock() for name in self.SUBSYSTEMS}
+        self._subsystem_build_times: Dict[str, float] = {}
+        for name, instance in (("unified_system", unified_system),
+                               ("semantic_engine", semantic_engine),
+                               ("search_system", search_system)):
+            if instance is not None:
+                self._subsystems[name] = instance
         
-        # Initialize Semantic Template Engine (Phase 2.6 - Mode 6)
-        try:
-            from wincasa.core.semantic_template_engine import SemanticTemplateEngine
-            self.semantic_engine = SemanticTemplateEngine(
-                api_key_file=api_key_file,
-                debug_mode=debug_mode
+        # Cross-user answer cache (invalidated when exports/DB change)
+        cache_config = self.config["answer_cache"]
+        if answer_cache is not None:
+            self.answer_cache = answer_cache
+        elif cache_config["enabled"]:
+            self.answer_cache = AnswerCache(max_entries=cache_config["max_entries"],
+                                            ttl_seconds=cache_config["ttl_seconds"])
+        else:
+            self.answer_cache = None
+        
+        # Adaptive routing model, trained offline from query_logs.db (adaptive_router.py)
+        routing_config = self.config["adaptive_routing"]
+        if router is not None:
+            self.router = router
+        elif routing_config["enabled"]:
+            self.router = AdaptiveRouter.load(
+                Path(routing_config["model_path"]),
+                min_samples=routing_config["min_samples"],
+                min_success_rate=routing_config["min_success_rate"],
+                cost_weight_ms_per_usd=routing_config["cost_weight_ms_per_usd"],
+                explore_rate=routing_config["explore_rate"]
             )
-            print("🧩 Semantic Template Engine (Mode 6) initialized")
-        except ImportError as e:
-            print(f"⚠️ Semantic Template Engine not available: {e}")
-            self.semantic_engine = None
+        else:
+            self.router = None
         
-        # Initialize Structured Search (Phase 2.2)
-        self.search_system = WincasaOptimizedSearch(debug_mode=debug_mode)
+        # Request coalescing: identical in-flight queries wait for one computation
+        self.inflight = SingleFlight("query_engine") if self.config["coalescing"]["enabled"] else None
         
         # Performance & Monitoring
         self.query_stats = {
@@ -119,18 +201,119 @@ class WincasaQueryEngine:
             "unified_queries": 0,
             "semantic_queries": 0,  # Mode 6 tracking
             "legacy_queries": 0,
+            "cache_queries": 0,  # Served from answer cache
+            "coalesced_queries": 0,  # Shared an identical in-flight computation
+            "adaptive_decisions": 0,  # Path order chosen by the learned router
+            "adaptive_skips": 0,  # Paths skipped as historically failing
+            "timeout_queries": 0,  # Deadline exceeded without partial answer
             "avg_processing_time": 0.0,
-            "avg_cost_per_query": 0.0
+            "avg_cost_per_query": 0.0,
+            # Speculative mode accounting
+            "speculative_queries": 0,
+            "hedges_fired": 0,
+            "hedge_wins": 0,
+            "wasted_cost": 0.0,
+            "wasted_time_ms": 0.0
         }
+        # Queries finish on executor/stream threads concurrently
+        self._stats_lock = threading.Lock()
         
-        # Performance tracking
-        self.performance_history = []
+        # Performance tracking: fixed-memory histograms per processing_mode/engine_version
+        self.histograms = PerformanceHistograms()
         
         if self.debug_mode:
             print(f"✅ Query Engine bereit:")
             print(f"   🎛️  Feature Flags: {self.config['feature_flags']}")
             print(f"   🎯 Unified Rollout: {self.config['rollout']['unified_percentage']}%")
     
+    def _subsystem(self, name: str) -> Any:
+        """Gibt ein Subsystem zurück und baut es beim ersten Zugriff (einmalig, thread-safe)"""
+        try:
+            return self._subsystems[name]
+        except KeyError:
+            pass
+        
+        with self._subsystem_locks[name]:
+            if name not in self._subsystems:
+                start_time = time.time()
+                self._subsystems[name] = getattr(self, f"_build_{name}")()
+                self._subsystem_build_times[name] = round((time.time() - start_time) * 1000, 2)
+                logger.info(f"🧩 Subsystem '{name}' bereit ({self._subsystem_build_times[name]}ms)")
+        return self._subsystems[name]
+    
+    def _build_search_system(self) -> WincasaOptimizedSearch:
+        # Structured Search (Phase 2.2) - same instance as the unified system
+        if self._shared:
+            return get_component("optimized_search")
+        return WincasaOptimizedSearch(api_key_file=self.api_key_file, debug_mode=self.debug_mode)
+    
+    def _build_unified_system(self) -> UnifiedTemplateSystem:
+        # Unified Template System (Phase 2.3)
+        if self._shared:
+            return get_component("unified_template_system")
+        # Private search instance - the unified system would otherwise fall back to the shared one
+        return UnifiedTemplateSystem(api_key_file=self.api_key_file, debug_mode=self.debug_mode,
+                                     search_system=self._subsystem("search_system"))
+    
+    def _build_semantic_engine(self):
+        # Semantic Template Engine (Phase 2.6 - Mode 6)
+        try:
+            if self._shared:
+                semantic_engine = get_component("semantic_template_engine")
+            else:
+                from wincasa.core.semantic_template_engine import SemanticTemplateEngine
+                semantic_engine = SemanticTemplateEngine(api_key_file=self.api_key_file,
+                                                         debug_mode=self.debug_mode)
+            print("🧩 Semantic Template Engine (Mode 6) initialized")
+            return semantic_engine
+        except ImportError as e:
+            print(f"⚠️ Semantic Template Engine not available: {e}")
+            return None
+    
+    async def _prepare_subsystems(self, *names: str):
+        """Baut fehlende Subsysteme im IO-Pool statt in der Event-Loop"""
+        missing = [name for name in names if name not in self._subsystems]
+        if missing:
+            # Build errors surface again at the actual call site (inside its error handling)
+            await asyncio.gather(*(run_io(self._subsystem, name) for name in missing),
+                                 return_exceptions=True)
+    
+    def warm_up(self, background: bool = True) -> Optional[threading.Thread]:
+        """
+        Baut alle Subsysteme vorab, Search-Index zuerst, LLM Handler zuletzt
+        
+        background=True startet einen Daemon-Thread (z.B. sobald der Server
+        lauscht) und kehrt sofort zurück. Queries während des Warm-ups warten
+        nur auf die Subsysteme, die sie selbst brauchen.
+        """
+        if background:
+            thread = threading.Thread(target=self.warm_up, kwargs={"background": False},
+                                      name="wincasa-warmup", daemon=True)
+            thread.start()
+            return thread
+        
+        start_time = time.time()
+        for name in self.SUBSYSTEMS:
+            try:
+                self._subsystem(name)
+            except Exception as e:
+                logger.warning(f"⚠️ Warm-up von '{name}' fehlgeschlagen: {e}")
+        if LEGACY_SYSTEM_AVAILABLE:
+            try:
+                get_component("llm_handler")
+            except Exception as e:
+                logger.warning(f"⚠️ Warm-up des LLM Handlers fehlgeschlagen: {e}")
+        logger.info(f"🔥 Warm-up abgeschlossen ({round((time.time() - start_time) * 1000)}ms)")
+        return None
+    
+    def get_subsystem_status(self) -> Dict[str, Dict[str, Any]]:
+        """Welche Subsysteme sind gebaut (und wie lange hat es gedauert)"""
+        return {
+            name: {"ready": name in self._subsystems,
+                   "build_time_ms": self._subsystem_build_times.get(name)}
+            for name in self.SUBSYSTEMS
+        }
+    
     def _load_config(self, config_file: str) -> Dict[str, Any]:
         """Lädt Query Engine Konfiguration"""
         config_path = Path(config_file)
@@ -150,11 +333,33 @@ class WincasaQueryEngine:
             "performance": {
                 "max_processing_time_ms": 10000,
                 "cost_alert_threshold": 0.10,  # $0.10 per query
-                "quality_threshold": 0.7
+                "quality_threshold": 0.7,
+                "batch_concurrency": 8  # Gleichzeitige LLM-Calls in process_queries
             },
             "legacy_modes": {
                 "default_mode": "JSON_VANILLA",
                 "fallback_mode": "JSON_SYSTEM"
+            },
+            "speculative": {
+                "enabled": False,  # Opt-in: Pfade parallel statt nacheinander
+                "hedge_delay_ms": 1500,  # Legacy LLM erst nach dieser Wartezeit starten
+                "confidence_threshold": 0.7
+            },
+            "answer_cache": {
+                "enabled": True,
+                "max_entries": 1000,
+                "ttl_seconds": 900
+            },
+            "coalescing": {
+                "enabled": True  # Gleichzeitige identische Queries teilen eine Berechnung
+            },
+            "adaptive_routing": {
+                "enabled": True,  # Ohne trainiertes Modell gilt die feste Kaskade
+                "model_path": "wincasa_data/router_model.json",
+                "min_samples": 20,
+                "min_success_rate": 0.8,
+                "cost_weight_ms_per_usd": 100000,  # $0.01 zählt wie 1s Latenz
+                "explore_rate": 0.05
             }
         }
         
@@ -212,36 +417,81 @@ class WincasaQueryEngine:
         start_time = time.time()
         
         try:
-            # Call legacy streamlit system
-            legacy_result = query_wincasa_system(query, mode)
-            
-            processing_time = round((time.time() - start_time) * 1000, 2)
-            
-            return {
-                "answer": legacy_result.get("answer", "Keine Antwort verfügbar"),
-                "mode": mode,
-                "processing_time_ms": processing_time,
-                "success": True,
-                "result_count": legacy_result.get("result_count", 0),
-                "cost_estimate": self._estimate_legacy_cost(query, mode),
-                "raw_result": legacy_result
-            }
-            
+            check_deadline("legacy")
+            sink = current_token_sink()
+            if sink is not None:
+                legacy_result = self._stream_legacy_query(query, mode, sink)
+            else:
+                # Call legacy streamlit system
+                legacy_result = query_wincasa_system(query, mode)
+            return self._legacy_success(query, mode, start_time, legacy_result)
+        except StreamCancelled:
+            # Reader is gone - an abort is not a legacy failure
+            raise
         except Exception as e:
-            processing_time = round((time.time() - start_time) * 1000, 2)
-            
-            if self.debug_mode:
-                print(f"   ❌ Legacy processing error: {e}")
-            
-            return {
-                "answer": f"Legacy-System Fehler: {str(e)}",
-                "mode": mode,
-                "processing_time_ms": processing_time,
-                "success": False,
-                "result_count": 0,
-                "cost_estimate": 0.0,
-                "error": str(e)
-            }
+            return self._legacy_error(mode, start_time, e)
+    
+    def _stream_legacy_query(self, query: str, mode: str, sink) -> Dict[str, Any]:
+        """Legacy System im Streaming-Modus: jedes Stück geht sofort an den Leser"""
+        chunks = []
+        stream = query_wincasa_system_stream(query, mode)
+        try:
+            for chunk in stream:
+                chunks.append(chunk)
+                sink(chunk)
+        finally:
+            # Ends the OpenAI stream right away when the reader cancels
+            close = getattr(stream, 'close', None)
+            if close:
+                close()
+        return {"answer": "".join(chunks), "mode": mode, "success": True, "streamed": True}
+    
+    async def _process_legacy_query_async(self, query: str, mode: str = None) -> Dict[str, Any]:
+        """Legacy System über den async LLM-Pfad"""
+        
+        if mode is None:
+            mode = self.config["legacy_modes"]["default_mode"]
+        
+        start_time = time.time()
+        
+        try:
+            check_deadline("legacy")
+            async with llm_slot():
+                legacy_result = await query_wincasa_system_async(query, mode)
+            return self._legacy_success(query, mode, start_time, legacy_result)
+        except Exception as e:
+            return self._legacy_error(mode, start_time, e)
+    
+    def _legacy_success(self, query: str, mode: str, start_time: float,
+                        legacy_result: Dict[str, Any]) -> Dict[str, Any]:
+        processing_time = round((time.time() - start_time) * 1000, 2)
+        
+        return {
+            "answer": legacy_result.get("answer", "Keine Antwort verfügbar"),
+            "mode": mode,
+            "processing_time_ms": processing_time,
+            "success": True,
+            "result_count": legacy_result.get("result_count", 0),
+            "cost_estimate": self._estimate_legacy_cost(query, mode),
+            "raw_result": legacy_result
+        }
+    
+    def _legacy_error(self, mode: str, start_time: float, e: Exception) -> Dict[str, Any]:
+        processing_time = round((time.time() - start_time) * 1000, 2)
+        
+        if self.debug_mode:
+            print(f"   ❌ Legacy processing error: {e}")
+        
+        return {
+            "answer": f"Legacy-System Fehler: {str(e)}",
+            "mode": mode,
+            "processing_time_ms": processing_time,
+            "success": False,
+            "result_count": 0,
+            "cost_estimate": 0.0,
+            "error": str(e),
+            "deadline_error": e if isinstance(e, DeadlineExceeded) else None
+        }
     
     def _estimate_legacy_cost(self, query: str, mode: str) -> float:
         """Schätzt Kosten für Legacy-Query"""
@@ -268,7 +518,9 @@ class WincasaQueryEngine:
     def process_query(self, 
                      query: str, 
                      user_id: Optional[str] = None,
-                     force_mode: Optional[str] = None) -> QueryEngineResult:
+                     force_mode: Optional[str] = None,
+                     speculative: Optional[bool] = None,
+                     deadline_ms: Optional[float] = None) -> QueryEngineResult:
         """
         Hauptfunktion: Intelligente Query-Verarbeitung
         
@@ -276,124 +528,576 @@ class WincasaQueryEngine:
             query: Die Benutzer-Anfrage
             user_id: Optional User ID für Feature Flags
             force_mode: Optional mode override ("unified", "legacy")
+            speculative: Optional override für config["speculative"]["enabled"]
+            deadline_ms: Optional Latenz-Budget (Default: performance.max_processing_time_ms)
         """
-        start_time = time.time()
-        
-        if self.debug_mode:
-            print(f"\n🔍 Query Engine: '{query}'")
-            if user_id:
-                print(f"   👤 User: {user_id}")
+        with deadline_scope(self._new_deadline(deadline_ms)):
+            return self._route_query(query, user_id, force_mode, speculative)
+    
+    def process_query_stream(self,
+                             query: str,
+                             user_id: Optional[str] = None,
+                             force_mode: Optional[str] = None,
+                             deadline_ms: Optional[float] = None) -> QueryStream:
+        """
+        Wie process_query, aber die Antwort kommt stückweise
         
-        # Always log the query start
-        print(f"[WincasaQueryEngine] Processing query: '{query[:50]}...' for user: {user_id}")
+        Der LLM-Pfad liefert Tokens, sobald OpenAI sie sendet; alle anderen
+        Pfade liefern ihre Antwort als ein Stück. Ohne Speculative Mode, damit
+        nur ein Pfad in den Stream schreibt.
         
-        # Determine processing mode
-        use_unified = force_mode == "unified" or (
-            force_mode != "legacy" and 
-            self._should_use_unified(user_id)
-        )
+        Returns:
+            QueryStream - iterierbar über die Antwort-Stücke, danach das
+            Ergebnis (inkl. time_to_first_token_ms) in .result
+        """
+        return QueryStream(self, query, user_id=user_id, force_mode=force_mode,
+                           speculative=False, deadline_ms=deadline_ms)
+    
+    def _route_query(self, query: str, user_id: Optional[str], force_mode: Optional[str],
+                     speculative: Optional[bool]) -> QueryEngineResult:
+        start_time = time.time()
+        use_unified = self._begin_query(query, user_id, force_mode)
         
-        # Shadow mode removed
+        cache_key = self._answer_cache_key(use_unified)
+        cached = self._cached_outcome(query, cache_key)
+        if cached:
+            return self._finish_query(query, user_id, start_time, cached, None, None)
+        # Data version the answer is computed from - checked again when storing it
+        data_version = self.answer_cache.current_version() if cache_key else None
         
+        # Identical concurrent queries share one computation
+        computed, coalesced = self._coalesce(query, use_unified, self._compute_outcome,
+                                             query, use_unified, speculative)
+        return self._finish_computed(query, user_id, start_time, computed, coalesced, cache_key, data_version)
+    
+    def _compute_outcome(self, query: str, use_unified: bool, speculative: Optional[bool]) -> Tuple[
+            Dict[str, Any], Optional[UnifiedResponse], Optional[Dict], Optional[Dict[str, Any]]]:
+        """Eigentliche Verarbeitung: (outcome, unified_response, legacy_response, speculative_details)"""
         unified_response = None
         legacy_response = None
         
+        # Speculative mode needs its own event loop - inside a running loop use process_query_async
+        if use_unified and self._use_speculative(speculative) and not self._in_event_loop():
+            return asyncio.run(
+                self._race_paths(query, lambda: run_io(self._process_legacy_query, query))
+            )
+        
         # Main processing path
         if use_unified:
-            # NEW: Check for Semantic Template patterns first (Mode 6)
-            semantic_result = None
-            if self.semantic_engine:
-                can_handle, semantic_confidence = self.semantic_engine.can_handle_query(query)
-                if can_handle and semantic_confidence > 0.7:
-                    # Process with Semantic Template Engine
+            # Path order: semantic -> unified -> legacy, or as learned by the adaptive router
+            decision = self._routing_decision(query)
+            outcome = None
+            unified_failed = False
+            for path in decision.order:
+                if path == "semantic":
+                    # Semantic Template patterns (Mode 6)
+                    if not self._semantic_candidate(query):
+                        continue
                     try:
-                        semantic_result = self.semantic_engine.process_query(query)
-                        
-                        if semantic_result.success:
-                            answer = semantic_result.answer
-                            confidence = semantic_result.confidence
-                            result_count = semantic_result.result_count
-                            processing_mode = "semantic_template"
-                            engine_version = "unified_v2_mode6"
-                            cost_estimate = 0.01  # Lightweight LLM cost for intent extraction
-                            
-                            self.query_stats["semantic_queries"] += 1
-                            
-                            if self.debug_mode:
-                                print(f"   ✅ Semantic Template successful: {semantic_result.pattern.pattern_id}")
-                        
+                        outcome = self._semantic_outcome(self.semantic_engine.process_query(query))
                     except Exception as e:
                         if self.debug_mode:
                             print(f"   ⚠️ Semantic Template failed: {e}")
-                        semantic_result = None
+                
+                elif path == "unified":
+                    try:
+                        unified_response = self.unified_system.process_query(query)
+                        outcome = self._unified_outcome(unified_response)
+                    except DeadlineExceeded as e:
+                        outcome = self._deadline_outcome(e)
+                    except Exception as e:
+                        if self.debug_mode:
+                            print(f"   ❌ Unified system error: {e}")
+                        unified_failed = True
+                
+                else:
+                    # Legacy: fallback after a unified error or chosen by the router
+                    legacy_response = self._process_legacy_query(query)
+                    outcome = self._legacy_outcome(legacy_response, fallback=unified_failed)
+                
+                if outcome is not None:
+                    break
             
-            # If semantic processing failed or not applicable, use Unified Template System
-            if not semantic_result or not semantic_result.success:
-                try:
-                    unified_response = self.unified_system.process_query(query)
-                    
-                    answer = unified_response.final_answer
-                    confidence = unified_response.confidence
-                    result_count = unified_response.result_count
-                    processing_mode = unified_response.processing_path
-                    engine_version = "unified_v2"
-                    cost_estimate = self._estimate_unified_cost(unified_response)
-                    
-                    self.query_stats["unified_queries"] += 1
-                    
-                except Exception as e:
-                    if self.debug_mode:
-                        print(f"   ❌ Unified system error: {e}")
-                    
-                    # Fallback to legacy
-                    legacy_result = self._process_legacy_query(query)
-                    answer = legacy_result["answer"]
-                    confidence = 0.3  # Low confidence due to fallback
-                    result_count = legacy_result["result_count"]
-                    processing_mode = "legacy_fallback"
-                    engine_version = "legacy_v1"
-                    cost_estimate = legacy_result["cost_estimate"]
-                    
-                    self.query_stats["legacy_queries"] += 1
+            if outcome is None:
+                # Router skipped legacy but nothing else answered - last resort
+                legacy_response = self._process_legacy_query(query)
+                outcome = self._legacy_outcome(legacy_response, fallback=unified_failed)
+            outcome["routing"] = decision
         
         else:
             # Use Legacy System
-            legacy_result = self._process_legacy_query(query)
-            legacy_response = legacy_result
+            legacy_response = self._process_legacy_query(query)
+            outcome = self._legacy_outcome(legacy_response)
+        
+        return outcome, unified_response, legacy_response, None
+    
+    async def process_query_async(self,
+                                  query: str,
+                                  user_id: Optional[str] = None,
+                                  force_mode: Optional[str] = None,
+                                  speculative: Optional[bool] = None,
+                                  deadline_ms: Optional[float] = None) -> QueryEngineResult:
+        """
+        Async-Variante von process_query für viele parallele Queries pro Prozess
+        
+        Legacy/LLM-Pfad läuft nativ async (kein Thread während des LLM-Wartens).
+        Synchrone Subsysteme laufen in begrenzten Executors: Unified Template
+        System (Templates mit SQL) im Single-Thread DB-Executor, Semantic
+        Template Engine (LLM-gebunden) im IO-Executor. Die Deadline folgt per
+        contextvars in Tasks und Executor-Threads.
+        """
+        with deadline_scope(self._new_deadline(deadline_ms)):
+            return await self._route_query_async(query, user_id, force_mode, speculative)
+    
+    def process_queries(self,
+                        queries: Iterable[str],
+                        concurrency: Optional[int] = None,
+                        user_id: Optional[str] = None,
+                        force_mode: Optional[str] = None,
+                        speculative: Optional[bool] = None,
+                        deadline_ms: Optional[float] = None) -> QueryBatch:
+        """
+        Verarbeitet viele Queries mit begrenzter Parallelität
+        
+        Identische Queries werden einmal verarbeitet, LLM-Calls und Unified System
+        laufen parallel bis `concurrency` (Default: performance.batch_concurrency),
+        nur SQL bleibt auf der seriellen DB-Lane. deadline_ms gilt pro Query.
+        
+        Returns:
+            QueryBatch - liefert BatchItems in Fertigstellungs-Reihenfolge
+            (sync oder async iterierbar), danach Durchsatz-Statistik in .stats
+        """
+        if concurrency is None:
+            concurrency = self.config["performance"]["batch_concurrency"]
+        return QueryBatch(self, queries, concurrency, user_id=user_id, force_mode=force_mode,
+                          speculative=speculative, deadline_ms=deadline_ms)
+    
+    async def _route_query_async(self, query: str, user_id: Optional[str], force_mode: Optional[str],
+                                 speculative: Optional[bool]) -> QueryEngineResult:
+        start_time = time.time()
+        use_unified = self._begin_query(query, user_id, force_mode)
+        
+        cache_key = self._answer_cache_key(use_unified)
+        cached = self._cached_outcome(query, cache_key)
+        if cached:
+            return self._finish_query(query, user_id, start_time, cached, None, None)
+        data_version = self.answer_cache.current_version() if cache_key else None
+        
+        computed, coalesced = await self._coalesce_async(query, use_unified, self._compute_outcome_async,
+                                                         query, use_unified, speculative)
+        return self._finish_computed(query, user_id, start_time, computed, coalesced, cache_key, data_version)
+    
+    async def _compute_outcome_async(self, query: str, use_unified: bool, speculative: Optional[bool]) -> Tuple[
+            Dict[str, Any], Optional[UnifiedResponse], Optional[Dict], Optional[Dict[str, Any]]]:
+        """Async-Variante von _compute_outcome"""
+        unified_response = None
+        legacy_response = None
+        
+        if use_unified:
+            await self._prepare_subsystems("semantic_engine", "unified_system")
+        
+        if use_unified and self._use_speculative(speculative):
+            return await self._race_paths(query, lambda: self._process_legacy_query_async(query))
+        
+        if use_unified:
+            decision = self._routing_decision(query)
+            outcome = None
+            unified_failed = False
+            for path in decision.order:
+                if path == "semantic":
+                    if not self._semantic_candidate(query):
+                        continue
+                    try:
+                        semantic_result = await self._semantic_query_async(query)
+                        outcome = self._semantic_outcome(semantic_result)
+                    except Exception as e:
+                        if self.debug_mode:
+                            print(f"   ⚠️ Semantic Template failed: {e}")
+                
+                elif path == "unified":
+                    try:
+                        unified_response = await self._unified_query_async(query)
+                        outcome = self._unified_outcome(unified_response)
+                    except DeadlineExceeded as e:
+                        outcome = self._deadline_outcome(e)
+                    except Exception as e:
+                        if self.debug_mode:
+                            print(f"   ❌ Unified system error: {e}")
+                        unified_failed = True
+                
+                else:
+                    legacy_response = await self._process_legacy_query_async(query)
+                    outcome = self._legacy_outcome(legacy_response, fallback=unified_failed)
+                
+                if outcome is not None:
+                    break
             
-            answer = legacy_result["answer"]
+            if outcome is None:
+                legacy_response = await self._process_legacy_query_async(query)
+                outcome = self._legacy_outcome(legacy_response, fallback=unified_failed)
+            outcome["routing"] = decision
+        
+        else:
+            legacy_response = await self._process_legacy_query_async(query)
+            outcome = self._legacy_outcome(legacy_response)
+        
+        return outcome, unified_response, legacy_response, None
+    
+    def _routing_decision(self, query: str) -> RoutingDecision:
+        """Pfad-Reihenfolge: gelerntes Modell pro Query-Muster, sonst feste Kaskade"""
+        if self.router is None:
+            return RoutingDecision(pattern=OTHER_PATTERN, order=DEFAULT_ORDER)
+        decision = self.router.route(detect_query_pattern(query, self.semantic_engine))
+        if decision.learned:
+            with self._stats_lock:
+                self.query_stats["adaptive_decisions"] += 1
+                self.query_stats["adaptive_skips"] += len(decision.skipped)
+            if self.debug_mode:
+                print(f"   🧭 Router ({decision.pattern}): {' -> '.join(decision.order)}"
+                      f"{' (übersprungen: ' + ', '.join(decision.skipped) + ')' if decision.skipped else ''}")
+        return decision
+    
+    def _new_deadline(self, deadline_ms: Optional[float]) -> Optional[Deadline]:
+        """Request-Deadline aus Parameter oder performance.max_processing_time_ms (0/None = keine)"""
+        budget_ms = deadline_ms if deadline_ms is not None else self.config["performance"]["max_processing_time_ms"]
+        return Deadline(budget_ms) if budget_ms else None
+    
+    def _deadline_outcome(self, error: DeadlineExceeded) -> Dict[str, Any]:
+        """Antwort, wenn das Budget ohne verwertbares Teilergebnis abläuft"""
+        if self.debug_mode:
+            print(f"   ⏱️ {error}")
+        return {
+            "route": "timeout",
+            "answer": (f"⏱️ Die Anfrage konnte nicht innerhalb von {error.budget_ms:.0f}ms beantwortet werden. "
+                       "Bitte präzisieren Sie die Anfrage oder versuchen Sie es erneut."),
+            "confidence": 0.0,
+            "result_count": 0,
+            "processing_mode": "deadline_exceeded",
+            "engine_version": "deadline",
+            "cost_estimate": 0.0,
+            "error": str(error)
+        }
+    
+    def _route_key(self, use_unified: bool) -> Tuple[str, str]:
+        """(gerouteter Modus, LLM-Modell) - gleiche Query + gleicher Key = gleiche Antwort"""
+        if use_unified:
+            mode = "unified"
+        else:
+            mode = f"legacy_{self.config['legacy_modes']['default_mode'].lower()}"
+        return mode, get_component("config").get_llm_config().get("model", "unknown")
+    
+    def _answer_cache_key(self, use_unified: bool) -> Optional[Tuple[str, str]]:
+        """Key für den Answer Cache - None wenn deaktiviert"""
+        if self.answer_cache is None:
+            return None
+        return self._route_key(use_unified)
+    
+    def _coalesce(self, query: str, use_unified: bool, compute, *args) -> Tuple[Any, bool]:
+        # Streams run alone: a reader abort must not reach coalesced followers
+        if self.inflight is None or current_token_sink() is not None:
+            return compute(*args), False
+        return self.inflight.do((normalize_query(query), *self._route_key(use_unified)), compute, *args)
+    
+    async def _coalesce_async(self, query: str, use_unified: bool, compute, *args) -> Tuple[Any, bool]:
+        if self.inflight is None:
+            return await compute(*args), False
+        return await self.inflight.do_async((normalize_query(query), *self._route_key(use_unified)),
+                                            compute, *args)
+    
+    def _finish_computed(self, query: str, user_id: Optional[str], start_time: float, computed: Tuple,
+                         coalesced: bool, cache_key: Optional[Tuple[str, str]],
+                         data_version: Optional[str] = None) -> QueryEngineResult:
+        """Ergebnis aus einer (ggf. geteilten) Berechnung - Mitläufer verursachen keine Kosten"""
+        outcome, unified_response, legacy_response, details = computed
+        if coalesced:
+            if self.debug_mode:
+                print(f"   🔗 Identische Query lief bereits - Ergebnis geteilt")
+            outcome = {**outcome, "route": "coalesced", "cost_estimate": 0.0}
+            cache_key = None
+        return self._finish_query(query, user_id, start_time, outcome, unified_response, legacy_response,
+                                  details, cache_key, data_version)
+    
+    def _cached_outcome(self, query: str, cache_key: Optional[Tuple[str, str]]) -> Optional[Dict[str, Any]]:
+        """Outcome aus dem Answer Cache (ohne Kosten) oder None"""
+        if cache_key is None:
+            return None
+        cached = self.answer_cache.get(query, *cache_key)
+        if cached is None:
+            return None
+        if self.debug_mode:
+            print(f"   ♻️ Answer Cache Treffer ({cached['processing_mode']})")
+        return {**cached, "route": "cache", "engine_version": "answer_cache", "cost_estimate": 0.0}
+    
+    def _store_answer(self, query: str, cache_key: Optional[Tuple[str, str]], outcome: Dict[str, Any],
+                      data_version: Optional[str] = None):
+        """Nur Antworten über der Qualitätsschwelle werden geteilt (keine Fallbacks/Fehler)"""
+        if cache_key is None or outcome["confidence"] < self.config["performance"]["quality_threshold"]:
+            return
+        self.answer_cache.put(query, *cache_key, {
+            key: outcome[key] for key in ("answer", "confidence", "result_count", "processing_mode")
+        }, data_version=data_version)
+    
+    def _use_speculative(self, speculative: Optional[bool]) -> bool:
+        if speculative is None:
+            return self.config["speculative"]["enabled"]
+        return speculative
+    
+    @staticmethod
+    def _in_event_loop() -> bool:
+        try:
+            asyncio.get_running_loop()
+            return True
+        except RuntimeError:
+            return False
+    
+    async def _race_paths(self, query: str, start_legacy) -> Tuple[Dict[str, Any], Optional[UnifiedResponse],
+                                                                    Optional[Dict], Dict[str, Any]]:
+        """
+        Speculative Mode: Semantic und Unified laufen parallel, Legacy LLM
+        startet nach hedge_delay_ms (oder sofort, wenn beide verfehlt haben).
+        Die erste Antwort über confidence_threshold gewinnt, der Rest wird
+        abgebrochen. Executor-Arbeit läuft im Thread zu Ende, ihr Ergebnis
+        wird verworfen - verschwendete Zeit/Kosten landen in query_stats.
+        
+        Returns:
+            (outcome, unified_response, legacy_response, speculative_details)
+        """
+        settings = self.config["speculative"]
+        threshold = settings["confidence_threshold"]
+        hedge_delay = settings["hedge_delay_ms"] / 1000
+        loop = asyncio.get_running_loop()
+        race_start = loop.time()
+        
+        tasks: Dict[asyncio.Future, str] = {}
+        started: Dict[str, float] = {}
+        finished: Dict[str, Tuple[Dict[str, Any], Any, float]] = {}
+        
+        def launch(route: str, awaitable):
+            started[route] = loop.time()
+            tasks[asyncio.ensure_future(awaitable)] = route
+        
+        if self._semantic_candidate(query):
+            launch("semantic", self._semantic_query_async(query))
+        launch("unified", self._unified_query_async(query))
+        
+        deadline = current_deadline()
+        winner = None
+        try:
+            while winner is None:
+                if deadline is not None and deadline.expired:
+                    break
+                if "legacy" not in started and (not tasks or loop.time() - race_start >= hedge_delay):
+                    if self.debug_mode:
+                        print(f"   🏁 Hedge: starte Legacy nach {round((loop.time() - race_start) * 1000)}ms")
+                    launch("legacy", start_legacy())
+                if not tasks:
+                    break
+                
+                timeout = None if "legacy" in started else max(0.0, race_start + hedge_delay - loop.time())
+                if deadline is not None:
+                    timeout = deadline.remaining() if timeout is None else min(timeout, deadline.remaining())
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                
+                for task in sorted(done, key=lambda t: self.ROUTE_ORDER.index(tasks[t])):
+                    route = tasks.pop(task)
+                    outcome, raw = self._race_outcome(route, task)
+                    if outcome is None:
+                        continue
+                    finished[route] = (outcome, raw, (loop.time() - started[route]) * 1000)
+                    if winner is None and outcome["confidence"] >= threshold:
+                        winner = route
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        if winner is None and finished:
+            # Nobody reached the threshold (or the deadline hit) - best answer so far wins
+            winner = max(finished, key=lambda route: finished[route][0]["confidence"])
+        elif winner is None:
+            winner = "timeout"
+            finished[winner] = (self._deadline_outcome(DeadlineExceeded("speculative", deadline.budget_ms if deadline else 0)),
+                                None, 0.0)
+        
+        # Wasted work: finished losers plus cancelled in-flight paths
+        now = loop.time()
+        wasted_cost = 0.0
+        wasted_time_ms = 0.0
+        for route, (outcome, _, elapsed_ms) in finished.items():
+            if route not in (winner, "timeout"):
+                wasted_cost += outcome["cost_estimate"]
+                wasted_time_ms += elapsed_ms
+        cancelled = list(tasks.values())
+        for route in cancelled:
+            if route == "legacy":
+                wasted_cost += self._estimate_legacy_cost(query, self.config["legacy_modes"]["default_mode"])
+            else:
+                wasted_cost += self.INFLIGHT_COST_ESTIMATES[route]
+            wasted_time_ms += (now - started[route]) * 1000
+        
+        hedged = "legacy" in started
+        with self._stats_lock:
+            self.query_stats["speculative_queries"] += 1
+            self.query_stats["hedges_fired"] += int(hedged)
+            self.query_stats["hedge_wins"] += int(winner == "legacy")
+            self.query_stats["wasted_cost"] += wasted_cost
+            self.query_stats["wasted_time_ms"] += wasted_time_ms
+        
+        details = {
+            "winner": winner,
+            "launched": [route for route in self.ROUTE_ORDER if route in started],
+            "cancelled": cancelled,
+            "hedged": hedged,
+            "hedge_delay_ms": settings["hedge_delay_ms"],
+            "wasted_cost": round(wasted_cost, 4),
+            "wasted_time_ms": round(wasted_time_ms, 2)
+        }
+        
+        if self.debug_mode:
+            print(f"   🏆 Speculative winner: {winner} (abgebrochen: {cancelled or '-'}, "
+                  f"verschwendet: {details['wasted_time_ms']}ms / ${wasted_cost:.4f})")
+        
+        outcome, raw, _ = finished[winner]
+        return (outcome,
+                raw if winner == "unified" else None,
+                raw if winner == "legacy" else None,
+                details)
+    
+    def _race_outcome(self, route: str, task: asyncio.Future) -> Tuple[Optional[Dict[str, Any]], Any]:
+        """Outcome eines beendeten Speculative-Pfads (None bei Fehler/Fehlschlag)"""
+        try:
+            raw = task.result()
+        except Exception as e:
+            if self.debug_mode:
+                print(f"   ⚠️ Speculative path {route} failed: {e}")
+            return None, None
+        if route == "semantic":
+            return self._semantic_outcome(raw), raw
+        if route == "unified":
+            return self._unified_outcome(raw), raw
+        return self._legacy_outcome(raw), raw
+    
+    def _begin_query(self, query: str, user_id: Optional[str], force_mode: Optional[str]) -> bool:
+        """Logging und Routing-Entscheidung (True = Unified System)"""
+        if self.debug_mode:
+            print(f"\n🔍 Query Engine: '{query}'")
+            if user_id:
+                print(f"   👤 User: {user_id}")
+        
+        # Always log the query start
+        print(f"[WincasaQueryEngine] Processing query: '{query[:50]}...' for user: {user_id}")
+        
+        # Determine processing mode
+        return force_mode == "unified" or (
+            force_mode != "legacy" and 
+            self._should_use_unified(user_id)
+        )
+    
+    def _semantic_candidate(self, query: str) -> bool:
+        """Semantic Template Engine (Mode 6) zuständig?"""
+        if not self.semantic_engine:
+            return False
+        can_handle, semantic_confidence = self.semantic_engine.can_handle_query(query)
+        return can_handle and semantic_confidence > 0.7
+    
+    async def _unified_query_async(self, query: str) -> UnifiedResponse:
+        """
+        Unified System im IO-Pool (Intent-Erkennung, Suche mit LLM-Antwort)
+        
+        Nur das Template-SQL läuft auf dem DB-Thread (call_db in der Template
+        Engine) - LLM-Wartezeit blockiert so keine Firebird-Arbeit.
+        """
+        async with llm_slot():
+            return await run_io(self.unified_system.process_query, query)
+    
+    async def _semantic_query_async(self, query: str):
+        """Semantic Engine (Intent-Erkennung per LLM) im IO-Pool"""
+        async with llm_slot():
+            return await run_io(self.semantic_engine.process_query, query)
+    
+    def _semantic_outcome(self, semantic_result) -> Optional[Dict[str, Any]]:
+        """Ergebnis der Semantic Template Engine (None = nicht erfolgreich)"""
+        if not semantic_result.success:
+            return None
+        
+        if self.debug_mode:
+            print(f"   ✅ Semantic Template successful: {semantic_result.pattern.pattern_id}")
+        
+        return {
+            "route": "semantic",
+            "answer": semantic_result.answer,
+            "confidence": semantic_result.confidence,
+            "result_count": semantic_result.result_count,
+            "processing_mode": "semantic_template",
+            "engine_version": "unified_v2_mode6",
+            "cost_estimate": 0.01  # Lightweight LLM cost for intent extraction
+        }
+    
+    def _unified_outcome(self, unified_response: UnifiedResponse) -> Dict[str, Any]:
+        """Ergebnis des Unified Template Systems"""
+        return {
+            "route": "unified",
+            "answer": unified_response.final_answer,
+            "confidence": unified_response.confidence,
+            "result_count": unified_response.result_count,
+            "processing_mode": unified_response.processing_path,
+            "engine_version": "unified_v2",
+            "cost_estimate": self._estimate_unified_cost(unified_response)
+        }
+    
+    def _legacy_outcome(self, legacy_result: Dict[str, Any], fallback: bool = False) -> Dict[str, Any]:
+        """Ergebnis des Legacy Systems (direkt oder als Fallback)"""
+        if isinstance(legacy_result.get("deadline_error"), DeadlineExceeded):
+            return self._deadline_outcome(legacy_result["deadline_error"])
+        if fallback:
+            confidence = 0.3  # Low confidence due to fallback
+            processing_mode = "legacy_fallback"
+        else:
             confidence = 0.7 if legacy_result["success"] else 0.2
-            result_count = legacy_result["result_count"]
             processing_mode = f"legacy_{legacy_result['mode'].lower()}"
-            engine_version = "legacy_v1"
-            cost_estimate = legacy_result["cost_estimate"]
-            
-            self.query_stats["legacy_queries"] += 1
-        
-        # Performance tracking
-        if use_unified and unified_response:
-            self.performance_history.append({
-                "timestamp": datetime.now(),
-                "processing_time_ms": unified_response.processing_time_ms,
-                "result_count": result_count,
-                "confidence": confidence
-            })
+        return {
+            "route": "legacy",
+            "answer": legacy_result["answer"],
+            "confidence": confidence,
+            "result_count": legacy_result["result_count"],
+            "processing_mode": processing_mode,
+            "engine_version": "legacy_v1",
+            "cost_estimate": legacy_result["cost_estimate"]
+        }
+    
+    def _finish_query(self, query: str, user_id: Optional[str], start_time: float,
+                      outcome: Dict[str, Any], unified_response: Optional[UnifiedResponse],
+                      legacy_response: Optional[Dict],
+                      speculative_details: Optional[Dict[str, Any]] = None,
+                      cache_key: Optional[Tuple[str, str]] = None,
+                      data_version: Optional[str] = None) -> QueryEngineResult:
+        """Statistiken, Performance-Tracking, Answer Cache und Ergebnisobjekt"""
+        self._store_answer(query, cache_key, outcome, data_version)
+
+        result_count = outcome["result_count"]
+        confidence = outcome["confidence"]
+        cost_estimate = outcome["cost_estimate"]
         
         # Final processing
         total_processing_time = round((time.time() - start_time) * 1000, 2)
-        self.query_stats["total_queries"] += 1
         
-        # Update running averages
-        total_queries = self.query_stats["total_queries"]
-        self.query_stats["avg_processing_time"] = (
-            (self.query_stats["avg_processing_time"] * (total_queries - 1) + total_processing_time) / total_queries
-        )
-        self.query_stats["avg_cost_per_query"] = (
-            (self.query_stats["avg_cost_per_query"] * (total_queries - 1) + cost_estimate) / total_queries
-        )
+        # Performance tracking
+        self.histograms.record(outcome["processing_mode"], outcome["engine_version"],
+                               total_processing_time, cost_estimate, result_count, confidence)
+        with self._stats_lock:
+            self.query_stats[f"{outcome['route']}_queries"] += 1
+            self.query_stats["total_queries"] += 1
+            
+            # Update running averages (count and averages change together)
+            total_queries = self.query_stats["total_queries"]
+            self.query_stats["avg_processing_time"] = (
+                (self.query_stats["avg_processing_time"] * (total_queries - 1) + total_processing_time) / total_queries
+            )
+            self.query_stats["avg_cost_per_query"] = (
+                (self.query_stats["avg_cost_per_query"] * (total_queries - 1) + cost_estimate) / total_queries
+            )
         
         if self.debug_mode:
-            print(f"   🎯 Mode: {processing_mode}")
+            print(f"   🎯 Mode: {outcome['processing_mode']}")
             print(f"   📊 Results: {result_count}")
             print(f"   ⏱️  Time: {total_processing_time}ms")
             print(f"   💰 Cost: ${cost_estimate:.4f}")
@@ -401,9 +1105,9 @@ class WincasaQueryEngine:
         return QueryEngineResult(
             query=query,
             user_id=user_id,
-            processing_mode=processing_mode,
-            engine_version=engine_version,
-            answer=answer,
+            processing_mode=outcome["processing_mode"],
+            engine_version=outcome["engine_version"],
+            answer=outcome["answer"],
             confidence=confidence,
             result_count=result_count,
             processing_time_ms=total_processing_time,
@@ -412,50 +1116,55 @@ class WincasaQueryEngine:
             legacy_response=legacy_response,
             timestamp=datetime.now(),
             feature_flags=self.config["feature_flags"].copy(),
-            error_details=None
+            error_details=outcome.get("error"),
+            speculative_details=speculative_details,
+            routing_decision=outcome["routing"].to_dict() if outcome.get("routing") else None,
+            route=outcome["route"]
         )
     
-    def get_performance_analysis(self) -> Dict[str, Any]:
-        """Analysiert Performance History"""
-        if not self.performance_history:
-            return {"error": "No performance data available"}
-        
-        history = self.performance_history
-        
-        # Performance Analysis
-        response_times = [h["processing_time_ms"] for h in history]
-        avg_response_time = sum(response_times) / len(response_times)
+    def get_performance_analysis(self, window: str = "all") -> Dict[str, Any]:
+        """
+        Analysiert Latenz-, Kosten- und Ergebnis-Verteilungen
         
-        # Success analysis
-        successful_queries = sum(1 for h in history if h["result_count"] > 0)
-        success_rate = successful_queries / len(history)
+        Args:
+            window: Zeitfenster ('1m', '5m', '15m', '1h', 'all')
+        """
+        snapshot = self.histograms.snapshot(window)
+        latency = snapshot["overall"]["latency_ms"]
+        if not latency["count"]:
+            return {"error": "No performance data available"}
         
-        # Confidence analysis
-        confidences = [h["confidence"] for h in history]
-        avg_confidence = sum(confidences) / len(confidences)
+        quality = self.histograms.quality()
         
         return {
-            "total_queries": len(history),
+            "window": window,
+            "total_queries": latency["count"],
             "performance": {
-                "avg_response_time_ms": round(avg_response_time, 2),
-                "min_response_time_ms": round(min(response_times), 2),
-                "max_response_time_ms": round(max(response_times), 2)
+                "avg_response_time_ms": latency["mean"],
+                "min_response_time_ms": latency["min"],
+                "max_response_time_ms": latency["max"],
+                "p50_response_time_ms": latency["p50"],
+                "p95_response_time_ms": latency["p95"],
+                "p99_response_time_ms": latency["p99"]
             },
+            "cost": snapshot["overall"]["cost_usd"],
+            "result_count": snapshot["overall"]["result_count"],
             "quality": {
-                "success_rate": round(success_rate, 3),
-                "avg_confidence": round(avg_confidence, 3)
+                "success_rate": round(quality["success_rate"], 3),
+                "avg_confidence": round(quality["avg_confidence"], 3)
             },
-            "recommendation": self._get_performance_recommendation(avg_response_time, success_rate)
+            "by_path": snapshot["paths"],
+            "recommendation": self._get_performance_recommendation(latency["p95"], quality["success_rate"])
         }
     
-    def _get_performance_recommendation(self, avg_response_time: float, success_rate: float) -> str:
-        """Gibt Performance-Empfehlung basierend auf aktuellen Daten"""
+    def _get_performance_recommendation(self, p95_response_time: float, success_rate: float) -> str:
+        """Gibt Performance-Empfehlung basierend auf aktuellen Daten (Ziel: p95 < 200ms)"""
         
-        if avg_response_time < 200 and success_rate > 0.9:
+        if p95_response_time < 200 and success_rate > 0.9:
             return "🚀 EXCELLENT: System performing optimally"
-        elif avg_response_time < 500 and success_rate > 0.8:
+        elif p95_response_time < 500 and success_rate > 0.8:
             return "✅ GOOD: Performance within acceptable range"
-        elif avg_response_time < 1000 and success_rate > 0.7:
+        elif p95_response_time < 1000 and success_rate > 0.7:
             return "🤔 MODERATE: Consider optimization"
         else:
             return "❌ POOR: Optimization required"
@@ -463,30 +1172,67 @@ class WincasaQueryEngine:
     def get_system_stats(self) -> Dict[str, Any]:
         """Umfassende System-Statistiken"""
         
+        # Consistent copy - other threads keep counting
+        with self._stats_lock:
+            query_stats = dict(self.query_stats)
+        
         # Route distribution
-        total = self.query_stats["total_queries"]
+        total = query_stats["total_queries"]
         if total > 0:
-            unified_pct = (self.query_stats["unified_queries"] / total) * 100
-            legacy_pct = (self.query_stats["legacy_queries"] / total) * 100
+            unified_pct = (query_stats["unified_queries"] / total) * 100
+            legacy_pct = (query_stats["legacy_queries"] / total) * 100
         else:
             unified_pct = legacy_pct = 0
         
         return {
-            "query_statistics": self.query_stats,
+            "query_statistics": query_stats,
             "route_distribution": {
                 "unified_percentage": round(unified_pct, 1),
                 "legacy_percentage": round(legacy_pct, 1)
             },
+            "speculative": self._get_speculative_stats(query_stats),
+            "answer_cache": self.answer_cache.get_stats() if self.answer_cache else {"enabled": False},
+            "coalescing": self.inflight.get_stats() if self.inflight else {"enabled": False},
+            "adaptive_routing": self.router.get_stats() if self.router else {"enabled": False},
+            # Pool metrics only once an LLM consumer created the shared client
+            "llm_client_pool": (get_registry().get("llm_client_pool").get_stats()
+                                if get_registry().is_built("llm_client_pool") else {"ready": False}),
+            "latency_histograms": {
+                window: self.histograms.snapshot(window) for window in WINDOWS
+            },
             "configuration": {
                 "rollout_percentage": self.config["rollout"]["unified_percentage"],
-                "feature_flags": self.config["feature_flags"]
+                "feature_flags": self.config["feature_flags"],
+                "speculative": self.config["speculative"]
             },
+            "subsystems": self.get_subsystem_status(),
+            # Stats only for built subsystems - reading them must not trigger a build
             "subsystem_stats": {
-                "unified_system": self.unified_system.get_system_stats(),
-                "search_system": self.search_system.get_stats()
+                "unified_system": (self.unified_system.get_system_stats()
+                                   if "unified_system" in self._subsystems else {"ready": False}),
+                "search_system": (self.search_system.get_stats()
+                                  if "search_system" in self._subsystems else {"ready": False})
             }
         }
     
+    def _get_speculative_stats(self, query_stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Kennzahlen zum Tunen von hedge_delay_ms"""
+        if query_stats is None:
+            with self._stats_lock:
+                query_stats = dict(self.query_stats)
+        speculative = query_stats["speculative_queries"]
+        if speculative == 0:
+            return {"queries": 0}
+        hedges = query_stats["hedges_fired"]
+        return {
+            "queries": speculative,
+            "hedge_rate": round(hedges / speculative, 3),
+            # Low win rate = hedge fires too early, LLM work is mostly wasted
+            "hedge_win_rate": round(query_stats["hedge_wins"] / hedges, 3) if hedges else 0.0,
+            "avg_wasted_cost": round(query_stats["wasted_cost"] / speculative, 4),
+            "avg_wasted_time_ms": round(query_stats["wasted_time_ms"] / speculative, 2)
+        }
+    
     def update_rollout_percentage(self, new_percentage: int):
         """Aktualisiert Rollout-Prozentsatz für Feature Flag"""
         if 0 <= new_percentage <= 100:
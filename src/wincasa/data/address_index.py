@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+WINCASA Address Index
+Strukturierter Adress-Index: (Straße, Hausnummer, PLZ) -> Datensätze per Dict-Lookup
+"""
+
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from wincasa.data.layer4_search_index import fold_text
+
+# 'str', 'str.', 'strasse', 'straße' -> 'strasse' (Leerzeichen davor bleiben erhalten)
+_STREET_SUFFIX_PATTERN = re.compile(r'str(?:asse|\.|\b)')
+# Hausnummer nur durch Leerzeichen getrennt; Bereiche/Listen ('11-15', '14+16') bleiben vollständig
+_ADDRESS_PATTERN = re.compile(r'^\s*(?P<street>[^\d,]*?[^\W\d_][^\d,]*?)'
+                              r'(?:\s+(?P<number>\d+(?:\s?[a-z](?![a-z]))?(?:\s*[-+/&]\s*[^,]+)?)\s*(?:,|$)'
+                              r'|\s*,|\s*$)')
+_HOUSE_NUMBER_PATTERN = re.compile(r'\d+(?:\s?[a-z](?![a-z]))?')
+_POSTAL_CODE_PATTERN = re.compile(r'\b\d{5}\b')
+_WORD_PATTERN = re.compile(r'[^\W\d_][\w.-]*|\d+(?:\s?[a-z](?![a-z]))?')
+
+# Maximale Anzahl Wörter eines Straßennamens bei der Freitext-Erkennung
+MAX_STREET_WORDS = 4
+
+
+def normalize_street(street: str) -> str:
+    """
+    Kanonischer Schlüssel eines Straßennamens
+
+    'Aachener Str.', 'Aachener Straße' und 'aachener strasse' ergeben alle
+    'aachener strasse'. Wortgrenzen bleiben erhalten wie beim früheren
+    Zeilen-Vergleich: 'Burgunderstr.' und 'Burgunder Str.' sind verschiedene Straßen.
+    """
+    normalized = _STREET_SUFFIX_PATTERN.sub('strasse', fold_text(street))
+    return re.sub(r'\s+', ' ', normalized).strip().rstrip('.,;:').strip()
+
+
+def normalize_house_number(house_number: str) -> str:
+    """'12A ' -> '12a', '11 - 15' -> '11 - 15' (Leerzeichen nur zusammengefasst)"""
+    return re.sub(r'\s+', ' ', str(house_number).lower()).strip()
+
+
+def split_address(address: str) -> Tuple[str, Optional[str]]:
+    """
+    Zerlegt eine Adresse in (Straßen-Schlüssel, Hausnummer)
+
+    Zusätze nach Komma ('44, 2. OG rechts') werden ignoriert, ohne Hausnummer
+    ist der zweite Wert None. Adressen ohne abgetrennte Hausnummer
+    ('Moltkestr.120') sind als Ganzes der Straßen-Schlüssel.
+    """
+    folded = fold_text(address or "")
+    match = _ADDRESS_PATTERN.match(folded)
+    if not match:
+        return normalize_street(folded), None
+    number = match.group('number')
+    return normalize_street(match.group('street')), normalize_house_number(number) if number else None
+
+
+class AddressIndex:
+    """
+    Adress-Index über beliebige Datensätze
+
+    Straßen werden einmal beim Laden normalisiert; Suchen sind Dict-Lookups
+    auf (Straße, Hausnummer), PLZ/Ort filtern nur noch die wenigen Treffer.
+    """
+
+    def __init__(self):
+        # street_key -> house_number (None = ohne Nummer) -> [(postal_city, record)]
+        self._entries: Dict[str, Dict[Optional[str], List[Tuple[str, Any]]]] = defaultdict(dict)
+        self._size = 0
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], street_field: str,
+                  postal_city_field: Optional[str] = None) -> "AddressIndex":
+        """Baut den Index über Export-Zeilen (Datensatz = Zeile)"""
+        index = cls()
+        for row in rows:
+            street = row.get(street_field)
+            if street:
+                index.add(str(street), row, row.get(postal_city_field) if postal_city_field else None)
+        return index
+
+    def add(self, address: str, record: Any, postal_city: Optional[str] = None):
+        """Nimmt einen Datensatz unter seiner Adresse auf"""
+        street_key, house_number = split_address(address)
+        if not street_key:
+            return
+        if postal_city is None:
+            postal_city = ""
+        self._entries[street_key].setdefault(house_number, []).append((fold_text(str(postal_city)), record))
+        self._size += 1
+
+    def lookup(self, street: str, house_number: Optional[str] = None,
+               postal_code: Optional[str] = None, city: Optional[str] = None) -> List[Any]:
+        """
+        Datensätze zu einer Adresse
+
+        Args:
+            street: Straße, optional inklusive Hausnummer ('Aachener Str. 71')
+            house_number: Hausnummer, falls nicht in street enthalten
+            postal_code: Optional PLZ-Filter
+            city: Optional Orts-Filter
+
+        Ohne Hausnummer werden alle Nummern der Straße geliefert, mit
+        Hausnummer nur exakt diese.
+        """
+        street_key, parsed_number = split_address(street)
+        if house_number is not None:
+            house_number = normalize_house_number(house_number)
+        else:
+            house_number = parsed_number
+
+        numbers = self._entries.get(street_key)
+        if not numbers:
+            return []
+        if house_number is not None:
+            candidates = numbers.get(house_number, [])
+        else:
+            candidates = [entry for entries in numbers.values() for entry in entries]
+
+        postal_code = str(postal_code) if postal_code else None
+        city = fold_text(city) if city else None
+        return [record for postal_city, record in candidates
+                if (not postal_code or postal_code in postal_city)
+                and (not city or city in postal_city)]
+
+    def find_in_text(self, text: str) -> List[Any]:
+        """
+        Erkennt Adressen in Freitext ('Wer wohnt in der Aachener Str. 71?')
+
+        Vor jeder Hausnummer werden die letzten 1..MAX_STREET_WORDS Wörter als
+        Straßen-Schlüssel probiert - jeder Versuch ist ein Dict-Lookup.
+        PLZ im Text schränken die Treffer ein.
+        """
+        folded = fold_text(text or "")
+        words = _WORD_PATTERN.findall(folded)
+        postal_codes = set(_POSTAL_CODE_PATTERN.findall(folded))
+
+        records = []
+        seen = set()
+        for position, word in enumerate(words):
+            if not _HOUSE_NUMBER_PATTERN.fullmatch(word) or word in postal_codes:
+                continue
+            house_number = normalize_house_number(word)
+            for length in range(min(MAX_STREET_WORDS, position), 0, -1):
+                numbers = self._entries.get(normalize_street(" ".join(words[position - length:position])))
+                if numbers and house_number in numbers:
+                    for postal_city, record in numbers[house_number]:
+                        if postal_codes and not any(code in postal_city for code in postal_codes):
+                            continue
+                        if id(record) not in seen:
+                            seen.add(id(record))
+                            records.append(record)
+                    break
+        return records
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, street: str) -> bool:
+        return split_address(street)[0] in self._entries
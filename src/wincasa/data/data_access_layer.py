@@ -13,11 +13,18 @@ Architecture Decision: Option A - Standardize Data Access Layer
 """
 
 import logging
+import threading
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from wincasa.data.address_index import AddressIndex
 
 logger = logging.getLogger(__name__)
 
+# Address indices shared by all instances: (dir, export, fields) -> ((size, mtime_ns), index)
+_address_indices: Dict[Tuple[str, str, str, str], Tuple[Tuple[int, int], AddressIndex]] = {}
+_address_indices_lock = threading.Lock()
+
 class WincasaDataAccess:
     """
     Unified data access interface for WINCASA system.
@@ -79,16 +86,17 @@ class WincasaDataAccess:
         'ETEL1': 'owner_phone',
     }
     
-    def __init__(self, source: str = "auto"):
+    def __init__(self, source: str = "auto", json_loader=None):
         """
         Initialize data access layer.
         
         Args:
             source: Data source type ("sql", "json", or "auto")
+            json_loader: Shared Layer4JSONLoader (optional, built on first use otherwise)
         """
         self.source = source.lower()
         self._sql_tools = None
-        self._json_loader = None
+        self._json_loader = json_loader
         
     def _get_sql_tools(self):
         """Lazy load SQL tools to avoid circular imports"""
@@ -100,7 +108,7 @@ class WincasaDataAccess:
     def _get_json_loader(self):
         """Lazy load JSON loader to avoid circular imports"""
         if self._json_loader is None:
-            from layer4_json_loader import Layer4JSONLoader
+            from wincasa.data.layer4_json_loader import Layer4JSONLoader
             self._json_loader = Layer4JSONLoader()
         return self._json_loader
     
@@ -177,64 +185,11 @@ class WincasaDataAccess:
     def _search_owners_json(self, street: str, postal_code: str = None,
                           city: str = None) -> Dict[str, Any]:
         """Execute JSON-based owner search"""
-        loader = self._get_json_loader()
-        
-        # Load owner data from JSON export
-        data = loader.load_json_data('01_eigentuemer')
-        if not data:
+        index = self._get_address_index('01_eigentuemer', 'ESTR', 'EPLZORT')
+        if index is None:
             return {'success': False, 'data': [], 'message': 'Owner JSON data not available'}
         
-        # Parse street and house number
-        import re
-        street_parts = re.match(r'^(.+?)\s+(\d+\w*)$', street.strip())
-        if street_parts:
-            search_street_name = street_parts.group(1).lower()
-            search_house_num = street_parts.group(2).lower()
-        else:
-            # No house number found, use whole string
-            search_street_name = street.lower()
-            search_house_num = None
-        
-        # Filter by address
-        filtered_owners = []
-        
-        for owner in data.get('data', []):
-            # Check different address fields for owners
-            owner_street_full = str(owner.get('ESTR', '')).lower()
-            
-            # Parse owner address
-            owner_parts = re.match(r'^(.+?)\s+(\d+\w*)$', owner_street_full.strip())
-            if owner_parts:
-                owner_street_name = owner_parts.group(1).lower()
-                owner_house_num = owner_parts.group(2).lower()
-            else:
-                owner_street_name = owner_street_full
-                owner_house_num = None
-            
-            # Check street name match
-            street_name_match = (
-                self._normalize_street_name(search_street_name) == 
-                self._normalize_street_name(owner_street_name)
-            )
-            
-            if not street_name_match:
-                continue
-                
-            # Check house number match if provided
-            if search_house_num and owner_house_num:
-                if search_house_num != owner_house_num:
-                    continue
-            elif search_house_num and not owner_house_num:
-                # We're looking for a specific number but owner has none
-                continue
-            
-            # Additional filters
-            if postal_code and str(postal_code) not in str(owner.get('EPLZORT', '')):
-                continue
-            if city and city.lower() not in str(owner.get('EPLZORT', '')).lower():
-                continue
-                
-            filtered_owners.append(owner)
+        filtered_owners = index.lookup(street, postal_code=postal_code, city=city)
         
         return {
             'success': True,
@@ -252,63 +207,11 @@ class WincasaDataAccess:
     def _search_tenants_json(self, street: str, postal_code: str = None,
                            city: str = None) -> Dict[str, Any]:
         """Execute JSON-based tenant search"""
-        loader = self._get_json_loader()
-        
-        # Load tenant data from JSON export
-        data = loader.load_json_data('03_aktuelle_mieter')
-        if not data:
+        index = self._get_address_index('03_aktuelle_mieter', 'STRASSE', 'PLZ_ORT')
+        if index is None:
             return {'success': False, 'data': [], 'message': 'JSON data not available'}
         
-        # Parse street and house number
-        import re
-        street_parts = re.match(r'^(.+?)\s+(\d+\w*)$', street.strip())
-        if street_parts:
-            search_street_name = street_parts.group(1).lower()
-            search_house_num = street_parts.group(2).lower()
-        else:
-            # No house number found, use whole string
-            search_street_name = street.lower()
-            search_house_num = None
-        
-        # Filter by address
-        filtered_tenants = []
-        
-        for tenant in data.get('data', []):
-            tenant_street_full = str(tenant.get('STRASSE', '')).lower()
-            
-            # Parse tenant address
-            tenant_parts = re.match(r'^(.+?)\s+(\d+\w*)$', tenant_street_full.strip())
-            if tenant_parts:
-                tenant_street_name = tenant_parts.group(1).lower()
-                tenant_house_num = tenant_parts.group(2).lower()
-            else:
-                tenant_street_name = tenant_street_full
-                tenant_house_num = None
-            
-            # Check street name match
-            street_name_match = (
-                self._normalize_street_name(search_street_name) == 
-                self._normalize_street_name(tenant_street_name)
-            )
-            
-            if not street_name_match:
-                continue
-                
-            # Check house number match if provided
-            if search_house_num and tenant_house_num:
-                if search_house_num != tenant_house_num:
-                    continue
-            elif search_house_num and not tenant_house_num:
-                # We're looking for a specific number but tenant has none
-                continue
-            
-            # Additional filters
-            if postal_code and str(postal_code) not in str(tenant.get('PLZ_ORT', '')):
-                continue
-            if city and city.lower() not in str(tenant.get('PLZ_ORT', '')).lower():
-                continue
-                
-            filtered_tenants.append(tenant)
+        filtered_tenants = index.lookup(street, postal_code=postal_code, city=city)
         
         return {
             'success': True,
@@ -317,16 +220,41 @@ class WincasaDataAccess:
             'source': 'json'
         }
     
-    def _normalize_street_name(self, street: str) -> str:
-        """Normalize street names for better matching"""
-        normalized = street.lower().strip()
-        # Handle common abbreviations
-        normalized = normalized.replace('str.', 'straße')
-        normalized = normalized.replace('str ', 'straße ')
-        normalized = normalized.replace('strasse', 'straße')
-        # Remove trailing punctuation
-        normalized = normalized.rstrip('.,;:')
-        return normalized
+    def _get_address_index(self, query_name: str, street_field: str,
+                           postal_city_field: str) -> Optional[AddressIndex]:
+        """
+        Address index over one JSON export, shared by all instances.
+        
+        Street names are normalized at build time (str./straße/strasse), so
+        address searches are dictionary lookups instead of per-row regex scans.
+        The index is rebuilt when the export's size/mtime changes, like the
+        Layer 4 search index.
+        """
+        loader = self._get_json_loader()
+        try:
+            stat = (loader.json_dir / f"{query_name}.json").stat()
+        except FileNotFoundError:
+            return None
+        signature = (stat.st_size, stat.st_mtime_ns)
+        key = (str(loader.json_dir), query_name, street_field, postal_city_field)
+        
+        cached = _address_indices.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        
+        with _address_indices_lock:
+            cached = _address_indices.get(key)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+            if cached is not None:
+                # Re-exported - the loader's cached copy is stale as well
+                loader.data_cache.pop(query_name, None)
+            data = loader.load_json_data(query_name)
+            if not data:
+                return None
+            index = AddressIndex.from_rows(data.get('data', []), street_field, postal_city_field)
+            _address_indices[key] = (signature, index)
+            return index
     
     def _normalize_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -413,6 +341,6 @@ class WincasaDataAccess:
 
 
 # Convenience function for easy integration
-def get_data_access(source: str = "auto") -> WincasaDataAccess:
+def get_data_access(source: str = "auto", json_loader=None) -> WincasaDataAccess:
     """Get configured data access instance"""
-    return WincasaDataAccess(source=source)
\ No newline at end of file
+    return WincasaDataAccess(source=source, json_loader=json_loader)
\ No newline at end of file
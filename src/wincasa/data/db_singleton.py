@@ -8,6 +8,7 @@ import threading
 import logging
 from typing import Optional
 import firebird.driver
+from wincasa.core.deadline import current_deadline, raise_if_deadline_caused
 from wincasa.utils.config_loader import WincasaConfig
 
 logger = logging.getLogger(__name__)
@@ -15,14 +16,15 @@ logger = logging.getLogger(__name__)
 # Global singleton instance
 _db_connection: Optional[firebird.driver.Connection] = None
 _db_lock = threading.Lock()
-_config = WincasaConfig()
+# Created with the first connection, not at import
+_config: Optional[WincasaConfig] = None
 
 def get_db_connection() -> firebird.driver.Connection:
     """
     Returns a thread-safe, globally unique Firebird database connection.
     This solves the embedded Firebird limitation of one connection per process.
     """
-    global _db_connection
+    global _db_connection, _config
     
     # Double-checked locking for performance
     if _db_connection is None or _db_connection.closed:
@@ -31,6 +33,8 @@ def get_db_connection() -> firebird.driver.Connection:
                 logger.info("🔌 Creating SINGLETON Firebird database connection...")
                 
                 try:
+                    if _config is None:
+                        _config = WincasaConfig()
                     db_config = _config.get_db_config()
                     
                     _db_connection = firebird.driver.connect(
@@ -62,6 +66,46 @@ def close_db_connection():
                 logger.error(f"Error closing database connection: {e}")
         _db_connection = None
 
+def execute_on_cursor(cursor, query: str, params=None):
+    """
+    Execute a query on a cursor within the current request deadline.
+    The remaining budget becomes the Firebird statement timeout (Firebird 4+).
+    
+    Returns the prepared statement (None without deadline); the caller
+    releases it with free_statement() once the rows are fetched.
+    """
+    statement = None
+    deadline = current_deadline()
+    if deadline is not None:
+        timeout_ms = max(1, int(deadline.timeout("sql") * 1000))
+        statement = cursor.prepare(query)
+        try:
+            # Statement._timeout is the setter name in firebird-driver 2.0.3. Statement
+            # timeouts need a Firebird 4+ server - older ones raise NotSupportedError,
+            # which is only logged: the query then runs without server-side timeout.
+            statement._timeout = timeout_ms
+        except Exception as e:
+            logger.debug(f"Statement timeout not available: {e}")
+    
+    try:
+        if params:
+            cursor.execute(statement or query, params)
+        else:
+            cursor.execute(statement or query)
+    except BaseException:
+        free_statement(statement)
+        raise
+    return statement
+
+def free_statement(statement):
+    """Release a statement prepared by execute_on_cursor (cursors do not free it)"""
+    if statement is None:
+        return
+    try:
+        statement.free()
+    except Exception as e:
+        logger.debug(f"Freeing prepared statement failed: {e}")
+
 def execute_query(query: str, params: dict = None) -> list:
     """
     Execute a query using the singleton connection.
@@ -72,12 +116,11 @@ def execute_query(query: str, params: dict = None) -> list:
     try:
         cursor = conn.cursor()
         
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-        
-        results = cursor.fetchall()
+        statement = execute_on_cursor(cursor, query, params)
+        try:
+            results = cursor.fetchall()
+        finally:
+            free_statement(statement)
         cursor.close()
         
         # Commit if it was a write operation
@@ -93,4 +136,5 @@ def execute_query(query: str, params: dict = None) -> list:
             conn.rollback()
         except:
             pass
+        raise_if_deadline_caused("sql", e)
         raise
\ No newline at end of file
@@ -10,8 +10,56 @@ import os
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+from wincasa.data.layer4_search_index import get_layer4_search_index
+
 logger = logging.getLogger(__name__)
 
+# Query-Kategorien basierend auf Layer 4
+QUERY_CATEGORIES = {
+    'stammdaten': {
+        '01_eigentuemer': 'Eigentümer mit Banking & Portfolio',
+        '03_aktuelle_mieter': 'Aktuelle Mieterbeziehungen',
+        '04_alle_mieter': 'Historische Mieterdaten',
+        '05_objekte': 'Immobilienportfolio',
+        '07_wohnungen': 'Wohnungsdetails mit Belegung'
+    },
+    'finanzen': {
+        '09_konten': 'Kontenplan mit Salden',
+        '10_eigentuemer_konten': 'Eigentümerkonten-Details',
+        '11_mieter_konten': 'Mieterkonten-Tracking',
+        '12_bank_konten': 'Bankverbindungen',
+        '26_detaillierte_buchungen': 'Komplette Transaktionshistorie',
+        '27_konten_saldenliste': 'Kontensaldenliste',
+        '28_nebenkostenkonten_matrix': 'Nebenkosten-Aufschlüsselung'
+    },
+    'governance': {
+        '13_weg_eigentuemer': 'WEG-Eigentümerstruktur',
+        '14_eigentuemer_op': 'Offene Posten Eigentümer',
+        '16_beiraete': 'Beiratsverwaltung',
+        '17_beschluesse': 'Beschlussverfolgung',
+        '18_versammlungen': 'Versammlungsverwaltung',
+        '19_etv_presence': 'Versammlungspräsenz'
+    },
+    'analysen': {
+        '20_monatliche_mieteinnahmen': 'Monatliche Mieteinnahmen',
+        '21_forderungsalterung': 'Forderungsalterung',
+        '22_leerstandsanalyse': 'Leerstandsanalyse',
+        '23_instandhaltungskosten': 'Instandhaltungskosten',
+        '24_ruecklagenanalyse': 'Rücklagenanalyse',
+        '25_objektbezogene_sachkonten': 'Objektbezogene GL-Konten'
+    },
+    'spezial': {
+        '29_eigentuemer_zahlungshistorie': 'Zahlungshistorie (parametrisiert)',
+        '30_weg_zahlungsuebersicht': 'WEG-Zahlungsübersicht (parametrisiert)',
+        '31_durchlaufende_posten': 'Durchlaufende Posten',
+        '32_sonderentnahmen': 'Sonderentnahmen',
+        '33_ruecklagen_management': 'Rücklagen-Management',
+        '34_spezielle_kontenklassen': 'Spezielle Kontenklassen',
+        '35_buchungskonten_uebersicht': 'Buchungskonten-Übersicht (parametrisiert)'
+    }
+}
+
+
 class Layer4JSONLoader:
     """Lädt Layer 4 JSON-Exporte aus dem konfigurierten exports/ Verzeichnis"""
     
@@ -28,6 +76,12 @@ class Layer4JSONLoader:
         self.json_dir = project_root / path_config['json_exports_dir']
         self.data_cache = {}
         
+        # Shared inverted index over the catalogued exports in catalog order - same
+        # rows and lower() substring semantics as the former linear scan
+        self.search_index = get_layer4_search_index(
+            self.json_dir, datasets=[query_name for queries_dict in QUERY_CATEGORIES.values()
+                                     for query_name in queries_dict])
+        
         # Load metadata
         self.load_metadata()
         
@@ -48,53 +102,8 @@ class Layer4JSONLoader:
         """Listet alle verfügbaren Layer 4 JSON-Exporte"""
         queries = []
         
-        # Definiere die Query-Kategorien basierend auf Layer 4
-        categories = {
-            'stammdaten': {
-                '01_eigentuemer': 'Eigentümer mit Banking & Portfolio',
-                '03_aktuelle_mieter': 'Aktuelle Mieterbeziehungen',
-                '04_alle_mieter': 'Historische Mieterdaten',
-                '05_objekte': 'Immobilienportfolio',
-                '07_wohnungen': 'Wohnungsdetails mit Belegung'
-            },
-            'finanzen': {
-                '09_konten': 'Kontenplan mit Salden',
-                '10_eigentuemer_konten': 'Eigentümerkonten-Details',
-                '11_mieter_konten': 'Mieterkonten-Tracking',
-                '12_bank_konten': 'Bankverbindungen',
-                '26_detaillierte_buchungen': 'Komplette Transaktionshistorie',
-                '27_konten_saldenliste': 'Kontensaldenliste',
-                '28_nebenkostenkonten_matrix': 'Nebenkosten-Aufschlüsselung'
-            },
-            'governance': {
-                '13_weg_eigentuemer': 'WEG-Eigentümerstruktur',
-                '14_eigentuemer_op': 'Offene Posten Eigentümer',
-                '16_beiraete': 'Beiratsverwaltung',
-                '17_beschluesse': 'Beschlussverfolgung',
-                '18_versammlungen': 'Versammlungsverwaltung',
-                '19_etv_presence': 'Versammlungspräsenz'
-            },
-            'analysen': {
-                '20_monatliche_mieteinnahmen': 'Monatliche Mieteinnahmen',
-                '21_forderungsalterung': 'Forderungsalterung',
-                '22_leerstandsanalyse': 'Leerstandsanalyse',
-                '23_instandhaltungskosten': 'Instandhaltungskosten',
-                '24_ruecklagenanalyse': 'Rücklagenanalyse',
-                '25_objektbezogene_sachkonten': 'Objektbezogene GL-Konten'
-            },
-            'spezial': {
-                '29_eigentuemer_zahlungshistorie': 'Zahlungshistorie (parametrisiert)',
-                '30_weg_zahlungsuebersicht': 'WEG-Zahlungsübersicht (parametrisiert)',
-                '31_durchlaufende_posten': 'Durchlaufende Posten',
-                '32_sonderentnahmen': 'Sonderentnahmen',
-                '33_ruecklagen_management': 'Rücklagen-Management',
-                '34_spezielle_kontenklassen': 'Spezielle Kontenklassen',
-                '35_buchungskonten_uebersicht': 'Buchungskonten-Übersicht (parametrisiert)'
-            }
-        }
-        
         # Erstelle Query-Liste mit Metadaten
-        for category, queries_dict in categories.items():
+        for category, queries_dict in QUERY_CATEGORIES.items():
             for query_name, description in queries_dict.items():
                 json_file = self.json_dir / f"{query_name}.json"
                 if json_file.exists():
@@ -149,32 +158,23 @@ class Layer4JSONLoader:
             return None
     
     def search_in_json(self, search_term: str, max_results: int = 100) -> List[Dict[str, Any]]:
-        """Sucht in allen JSON-Dateien nach einem Begriff"""
-        results = []
-        search_lower = search_term.lower()
+        """Sucht in allen JSON-Dateien nach einem Begriff (invertierter Index statt Full-Scan)"""
+        categories = {query_name: category
+                      for category, queries_dict in QUERY_CATEGORIES.items()
+                      for query_name in queries_dict}
         
-        # Durchsuche alle verfügbaren Queries
-        for query_info in self.list_available_queries():
-            if not query_info['exists']:
-                continue
-                
-            query_name = query_info['name']
-            data = self.load_json_data(query_name)
-            
-            if data and 'data' in data:
-                for row in data['data']:
-                    # Suche in allen Feldern
-                    if any(search_lower in str(value).lower() for value in row.values()):
-                        results.append({
-                            'query': query_name,
-                            'category': query_info['category'],
-                            'data': row
-                        })
-                        
-                        if len(results) >= max_results:
-                            return results
-        
-        return results
+        search_result = self.search_index.search(search_term, max_results)
+        return [{
+            'query': result['dataset'],
+            'category': categories[result['dataset']],
+            'data': result['data']
+        } for result in search_result['results']]
+    
+    def search_with_facets(self, search_term: str, max_results: int = 100,
+                           datasets: Optional[List[str]] = None,
+                           columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Indexsuche mit Datensatz-/Spalten-Filter und Facetten-Zählung"""
+        return self.search_index.search(search_term, max_results, datasets=datasets, columns=columns)
     
     def get_summary_statistics(self) -> Dict[str, Any]:
         """Gibt eine Zusammenfassung der verfügbaren Daten zurück"""
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+WINCASA Layer 4 Search Index
+Invertierter Index über alle Layer 4 JSON-Exporte mit Datensatz- und Spalten-Facetten
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r'\w+')
+_PREFIX_UPPER_BOUND = "\U0010ffff"
+_NGRAM = 3  # Längste indizierte Zeichenfolge im Vokabular-Index
+
+# Global singleton instances (one index per export directory and dataset selection)
+_indices: Dict[Tuple, "Layer4SearchIndex"] = {}
+_indices_lock = threading.Lock()
+
+
+def fold_text(text: str) -> str:
+    """Kleinschreibung + deutsche Umlaut-Normalisierung (Müller == Mueller)"""
+    folded = text.lower()
+    folded = folded.replace('ä', 'ae').replace('ö', 'oe').replace('ü', 'ue')
+    return folded.replace('ß', 'ss')
+
+
+class _IndexState:
+    """Unveränderlicher Index-Stand - wird bei Refresh komplett ersetzt"""
+
+    def __init__(self):
+        self.signature: Tuple = ()
+        self.datasets: List[str] = []
+        self.dataset_rows: List[List[Dict[str, Any]]] = []
+        self.columns: List[Tuple[int, str]] = []        # column id -> (dataset idx, column)
+        self.column_dataset = np.empty(0, dtype=np.uint16)
+        self.row_dataset = np.empty(0, dtype=np.uint16)
+        self.row_offset = np.empty(0, dtype=np.uint32)
+        self.terms: List[str] = []
+        self.offsets = np.zeros(1, dtype=np.uint32)
+        self.row_ids = np.empty(0, dtype=np.uint32)
+        self.column_ids = np.empty(0, dtype=np.uint32)
+        self.ngrams: Dict[str, int] = {}                # n-gram -> id (1 bis _NGRAM Zeichen)
+        self.ngram_offsets = np.zeros(1, dtype=np.uint32)
+        self.ngram_terms = np.empty(0, dtype=np.uint32)  # Term-Positionen je n-gram, aufsteigend
+        self.build_time_ms = 0.0
+
+
+class Layer4SearchIndex:
+    """
+    Invertierter Index über alle Layer 4 JSON-Exporte
+
+    Jede Zelle wird tokenisiert, die Postings (Zeile, Spalte) liegen als
+    CSR-Arrays hinter einem sortierten Term-Array. Ein Suchbegriff wird auf
+    alle Terme abgebildet, die ihn enthalten - so bleiben Treffer in Komposita
+    ('heizung' in 'zentralheizung') erhalten. Präfix-Treffer sind ein Bereich
+    im Term-Array, Infix-Kandidaten liefert ein n-gram-Index über das Vokabular.
+    Bei mehreren Tokens werden die Kandidatenzeilen geschnitten und per
+    Teilstring-Vergleich verifiziert; die Zeilen selbst werden nie gescannt.
+
+    Der Index wird beim ersten Zugriff gebaut und neu aufgebaut, sobald sich
+    eine Export-Datei ändert (gedrosselte Größe/mtime-Prüfung).
+
+    Treffer entsprechen dem Teilstring-Vergleich auf lower() (wie der frühere
+    Full-Scan); Umlaut-Normalisierung (Müller == Mueller) nur mit fold_umlauts.
+    datasets legt fest, welche Exporte in welcher Reihenfolge durchsucht werden
+    (Default: alle *.json außer _*-Dateien, alphabetisch).
+    """
+
+    def __init__(self, json_dir: Path, check_interval: float = 5.0,
+                 datasets: Optional[Sequence[str]] = None, fold_umlauts: bool = False):
+        self.json_dir = Path(json_dir)
+        self.check_interval = check_interval
+        self.datasets = list(datasets) if datasets is not None else None
+        self.fold_umlauts = fold_umlauts
+        self._fold = fold_text if fold_umlauts else str.lower
+        self._state: Optional[_IndexState] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _export_files(self) -> List[Path]:
+        if self.datasets is not None:
+            return [self.json_dir / f"{name}.json" for name in self.datasets
+                    if (self.json_dir / f"{name}.json").exists()]
+        return sorted(path for path in self.json_dir.glob("*.json") if not path.name.startswith("_"))
+
+    def _signature(self) -> Tuple:
+        signature = []
+        for path in self._export_files():
+            try:
+                stat = path.stat()
+                signature.append((path.name, stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                continue
+        return tuple(signature)
+
+    def _get_state(self) -> _IndexState:
+        """Aktueller Index-Stand, (neu) gebaut bei Bedarf"""
+        state = self._state
+        now = time.monotonic()
+        if state is not None and now - self._last_check < self.check_interval:
+            return state
+
+        with self._lock:
+            state = self._state
+            if state is not None and now - self._last_check < self.check_interval:
+                return state
+            signature = self._signature()
+            if state is None or signature != state.signature:
+                if state is not None:
+                    logger.info("🔄 Layer 4 Exporte geändert - Suchindex wird neu aufgebaut")
+                state = self._build(signature)
+                self._state = state
+            self._last_check = now
+        return state
+
+    def _build(self, signature: Tuple) -> _IndexState:
+        """Baut den Index über alle Export-Dateien"""
+        start_time = time.time()
+        state = _IndexState()
+        state.signature = signature
+
+        term_ids: Dict[str, int] = {}
+        occurrence_terms = array('I')
+        occurrence_rows = array('I')
+        occurrence_columns = array('I')
+        row_dataset = array('H')
+        row_offset = array('I')
+        column_lookup: Dict[Tuple[int, str], int] = {}
+
+        for path in self._export_files():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    rows = json.load(f).get('data', [])
+            except Exception as e:
+                logger.error(f"Fehler beim Indexieren von {path}: {e}")
+                continue
+
+            dataset_idx = len(state.datasets)
+            state.datasets.append(path.stem)
+            state.dataset_rows.append(rows)
+
+            for row_idx, row in enumerate(rows):
+                row_id = len(row_dataset)
+                row_dataset.append(dataset_idx)
+                row_offset.append(row_idx)
+
+                for column, value in row.items():
+                    if value is None or value == '':
+                        continue
+                    column_id = column_lookup.get((dataset_idx, column))
+                    if column_id is None:
+                        column_id = column_lookup[(dataset_idx, column)] = len(state.columns)
+                        state.columns.append((dataset_idx, column))
+                    for token in set(_TOKEN_PATTERN.findall(self._fold(str(value)))):
+                        term_id = term_ids.get(token)
+                        if term_id is None:
+                            term_id = term_ids[token] = len(term_ids)
+                        occurrence_terms.append(term_id)
+                        occurrence_rows.append(row_id)
+                        occurrence_columns.append(column_id)
+
+        # Sort postings by term rank, rows ascending within a term (CSR layout)
+        state.terms = sorted(term_ids)
+        rank = np.empty(len(term_ids), dtype=np.uint32)
+        rank[[term_ids[term] for term in state.terms]] = np.arange(len(state.terms), dtype=np.uint32)
+        occurrence_rank = rank[np.frombuffer(occurrence_terms, dtype=np.uint32)]
+        rows = np.frombuffer(occurrence_rows, dtype=np.uint32)
+        order = np.lexsort((rows, occurrence_rank))
+
+        state.offsets = np.zeros(len(state.terms) + 1, dtype=np.uint32)
+        np.cumsum(np.bincount(occurrence_rank, minlength=len(state.terms)), out=state.offsets[1:])
+        state.row_ids = rows[order]
+        state.column_ids = np.frombuffer(occurrence_columns, dtype=np.uint32)[order]
+        state.row_dataset = np.frombuffer(row_dataset, dtype=np.uint16).copy()
+        state.row_offset = np.frombuffer(row_offset, dtype=np.uint32).copy()
+        state.column_dataset = np.array([dataset_idx for dataset_idx, _ in state.columns], dtype=np.uint16)
+        self._build_ngrams(state)
+        state.build_time_ms = round((time.time() - start_time) * 1000, 2)
+
+        logger.info(f"✅ Layer 4 Suchindex: {len(state.datasets)} Datensätze, "
+                    f"{len(state.row_offset)} Zeilen, {len(state.terms)} Terme ({state.build_time_ms}ms)")
+        return state
+
+    def _build_ngrams(self, state: _IndexState):
+        """n-gram-Index (1 bis _NGRAM Zeichen) über das Vokabular, CSR wie die Postings"""
+        occurrence_ngrams = array('I')
+        occurrence_terms = array('I')
+        for position, term in enumerate(state.terms):
+            ngrams = {term[start:start + size]
+                      for size in range(1, _NGRAM + 1) for start in range(len(term) - size + 1)}
+            for ngram in ngrams:
+                ngram_id = state.ngrams.get(ngram)
+                if ngram_id is None:
+                    ngram_id = state.ngrams[ngram] = len(state.ngrams)
+                occurrence_ngrams.append(ngram_id)
+                occurrence_terms.append(position)
+
+        ngram_ids = np.frombuffer(occurrence_ngrams, dtype=np.uint32)
+        # Stable sort keeps the term positions of each n-gram ascending
+        order = np.argsort(ngram_ids, kind='stable')
+        state.ngram_offsets = np.zeros(len(state.ngrams) + 1, dtype=np.uint32)
+        np.cumsum(np.bincount(ngram_ids, minlength=len(state.ngrams)), out=state.ngram_offsets[1:])
+        state.ngram_terms = np.frombuffer(occurrence_terms, dtype=np.uint32)[order]
+
+    def _infix_terms(self, state: _IndexState, token: str) -> np.ndarray:
+        """
+        Positionen aller Terme, die das Token enthalten (über den n-gram-Index)
+
+        Kurze Tokens sind selbst ein n-gram; längere schneiden die Term-Listen
+        ihrer n-gramme (seltenste zuerst) und prüfen die Kandidaten per Teilstring.
+        """
+        if len(token) <= _NGRAM:
+            ngram_id = state.ngrams.get(token)
+            if ngram_id is None:
+                return np.empty(0, dtype=np.uint32)
+            return state.ngram_terms[state.ngram_offsets[ngram_id]:state.ngram_offsets[ngram_id + 1]]
+
+        slices = []
+        for ngram in {token[start:start + _NGRAM] for start in range(len(token) - _NGRAM + 1)}:
+            ngram_id = state.ngrams.get(ngram)
+            if ngram_id is None:
+                return np.empty(0, dtype=np.uint32)
+            slices.append(state.ngram_terms[state.ngram_offsets[ngram_id]:state.ngram_offsets[ngram_id + 1]])
+        slices.sort(key=len)
+        candidates = slices[0]
+        for other in slices[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, other, assume_unique=True)
+        return np.array([position for position in candidates.tolist() if token in state.terms[position]],
+                        dtype=np.uint32)
+
+    def _column_filter(self, state: _IndexState, datasets: Optional[List[str]],
+                       columns: Optional[List[str]]) -> Optional[np.ndarray]:
+        """Bool-Maske erlaubter Spalten-IDs (None = keine Einschränkung)"""
+        if not datasets and not columns:
+            return None
+        allowed = np.ones(len(state.columns), dtype=bool)
+        if datasets:
+            wanted = set(datasets)
+            dataset_ids = [idx for idx, name in enumerate(state.datasets) if name in wanted]
+            allowed &= np.isin(state.column_dataset, dataset_ids)
+        if columns:
+            wanted = set(columns)
+            allowed &= np.array([state.columns[column_id][1] in wanted
+                                 or self._column_name(state, column_id) in wanted
+                                 for column_id in range(len(state.columns))], dtype=bool)
+        return allowed
+
+    def _token_postings(self, state: _IndexState, token: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(row_ids, column_ids) aller Terme, die das Token enthalten"""
+        # Prefix hits are one contiguous range, the n-gram index adds infix hits
+        lo = bisect_left(state.terms, token)
+        hi = bisect_left(state.terms, token + _PREFIX_UPPER_BOUND, lo)
+        infix = self._infix_terms(state, token)
+        infix = infix[(infix < lo) | (infix >= hi)]
+        positions = np.concatenate((np.arange(lo, hi, dtype=np.int64), infix.astype(np.int64)))
+
+        if not len(positions):
+            return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.uint32)
+
+        # Gather all posting slices at once: positions -> flat posting indices
+        starts = state.offsets[positions].astype(np.int64)
+        lengths = state.offsets[positions + 1].astype(np.int64) - starts
+        slice_begin = np.cumsum(lengths) - lengths
+        selected = np.arange(int(lengths.sum())) + np.repeat(starts - slice_begin, lengths)
+        return state.row_ids[selected], state.column_ids[selected]
+
+    def _column_name(self, state: _IndexState, column_id: int) -> str:
+        dataset_idx, column = state.columns[column_id]
+        return f"{state.datasets[dataset_idx]}.{column}"
+
+    def _row(self, state: _IndexState, row_id: int) -> Dict[str, Any]:
+        return state.dataset_rows[int(state.row_dataset[row_id])][int(state.row_offset[row_id])]
+
+    def search(self, search_term: str, max_results: int = 100,
+               datasets: Optional[List[str]] = None,
+               columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Sucht einen Begriff in allen (oder den gefilterten) Exporten
+
+        Args:
+            search_term: Suchbegriff (Teilstring, Groß-/Kleinschreibung egal; Umlaute nur mit fold_umlauts)
+            max_results: Maximale Anzahl zurückgegebener Zeilen
+            datasets: Optional nur diese Exporte (z.B. ['09_konten'])
+            columns: Optional nur diese Spalten ('KBEZ' oder '09_konten.KBEZ')
+
+        Returns:
+            Dict mit results (dataset, row_index, data), total und facets
+        """
+        start_time = time.time()
+        state = self._get_state()
+        query = self._fold(search_term)
+        tokens = _TOKEN_PATTERN.findall(query)
+        allowed_columns = self._column_filter(state, datasets, columns)
+
+        if not query:
+            matched_rows = np.empty(0, dtype=np.uint32)
+            matched_columns = np.empty(0, dtype=np.uint32)
+        elif len(tokens) == 1 and tokens[0] == query:
+            # Single token: a term hit is already a substring hit
+            matched_rows, matched_columns = self._token_postings(state, query)
+            if allowed_columns is not None:
+                keep = allowed_columns[matched_columns]
+                matched_rows, matched_columns = matched_rows[keep], matched_columns[keep]
+        else:
+            matched_rows, matched_columns = self._verify(state, query, tokens, allowed_columns)
+
+        # Unique (row, column) pairs for facets, unique rows for results
+        pairs = np.unique(matched_rows.astype(np.uint64) * len(state.columns) + matched_columns)
+        pair_rows = (pairs // max(len(state.columns), 1)).astype(np.uint32)
+        pair_columns = (pairs % max(len(state.columns), 1)).astype(np.uint32)
+        rows = np.unique(pair_rows)
+
+        dataset_counts = np.bincount(state.row_dataset[rows], minlength=len(state.datasets))
+        column_counts = np.bincount(pair_columns, minlength=len(state.columns))
+
+        results = []
+        for row_id in rows[:max_results].tolist():
+            results.append({
+                'dataset': state.datasets[int(state.row_dataset[row_id])],
+                'row_index': int(state.row_offset[row_id]),
+                'data': self._row(state, row_id)
+            })
+
+        return {
+            'results': results,
+            'total': int(len(rows)),
+            'facets': {
+                'datasets': {state.datasets[idx]: int(count)
+                             for idx, count in enumerate(dataset_counts) if count},
+                'columns': {self._column_name(state, idx): int(column_counts[idx])
+                            for idx in np.flatnonzero(column_counts).tolist()}
+            },
+            'search_time_ms': round((time.time() - start_time) * 1000, 2)
+        }
+
+    def _verify(self, state: _IndexState, query: str, tokens: List[str],
+                allowed_columns: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Mehrere Tokens: Kandidaten-Zellen per Index, Teilstring-Prüfung nur dort
+        
+        Eine Zelle mit dem vollständigen Suchbegriff enthält jedes seiner Tokens,
+        daher genügen die Zellen des seltensten Tokens, deren Zeile auch alle
+        anderen Tokens enthält.
+        """
+        if tokens:
+            postings = sorted((self._token_postings(state, token) for token in tokens),
+                              key=lambda token_postings: len(token_postings[0]))
+            rows, columns = postings[0]
+            for other_rows, _ in postings[1:]:
+                keep = np.isin(rows, other_rows)
+                rows, columns = rows[keep], columns[keep]
+            if allowed_columns is not None:
+                keep = allowed_columns[columns]
+                rows, columns = rows[keep], columns[keep]
+            cells = zip(rows.tolist(), columns.tolist())
+        else:
+            # No word characters in the query - fall back to a full scan
+            cells = ((row_id, column_id)
+                     for row_id in range(len(state.row_offset))
+                     for column_id in self._row_column_ids(state, row_id, allowed_columns))
+
+        matched_rows = []
+        matched_columns = []
+        for row_id, column_id in cells:
+            value = self._row(state, row_id).get(state.columns[column_id][1])
+            if value is not None and query in self._fold(str(value)):
+                matched_rows.append(row_id)
+                matched_columns.append(column_id)
+
+        return np.array(matched_rows, dtype=np.uint32), np.array(matched_columns, dtype=np.uint32)
+
+    def _row_column_ids(self, state: _IndexState, row_id: int,
+                        allowed_columns: Optional[np.ndarray]) -> List[int]:
+        dataset_idx = int(state.row_dataset[row_id])
+        column_ids = [column_id for column_id, (column_dataset, _) in enumerate(state.columns)
+                      if column_dataset == dataset_idx]
+        if allowed_columns is not None:
+            column_ids = [column_id for column_id in column_ids if allowed_columns[column_id]]
+        return column_ids
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Index-Statistiken"""
+        state = self._get_state()
+        return {
+            'datasets': len(state.datasets),
+            'rows': int(len(state.row_offset)),
+            'columns': len(state.columns),
+            'terms': len(state.terms),
+            'ngrams': len(state.ngrams),
+            'postings': int(len(state.row_ids)),
+            'index_bytes': int(state.offsets.nbytes + state.row_ids.nbytes + state.column_ids.nbytes
+                               + state.ngram_offsets.nbytes + state.ngram_terms.nbytes),
+            'build_time_ms': state.build_time_ms
+        }
+
+
+def get_layer4_search_index(json_dir: Path, datasets: Optional[Sequence[str]] = None,
+                            fold_umlauts: bool = False) -> Layer4SearchIndex:
+    """Gibt den prozessweiten Suchindex für ein Export-Verzeichnis (und eine Datensatz-Auswahl) zurück"""
+    key = (str(Path(json_dir).resolve()), tuple(datasets) if datasets is not None else None, fold_umlauts)
+    index = _indices.get(key)
+    if index is None:
+        with _indices_lock:
+            index = _indices.get(key)
+            if index is None:
+                index = _indices[key] = Layer4SearchIndex(Path(json_dir), datasets=datasets,
+                                                          fold_umlauts=fold_umlauts)
+    return index
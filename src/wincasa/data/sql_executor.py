@@ -11,16 +11,17 @@ from typing import Any, Dict, List, Optional
 
 import pandas as pd
 
+from wincasa.core.deadline import raise_if_deadline_caused
+from wincasa.data.db_singleton import execute_on_cursor, execute_query, free_statement, get_db_connection
 from wincasa.utils.config_loader import WincasaConfig
-from wincasa.data.db_singleton import get_db_connection, execute_query
 
 logger = logging.getLogger(__name__)
 
 class WincasaSQLExecutor:
     """SQL-Ausführung für WINCASA Firebird-Datenbank"""
     
-    def __init__(self):
-        self.config = WincasaConfig()
+    def __init__(self, config: Optional[WincasaConfig] = None):
+        self.config = config or WincasaConfig()
         # Use singleton connection instead of own connection
         self.sql_templates = self._load_sql_templates()
     
@@ -114,11 +115,14 @@ class WincasaSQLExecutor:
                     else:
                         query = query.replace(placeholder, str(value))
             
-            cursor.execute(query)
+            statement = execute_on_cursor(cursor, query)
             
             # Ergebnisse holen
-            columns = [desc[0] for desc in cursor.description]
-            rows = cursor.fetchall()
+            try:
+                columns = [desc[0] for desc in cursor.description]
+                rows = cursor.fetchall()
+            finally:
+                free_statement(statement)
             
             # DataFrame erstellen
             df = pd.DataFrame(rows, columns=columns)
@@ -130,6 +134,7 @@ class WincasaSQLExecutor:
             
         except Exception as e:
             logger.error(f"Fehler bei Query-Ausführung: {e}")
+            raise_if_deadline_caused("sql", e)
             raise
     
     def get_available_queries(self) -> List[str]:
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+WINCASA Streaming Histograms
+Latenz-, Kosten- und Ergebnis-Verteilungen mit fester Speichergröße
+
+Log-Buckets mit relativer Genauigkeit (HDR-Prinzip): jeder Wert landet in
+einem Bucket, dessen Grenzen sich um den Faktor gamma unterscheiden -
+Perzentile haben damit maximal `relative_accuracy` Fehler, egal wie viele
+Werte aufgezeichnet werden. Zeitfenster bestehen aus einem Ring von
+Minuten-Slots, ältere Slots werden überschrieben.
+"""
+
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_PERCENTILES = (50, 90, 95, 99)
+
+# Fenster-Name -> Sekunden (None = seit Start)
+WINDOWS: Dict[str, Optional[int]] = {"1m": 60, "5m": 300, "15m": 900, "1h": 3600, "all": None}
+
+SLOT_SECONDS = 60
+SLOT_COUNT = 60  # Ring deckt das größte Fenster (1h) ab
+
+
+class StreamingHistogram:
+    """
+    Log-Bucket Histogramm (relative Genauigkeit, feste Bucket-Anzahl)
+
+    Werte <= 0 werden separat gezählt, Werte außerhalb [min_value, max_value]
+    auf den ersten/letzten Bucket geklemmt. Min/Max/Summe bleiben exakt.
+    """
+
+    def __init__(self, min_value: float = 0.01, max_value: float = 3_600_000.0,
+                 relative_accuracy: float = 0.01):
+        self.min_value = min_value
+        self.max_value = max_value
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._min_index = self._raw_index(min_value)
+        self._max_index = self._raw_index(max_value)
+
+        # Sparse: bucket index -> count (höchstens max_index - min_index + 1 Einträge)
+        self._counts: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    @property
+    def bucket_limit(self) -> int:
+        """Maximale Anzahl Buckets - obere Schranke für den Speicherbedarf"""
+        return self._max_index - self._min_index + 1
+
+    def _raw_index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _bucket_value(self, index: int) -> float:
+        # Mittelpunkt des Buckets (gamma^(i-1), gamma^i] mit relativem Fehler <= relative_accuracy
+        return 2 * self._gamma ** index / (self._gamma + 1)
+
+    def record(self, value: float, count: int = 1):
+        """Zeichnet einen Wert auf (count-fach)"""
+        if value <= 0:
+            self.zero_count += count
+        else:
+            index = min(max(self._raw_index(value), self._min_index), self._max_index)
+            self._counts[index] = self._counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "StreamingHistogram"):
+        """Addiert ein Histogramm mit gleicher Konfiguration"""
+        for index, count in other._counts.items():
+            self._counts[index] = self._counts.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def copy_empty(self) -> "StreamingHistogram":
+        return StreamingHistogram(self.min_value, self.max_value, self.relative_accuracy)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentiles(self, percentiles: Iterable[float] = DEFAULT_PERCENTILES) -> Dict[float, float]:
+        """Perzentile (0-100) in einem Durchlauf über die sortierten Buckets"""
+        percentiles = sorted(percentiles)
+        if not self.count:
+            return {p: 0.0 for p in percentiles}
+
+        results = {}
+        buckets = iter(sorted(self._counts.items()))
+        seen = self.zero_count
+        value = 0.0
+        for p in percentiles:
+            if p >= 100:
+                results[p] = self.max
+                continue
+            rank = p / 100 * (self.count - 1)
+            while seen <= rank:
+                index, count = next(buckets)
+                seen += count
+                value = self._bucket_value(index)
+            # Exakte Ränder statt Bucket-Mitte
+            results[p] = min(max(value, self.min), self.max)
+        return results
+
+    def percentile(self, percentile: float) -> float:
+        return self.percentiles((percentile,))[percentile]
+
+    def to_dict(self, percentiles: Iterable[float] = DEFAULT_PERCENTILES, digits: int = 2) -> Dict[str, Any]:
+        if not self.count:
+            return {"count": 0}
+        summary = {
+            "count": self.count,
+            "mean": round(self.mean, digits),
+            "min": round(self.min, digits),
+            "max": round(self.max, digits)
+        }
+        for p, value in self.percentiles(percentiles).items():
+            summary[f"p{p:g}"] = round(value, digits)
+        return summary
+
+
+class WindowedHistogram:
+    """
+    Histogramm mit Zeitfenstern
+
+    Ein Ring aus SLOT_COUNT Minuten-Slots liefert die gleitenden Fenster,
+    ein zusätzliches Histogramm zählt alles seit Start.
+    """
+
+    def __init__(self, **histogram_args):
+        self._template = StreamingHistogram(**histogram_args)
+        self._all = self._template.copy_empty()
+        self._slots: List[Tuple[int, Optional[StreamingHistogram]]] = [(-1, None)] * SLOT_COUNT
+
+    def record(self, value: float, now: Optional[float] = None):
+        slot_id = int((time.time() if now is None else now) // SLOT_SECONDS)
+        position = slot_id % SLOT_COUNT
+        current_id, histogram = self._slots[position]
+        if current_id != slot_id or histogram is None:
+            histogram = self._template.copy_empty()
+            self._slots[position] = (slot_id, histogram)
+        histogram.record(value)
+        self._all.record(value)
+
+    def snapshot(self, window_seconds: Optional[int] = None, now: Optional[float] = None) -> StreamingHistogram:
+        """Zusammengeführtes Histogramm der letzten window_seconds (None = alles)"""
+        if window_seconds is None:
+            return self._all
+        current_id = int((time.time() if now is None else now) // SLOT_SECONDS)
+        oldest_id = current_id - max(1, math.ceil(window_seconds / SLOT_SECONDS)) + 1
+        merged = self._template.copy_empty()
+        for slot_id, histogram in self._slots:
+            if histogram is not None and oldest_id <= slot_id <= current_id:
+                merged.merge(histogram)
+        return merged
+
+
+class PerformanceHistograms:
+    """
+    Streaming-Metriken pro Verarbeitungspfad
+
+    Key ist (processing_mode, engine_version); pro Key werden Latenz (ms),
+    Kosten (USD) und Ergebnisanzahl als WindowedHistogram geführt.
+    Thread-safe, Speicher unabhängig von der Anzahl Queries.
+    """
+
+    METRICS = {
+        "latency_ms": {"min_value": 0.01, "max_value": 3_600_000.0},
+        "cost_usd": {"min_value": 0.0001, "max_value": 100.0},
+        "result_count": {"min_value": 1, "max_value": 10_000_000},
+    }
+
+    def __init__(self):
+        self._paths: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _new_path(self) -> Dict[str, Any]:
+        path = {name: WindowedHistogram(**args) for name, args in self.METRICS.items()}
+        path.update({"successes": 0, "confidence_sum": 0.0})
+        return path
+
+    def record(self, processing_mode: str, engine_version: str, latency_ms: float,
+               cost: float, result_count: int, confidence: float = 0.0, now: Optional[float] = None):
+        """Zeichnet eine verarbeitete Query auf"""
+        with self._lock:
+            path = self._paths.get((processing_mode, engine_version))
+            if path is None:
+                path = self._paths[(processing_mode, engine_version)] = self._new_path()
+            path["latency_ms"].record(latency_ms, now)
+            path["cost_usd"].record(cost, now)
+            path["result_count"].record(result_count, now)
+            path["successes"] += int(result_count > 0)
+            path["confidence_sum"] += confidence
+
+    @property
+    def total_count(self) -> int:
+        with self._lock:
+            return sum(path["latency_ms"].snapshot().count for path in self._paths.values())
+
+    def snapshot(self, window: str = "all", now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Perzentile für ein Zeitfenster ('1m', '5m', '15m', '1h', 'all')
+
+        Returns:
+            {"overall": {metric: summary}, "paths": {"mode/version": {metric: summary}}}
+        """
+        if window not in WINDOWS:
+            raise ValueError(f"Unbekanntes Zeitfenster: {window} (erlaubt: {', '.join(WINDOWS)})")
+        window_seconds = WINDOWS[window]
+
+        with self._lock:
+            overall = {name: StreamingHistogram(**args) for name, args in self.METRICS.items()}
+            paths = {}
+            for (processing_mode, engine_version), path in sorted(self._paths.items()):
+                summary = {}
+                for name in self.METRICS:
+                    histogram = path[name].snapshot(window_seconds, now)
+                    overall[name].merge(histogram)
+                    summary[name] = histogram.to_dict(digits=4 if name == "cost_usd" else 2)
+                if summary["latency_ms"]["count"]:
+                    paths[f"{processing_mode}/{engine_version}"] = summary
+
+        return {
+            "window": window,
+            "overall": {name: histogram.to_dict(digits=4 if name == "cost_usd" else 2)
+                        for name, histogram in overall.items()},
+            "paths": paths
+        }
+
+    def quality(self) -> Dict[str, float]:
+        """Erfolgsquote (result_count > 0) und mittlere Confidence seit Start"""
+        with self._lock:
+            count = sum(path["latency_ms"].snapshot().count for path in self._paths.values())
+            if not count:
+                return {"success_rate": 0.0, "avg_confidence": 0.0}
+            return {
+                "success_rate": sum(path["successes"] for path in self._paths.values()) / count,
+                "avg_confidence": sum(path["confidence_sum"] for path in self._paths.values()) / count
+            }
+
+    def reset(self):
+        with self._lock:
+            self._paths.clear()
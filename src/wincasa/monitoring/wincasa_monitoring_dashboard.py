@@ -130,7 +130,9 @@ class WincasaMonitoringDashboard:
             success=result.result_count > 0 and not result.error_details,
             error=result.error_details,
             answer_preview=getattr(result, 'answer', '')[:200] if hasattr(result, 'answer') else None,
-            source_data=result.processing_mode
+            source_data=result.processing_mode,
+            time_to_first_token_ms=getattr(result, 'time_to_first_token_ms', None),
+            route=getattr(result, 'route', None)
         )
         
         # Persist to database
@@ -32,6 +32,8 @@ class QueryLogEntry:
     error: Optional[str] = None
     answer_preview: Optional[str] = None
     source_data: Optional[str] = None
+    time_to_first_token_ms: Optional[float] = None  # Streaming queries only
+    route: Optional[str] = None  # Engine route: semantic, unified, legacy, cache, coalesced
     
 class WincasaQueryLogger:
     """
@@ -84,10 +86,18 @@ class WincasaQueryLogger:
                 error TEXT,
                 answer_preview TEXT,
                 source_data TEXT,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                time_to_first_token_ms REAL,
+                route TEXT
             )
             """)
             
+            # Migrate databases created before these columns existed
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(query_logs)")}
+            for column, column_type in (("time_to_first_token_ms", "REAL"), ("route", "TEXT")):
+                if column not in columns:
+                    cursor.execute(f"ALTER TABLE query_logs ADD COLUMN {column} {column_type}")
+            
             # Indices for performance
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_timestamp ON query_logs(timestamp)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_mode ON query_logs(mode)")
@@ -125,14 +135,15 @@ class WincasaQueryLogger:
                     INSERT INTO query_logs (
                         timestamp, query, mode, model, user_id, session_id,
                         response_time_ms, result_count, confidence, cost_estimate,
-                        success, error, answer_preview, source_data
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        success, error, answer_preview, source_data,
+                        time_to_first_token_ms, route
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     """, (
                         entry.timestamp, entry.query, entry.mode, entry.model,
                         entry.user_id, entry.session_id, entry.response_time_ms,
                         entry.result_count, entry.confidence, entry.cost_estimate,
                         1 if entry.success else 0, entry.error, entry.answer_preview,
-                        entry.source_data
+                        entry.source_data, entry.time_to_first_token_ms, entry.route
                     ))
                     
                     query_id = cursor.lastrowid
@@ -217,6 +228,13 @@ class WincasaQueryLogger:
             )
             avg_response_time = cursor.fetchone()[0] or 0.0
             
+            # Average time to first token (streamed queries only)
+            cursor.execute(
+                "SELECT AVG(time_to_first_token_ms) FROM query_logs WHERE timestamp >= ?",
+                (cutoff_date,)
+            )
+            avg_ttft = cursor.fetchone()[0]
+            
             # Unique users and sessions
             cursor.execute(
                 "SELECT COUNT(DISTINCT user_id), COUNT(DISTINCT session_id) FROM query_logs WHERE timestamp >= ?",
@@ -249,6 +267,7 @@ class WincasaQueryLogger:
                 "total_queries": total_queries,
                 "success_rate": round(success_rate, 3),
                 "avg_response_time_ms": round(avg_response_time, 2),
+                "avg_time_to_first_token_ms": round(avg_ttft, 2) if avg_ttft is not None else None,
                 "unique_users": unique_users,
                 "unique_sessions": unique_sessions,
                 "mode_distribution": mode_distribution,
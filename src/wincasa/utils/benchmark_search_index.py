@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+WINCASA Search Index Scaling Benchmark
+Misst Such-Latenz des Optimized Search Systems bei wachsender Entity-Anzahl
+"""
+
+import json
+import random
+import statistics
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from wincasa.core.wincasa_optimized_search import WincasaOptimizedSearch
+
+DEFAULT_RAG_DATA_DIR = Path(__file__).parent.parent.parent.parent / "data" / "exports" / "rag_data"
+
+BENCHMARK_QUERIES = ["Weber", "Müller", "Essen", "GmbH", "Aachener", "Hamburg", "bergstr", "info"]
+
+
+def _synthetic_word(rng: random.Random) -> str:
+    """Zufallswort mit 'zq'-Präfix - kollidiert nie mit echten Suchbegriffen"""
+    return "zq" + "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+
+
+def _synthetic_entity(template: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    """Erzeugt eine Entity mit gleicher Struktur, aber neuen Suchbegriffen"""
+    entity = json.loads(json.dumps(template))
+    for key in ("name", "partner", "firma", "stadt", "plz_ort"):
+        if entity.get(key):
+            entity[key] = f"{_synthetic_word(rng)} {_synthetic_word(rng)}"
+    if entity.get("adresse"):
+        entity["adresse"] = f"{_synthetic_word(rng)}straße {rng.randint(1, 200)}"
+    if isinstance(entity.get("kontakt"), dict) and entity["kontakt"].get("email"):
+        entity["kontakt"]["email"] = f"{_synthetic_word(rng)}@{_synthetic_word(rng)}.de"
+    return entity
+
+
+def _write_scaled_dataset(source_dir: Path, target_dir: Path, scale: int, seed: int = 42):
+    """Schreibt die rag_data Dateien um Faktor 'scale' vergrößert"""
+    rng = random.Random(seed)
+    for filename in ("mieter.json", "eigentuemer.json", "objekte.json"):
+        source_file = source_dir / filename
+        entities = json.loads(source_file.read_text(encoding="utf-8")) if source_file.exists() else []
+        scaled = list(entities)
+        for _ in range(scale - 1):
+            scaled.extend(_synthetic_entity(entity, rng) for entity in entities)
+        (target_dir / filename).write_text(json.dumps(scaled, ensure_ascii=False), encoding="utf-8")
+
+
+def _time_queries(search: WincasaOptimizedSearch, queries: List[str], repeats: int) -> Dict[str, float]:
+    """Median-Latenz pro Query in Millisekunden"""
+    latencies = {}
+    for query in queries:
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            search.optimized_search(query, max_results=10)
+            samples.append((time.perf_counter() - start) * 1000)
+        latencies[query] = statistics.median(samples)
+    return latencies
+
+
+def _time_batch(search: WincasaOptimizedSearch, queries: List[str], repeats: int) -> Dict[str, float]:
+    """Durchsatz (Queries/s) einzeln vs. optimized_search_many"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for query in queries:
+            search.optimized_search(query, max_results=10)
+    single_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        search.optimized_search_many(queries, max_results=10)
+    batch_s = time.perf_counter() - start
+
+    total = len(queries) * repeats
+    return {"single_qps": round(total / single_s), "batch_qps": round(total / batch_s)}
+
+
+def benchmark_index_scaling(rag_data_dir: Path = DEFAULT_RAG_DATA_DIR,
+                            scales: tuple = (1, 10),
+                            repeats: int = 20) -> List[Dict[str, Any]]:
+    """Baut den Index für jede Skalierung neu und misst die Query-Latenz"""
+    results = []
+
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            _write_scaled_dataset(Path(rag_data_dir), Path(tmp_dir), scale)
+
+            build_start = time.perf_counter()
+            search = WincasaOptimizedSearch(rag_data_dir=tmp_dir, api_key_file="",
+                                            debug_mode=False, snapshot_dir=None)
+            build_ms = (time.perf_counter() - build_start) * 1000
+
+            stats = search.get_stats()
+            latencies = _time_queries(search, BENCHMARK_QUERIES, repeats)
+            # Golden-set style workload: overlapping terms and repeated queries
+            batch_queries = BENCHMARK_QUERIES * 4 + [f"{a} {b}" for a, b in
+                                                     zip(BENCHMARK_QUERIES, reversed(BENCHMARK_QUERIES))]
+            throughput = _time_batch(search, batch_queries, repeats)
+
+            results.append({
+                "scale": scale,
+                "entities": sum(stats["entities"].values()),
+                "index_terms": sum(stats["indices"].values()),
+                "build_ms": round(build_ms, 1),
+                "median_query_ms": round(statistics.median(latencies.values()), 3),
+                "per_query_ms": {q: round(ms, 3) for q, ms in latencies.items()},
+                **throughput
+            })
+
+    return results
+
+
+if __name__ == "__main__":
+    print("🚀 Search Index Scaling Benchmark...")
+    for row in benchmark_index_scaling():
+        print(f"\n📊 Scale x{row['scale']}: {row['entities']} Entities, {row['index_terms']} Terme")
+        print(f"   🏗️  Build: {row['build_ms']}ms")
+        print(f"   ⏱️  Median Query: {row['median_query_ms']}ms")
+        print(f"   📦 Durchsatz: {row['single_qps']} q/s einzeln, {row['batch_qps']} q/s Batch")
+        for query, ms in row["per_query_ms"].items():
+            print(f"      '{query}': {ms}ms")
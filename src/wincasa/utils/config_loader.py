@@ -60,6 +60,19 @@ class WincasaConfig:
             'openai_temperature': float(os.getenv('OPENAI_TEMPERATURE', '0.1')),
             'openai_max_tokens': int(os.getenv('OPENAI_MAX_TOKENS', '4000')),
             
+            # OpenAI HTTP Connection-Pool (ein Client pro Prozess)
+            'openai_pool_max_connections': int(os.getenv('OPENAI_POOL_MAX_CONNECTIONS', '20')),
+            'openai_pool_max_keepalive': int(os.getenv('OPENAI_POOL_MAX_KEEPALIVE', '10')),
+            'openai_pool_keepalive_expiry': float(os.getenv('OPENAI_POOL_KEEPALIVE_EXPIRY', '60')),
+            'openai_connect_timeout': float(os.getenv('OPENAI_CONNECT_TIMEOUT', '5')),
+            'openai_read_timeout': float(os.getenv('OPENAI_READ_TIMEOUT', '60')),
+            'openai_max_retries': int(os.getenv('OPENAI_MAX_RETRIES', '2')),
+            
+            # Tool-Schleife (Function Calling): Obergrenzen pro Anfrage
+            'llm_tool_max_rounds': int(os.getenv('LLM_TOOL_MAX_ROUNDS', '3')),
+            'llm_tool_time_budget': float(os.getenv('LLM_TOOL_TIME_BUDGET', '20')),
+            'llm_tool_result_max_chars': int(os.getenv('LLM_TOOL_RESULT_MAX_CHARS', '20000')),
+            
             # System Mode
             'system_mode': os.getenv('SYSTEM_MODE', 'json_standard'),
             
@@ -190,6 +203,25 @@ class WincasaConfig:
             'max_tokens': self._config['openai_max_tokens']
         }
     
+    def get_llm_pool_config(self) -> Dict[str, Any]:
+        """Gibt Einstellungen für den geteilten OpenAI Connection-Pool zurück"""
+        return {
+            'max_connections': self._config['openai_pool_max_connections'],
+            'max_keepalive_connections': self._config['openai_pool_max_keepalive'],
+            'keepalive_expiry': self._config['openai_pool_keepalive_expiry'],
+            'connect_timeout': self._config['openai_connect_timeout'],
+            'read_timeout': self._config['openai_read_timeout'],
+            'max_retries': self._config['openai_max_retries']
+        }
+    
+    def get_tool_loop_config(self) -> Dict[str, Any]:
+        """Gibt Obergrenzen der LLM Tool-Schleife zurück (Runden, Tool-Zeit in Sekunden, Ergebnislänge)"""
+        return {
+            'max_rounds': self._config['llm_tool_max_rounds'],
+            'time_budget': self._config['llm_tool_time_budget'],
+            'max_result_chars': self._config['llm_tool_result_max_chars']
+        }
+    
     def get_system_prompt_path(self) -> str:
         """Gibt Pfad zur System-Prompt-Datei basierend auf SYSTEM_MODE zurück"""
         mode = self._config['system_mode']
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+WINCASA Adaptive Router - Unit Tests
+Training aus query_logs, Pfadwahl und Anbindung an den Query Engine
+"""
+
+import sys
+from pathlib import Path
+# Add src directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import json
+import tempfile
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+
+from wincasa.core.adaptive_router import (MODEL_VERSION, AdaptiveRouter,
+                                          detect_query_pattern,
+                                          load_log_records, train_model)
+from wincasa.core.component_registry import get_registry
+from wincasa.core.wincasa_query_engine import WincasaQueryEngine
+from wincasa.monitoring.wincasa_query_logger import (QueryLogEntry,
+                                                     WincasaQueryLogger)
+
+
+def path_stats(samples, success_rate, latency_ms, cost_usd=0.0):
+    return {"samples": samples, "success_rate": success_rate, "latency_ms": latency_ms,
+            "p90_latency_ms": latency_ms, "cost_usd": cost_usd}
+
+
+MODEL = {
+    "version": MODEL_VERSION,
+    "patterns": {
+        "kw_leerstand": {
+            "semantic": path_stats(5, 1.0, 10.0),
+            "unified": path_stats(50, 0.2, 80.0),
+            "legacy": path_stats(40, 0.95, 3000.0, 0.02),
+        },
+        "kw_mieter": {
+            "unified": path_stats(50, 0.9, 2500.0),
+            "legacy": path_stats(50, 0.9, 1500.0, 0.02),
+        },
+        "kw_finanzen": {
+            "unified": path_stats(50, 0.1, 100.0),
+            "legacy": path_stats(50, 0.3, 2000.0),
+        }
+    }
+}
+
+
+class TestAdaptiveRouter(unittest.TestCase):
+    """Unit tests for AdaptiveRouter and offline training"""
+
+    def setUp(self):
+        self.router = AdaptiveRouter(MODEL, explore_rate=0.0)
+
+    def test_pattern_detection(self):
+        """Test keyword fallback patterns on folded text"""
+        self.assertEqual(detect_query_pattern("Welche Wohnungen stehen LEER?"), "kw_leerstand")
+        self.assertEqual(detect_query_pattern("Wer wohnt in der Aachener Str. 71?"), "kw_mieter")
+        self.assertEqual(detect_query_pattern("Offene Rückstände 2024"), "kw_finanzen")
+        self.assertEqual(detect_query_pattern("Hallo"), "sonstige")
+
+    def test_failing_paths_skipped(self):
+        """Test historically failing paths are skipped, unknown ones kept as fallback"""
+        decision = self.router.route("kw_leerstand")
+        self.assertEqual(decision.order, ("legacy", "semantic"))
+        self.assertEqual(decision.skipped, ("unified",))
+        self.assertTrue(decision.learned)
+
+    def test_cost_weighs_into_latency(self):
+        """Test cost is converted into latency when ranking qualified paths"""
+        self.assertEqual(self.router.route("kw_mieter").scores, {"unified": 2500.0, "legacy": 3500.0})
+        self.assertEqual(self.router.route("kw_mieter").order, ("unified", "legacy", "semantic"))
+        latency_only = AdaptiveRouter(MODEL, explore_rate=0.0, cost_weight_ms_per_usd=0)
+        self.assertEqual(latency_only.route("kw_mieter").order[0], "legacy")
+
+    def test_unknown_or_hopeless_pattern_uses_cascade(self):
+        """Test the fixed cascade without data and when every path fails"""
+        decision = self.router.route("sonstige")
+        self.assertEqual((decision.order, decision.learned), (("semantic", "unified", "legacy"), False))
+
+        # Only the untested semantic path is left to try
+        self.assertEqual(self.router.route("kw_finanzen").order, ("semantic",))
+        hopeless = AdaptiveRouter({**MODEL, "patterns": {"kw_finanzen": {
+            path: path_stats(50, 0.1, 100.0) for path in ("semantic", "unified", "legacy")}}}, explore_rate=0.0)
+        self.assertEqual(hopeless.route("kw_finanzen").order, ("semantic", "unified", "legacy"))
+
+    def test_train_from_query_logs(self):
+        """Test training aggregates logged processing modes per pattern and path"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = Path(temp_dir) / "query_logs.db"
+            query_logger = WincasaQueryLogger(db_path=str(db_path))
+            rows = [("Freie Wohnungen in Essen", "template", 50.0, True, 0.0),
+                    ("Leerstand Bergstraße", "legacy_fallback", 2500.0, True, 0.02),
+                    ("Leerstand gesamt", "legacy_json_vanilla", 1500.0, True, 0.02),
+                    ("Leerstand gesamt", "deadline_exceeded", 10000.0, False, 0.0)]
+            for query, mode, latency, success, cost in rows:
+                query_logger.log_query(QueryLogEntry(
+                    timestamp=datetime.now().isoformat(), query=query, mode=mode, model="gpt-4o-mini",
+                    user_id="test", session_id="s1", response_time_ms=latency, result_count=int(success),
+                    confidence=0.9, cost_estimate=cost, success=success))
+
+            model = train_model(load_log_records(db_path, days=1))
+
+        self.assertEqual((model["rows"], model["skipped_rows"]), (3, 1))
+        stats = model["patterns"]["kw_leerstand"]
+        self.assertEqual(stats["unified"]["samples"], 2)
+        self.assertEqual(stats["unified"]["success_rate"], 0.5)  # legacy_fallback = unified failed
+        self.assertEqual(stats["legacy"]["latency_ms"], 1500.0)
+
+    def test_cache_hits_excluded_from_training(self):
+        """Test answer cache hits and coalesced results don't change path stats"""
+        def train(extra_rows):
+            with tempfile.TemporaryDirectory() as temp_dir:
+                db_path = Path(temp_dir) / "query_logs.db"
+                query_logger = WincasaQueryLogger(db_path=str(db_path))
+                rows = [("Leerstand gesamt", "legacy_json_vanilla", 1500.0, 0.02, "legacy")] + extra_rows
+                for query, mode, latency, cost, route in rows:
+                    query_logger.log_query(QueryLogEntry(
+                        timestamp=datetime.now().isoformat(), query=query, mode=mode, model="gpt-4o-mini",
+                        user_id="test", session_id="s1", response_time_ms=latency, result_count=1,
+                        confidence=0.9, cost_estimate=cost, success=True, route=route))
+                return train_model(load_log_records(db_path))
+
+        replayed = [("Leerstand gesamt", "legacy_json_vanilla", 0.4, 0.0, "cache"),
+                    ("leerstand gesamt?", "legacy_json_vanilla", 2.0, 0.0, "coalesced")]
+        self.assertEqual(train(replayed)["patterns"], train([])["patterns"])
+        self.assertEqual(train(replayed)["patterns"]["kw_leerstand"]["legacy"]["latency_ms"], 1500.0)
+
+    def test_load(self):
+        """Test loading trained models and rejecting missing/incompatible ones"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            model_path = Path(temp_dir) / "router_model.json"
+            self.assertIsNone(AdaptiveRouter.load(model_path))
+            model_path.write_text(json.dumps({"version": 0, "patterns": {}}))
+            self.assertIsNone(AdaptiveRouter.load(model_path))
+            model_path.write_text(json.dumps(MODEL))
+            self.assertEqual(AdaptiveRouter.load(model_path, min_samples=3).route("kw_leerstand").order[0], "semantic")
+
+
+class TestEngineAdaptiveRouting(unittest.TestCase):
+    """Adaptive routing inside WincasaQueryEngine"""
+
+    def setUp(self):
+        self.llm_calls = []
+        get_registry().provide("llm_handler", SimpleNamespace(query_llm=self.query_llm))
+
+    def tearDown(self):
+        get_registry().reset("llm_handler")
+
+    def query_llm(self, query, mode=None):
+        self.llm_calls.append(query)
+        return {"answer": f"Antwort: {query}", "result_count": 1, "mode": mode}
+
+    def test_router_skips_failing_unified_path(self):
+        """Test a pattern whose template path fails goes straight to the LLM"""
+        unified_calls = []
+
+        def process_query(query):
+            unified_calls.append(query)
+            return SimpleNamespace(final_answer="Template", confidence=0.9, result_count=1,
+                                   processing_path="template", processing_time_ms=1.0)
+
+        engine = WincasaQueryEngine(config_file="does/not/exist.json",
+                                    unified_system=SimpleNamespace(process_query=process_query),
+                                    semantic_engine=False, search_system=object(), answer_cache=None,
+                                    router=AdaptiveRouter(MODEL, explore_rate=0.0))
+        result = engine.process_query("Leerstand in Essen", force_mode="unified")
+        self.assertEqual(unified_calls, [])
+        self.assertEqual(result.processing_mode, "legacy_json_vanilla")
+        self.assertEqual(result.routing_decision["skipped"], ("unified",))
+        self.assertEqual(engine.query_stats["adaptive_decisions"], 1)
+
+        # Unknown pattern keeps the cascade
+        result = engine.process_query("Hallo", force_mode="unified")
+        self.assertEqual((result.processing_mode, unified_calls), ("template", ["Hallo"]))
+        self.assertFalse(result.routing_decision["learned"])
+
+
+if __name__ == '__main__':
+    unittest.main()
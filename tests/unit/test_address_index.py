@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+WINCASA Address Index - Unit Tests
+Straßen-Normalisierung, Adress-Lookups und Anbindung an Suche/Data Access
+"""
+
+import sys
+from pathlib import Path
+# Add src directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import json
+import os
+import tempfile
+import unittest
+
+from wincasa.core.wincasa_optimized_search import WincasaOptimizedSearch
+from wincasa.data.address_index import (AddressIndex, normalize_street,
+                                        split_address)
+from wincasa.data.data_access_layer import WincasaDataAccess
+from wincasa.data.layer4_json_loader import Layer4JSONLoader
+
+RAG_DATA_DIR = Path(__file__).parent.parent.parent / "data" / "exports" / "rag_data"
+
+
+class TestAddressIndex(unittest.TestCase):
+    """Unit tests for AddressIndex"""
+
+    def setUp(self):
+        self.index = AddressIndex.from_rows([
+            {"STR": "Aachener Str. 71", "PLZORT": "50674 Köln", "NAME": "Weber"},
+            {"STR": "Aachener Straße 71", "PLZORT": "50674 Köln", "NAME": "Schmidt"},
+            {"STR": "Aachener Str. 12a", "PLZORT": "50674 Köln", "NAME": "Becker"},
+            {"STR": "Von-Waldthausen-Straße 44, 2. OG rechts", "PLZORT": "44894 Bochum", "NAME": "Krause"},
+            {"STR": "Aachener Str. 71", "PLZORT": "52062 Aachen", "NAME": "Wolf"},
+        ], "STR", "PLZORT")
+
+    def test_street_normalization(self):
+        """Test abbreviations and spelling variants share one key"""
+        for variant in ["Aachener Str.", "Aachener Str", "aachener strasse", "Aachener Straße"]:
+            self.assertEqual(normalize_street(variant), "aachener strasse", variant)
+        self.assertEqual(normalize_street("Marienstr."), "marienstrasse")
+        self.assertEqual(split_address("Von-Waldthausen-Straße 44, 2. OG rechts"),
+                         ("von-waldthausen-strasse", "44"))
+        self.assertEqual(split_address("Hauptstr 12 A"), ("hauptstrasse", "12 a"))
+        self.assertEqual(split_address("Am Markt"), ("am markt", None))
+
+    def test_no_lenient_matches(self):
+        """Test ranges, glued numbers and spacing variants stay distinct as in the former row scan"""
+        self.assertEqual(split_address("Ahestr. 11-15"), ("ahestrasse", "11-15"))
+        self.assertEqual(split_address("Burgunder Str. 14+16"), ("burgunder strasse", "14+16"))
+        self.assertEqual(split_address("Moltkestr.120"), ("moltkestrasse120", None))
+
+        index = AddressIndex.from_rows([{"ESTR": street, "NAME": name} for street, name in [
+            ("Moltkestr. 120", "A"), ("Moltkestr.120", "B"), ("Ahestr. 11", "C"), ("Ahestr. 11-15", "D"),
+            ("Burgunder Str. 16", "E"), ("Burgunderstr. 16", "F"), ("Neuerburgstr. 4d", "G"),
+            ("Neuerburgstr. 4 d", "H"), ("Martinstr. 2", "I"), ("Martinstr. 2 / Nikolausstr. 7", "J"),
+        ]], "ESTR")
+        names = lambda street: sorted(row["NAME"] for row in index.lookup(street))
+        self.assertEqual(names("Moltkestr.120"), ["B"])
+        self.assertEqual(names("Moltkestraße 120"), ["A"])
+        self.assertEqual(names("Ahestr. 11-15"), ["D"])
+        self.assertEqual(names("Ahestraße 11"), ["C"])
+        self.assertEqual(names("Burgunder Straße 16"), ["E"])
+        self.assertEqual(names("Burgunderstr. 16"), ["F"])
+        self.assertEqual(names("Neuerburgstr. 4 d"), ["H"])
+        self.assertEqual(names("Martinstraße 2"), ["I"])
+        self.assertEqual(names("Martinstr. 2 / Nikolausstr. 7"), ["J"])
+
+    def test_lookup_street_and_number(self):
+        """Test exact house numbers and postal filters"""
+        names = lambda rows: sorted(row["NAME"] for row in rows)
+        self.assertEqual(names(self.index.lookup("Aachener Strasse 71")), ["Schmidt", "Weber", "Wolf"])
+        self.assertEqual(names(self.index.lookup("Aachener Str.", "12A")), ["Becker"])
+        self.assertEqual(names(self.index.lookup("Aachener Str. 71", postal_code="50674")), ["Schmidt", "Weber"])
+        self.assertEqual(names(self.index.lookup("Aachener Str. 71", city="Aachen")), ["Wolf"])
+        self.assertEqual(len(self.index.lookup("Aachener Str.")), 4)
+        self.assertEqual(self.index.lookup("Aachener Str. 7"), [])
+        self.assertEqual(self.index.lookup("Kölner Str. 71"), [])
+
+    def test_find_in_text(self):
+        """Test address detection in free-text questions"""
+        rows = self.index.find_in_text("Wer wohnt in der Von-Waldthausen-Str. 44?")
+        self.assertEqual([row["NAME"] for row in rows], ["Krause"])
+
+        rows = self.index.find_in_text("Mieter Aachener Straße 71 in 52062")
+        self.assertEqual([row["NAME"] for row in rows], ["Wolf"])
+
+        self.assertEqual(self.index.find_in_text("Wie hoch ist die Miete 2024?"), [])
+
+
+class TestAddressSearchIntegration(unittest.TestCase):
+    """Address index in optimized search and data access layer"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.search = WincasaOptimizedSearch(rag_data_dir=str(RAG_DATA_DIR), api_key_file="",
+                                            debug_mode=False, snapshot_dir=None)
+
+    def test_optimized_search_ranks_address_first(self):
+        """Test exact street + number hits rank above term matches"""
+        results = self.search.optimized_search("Wer wohnt in der Von-Waldthausen-Str. 44?", max_results=10)
+        address_hits = [r for r in results if "adresse" in r.exact_matches]
+        self.assertTrue(address_hits)
+        self.assertEqual(results[:len(address_hits)], address_hits)
+        for result in address_hits:
+            self.assertTrue(result.entity_data["adresse"].startswith("Von-Waldthausen-Straße 44"))
+
+    def test_data_access_owner_search(self):
+        """Test JSON owner search uses normalized address keys"""
+        data_access = WincasaDataAccess(source="json")
+        result = data_access.search_owners_by_address("Neusser Str. 12")
+        self.assertTrue(result['success'])
+        self.assertIn("Janz", [owner.get('owner_last_name') for owner in result['data']])
+
+        result = data_access.search_owners_by_address("Neusser Straße 12", city="Düsseldorf")
+        self.assertEqual(result['data'], [])
+
+    def test_data_access_owner_regressions(self):
+        """Test ESTR values that the first index version matched too leniently"""
+        index = WincasaDataAccess(source="json")._get_address_index('01_eigentuemer', 'ESTR', 'EPLZORT')
+        self.assertEqual(len(index.lookup("Moltkestr.120")), 2)
+        self.assertEqual(len(index.lookup("Moltkestr. 120")), 6)
+        self.assertEqual(len(index.lookup("Ahestr. 11-15")), 1)
+        self.assertEqual(len(index.lookup("Ahestraße 11")), 2)
+        # Shared across instances - no rebuild per tool call
+        self.assertIs(WincasaDataAccess(source="json")._get_address_index('01_eigentuemer', 'ESTR', 'EPLZORT'),
+                      index)
+
+    def test_data_access_index_follows_export(self):
+        """Test the address index is rebuilt when the export file changes"""
+        with tempfile.TemporaryDirectory() as json_dir:
+            export_file = Path(json_dir) / "01_eigentuemer.json"
+            loader = Layer4JSONLoader()
+            loader.json_dir = Path(json_dir)
+            data_access = WincasaDataAccess(source="json")
+            data_access._json_loader = loader
+
+            export_file.write_text(json.dumps({"data": [{"ESTR": "Ahestr. 11", "EPLZORT": "45127 Essen"}]}))
+            self.assertEqual(len(data_access._search_owners_json("Ahestr. 11")['data']), 1)
+
+            export_file.write_text(json.dumps({"data": [{"ESTR": "Ahestr. 11", "EPLZORT": "45127 Essen"},
+                                                        {"ESTR": "Ahestr. 11", "EPLZORT": "45128 Essen"}]}))
+            os.utime(export_file, ns=(os.stat(export_file).st_atime_ns, os.stat(export_file).st_mtime_ns + 10 ** 9))
+            self.assertEqual(len(data_access._search_owners_json("Ahestr. 11")['data']), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
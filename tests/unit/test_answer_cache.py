@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+WINCASA Answer Cache - Unit Tests
+LRU/TTL, Datenversion und Anbindung an den Query Engine
+"""
+
+import sys
+from pathlib import Path
+# Add src directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import os
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+from wincasa.core.answer_cache import (AnswerCache, DataVersionTracker,
+                                       normalize_query)
+from wincasa.core.component_registry import get_registry
+from wincasa.core.wincasa_query_engine import WincasaQueryEngine
+
+
+class CountingUnifiedSystem:
+    """Unified System, das Aufrufe zählt"""
+
+    def __init__(self, confidence=0.9):
+        self.calls = 0
+        self.confidence = confidence
+
+    def process_query(self, query):
+        self.calls += 1
+        return SimpleNamespace(final_answer=f"Template: {query}", confidence=self.confidence, result_count=3,
+                               processing_path="template", processing_time_ms=1.0)
+
+
+class TestAnswerCache(unittest.TestCase):
+    """Unit tests for AnswerCache"""
+
+    def setUp(self):
+        self.version = "v1"
+        self.cache = AnswerCache(max_entries=2, ttl_seconds=60, version_provider=lambda: self.version)
+
+    def test_normalized_keys(self):
+        """Test spelling variants of one question share an entry"""
+        self.assertEqual(normalize_query("  Freie Wohnungen in ESSEN? "), "freie wohnungen in essen")
+        self.cache.put("Freie Wohnungen in Essen", "unified", "gpt", {"answer": "3"})
+        self.assertEqual(self.cache.get("freie  wohnungen in essen?", "unified", "gpt"), {"answer": "3"})
+        self.assertIsNone(self.cache.get("Freie Wohnungen in Essen", "legacy_json_vanilla", "gpt"))
+        self.assertIsNone(self.cache.get("Freie Wohnungen in Essen", "unified", "gpt-4o"))
+
+    def test_lru_eviction_and_ttl(self):
+        """Test size bound evicts the least recently used entry and TTL expires entries"""
+        self.cache.put("a", "unified", "gpt", {"answer": "a"})
+        self.cache.put("b", "unified", "gpt", {"answer": "b"})
+        self.cache.get("a", "unified", "gpt")
+        self.cache.put("c", "unified", "gpt", {"answer": "c"})
+        self.assertIsNone(self.cache.get("b", "unified", "gpt"))
+        self.assertIsNotNone(self.cache.get("a", "unified", "gpt"))
+        self.assertEqual(self.cache.get_stats()["evictions"], 1)
+
+        self.cache.ttl_seconds = 0
+        time.sleep(0.01)
+        self.assertIsNone(self.cache.get("a", "unified", "gpt"))
+        self.assertEqual(self.cache.get_stats()["expirations"], 1)
+
+    def test_data_version_invalidates(self):
+        """Test a new data version drops all entries"""
+        self.cache.put("a", "unified", "gpt", {"answer": "a"})
+        self.version = "v2"
+        self.assertIsNone(self.cache.get("a", "unified", "gpt"))
+        stats = self.cache.get_stats()
+        self.assertEqual((stats["invalidations"], stats["size"], stats["data_version"]), (1, 0, "v2"))
+        self.assertEqual(stats["hit_rate"], 0.0)
+
+    def test_put_from_outdated_version_dropped(self):
+        """Test an answer computed from data that changed meanwhile is not stored"""
+        computed_from = self.cache.current_version()
+        self.version = "v2"
+        self.cache.put("a", "unified", "gpt", {"answer": "alt"}, data_version=computed_from)
+        self.assertIsNone(self.cache.get("a", "unified", "gpt"))
+        self.assertEqual(self.cache.get_stats()["stale_puts"], 1)
+
+        self.cache.put("a", "unified", "gpt", {"answer": "neu"}, data_version=self.cache.current_version())
+        self.assertEqual(self.cache.get("a", "unified", "gpt"), {"answer": "neu"})
+
+    def test_version_tracker(self):
+        """Test the tracker notices changed export files"""
+        with tempfile.TemporaryDirectory() as export_dir:
+            export_file = Path(export_dir) / "05_objekte.json"
+            export_file.write_text("[]")
+            tracker = DataVersionTracker([Path(export_dir), Path(export_dir) / "missing.FDB"], check_interval=0)
+            first = tracker.current()
+            self.assertEqual(tracker.current(), first)
+
+            export_file.write_text('[{"ONR": 1}]')
+            os.utime(export_file, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+            self.assertNotEqual(tracker.current(), first)
+
+
+class TestEngineAnswerCache(unittest.TestCase):
+    """Answer cache inside WincasaQueryEngine"""
+
+    def setUp(self):
+        get_registry().provide("config", SimpleNamespace(get_llm_config=lambda: {"model": "test-model"}))
+        self.version = "v1"
+        self.unified = CountingUnifiedSystem()
+        self.engine = WincasaQueryEngine(config_file="does/not/exist.json", unified_system=self.unified,
+                                         semantic_engine=False, search_system=object(),
+                                         answer_cache=AnswerCache(version_provider=lambda: self.version))
+
+    def tearDown(self):
+        get_registry().reset("config")
+
+    def test_repeated_query_served_from_cache(self):
+        """Test a second user gets the cached answer without recomputation"""
+        first = self.engine.process_query("Portfolio von Bona Casa GmbH", "user1", force_mode="unified")
+        second = self.engine.process_query("portfolio von bona casa gmbh?", "user2", force_mode="unified")
+
+        self.assertEqual(self.unified.calls, 1)
+        self.assertEqual(second.answer, first.answer)
+        self.assertEqual((second.engine_version, second.processing_mode), ("answer_cache", "template"))
+        self.assertEqual(second.cost_estimate, 0.0)
+        self.assertEqual(self.engine.query_stats["cache_queries"], 1)
+        self.assertEqual(self.engine.answer_cache.get_stats()["hit_rate"], 0.5)
+
+        self.version = "v2"
+        self.engine.process_query("Portfolio von Bona Casa GmbH", "user3", force_mode="unified")
+        self.assertEqual(self.unified.calls, 2)
+
+    def test_export_during_computation_not_cached(self):
+        """Test a re-export while the query runs keeps the old answer out of the cache"""
+        process_query = self.unified.process_query
+
+        def process_query_during_export(query):
+            self.version = "v2"
+            return process_query(query)
+
+        self.unified.process_query = process_query_during_export
+        self.engine.process_query("Portfolio von Bona Casa GmbH", force_mode="unified")
+        self.unified.process_query = process_query
+        self.engine.process_query("Portfolio von Bona Casa GmbH", force_mode="unified")
+
+        self.assertEqual(self.unified.calls, 2)
+        self.assertEqual(self.engine.answer_cache.get_stats()["stale_puts"], 1)
+
+    def test_low_confidence_not_cached(self):
+        """Test uncertain answers are recomputed"""
+        self.unified.confidence = 0.4
+        for _ in range(2):
+            self.engine.process_query("Irgendwas Unklares", force_mode="unified")
+        self.assertEqual(self.unified.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+WINCASA Async Query Pipeline - Unit Tests
+Parallele process_query_async-Aufrufe, Executor-Zuordnung und Speculative Mode
+ohne echte LLM-/DB-Zugriffe
+"""
+
+import sys
+from pathlib import Path
+# Add src directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import asyncio
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from wincasa.core.async_executors import call_db, run_db, run_io
+from wincasa.core.component_registry import get_registry
+from wincasa.core.wincasa_query_engine import WincasaQueryEngine
+
+LLM_DELAY = 0.2
+
+
+class FakeLLMHandler:
+    """Async LLM Handler mit fester Latenz"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def query_llm_async(self, user_query, mode=None):
+        self.calls.append((user_query, mode))
+        await asyncio.sleep(LLM_DELAY)
+        return {"answer": f"Antwort: {user_query}", "result_count": 1}
+
+    def query_llm(self, user_query, mode=None):
+        self.calls.append((user_query, mode))
+        time.sleep(LLM_DELAY)
+        return {"answer": f"Antwort: {user_query}", "result_count": 1}
+
+
+class FakeUnifiedSystem:
+    """Unified System, das den ausführenden Thread protokolliert"""
+
+    def __init__(self, delay=0.0, confidence=0.9):
+        self.threads = []
+        self.delay = delay
+        self.confidence = confidence
+
+    def process_query(self, query):
+        self.threads.append(threading.current_thread().name)
+        time.sleep(self.delay)
+        return SimpleNamespace(final_answer=f"Template: {query}", confidence=self.confidence, result_count=2,
+                               processing_path="template", processing_time_ms=1.0)
+
+
+class TestAsyncPipeline(unittest.TestCase):
+    """Unit tests for WincasaQueryEngine.process_query_async"""
+
+    def setUp(self):
+        self.handler = FakeLLMHandler()
+        self.unified = FakeUnifiedSystem()
+        get_registry().provide("llm_handler", self.handler)
+        self.engine = WincasaQueryEngine(config_file="does/not/exist.json", unified_system=self.unified,
+                                         semantic_engine=False, search_system=object())
+
+    def tearDown(self):
+        get_registry().reset("llm_handler")
+
+    def test_concurrent_legacy_queries_overlap(self):
+        """Test parallel LLM-bound queries share one event loop without serializing"""
+        queries = [f"Frage {i}" for i in range(20)]
+
+        async def run_all():
+            return await asyncio.gather(*(self.engine.process_query_async(q, force_mode="legacy")
+                                          for q in queries))
+
+        start_time = time.time()
+        results = asyncio.run(run_all())
+        elapsed = time.time() - start_time
+
+        self.assertLess(elapsed, LLM_DELAY * 5)
+        self.assertEqual([r.answer for r in results], [f"Antwort: {q}" for q in queries])
+        self.assertTrue(all(r.processing_mode == "legacy_json_vanilla" for r in results))
+        self.assertEqual(self.engine.query_stats["total_queries"], len(queries))
+        self.assertEqual(self.engine.query_stats["legacy_queries"], len(queries))
+
+    def test_unified_queries_run_on_io_pool(self):
+        """Test unified queries overlap in the IO pool and only their SQL is serialized on the DB thread"""
+        sql_threads = []
+        self.unified.delay = LLM_DELAY
+        process_query = self.unified.process_query
+
+        def process_with_sql(query):
+            sql_threads.append(call_db(lambda: threading.current_thread().name))
+            return process_query(query)
+
+        self.unified.process_query = process_with_sql
+
+        async def run_all():
+            return await asyncio.gather(*(self.engine.process_query_async(f"Mieter {i}", force_mode="unified")
+                                          for i in range(5)))
+
+        start_time = time.time()
+        results = asyncio.run(run_all())
+        elapsed = time.time() - start_time
+
+        self.assertLess(elapsed, LLM_DELAY * 3)
+        self.assertTrue(all(r.processing_mode == "template" for r in results))
+        self.assertTrue(all(name.startswith("wincasa-io") for name in self.unified.threads))
+        self.assertEqual(len(set(sql_threads)), 1)
+        self.assertTrue(sql_threads[0].startswith("wincasa-db"))
+        self.assertEqual(self.engine.histograms.total_count, 5)
+        self.assertEqual(self.handler.calls, [])
+
+    def test_unified_error_falls_back_to_async_legacy(self):
+        """Test unified failures use the async legacy path"""
+        def fail(query):
+            raise RuntimeError("Firebird nicht erreichbar")
+        self.unified.process_query = fail
+
+        result = asyncio.run(self.engine.process_query_async("Leerstand", force_mode="unified"))
+        self.assertEqual(result.processing_mode, "legacy_fallback")
+        self.assertEqual(result.answer, "Antwort: Leerstand")
+
+    def test_stats_consistent_under_concurrency(self):
+        """Test query_stats counters and running averages stay exact when queries finish on many threads"""
+        outcome = {"route": "unified", "processing_mode": "template", "engine_version": "unified_v2",
+                   "answer": "Template", "confidence": 0.9, "result_count": 1, "cost_estimate": 0.5}
+        threads_count, per_thread = 8, 250
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=lambda: [self.engine._finish_query("Mieter", None, time.time(),
+                                                                                  outcome, None, None)
+                                                        for _ in range(per_thread)])
+                       for _ in range(threads_count)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+        stats = self.engine.query_stats
+        self.assertEqual(stats["total_queries"], threads_count * per_thread)
+        self.assertEqual(stats["unified_queries"], threads_count * per_thread)
+        self.assertAlmostEqual(stats["avg_cost_per_query"], 0.5)
+
+    def test_executors(self):
+        """Test run_db uses one thread and run_io a separate pool"""
+        async def names():
+            db = await asyncio.gather(*(run_db(lambda: threading.current_thread().name) for _ in range(4)))
+            io = await run_io(lambda: threading.current_thread().name)
+            return db, io
+
+        db, io = asyncio.run(names())
+        self.assertEqual(len(set(db)), 1)
+        self.assertTrue(io.startswith("wincasa-io"))
+
+        # call_db on the DB thread itself runs inline instead of deadlocking
+        nested = asyncio.run(run_db(call_db, lambda: threading.current_thread().name))
+        self.assertEqual(nested, db[0])
+
+
+class TestSpeculativeExecution(unittest.TestCase):
+    """Unit tests for the speculative (hedged) routing mode"""
+
+    def setUp(self):
+        self.handler = FakeLLMHandler()
+        get_registry().provide("llm_handler", self.handler)
+
+    def tearDown(self):
+        get_registry().reset("llm_handler")
+
+    def make_engine(self, unified, hedge_delay_ms):
+        engine = WincasaQueryEngine(config_file="does/not/exist.json", unified_system=unified,
+                                    semantic_engine=False, search_system=object())
+        engine.config["speculative"]["hedge_delay_ms"] = hedge_delay_ms
+        return engine
+
+    def test_fast_template_wins_without_hedge(self):
+        """Test a confident template answer returns before the hedge fires"""
+        engine = self.make_engine(FakeUnifiedSystem(), hedge_delay_ms=500)
+        result = engine.process_query("Mieter Aachener Str. 71", force_mode="unified", speculative=True)
+
+        self.assertEqual(result.processing_mode, "template")
+        self.assertEqual(result.speculative_details["winner"], "unified")
+        self.assertFalse(result.speculative_details["hedged"])
+        self.assertEqual(self.handler.calls, [])
+        self.assertEqual(engine.query_stats["unified_queries"], 1)
+
+    def test_hedge_wins_and_cancels_slow_path(self):
+        """Test the legacy hedge answers while the slow template path is cancelled"""
+        engine = self.make_engine(FakeUnifiedSystem(delay=LLM_DELAY * 4), hedge_delay_ms=20)
+
+        start_time = time.time()
+        result = asyncio.run(engine.process_query_async("Leerstand Essen", force_mode="unified",
+                                                        speculative=True))
+        elapsed = time.time() - start_time
+
+        self.assertLess(elapsed, LLM_DELAY * 3)
+        self.assertEqual(result.answer, "Antwort: Leerstand Essen")
+        details = result.speculative_details
+        self.assertEqual((details["winner"], details["cancelled"], details["hedged"]), ("legacy", ["unified"], True))
+        self.assertGreater(details["wasted_time_ms"], 0)
+        self.assertGreater(details["wasted_cost"], 0)
+
+        stats = engine._get_speculative_stats()
+        self.assertEqual((stats["queries"], stats["hedge_rate"], stats["hedge_win_rate"]), (1, 1.0, 1.0))
+        self.assertEqual((engine.query_stats["legacy_queries"], engine.query_stats["unified_queries"]), (1, 0))
+
+    def test_low_confidence_starts_hedge_immediately(self):
+        """Test a miss on the cheap paths does not wait for the hedge delay"""
+        engine = self.make_engine(FakeUnifiedSystem(confidence=0.2), hedge_delay_ms=10000)
+
+        start_time = time.time()
+        result = engine.process_query("Bericht Rückstände", force_mode="unified", speculative=True)
+
+        self.assertLess(time.time() - start_time, LLM_DELAY * 3)
+        self.assertEqual(result.speculative_details["winner"], "legacy")
+        self.assertEqual(result.speculative_details["cancelled"], [])
+        self.assertEqual(result.speculative_details["wasted_cost"], 0.01)
+
+    def test_disabled_by_default(self):
+        """Test speculative mode is opt-in"""
+        engine = self.make_engine(FakeUnifiedSystem(), hedge_delay_ms=0)
+        result = engine.process_query("Mieter", force_mode="unified")
+        self.assertIsNone(result.speculative_details)
+        self.assertEqual(engine.query_stats["speculative_queries"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
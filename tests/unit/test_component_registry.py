@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+WINCASA Component Registry - Unit Tests
+Einmaliges Bauen, Injektion und Zyklus-Erkennung ohne echte Komponenten
+"""
+
+import sys
+from pathlib import Path
+# Add src directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import threading
+import time
+import unittest
+
+from wincasa.core.component_registry import (DEFAULT_FACTORIES,
+                                             ComponentRegistry, get_registry)
+
+
+class TestComponentRegistry(unittest.TestCase):
+    """Unit tests for ComponentRegistry"""
+
+    def setUp(self):
+        self.builds = []
+
+        def build_search():
+            self.builds.append("search")
+            time.sleep(0.01)
+            return object()
+
+        def build_engine():
+            self.builds.append("engine")
+            return {"search": self.registry.get("search")}
+
+        self.registry = ComponentRegistry({"search": build_search, "engine": build_engine})
+
+    def test_builds_once(self):
+        """Test components are built once and shared by dependents"""
+        engine = self.registry.get("engine")
+        self.assertIs(engine["search"], self.registry.get("search"))
+        self.assertIs(self.registry.get("engine"), engine)
+        self.assertEqual(sorted(self.builds), ["engine", "search"])
+        self.assertEqual(self.registry.get_stats()["built"], ["engine", "search"])
+
+    def test_concurrent_get_builds_once(self):
+        """Test concurrent first access builds a single instance"""
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.registry.get("search")))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.builds, ["search"])
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_provide_and_reset(self):
+        """Test injected instances and rebuild after reset"""
+        fake_search = object()
+        self.registry.provide("search", fake_search)
+        self.assertIs(self.registry.get("engine")["search"], fake_search)
+        self.assertNotIn("search", self.builds)
+
+        self.registry.reset("search")
+        self.assertFalse(self.registry.is_built("search"))
+        self.assertIsNot(self.registry.get("search"), fake_search)
+
+    def test_unknown_and_cyclic_components(self):
+        """Test unknown names and dependency cycles fail loudly"""
+        with self.assertRaises(KeyError):
+            self.registry.get("missing")
+
+        self.registry.register("a", lambda: self.registry.get("b"))
+        self.registry.register("b", lambda: self.registry.get("a"))
+        with self.assertRaises(RuntimeError):
+            self.registry.get("a")
+
+    def test_default_registry(self):
+        """Test the process-wide registry knows the heavy components"""
+        self.assertIs(get_registry(), get_registry())
+        for name in ("config", "layer4_json_loader", "optimized_search", "llm_handler",
+                     "unified_template_system", "semantic_template_engine", "query_engine"):
+            self.assertIn(name, DEFAULT_FACTORIES)
+
+    def test_data_layer_does_not_use_registry(self):
+        """Test wincasa.data gets its dependencies injected instead of pulling them from the registry"""
+        data_dir = Path(__file__).parent.parent.parent / "src" / "wincasa" / "data"
+        for module in data_dir.glob("*.py"):
+            source = module.read_text(encoding="utf-8")
+            self.assertNotIn("component_registry", source, module.name)
+            self.assertNotIn("get_component(", source, module.name)
+
+
+if __name__ == '__main__':
+    unittest.main()
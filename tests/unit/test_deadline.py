@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+WINCASA Request Deadlines - Unit Tests
+Budget-Prüfung, Weitergabe an Threads/DB und Degradierung im Query Engine
+"""
+
+import sys
+from pathlib import Path
+# Add src directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import asyncio
+import time
+import unittest
+from types import SimpleNamespace
+
+from wincasa.core import llm_handler
+from wincasa.core.async_executors import run_io
+from wincasa.core.component_registry import get_registry
+from wincasa.core.deadline import (Deadline, DeadlineExceeded, check_deadline,
+                                   current_deadline, deadline_scope,
+                                   raise_if_deadline_caused, remaining_timeout)
+from wincasa.core.llm_handler import WincasaLLMHandler
+from wincasa.core.wincasa_query_engine import WincasaQueryEngine
+from wincasa.data import db_singleton
+from wincasa.data.db_singleton import execute_on_cursor
+
+LLM_DELAY = 0.3
+
+
+class TimeoutAwareLLMHandler:
+    """LLM Handler, der wie der HTTP-Client das Restbudget als Timeout nutzt"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def query_llm(self, user_query, mode=None):
+        self.calls += 1
+        timeout = remaining_timeout("llm", LLM_DELAY)
+        time.sleep(timeout)
+        if timeout < LLM_DELAY:
+            raise_if_deadline_caused("llm", TimeoutError("Request timed out"))
+        return {"answer": f"Antwort: {user_query}", "result_count": 1}
+
+
+class SlowUnifiedSystem:
+    """Unified System mit fester Latenz, prüft danach das Budget"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.deadlines = []
+
+    def process_query(self, query):
+        self.deadlines.append(current_deadline())
+        time.sleep(self.delay)
+        check_deadline("unified")
+        return SimpleNamespace(final_answer=f"Template: {query}", confidence=0.9, result_count=1,
+                               processing_path="template", processing_time_ms=self.delay * 1000)
+
+
+class TestDeadline(unittest.TestCase):
+    """Unit tests for Deadline and its context propagation"""
+
+    def test_budget(self):
+        """Test remaining budget, timeouts and expiry"""
+        deadline = Deadline(50)
+        self.assertFalse(deadline.expired)
+        self.assertLessEqual(deadline.timeout("llm", cap=0.01), 0.01)
+        self.assertGreater(deadline.remaining_ms(), 0)
+        time.sleep(0.06)
+        self.assertTrue(deadline.expired)
+        self.assertEqual(deadline.remaining(), 0.0)
+        with self.assertRaises(DeadlineExceeded) as context:
+            deadline.check("sql")
+        self.assertEqual(context.exception.stage, "sql")
+
+    def test_scope_and_thread_propagation(self):
+        """Test the deadline reaches executor threads and is reset afterwards"""
+        self.assertIsNone(current_deadline())
+        self.assertEqual(remaining_timeout("llm", 5.0), 5.0)
+        deadline = Deadline(1000)
+
+        async def in_thread():
+            with deadline_scope(deadline):
+                return await run_io(current_deadline)
+
+        self.assertIs(asyncio.run(in_thread()), deadline)
+        self.assertIsNone(current_deadline())
+
+    def test_sql_statement_timeout(self):
+        """Test SQL gets the remaining budget as statement timeout"""
+        statement = SimpleNamespace()
+        cursor = SimpleNamespace(prepare=lambda query: statement, executed=[])
+        cursor.execute = lambda query, *params: cursor.executed.append(query)
+
+        self.assertIsNone(execute_on_cursor(cursor, "SELECT 1 FROM RDB$DATABASE"))
+        self.assertEqual(cursor.executed, ["SELECT 1 FROM RDB$DATABASE"])
+
+        with deadline_scope(Deadline(2000)):
+            self.assertIs(execute_on_cursor(cursor, "SELECT 1 FROM RDB$DATABASE"), statement)
+        self.assertIs(cursor.executed[-1], statement)
+        self.assertTrue(0 < statement._timeout <= 2000)
+
+        with deadline_scope(Deadline(0.001)):
+            time.sleep(0.005)
+            with self.assertRaises(DeadlineExceeded):
+                execute_on_cursor(cursor, "SELECT 1 FROM RDB$DATABASE")
+
+    def test_prepared_statement_freed_after_fetch(self):
+        """Test execute_query frees the deadline statement once rows are fetched, also on errors"""
+        events = []
+        statement = SimpleNamespace(free=lambda: events.append("free"))
+        cursor = SimpleNamespace(prepare=lambda query: statement, close=lambda: events.append("close"),
+                                 execute=lambda query, *params: events.append("execute"),
+                                 fetchall=lambda: events.append("fetch") or [(1,)])
+        connection = SimpleNamespace(cursor=lambda: cursor, rollback=lambda: None)
+        original = db_singleton.get_db_connection
+        db_singleton.get_db_connection = lambda: connection
+        try:
+            with deadline_scope(Deadline(2000)):
+                self.assertEqual(db_singleton.execute_query("SELECT 1 FROM RDB$DATABASE"), [(1,)])
+            self.assertEqual(events, ["execute", "fetch", "free", "close"])
+
+            events.clear()
+            cursor.fetchall = lambda: 1 / 0
+            with deadline_scope(Deadline(2000)):
+                with self.assertRaises(ZeroDivisionError):
+                    db_singleton.execute_query("SELECT 1 FROM RDB$DATABASE")
+            self.assertEqual(events, ["execute", "free"])
+        finally:
+            db_singleton.get_db_connection = original
+
+    def test_llm_sql_tools_use_statement_timeout(self):
+        """Test the LLM SQL tools run with the statement timeout and abort once the budget is gone"""
+        events = []
+        statement = SimpleNamespace(free=lambda: events.append("free"))
+        cursor = SimpleNamespace(prepare=lambda query: statement, close=lambda: events.append("close"),
+                                 execute=lambda query, *params: events.append("execute"),
+                                 fetchall=lambda: [(1,)], description=[("ANZAHL",)])
+        connection = SimpleNamespace(cursor=lambda: cursor, close=lambda: events.append("disconnect"))
+        handler = WincasaLLMHandler.__new__(WincasaLLMHandler)
+        original = llm_handler.get_connection
+        llm_handler.get_connection = lambda: connection
+        try:
+            with deadline_scope(Deadline(2000)):
+                answer = handler._execute_sql_function({"sql": "SELECT COUNT(*) FROM BEWOHNER"}, "q1")
+            self.assertIn("ANZAHL", answer)
+            self.assertEqual(events, ["execute", "free", "close", "disconnect"])
+            self.assertTrue(0 < statement._timeout <= 2000)
+
+            def timed_out():
+                time.sleep(0.005)
+                raise RuntimeError("statement timeout")
+            cursor.fetchall = timed_out
+            with deadline_scope(Deadline(1)):
+                with self.assertRaises(DeadlineExceeded):
+                    handler._execute_tenant_search_function({"street": "Aachener Str."}, "q2")
+                with self.assertRaises(DeadlineExceeded):
+                    handler._execute_function("execute_sql_query", {"sql": "SELECT 1 FROM RDB$DATABASE"},
+                                              SimpleNamespace(query_id="q3", mode="vanilla_sql",
+                                                              is_json_mode=False))
+        finally:
+            llm_handler.get_connection = original
+
+
+class TestEngineDeadline(unittest.TestCase):
+    """Deadline enforcement in WincasaQueryEngine"""
+
+    def setUp(self):
+        self.handler = TimeoutAwareLLMHandler()
+        get_registry().provide("llm_handler", self.handler)
+
+    def tearDown(self):
+        get_registry().reset("llm_handler")
+
+    def make_engine(self, unified):
+        return WincasaQueryEngine(config_file="does/not/exist.json", unified_system=unified,
+                                  semantic_engine=False, search_system=object(), answer_cache=None)
+
+    def test_legacy_call_bounded_by_deadline(self):
+        """Test a slow LLM call returns the timeout answer at the deadline"""
+        engine = self.make_engine(SlowUnifiedSystem(0))
+        start_time = time.time()
+        result = engine.process_query("Erstelle einen Bericht", force_mode="legacy", deadline_ms=50)
+
+        self.assertLess(time.time() - start_time, LLM_DELAY)
+        self.assertEqual(result.processing_mode, "deadline_exceeded")
+        self.assertIn("50ms", result.answer)
+        self.assertIn("llm", result.error_details)
+        self.assertEqual(engine.query_stats["timeout_queries"], 1)
+
+    def test_expired_budget_skips_legacy_fallback(self):
+        """Test an exhausted budget in the unified path does not start the LLM"""
+        unified = SlowUnifiedSystem(0.02)
+        engine = self.make_engine(unified)
+        result = engine.process_query("Mieter Essen", force_mode="unified", deadline_ms=5)
+
+        self.assertEqual(result.processing_mode, "deadline_exceeded")
+        self.assertEqual(self.handler.calls, 0)
+        self.assertEqual(unified.deadlines[0].budget_ms, 5)
+
+    def test_default_budget_from_config(self):
+        """Test performance.max_processing_time_ms is the default budget"""
+        unified = SlowUnifiedSystem(0)
+        engine = self.make_engine(unified)
+        result = engine.process_query("Mieter Essen", force_mode="unified")
+        self.assertEqual(result.processing_mode, "template")
+        self.assertEqual(unified.deadlines[0].budget_ms,
+                         engine.config["performance"]["max_processing_time_ms"])
+
+    def test_speculative_race_bounded_by_deadline(self):
+        """Test the speculative race returns at the deadline without a winner"""
+        engine = self.make_engine(SlowUnifiedSystem(LLM_DELAY))
+        engine.config["speculative"]["hedge_delay_ms"] = 10000
+
+        start_time = time.time()
+        result = asyncio.run(engine.process_query_async("Leerstand", force_mode="unified",
+                                                        speculative=True, deadline_ms=50))
+        self.assertLess(time.time() - start_time, LLM_DELAY)
+        self.assertEqual(result.processing_mode, "deadline_exceeded")
+        self.assertEqual(result.speculative_details["winner"], "timeout")
+        self.assertEqual(result.speculative_details["cancelled"], ["unified"])
+        # Cancelled template work keeps the DB thread busy until it finishes
+        time.sleep(LLM_DELAY)
+
+
+if __name__ == '__main__':
+    unittest.main()
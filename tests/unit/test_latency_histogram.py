@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+WINCASA Streaming Histograms - Unit Tests
+Perzentil-Genauigkeit, feste Speichergröße und Zeitfenster
+"""
+
+import sys
+from pathlib import Path
+# Add src directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import random
+import unittest
+
+from wincasa.monitoring.latency_histogram import (PerformanceHistograms,
+                                                  StreamingHistogram,
+                                                  WindowedHistogram)
+
+
+class TestStreamingHistogram(unittest.TestCase):
+    """Unit tests for StreamingHistogram"""
+
+    def test_percentiles_within_relative_accuracy(self):
+        """Test percentiles match exact values within the configured accuracy"""
+        rng = random.Random(42)
+        values = [rng.lognormvariate(4, 1.2) for _ in range(20000)]
+        histogram = StreamingHistogram(relative_accuracy=0.01)
+        for value in values:
+            histogram.record(value)
+
+        values.sort()
+        for p, estimate in histogram.percentiles((50, 95, 99, 99.9)).items():
+            exact = values[int(p / 100 * (len(values) - 1))]
+            self.assertLess(abs(estimate - exact) / exact, 0.02, p)
+        self.assertEqual(histogram.max, values[-1])
+        self.assertAlmostEqual(histogram.mean, sum(values) / len(values))
+
+    def test_fixed_memory(self):
+        """Test the bucket count is bounded regardless of the number of values"""
+        histogram = StreamingHistogram(min_value=0.01, max_value=1000.0)
+        for i in range(100000):
+            histogram.record((i % 5000) * 0.37)
+        histogram.record(10 ** 9)
+        self.assertLessEqual(len(histogram._counts), histogram.bucket_limit)
+        self.assertEqual(histogram.count, 100001)
+        self.assertEqual(histogram.percentile(100), 10 ** 9)
+
+    def test_zero_values_and_merge(self):
+        """Test zero costs and merging of partial histograms"""
+        first, second = StreamingHistogram(), StreamingHistogram()
+        for _ in range(90):
+            first.record(0.0)
+        for _ in range(10):
+            second.record(0.05)
+        first.merge(second)
+        self.assertEqual(first.percentile(50), 0.0)
+        self.assertAlmostEqual(first.percentile(95), 0.05, places=3)
+        self.assertEqual(StreamingHistogram().to_dict(), {"count": 0})
+
+
+class TestWindows(unittest.TestCase):
+    """Time windows and per-path aggregation"""
+
+    def test_windowed_histogram(self):
+        """Test old slots drop out of short windows but stay in 'all'"""
+        histogram = WindowedHistogram()
+        now = 1_000_000.0
+        histogram.record(1000.0, now=now - 600)
+        histogram.record(10.0, now=now)
+        self.assertEqual(histogram.snapshot(60, now=now).count, 1)
+        self.assertEqual(histogram.snapshot(900, now=now).count, 2)
+        self.assertEqual(histogram.snapshot(None).count, 2)
+
+        # Ring slot is reused after an hour
+        histogram.record(20.0, now=now + 3600)
+        self.assertEqual(histogram.snapshot(3600, now=now + 3600).count, 1)
+
+    def test_performance_histograms(self):
+        """Test per-path summaries and overall percentiles"""
+        histograms = PerformanceHistograms()
+        for i in range(100):
+            histograms.record("template", "unified_v2", 20 + i, 0.01, 3, 0.9)
+        histograms.record("legacy_json_vanilla", "legacy_v1", 4000, 0.0, 0, 0.2)
+
+        snapshot = histograms.snapshot("5m")
+        self.assertEqual(set(snapshot["paths"]), {"template/unified_v2", "legacy_json_vanilla/legacy_v1"})
+        self.assertEqual(snapshot["overall"]["latency_ms"]["count"], 101)
+        self.assertEqual(snapshot["overall"]["latency_ms"]["max"], 4000)
+        self.assertAlmostEqual(snapshot["paths"]["template/unified_v2"]["latency_ms"]["p50"], 69.5, delta=1)
+        self.assertEqual(snapshot["paths"]["template/unified_v2"]["cost_usd"]["p95"], 0.01)
+        self.assertAlmostEqual(histograms.quality()["success_rate"], 100 / 101)
+
+        with self.assertRaises(ValueError):
+            histograms.snapshot("2d")
+
+
+if __name__ == '__main__':
+    unittest.main()
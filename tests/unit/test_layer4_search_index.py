@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+WINCASA Layer 4 Search Index - Unit Tests
+Invertierter Index über JSON-Exporte ohne Datenbank
+"""
+
+import sys
+from pathlib import Path
+# Add src directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from wincasa.data.layer4_json_loader import QUERY_CATEGORIES, Layer4JSONLoader
+from wincasa.data.layer4_search_index import Layer4SearchIndex
+
+CATALOG = [query_name for queries_dict in QUERY_CATEGORIES.values() for query_name in queries_dict]
+
+
+def _write_export(json_dir: Path, name: str, rows):
+    columns = list(rows[0].keys()) if rows else []
+    export = {
+        "query_info": {"name": name},
+        "columns": columns,
+        "data": rows,
+        "summary": {"row_count": len(rows)}
+    }
+    (json_dir / f"{name}.json").write_text(json.dumps(export, ensure_ascii=False), encoding="utf-8")
+
+
+class TestLayer4SearchIndex(unittest.TestCase):
+    """Unit tests for Layer4SearchIndex"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        _write_export(self.tmp_dir, "03_aktuelle_mieter", [
+            {"NAME": "Müller", "STRASSE": "Kettwiger Str. 23", "PLZ_ORT": "45127 Essen"},
+            {"NAME": "Weber", "STRASSE": "Aachener Str. 5", "PLZ_ORT": "50674 Köln"},
+            {"NAME": "Schmidt", "STRASSE": "Kettwiger Str. 7", "PLZ_ORT": "45127 Essen"},
+        ])
+        _write_export(self.tmp_dir, "09_konten", [
+            {"KBEZ": "Zentralheizung Wartung", "BETRAG": 120.5},
+            {"KBEZ": "Instandhaltung", "BETRAG": None},
+        ])
+        # Summary files are not data exports
+        (self.tmp_dir / "_export_summary.json").write_text(json.dumps({"NAME": "Müller"}))
+        self.index = Layer4SearchIndex(self.tmp_dir, check_interval=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _linear_scan(self, term: str, datasets, max_results: int = 100):
+        """Former Layer4JSONLoader.search_in_json: lower() substring over the datasets in order"""
+        search_lower = term.lower()
+        results = []
+        for name in datasets:
+            path = self.tmp_dir / f"{name}.json"
+            if not path.exists():
+                continue
+            for row in json.loads(path.read_text(encoding="utf-8"))["data"]:
+                if any(v is not None and search_lower in str(v).lower() for v in row.values()):
+                    results.append((name, row))
+                    if len(results) >= max_results:
+                        return results
+        return results
+
+    def test_matches_linear_scan(self):
+        """Test index hits equal a lower() substring scan"""
+        datasets = sorted(path.stem for path in self.tmp_dir.glob("[!_]*.json"))
+        for term in ["Müller", "mueller", "heizung", "Kettwiger Str. 23", "str", "45127", "5", "120.5", " Essen"]:
+            result = self.index.search(term)
+            self.assertEqual(result['total'], len(self._linear_scan(term, datasets, max_results=10**6)), term)
+
+    def test_catalog_parity_with_old_scan(self):
+        """Test a catalog-restricted index returns the same rows in the same order as the old scan"""
+        # Not in QUERY_CATEGORIES - the old scan never saw it
+        _write_export(self.tmp_dir, "02_mieter", [{"NAME": "Müller", "PLZ_ORT": "45127 Essen"}])
+        index = Layer4SearchIndex(self.tmp_dir, check_interval=0, datasets=CATALOG)
+
+        for term in ["Essen", "45127", "Müller", "MÜLLER", "mueller", "Köln", "koeln", "str", "Kettwiger Str"]:
+            for max_results in (1, 2, 100):
+                expected = self._linear_scan(term, CATALOG, max_results)
+                result = index.search(term, max_results=max_results)
+                self.assertEqual([(r['dataset'], r['data']) for r in result['results']], expected,
+                                 (term, max_results))
+
+    def test_compound_and_umlaut_match(self):
+        """Test infix terms and optional umlaut folding"""
+        result = self.index.search("Heizung")
+        self.assertEqual([r['data']['KBEZ'] for r in result['results']], ["Zentralheizung Wartung"])
+
+        self.assertEqual(self.index.search("KOELN")['total'], 0)
+        folding_index = Layer4SearchIndex(self.tmp_dir, check_interval=0, fold_umlauts=True)
+        result = folding_index.search("KOELN")
+        self.assertEqual(result['results'][0]['data']['NAME'], "Weber")
+        self.assertEqual(folding_index.search("mueller")['total'], 1)
+
+    def test_ngram_lookup_matches_vocabulary_scan(self):
+        """Test the n-gram index finds exactly the terms a substring scan over the vocabulary finds"""
+        state = self.index._get_state()
+        tokens = {term[start:end] for term in state.terms
+                  for start in range(len(term)) for end in range(start + 1, len(term) + 1)}
+        for token in sorted(tokens | {"zz", "heizx", "tralh"}):
+            expected = [position for position, term in enumerate(state.terms) if token in term]
+            self.assertEqual(sorted(self.index._infix_terms(state, token).tolist()), expected, token)
+
+    def test_multi_token_verification(self):
+        """Test multi-token queries require the whole phrase in one cell"""
+        result = self.index.search("Kettwiger Str. 23")
+        self.assertEqual(result['total'], 1)
+        self.assertEqual(result['results'][0]['dataset'], "03_aktuelle_mieter")
+        self.assertEqual(result['results'][0]['row_index'], 0)
+
+        self.assertEqual(self.index.search("Essen Müller")['total'], 0)
+
+    def test_facets_and_filters(self):
+        """Test facet counts and dataset/column filters"""
+        result = self.index.search("Essen")
+        self.assertEqual(result['facets']['datasets'], {"03_aktuelle_mieter": 2})
+        self.assertEqual(result['facets']['columns'], {"03_aktuelle_mieter.PLZ_ORT": 2})
+
+        self.assertEqual(self.index.search("Essen", datasets=["09_konten"])['total'], 0)
+        self.assertEqual(self.index.search("Essen", columns=["STRASSE"])['total'], 0)
+        self.assertEqual(self.index.search("Essen", columns=["03_aktuelle_mieter.PLZ_ORT"])['total'], 2)
+
+    def test_max_results_keeps_total(self):
+        """Test max_results limits rows but not the total"""
+        result = self.index.search("str", max_results=1)
+        self.assertEqual(len(result['results']), 1)
+        self.assertEqual(result['total'], 3)
+
+    def test_rebuild_on_export_change(self):
+        """Test the index is rebuilt when an export file changes"""
+        self.assertEqual(self.index.search("Becker")['total'], 0)
+
+        _write_export(self.tmp_dir, "09_konten", [{"KBEZ": "Becker Reparatur", "BETRAG": 1.0}])
+        path = self.tmp_dir / "09_konten.json"
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        self.assertEqual(self.index.search("Becker")['total'], 1)
+        self.assertEqual(self.index.search("Instandhaltung")['total'], 0)
+
+
+@unittest.skipUnless(Layer4JSONLoader().json_dir.joinpath("01_eigentuemer.json").exists(),
+                     "Layer 4 Exporte nicht vorhanden")
+class TestLayer4LoaderParity(unittest.TestCase):
+    """search_in_json on the shipped exports against the former linear scan"""
+
+    def test_search_in_json_matches_old_scan(self):
+        """Test counts and row order equal the old lower() scan over list_available_queries"""
+        loader = Layer4JSONLoader()
+
+        def old_search(term, max_results):
+            results = []
+            for query_info in loader.list_available_queries():
+                if not query_info['exists']:
+                    continue
+                for row in loader.load_json_data(query_info['name'])['data']:
+                    if any(term.lower() in str(value).lower() for value in row.values()):
+                        results.append((query_info['name'], query_info['category'], row))
+                        if len(results) >= max_results:
+                            return results
+            return results
+
+        for term in ["Essen", "45127", "GmbH", "Müller", "Kettwiger Str", "Mueller", "str."]:
+            for max_results in (50, 10**6):
+                expected = old_search(term, max_results)
+                actual = [(r['query'], r['category'], r['data']) for r in loader.search_in_json(term, max_results)]
+                self.assertEqual(len(actual), len(expected), term)
+                self.assertEqual(actual, expected, term)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+WINCASA Lazy Subsystems - Unit Tests
+Bau beim ersten Zugriff und Background Warm-up des Query Engines
+"""
+
+import sys
+from pathlib import Path
+# Add src directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from wincasa.core.component_registry import DEFAULT_FACTORIES, get_registry
+from wincasa.core.semantic_template_engine import SemanticTemplateEngine
+from wincasa.core.wincasa_query_engine import WincasaQueryEngine
+
+COMPONENTS = ("optimized_search", "unified_template_system", "semantic_template_engine", "llm_handler")
+
+
+class FakeLLMHandler:
+    def query_llm(self, user_query, mode=None):
+        return {"answer": f"Antwort: {user_query}", "result_count": 1}
+
+
+class FakeSearch:
+    def get_stats(self):
+        return {"total_entities": 0}
+
+
+class TestLazySubsystems(unittest.TestCase):
+    """Unit tests for on-demand subsystem initialization"""
+
+    def setUp(self):
+        self.builds = []
+        self.semantic_gate = threading.Event()
+        self.semantic_gate.set()
+        registry = get_registry()
+
+        def factory(name, instance, gate=None):
+            def build():
+                self.builds.append(name)
+                if gate is not None:
+                    gate.wait(2)
+                return instance
+            return build
+
+        registry.register("optimized_search", factory("optimized_search", FakeSearch()))
+        registry.register("unified_template_system", factory(
+            "unified_template_system",
+            SimpleNamespace(process_query=lambda query: SimpleNamespace(
+                final_answer=f"Template: {query}", confidence=0.9, result_count=1,
+                processing_path="template", processing_time_ms=1.0))))
+        registry.register("semantic_template_engine", factory(
+            "semantic_template_engine", SimpleNamespace(can_handle_query=lambda query: (False, 0.0)),
+            self.semantic_gate))
+        registry.register("llm_handler", factory("llm_handler", FakeLLMHandler()))
+        self.engine = WincasaQueryEngine(config_file="does/not/exist.json", answer_cache=None)
+
+    def tearDown(self):
+        self.semantic_gate.set()
+        registry = get_registry()
+        for name in COMPONENTS:
+            registry.register(name, DEFAULT_FACTORIES[name])
+            registry.reset(name)
+
+    def test_nothing_built_until_used(self):
+        """Test the constructor and stats build nothing, a query builds only its path"""
+        self.assertEqual(self.builds, [])
+        stats = self.engine.get_system_stats()
+        self.assertFalse(any(status["ready"] for status in stats["subsystems"].values()))
+
+        self.engine.process_query("Erstelle einen Bericht", force_mode="legacy")
+        self.assertEqual(self.builds, ["llm_handler"])
+
+        result = self.engine.process_query("Mieter Essen", force_mode="unified")
+        self.assertEqual(result.processing_mode, "template")
+        self.assertEqual(sorted(self.builds), ["llm_handler", "semantic_template_engine",
+                                               "unified_template_system"])
+        self.assertNotIn("optimized_search", self.builds)
+
+    def test_background_warm_up_serves_fast_path_first(self):
+        """Test the search index is ready while slower subsystems are still building"""
+        self.semantic_gate.clear()
+        thread = self.engine.warm_up()
+
+        for _ in range(200):
+            if self.engine.get_subsystem_status()["unified_system"]["ready"]:
+                break
+            time.sleep(0.005)
+        status = self.engine.get_subsystem_status()
+        self.assertTrue(status["search_system"]["ready"])
+        self.assertFalse(status["semantic_engine"]["ready"])
+        self.assertIsInstance(self.engine.search_system, FakeSearch)
+
+        self.semantic_gate.set()
+        thread.join(2)
+        self.assertEqual(self.builds, ["optimized_search", "unified_template_system",
+                                       "semantic_template_engine", "llm_handler"])
+        self.engine.warm_up(background=False)
+        self.assertEqual(len(self.builds), 4)
+
+    def test_private_api_key_file_gets_own_search(self):
+        """Test a non-default API key file builds its own search instead of the shared component"""
+        engine = WincasaQueryEngine(config_file="does/not/exist.json", api_key_file="does/not/exist.env",
+                                    answer_cache=None, semantic_engine=False)
+        with mock.patch("wincasa.core.wincasa_query_engine.WincasaOptimizedSearch") as search_class, \
+                mock.patch("wincasa.core.wincasa_query_engine.UnifiedTemplateSystem") as unified_class:
+            search = engine.search_system
+            unified = engine.unified_system
+
+        search_class.assert_called_once_with(api_key_file="does/not/exist.env", debug_mode=False)
+        self.assertIs(search, search_class.return_value)
+        self.assertIs(unified_class.call_args.kwargs["search_system"], search)
+        self.assertIs(unified, unified_class.return_value)
+        self.assertEqual(self.builds, [])
+
+    def test_semantic_engine_defers_llm_handler(self):
+        """Test pattern matching works without building the LLM handler"""
+        engine = SemanticTemplateEngine()
+        can_handle, confidence = engine.can_handle_query("Alle Mieter von Bona Casa")
+        self.assertTrue(can_handle)
+        self.assertNotIn("llm_handler", self.builds)
+        self.assertIsInstance(engine.llm_handler, FakeLLMHandler)
+        self.assertEqual(self.builds, ["llm_handler"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+WINCASA LLM Client Pool - Unit Tests
+Geteilte OpenAI Clients, Pool-Messung und Anbindung der LLM-Konsumenten
+"""
+
+import sys
+from pathlib import Path
+# Add src directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from wincasa.core import llm_client_pool
+from wincasa.core.component_registry import get_registry
+from wincasa.core.llm_client_pool import LLMClientPool, MeteredTransport, PoolMeter
+from wincasa.core.llm_handler import WincasaLLMHandler
+
+POOL_CONFIG = {"max_connections": 4, "max_keepalive_connections": 2, "keepalive_expiry": 30.0,
+               "connect_timeout": 2.0, "read_timeout": 20.0, "max_retries": 1}
+
+
+class TestPoolMeter(unittest.TestCase):
+    """Unit tests for PoolMeter"""
+
+    def test_utilization(self):
+        """Test in-use, peak, saturation and connection reuse accounting"""
+        meter = PoolMeter(max_connections=2)
+        for _ in range(3):
+            meter.acquire()
+        meter.connection_opened("connection.connect_tcp.started")
+        meter.connection_opened("connection.connect_tcp.complete")
+        meter.connection_opened("http11.send_request_headers.complete")
+        meter.release()
+        meter.release(error=True)
+
+        stats = meter.get_stats()
+        self.assertEqual((stats["in_use"], stats["peak_in_use"], stats["saturated"]), (1, 3, 1))
+        self.assertEqual((stats["connections_opened"], stats["errors"]), (1, 1))
+        self.assertEqual((stats["utilization"], stats["peak_utilization"]), (0.5, 1.5))
+        self.assertEqual(stats["connection_reuse_rate"], 0.667)
+
+    @unittest.skipUnless(llm_client_pool.httpx, "httpx nicht installiert")
+    def test_metered_transport_holds_connection_until_close(self):
+        """Test a request occupies the pool until its response body is closed"""
+        httpx = llm_client_pool.httpx
+        meter = PoolMeter(max_connections=4)
+        transport = MeteredTransport(httpx.MockTransport(
+            lambda request: httpx.Response(200, content=iter([b"o", b"k"]))), meter)
+        with httpx.Client(transport=transport) as client:
+            with client.stream("GET", "https://api.example.test/v1") as response:
+                self.assertEqual(meter.in_use, 1)
+                self.assertEqual(response.read(), b"ok")
+            self.assertEqual(client.get("https://api.example.test/v1").text, "ok")
+        self.assertEqual((meter.in_use, meter.stats["requests"]), (0, 2))
+
+
+@unittest.skipUnless(llm_client_pool.openai, "openai nicht installiert")
+class TestLLMClientPool(unittest.TestCase):
+    """Unit tests for LLMClientPool"""
+
+    def setUp(self):
+        self.pool = LLMClientPool(**POOL_CONFIG)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_one_client_per_key(self):
+        """Test sync clients are shared per API key and carry the pool settings"""
+        client = self.pool.get_client("sk-test")
+        self.assertIs(self.pool.get_client("sk-test"), client)
+        self.assertIsNot(self.pool.get_client("sk-other"), client)
+        self.assertEqual(client.max_retries, 1)
+
+        stats = self.pool.get_stats()
+        self.assertEqual(stats["clients"], {"sync": 2, "async": 0})
+        self.assertEqual(stats["settings"]["max_connections"], 4)
+
+    def test_async_client_per_loop(self):
+        """Test async clients are shared within an event loop but not across loops"""
+        async def get_twice():
+            return self.pool.get_async_client("sk-test"), self.pool.get_async_client("sk-test")
+
+        first, second = asyncio.run(get_twice())
+        self.assertIs(first, second)
+        self.assertIsNot(asyncio.run(get_twice())[0], first)
+
+
+class TestLLMConsumers(unittest.TestCase):
+    """Injection of the shared pool into LLM consumers"""
+
+    def setUp(self):
+        get_registry().provide("config", SimpleNamespace(
+            get_llm_pool_config=lambda: POOL_CONFIG,
+            get_llm_config=lambda: {"api_key": "sk-test", "model": "test-model"}))
+
+    def tearDown(self):
+        get_registry().reset("config")
+        get_registry().reset("llm_client_pool")
+
+    def test_registry_builds_pool_from_config(self):
+        """Test the process-wide pool is built once from the configured settings"""
+        pool = get_registry().get("llm_client_pool")
+        self.assertIs(get_registry().get("llm_client_pool"), pool)
+        self.assertEqual((pool.max_connections, pool.read_timeout), (4, 20.0))
+
+    def test_handler_uses_shared_client(self):
+        """Test the handler's plain completion call goes through the pooled client"""
+        calls = []
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+            create=lambda **kwargs: calls.append(kwargs) or "response")))
+        pool = SimpleNamespace(get_client=lambda api_key: calls.append(api_key) or client)
+
+        handler = WincasaLLMHandler.__new__(WincasaLLMHandler)
+        handler.config = get_registry().get("config")
+        handler.client_pool = pool
+        response = handler._call_openai_api(messages=[{"role": "user", "content": "Hallo"}],
+                                            max_tokens=10, timeout=None)
+
+        self.assertEqual(response, "response")
+        self.assertEqual(calls[0], "sk-test")
+        # No deadline -> the pool's read timeout applies instead of "no timeout"
+        self.assertNotIn("timeout", calls[1])
+        self.assertEqual(calls[1]["model"], "test-model")
+
+
+if __name__ == '__main__':
+    unittest.main()
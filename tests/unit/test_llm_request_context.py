@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+WINCASA LLM Request Context - Unit Tests
+Mode, Modell und Prompt pro Anfrage statt os.environ / Handler-Zustand
+"""
+
+import sys
+from pathlib import Path
+# Add src directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import asyncio
+import os
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from wincasa.core.llm_handler import LLMRequestContext, WincasaLLMHandler
+from wincasa.core.singleflight import SingleFlight
+
+DELAY = 0.05
+QUERY = "Wie viele Objekte gibt es?"
+
+
+def completion(content):
+    message = SimpleNamespace(function_call=None, content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+class TestLLMRequestContext(unittest.TestCase):
+    """Parallel LLM calls in different modes and models"""
+
+    def setUp(self):
+        self.calls = []
+        handler = WincasaLLMHandler.__new__(WincasaLLMHandler)
+        handler.config = SimpleNamespace(
+            get_llm_config=lambda: {"api_key": "sk-test", "model": "default-model",
+                                    "temperature": 0.1, "max_tokens": 100},
+            load_system_prompt=lambda: "Standard-Prompt",
+            get_system_prompt_path=lambda: "does/not/exist.md",
+            get=lambda key: "json_standard")
+        handler.prompts = handler._build_prompt_cache()
+        handler.inflight = SingleFlight("llm_handler")
+        handler.client_pool = SimpleNamespace(get_client=lambda api_key: self.client(),
+                                              get_async_client=lambda api_key: self.client(is_async=True))
+        handler._knowledge_context_for_query = lambda user_query, query_id: ""
+        self.handler = handler
+
+    def client(self, is_async=False):
+        def record(kwargs):
+            function_names = [tool["function"]["name"] for tool in kwargs["tools"]]
+            self.calls.append((kwargs["model"], kwargs["messages"][0]["content"], function_names))
+            return completion(f"{kwargs['model']} | {function_names[0]}")
+
+        def create(**kwargs):
+            time.sleep(DELAY)
+            return record(kwargs)
+
+        async def create_async(**kwargs):
+            await asyncio.sleep(DELAY)
+            return record(kwargs)
+
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+            create=create_async if is_async else create)))
+
+    def test_parallel_modes_and_models(self):
+        """Test concurrent requests keep their own mode, prompt and model"""
+        requests = [("json_standard", "model-a"), ("sql_standard", "model-b"),
+                    ("json_vanilla", None), ("sql_vanilla", "model-a")]
+        system_mode = os.environ.get("SYSTEM_MODE")
+
+        with ThreadPoolExecutor(len(requests)) as pool:
+            results = list(pool.map(lambda request: self.handler.query_llm(QUERY, *request), requests))
+
+        self.assertEqual([result["answer"] for result in results],
+                         ["model-a | search_json_data", "model-b | search_tenants_by_address",
+                          "default-model | search_json_data", "model-a | search_tenants_by_address"])
+        prompts = {model_prompt[1] for model_prompt in self.calls}
+        self.assertEqual(len(prompts), 4)  # every mode got its own system prompt
+        self.assertEqual(os.environ.get("SYSTEM_MODE"), system_mode)
+
+    def test_async_model_override(self):
+        """Test the async path carries the per-request model"""
+        async def scenario():
+            return await asyncio.gather(self.handler.query_llm_async(QUERY, "sql_vanilla", model="model-b"),
+                                        self.handler.query_llm_async(QUERY, "sql_vanilla"))
+
+        results = asyncio.run(scenario())
+        self.assertEqual([result["answer"] for result in results],
+                         ["model-b | search_tenants_by_address", "default-model | search_tenants_by_address"])
+
+    def test_functions_limited_to_mode(self):
+        """Test functions outside the request's mode are not executed"""
+        context = LLMRequestContext(query_id="1", mode="sql_standard", system_prompt="", llm_config={})
+        self.handler._execute_json_search_function = lambda args, query_id: self.fail("JSON-Funktion im SQL-Modus")
+        answer = self.handler._execute_function("search_json_data", {}, context)
+        self.assertIn("nicht verfügbar", answer)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+WINCASA Prompt Cache - Unit Tests
+Memoisierte System-Prompts pro Mode mit Invalidierung über Datei-mtimes
+"""
+
+import sys
+from pathlib import Path
+# Add src directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from wincasa.core.llm_handler import WincasaLLMHandler
+from wincasa.core.prompt_cache import PromptCache
+
+
+class TestPromptCache(unittest.TestCase):
+    """Unit tests for PromptCache"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.enhanced = Path(self.temp_dir.name) / "ENHANCED.md"
+        self.standard = Path(self.temp_dir.name) / "STANDARD.md"
+        self.standard.write_text("Standard v1", encoding="utf-8")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def build(self):
+        path = self.enhanced if self.enhanced.exists() else self.standard
+        return path.read_text(encoding="utf-8") + " + KB"
+
+    def touch(self, path, content):
+        stat = path.stat() if path.exists() else None
+        path.write_text(content, encoding="utf-8")
+        if stat:
+            # Make sure the change is visible even on coarse mtime resolution
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_built_once(self):
+        """Test repeated lookups within the check interval do no file work"""
+        cache = PromptCache(check_interval=60.0)
+        cache.register("json_standard", [self.enhanced, self.standard], self.build)
+        self.assertEqual(cache.warm_up(), [])
+
+        self.touch(self.standard, "Standard v2")
+        self.assertEqual([cache.get("json_standard") for _ in range(3)], ["Standard v1 + KB"] * 3)
+        self.assertEqual((cache.stats["builds"], cache.stats["checks"], cache.stats["hits"]), (1, 1, 3))
+        self.assertRaises(KeyError, cache.get, "unbekannt")
+
+    def test_file_changes_invalidate(self):
+        """Test edited and newly created higher-priority prompt files trigger a rebuild"""
+        cache = PromptCache(check_interval=0.0)
+        cache.register("json_standard", [self.enhanced, self.standard], self.build)
+        self.assertEqual(cache.get("json_standard"), "Standard v1 + KB")
+        self.assertEqual(cache.get("json_standard"), "Standard v1 + KB")
+        self.assertEqual(cache.stats["builds"], 1)
+
+        self.touch(self.standard, "Standard v2")
+        self.assertEqual(cache.get("json_standard"), "Standard v2 + KB")
+        self.touch(self.enhanced, "Enhanced")
+        self.assertEqual(cache.get("json_standard"), "Enhanced + KB")
+        self.assertEqual(cache.stats["builds"], 3)
+
+
+class TestHandlerPrompts(unittest.TestCase):
+    """Prompt lookup in WincasaLLMHandler"""
+
+    def test_mode_switch_without_file_io(self):
+        """Test all modes are built up front and switching modes opens no files"""
+        handler = WincasaLLMHandler.__new__(WincasaLLMHandler)
+        handler.config = SimpleNamespace(load_system_prompt=lambda: "Standard-Prompt",
+                                         get_system_prompt_path=lambda: "does/not/exist.md")
+        handler.prompts = handler._build_prompt_cache()
+        self.assertEqual(handler.prompts.get_stats()["prompts"],
+                         sorted(WincasaLLMHandler.PROMPT_MODES + (WincasaLLMHandler.DEFAULT_PROMPT,)))
+
+        with mock.patch("builtins.open", side_effect=AssertionError("Datei-I/O im Request-Pfad")):
+            prompts = {mode: handler._system_prompt_for_mode(mode) for mode in WincasaLLMHandler.PROMPT_MODES}
+            self.assertEqual(handler._system_prompt_for_mode(None), "Standard-Prompt")
+            self.assertEqual(handler._system_prompt_for_mode("unbekannt"), handler._get_fallback_prompt())
+
+        self.assertNotEqual(prompts["json_standard"], prompts["sql_standard"])
+        self.assertIn("KRITISCHE FELD-MAPPINGS", prompts["sql_vanilla"])
+
+
+if __name__ == '__main__':
+    unittest.main()
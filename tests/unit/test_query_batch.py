@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+WINCASA Query Batch - Unit Tests
+Deduplizierung, LLM-Limit, Executor-Zuordnung und Streaming von process_queries
+"""
+
+import sys
+from pathlib import Path
+# Add src directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import asyncio
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from wincasa.core.component_registry import get_registry
+from wincasa.core.wincasa_query_engine import WincasaQueryEngine
+
+LLM_DELAY = 0.1
+
+
+class ConcurrencyLLMHandler:
+    """Async LLM Handler, der gleichzeitige Calls zählt"""
+
+    def __init__(self, delays=None):
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.delays = delays or {}
+
+    async def query_llm_async(self, user_query, mode=None):
+        self.calls.append(user_query)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delays.get(user_query, LLM_DELAY))
+        finally:
+            self.active -= 1
+        return {"answer": f"Antwort: {user_query}", "result_count": 1}
+
+
+class ThreadCountingUnifiedSystem:
+    """Unified System, das parallele Ausführung erkennt"""
+
+    def __init__(self):
+        self.threads = set()
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def process_query(self, query):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.threads.add(threading.current_thread().name)
+        time.sleep(LLM_DELAY / 2)
+        with self._lock:
+            self.active -= 1
+        return SimpleNamespace(final_answer=f"Template: {query}", confidence=0.9, result_count=2,
+                               processing_path="template", processing_time_ms=10.0)
+
+
+class TestQueryBatch(unittest.TestCase):
+    """Unit tests for WincasaQueryEngine.process_queries"""
+
+    def setUp(self):
+        self.handler = ConcurrencyLLMHandler()
+        self.unified = ThreadCountingUnifiedSystem()
+        get_registry().provide("llm_handler", self.handler)
+        self.engine = WincasaQueryEngine(config_file="does/not/exist.json", unified_system=self.unified,
+                                         semantic_engine=False, search_system=object(), answer_cache=None)
+
+    def tearDown(self):
+        get_registry().reset("llm_handler")
+
+    def test_dedupe_and_llm_limit(self):
+        """Test duplicates run once and LLM calls stay under the limit"""
+        queries = [f"Frage {i}" for i in range(8)] + ["frage 3?", "FRAGE 5"]
+        batch = self.engine.process_queries(queries, concurrency=3, force_mode="legacy")
+
+        start_time = time.time()
+        items = batch.results()
+        elapsed = time.time() - start_time
+
+        self.assertEqual([item.index for item in items], list(range(10)))
+        self.assertEqual(len(self.handler.calls), 8)
+        self.assertEqual(self.handler.max_active, 3)
+        self.assertLess(elapsed, 8 * LLM_DELAY)
+        self.assertIs(items[8].result, items[3].result)
+        self.assertEqual((items[8].duplicate_of, items[9].duplicate_of), (3, 5))
+
+        stats = batch.stats
+        self.assertEqual((stats["queries"], stats["unique_queries"], stats["duplicates"]), (10, 8, 2))
+        self.assertEqual((stats["completed"], stats["errors"]), (8, 0))
+        self.assertEqual(stats["latency_ms"]["count"], 8)
+        self.assertGreater(stats["throughput_qps"], 0)
+
+    def test_streams_in_completion_order(self):
+        """Test fast queries are delivered before slow ones"""
+        self.handler.delays = {"Langsam": 0.3, "Schnell": 0.01}
+        batch = self.engine.process_queries(["Langsam", "Schnell"], concurrency=2, force_mode="legacy")
+        self.assertEqual([item.query for item in batch], ["Schnell", "Langsam"])
+
+    def test_template_queries_use_io_pool(self):
+        """Test unified-path queries run in the IO pool (only their SQL goes to the DB lane)"""
+        queries = [f"Mieter in Haus {i}" for i in range(6)]
+
+        async def collect():
+            batch = self.engine.process_queries(queries, concurrency=6, force_mode="unified")
+            items = [item async for item in batch]
+            return items, batch.stats
+
+        items, stats = asyncio.run(collect())
+        self.assertEqual(len(items), 6)
+        self.assertTrue(all(name.startswith("wincasa-io") for name in self.unified.threads))
+        self.assertEqual(stats["by_processing_mode"], {"template": 6})
+
+    def test_unified_queries_overlap_within_limit(self):
+        """Test unified-path queries run concurrently, but never beyond the batch limit"""
+        queries = [f"Mieter in Haus {i}" for i in range(9)]
+        batch = self.engine.process_queries(queries, concurrency=3, force_mode="unified")
+
+        start_time = time.time()
+        items = batch.results()
+        elapsed = time.time() - start_time
+
+        self.assertEqual(len(items), 9)
+        self.assertEqual(self.unified.max_active, 3)
+        self.assertLess(elapsed, 9 * LLM_DELAY / 2)
+
+    def test_early_stop(self):
+        """Test breaking out of the iteration drops pending queries without waiting for the next result"""
+        queries = [f"Frage {i}" for i in range(10)]
+        self.handler.delays = {query: 1.0 for query in queries[1:]}
+        self.handler.delays["Frage 0"] = 0.01
+        batch = self.engine.process_queries(queries, concurrency=1, force_mode="legacy")
+
+        start_time = time.time()
+        for item in batch:
+            break
+        self.assertLess(time.time() - start_time, 0.5)
+        self.assertLess(batch.stats["completed"], 10)
+        with self.assertRaises(RuntimeError):
+            list(batch)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+WINCASA Query Stream - Unit Tests
+Token-Streaming vom LLM Handler über den Query Engine, Time-to-First-Token im Query Logger
+"""
+
+import sys
+from pathlib import Path
+# Add src directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import sqlite3
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+
+from wincasa.core.component_registry import get_registry
+from wincasa.core.llm_handler import WincasaLLMHandler
+from wincasa.core.singleflight import SingleFlight
+from wincasa.core.wincasa_query_engine import WincasaQueryEngine
+from wincasa.monitoring.wincasa_query_logger import QueryLogEntry, WincasaQueryLogger
+
+QUERY = "Wie viele Objekte gibt es?"
+
+
+def chunk(content=None, tool_calls=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+class TestQueryStream(unittest.TestCase):
+    """Streaming through WincasaQueryEngine.process_query_stream"""
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.closed = threading.Event()
+
+        def query_llm_stream(query, mode=None, model=None):
+            try:
+                yield "Es gibt "
+                # The rest only arrives once the caller has seen the first token
+                self.assertTrue(self.release.wait(2.0))
+                yield "12 "
+                yield "Objekte."
+            finally:
+                self.closed.set()
+
+        get_registry().provide("llm_handler", SimpleNamespace(query_llm_stream=query_llm_stream))
+        self.engine = WincasaQueryEngine(config_file="does/not/exist.json", unified_system=object(),
+                                         semantic_engine=False, search_system=object(), answer_cache=None)
+
+    def tearDown(self):
+        get_registry().reset("llm_handler")
+
+    def test_tokens_arrive_incrementally(self):
+        """Test chunks reach the caller before the answer is complete and TTFT is recorded"""
+        stream = self.engine.process_query_stream(QUERY, force_mode="legacy")
+        chunks = []
+        for piece in stream:
+            chunks.append(piece)
+            self.release.set()
+
+        self.assertEqual(chunks, ["Es gibt ", "12 ", "Objekte."])
+        self.assertEqual(stream.result.answer, "Es gibt 12 Objekte.")
+        self.assertTrue(stream.result.processing_mode.startswith("legacy"))
+        self.assertIsNotNone(stream.time_to_first_token_ms)
+        self.assertEqual(stream.result.time_to_first_token_ms, stream.time_to_first_token_ms)
+        self.assertRaises(RuntimeError, list, stream)
+
+    def test_reader_abort_stops_llm_stream(self):
+        """Test a caller that stops reading ends the LLM stream at the next token"""
+        stream = self.engine.process_query_stream(QUERY, force_mode="legacy")
+        for piece in stream:
+            self.release.set()
+            break
+
+        self.assertTrue(self.closed.is_set())
+        # Aborted, not failed: no legacy error result and no stats entry
+        self.assertIsNone(stream.result)
+        self.assertEqual(self.engine.query_stats["legacy_queries"], 0)
+
+    def test_stream_not_coalesced(self):
+        """Test an aborted stream does not hand its cancellation to an identical regular query"""
+        get_registry().provide("llm_handler", SimpleNamespace(
+            query_llm_stream=get_registry().get("llm_handler").query_llm_stream,
+            query_llm=lambda query, mode=None, model=None: {"answer": "12 Objekte", "mode": mode}))
+        stream = self.engine.process_query_stream(QUERY, force_mode="legacy")
+        iterator = iter(stream)
+        next(iterator)
+
+        # Stream is in flight - a regular identical query computes on its own
+        result = self.engine.process_query(QUERY, force_mode="legacy")
+        self.release.set()
+        iterator.close()
+
+        self.assertEqual(result.answer, "12 Objekte")
+        self.assertGreater(result.confidence, 0.2)
+        self.assertIsNone(result.error_details)
+
+
+class TestStreamOpenAI(unittest.TestCase):
+    """Delta handling in WincasaLLMHandler._stream_openai"""
+
+    def setUp(self):
+        self.chunks = []
+        handler = WincasaLLMHandler.__new__(WincasaLLMHandler)
+        handler.config = SimpleNamespace(
+            get_llm_config=lambda: {"api_key": "sk-test", "model": "test-model",
+                                    "temperature": 0.1, "max_tokens": 100},
+            load_system_prompt=lambda: "Standard-Prompt",
+            get_system_prompt_path=lambda: "does/not/exist.md")
+        handler.prompts = handler._build_prompt_cache()
+        handler.inflight = SingleFlight("llm_handler")
+        handler.client_pool = SimpleNamespace(get_client=lambda api_key: SimpleNamespace(
+            chat=SimpleNamespace(completions=SimpleNamespace(create=self.create))))
+        handler._knowledge_context_for_query = lambda user_query, query_id: ""
+        self.handler = handler
+
+    def create(self, **kwargs):
+        self.assertTrue(kwargs["stream"])
+        return iter(self.chunks.pop(0))
+
+    def tool_delta(self, index, arguments, call_id=None, name=None):
+        return SimpleNamespace(index=index, id=call_id,
+                               function=SimpleNamespace(name=name, arguments=arguments))
+
+    def test_content_deltas(self):
+        """Test text deltas are yielded as they arrive"""
+        self.chunks = [[chunk("Es "), chunk(None), chunk("gibt "), SimpleNamespace(choices=[]), chunk("12.")]]
+        self.assertEqual(list(self.handler.query_llm_stream(QUERY, "json_standard")), ["Es ", "gibt ", "12."])
+
+    def test_tool_call_deltas(self):
+        """Test interleaved tool call fragments are assembled, run and the final answer is streamed"""
+        self.chunks = [
+            [chunk(tool_calls=[self.tool_delta(0, "", "call_a", "search_json_data"),
+                               self.tool_delta(1, "", "call_b", "search_json_data")]),
+             chunk(tool_calls=[self.tool_delta(0, '{"query_name": '), self.tool_delta(1, '{"query_name": ')]),
+             chunk(tool_calls=[self.tool_delta(1, '"03_aktuelle_mieter"}'), self.tool_delta(0, '"01_eigentuemer"}')])],
+            [chunk("Fertig.")]
+        ]
+        executed = []
+        self.handler._execute_json_search_function = lambda args, query_id: executed.append(
+            args["query_name"]) or f"Treffer: {args['query_name']}"
+
+        self.assertEqual(list(self.handler.query_llm_stream(QUERY, "json_standard")), ["Fertig."])
+        self.assertEqual(sorted(executed), ["01_eigentuemer", "03_aktuelle_mieter"])
+
+
+class TestQueryLoggerTTFT(unittest.TestCase):
+    """Time-to-First-Token in WincasaQueryLogger"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.temp_dir.name) / "query_logs.db"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def entry(self, ttft):
+        return QueryLogEntry(timestamp=datetime.now().isoformat(), query=QUERY, mode="legacy_json_standard",
+                             model="test-model", user_id="anonymous", session_id="test", response_time_ms=900.0,
+                             result_count=1, confidence=0.7, cost_estimate=0.0, success=True,
+                             time_to_first_token_ms=ttft)
+
+    def test_old_schema_is_migrated(self):
+        """Test databases without the TTFT column are migrated and TTFT is averaged over streamed queries"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("CREATE TABLE query_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL, "
+                         "query TEXT NOT NULL, mode TEXT NOT NULL, model TEXT, user_id TEXT, session_id TEXT, "
+                         "response_time_ms REAL, result_count INTEGER, confidence REAL, cost_estimate REAL, "
+                         "success INTEGER, error TEXT, answer_preview TEXT, source_data TEXT, "
+                         "created_at TEXT DEFAULT CURRENT_TIMESTAMP)")
+
+        query_logger = WincasaQueryLogger(db_path=str(self.db_path))
+        for ttft in (120.0, 180.0, None):
+            self.assertGreater(query_logger.log_query(self.entry(ttft)), 0)
+
+        history = query_logger.get_history()
+        self.assertEqual(sorted(row["time_to_first_token_ms"] or 0 for row in history), [0, 120.0, 180.0])
+        self.assertEqual(query_logger.get_statistics()["avg_time_to_first_token_ms"], 150.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+WINCASA Search Index - Unit Tests
+Prefix-Index und Optimized Search ohne LLM-Calls
+"""
+
+import sys
+from pathlib import Path
+# Add src directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from wincasa.core.search_index import (FuzzyTermIndex, PrefixIndex,
+                                       damerau_levenshtein, sum_score_per_doc,
+                                       top_k)
+from wincasa.core.wincasa_optimized_search import WincasaOptimizedSearch
+
+RAG_DATA_DIR = Path(__file__).parent.parent.parent / "data" / "exports" / "rag_data"
+
+
+class TestPrefixIndex(unittest.TestCase):
+    """Unit tests for PrefixIndex"""
+
+    def setUp(self):
+        self.index = PrefixIndex()
+        for term, doc_id in [("mueller", 1), ("muellerstr", 2), ("mueller", 3),
+                             ("meier", 4), ("muenster", 5)]:
+            self.index.add(term, doc_id, 1.0)
+
+    def test_exact_lookup(self):
+        doc_ids, weights = self.index.lookup("mueller")
+        self.assertEqual(doc_ids.tolist(), [1, 3])
+        self.assertEqual(weights.tolist(), [1.0, 1.0])
+        self.assertIsNone(self.index.lookup("muell"))
+        self.assertIn("meier", self.index)
+
+    def test_prefix_range(self):
+        terms = [term for term, _, _ in self.index.prefix_items("mue")]
+        self.assertEqual(terms, ["mueller", "muellerstr", "muenster"])
+        self.assertEqual(list(self.index.prefix_items("xyz")), [])
+
+        # Prefix range is one contiguous posting slice
+        doc_ids, _ = self.index.postings_range(*self.index.term_range("mue"))
+        self.assertEqual(doc_ids.tolist(), [1, 3, 2, 5])
+
+    def test_only_full_words_stored(self):
+        self.assertEqual(len(self.index), 4)
+        self.index.add("aachener", 6, 0.5)
+        self.assertEqual(list(self.index)[0], "aachener")
+        self.assertEqual(self.index.lookup("mueller")[0].tolist(), [1, 3])
+
+    def test_score_merging(self):
+        doc_ids, scores = sum_score_per_doc(np.array([3, 1, 3], dtype=np.uint32),
+                                            np.array([0.5, 0.25, 0.25]))
+        self.assertEqual(doc_ids.tolist(), [1, 3])
+        self.assertEqual(scores.tolist(), [0.25, 0.75])
+
+    def test_top_k_selection(self):
+        doc_ids = np.array([2, 4, 5, 7, 9], dtype=np.uint32)
+        scores = np.array([0.5, 0.9, 0.5, 0.1, 0.5])
+        self.assertEqual(top_k(doc_ids, scores, 3).tolist(), [1, 0, 2])
+        self.assertEqual(top_k(doc_ids, scores, 10).tolist(), [1, 0, 2, 4, 3])
+        self.assertEqual(top_k(doc_ids, scores, 0).tolist(), [])
+
+
+class TestFuzzyTermIndex(unittest.TestCase):
+    """Unit tests for the deletion dictionary"""
+
+    def test_damerau_levenshtein(self):
+        self.assertEqual(damerau_levenshtein("schmitt", "schmidt", 2), 1)
+        self.assertEqual(damerau_levenshtein("mueler", "mueller", 2), 1)
+        self.assertEqual(damerau_levenshtein("weebr", "weber", 2), 1)  # transposition
+        self.assertEqual(damerau_levenshtein("abc", "xyz123", 1), 2)
+
+    def test_distance_caps(self):
+        fuzzy = FuzzyTermIndex(["mueller", "meier", "schmidt", "kupferdreherstrasse", "ott"])
+        self.assertEqual(fuzzy.lookup("muller"), [("mueller", 1)])
+        self.assertEqual(fuzzy.lookup("schmitt"), [("schmidt", 1)])
+        self.assertEqual(fuzzy.lookup("kupferdrehrstrase"), [("kupferdreherstrasse", 2)])
+        # Short terms are never corrected, distance 2 needs 8+ characters
+        self.assertEqual(fuzzy.lookup("ot"), [])
+        self.assertEqual(fuzzy.lookup("otto"), [("ott", 1)])
+        self.assertEqual(fuzzy.lookup("mxiex"), [])
+
+
+class TestOptimizedSearchIndex(unittest.TestCase):
+    """Search behaviour on the rag_data exports"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.search = WincasaOptimizedSearch(rag_data_dir=str(RAG_DATA_DIR), api_key_file="",
+                                            snapshot_dir=None)
+
+    def test_prefix_and_exact_scores(self):
+        exact = self.search.optimized_search("Essen", max_results=5)
+        partial = self.search.optimized_search("Ess", max_results=5)
+        self.assertTrue(exact and partial)
+        self.assertGreater(exact[0].relevance_score, partial[0].relevance_score)
+
+    def test_umlaut_normalization(self):
+        umlaut = self.search.optimized_search("Köln", max_results=50)
+        ascii_form = self.search.optimized_search("Koeln", max_results=50)
+        self.assertGreater(len(umlaut), 0)
+        self.assertEqual(len(umlaut), len(ascii_form))
+
+    def test_bm25_ranking_and_annotations(self):
+        results = self.search.optimized_search("GmbH", max_results=5)
+        self.assertEqual(len(results), 5)
+        scores = [r.relevance_score for r in results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        for result in results:
+            self.assertTrue(result.matched_fields)
+
+        # Documents matching all query terms rank first
+        both = self.search.optimized_search("Essen GmbH", max_results=1)
+        self.assertGreater(both[0].relevance_score, results[0].relevance_score)
+
+    def test_batch_search(self):
+        queries = ["Essen", "GmbH", "Essen", "x", "Müller Essen"]
+        batch = self.search.optimized_search_many(queries, max_results=5)
+        self.assertEqual(len(batch), len(queries))
+        self.assertEqual(batch[3], [])
+        for query, results in zip(queries, batch):
+            expected = self.search.optimized_search(query, max_results=5)
+            self.assertEqual([(r.entity_data, r.relevance_score) for r in results],
+                             [(r.entity_data, r.relevance_score) for r in expected])
+
+    def test_typo_tolerance(self):
+        exact = self.search.optimized_search("Müller", max_results=5)
+        typo = self.search.optimized_search("Muller", max_results=5)
+        self.assertTrue(typo)
+        self.assertEqual([r.entity_data for r in typo], [r.entity_data for r in exact])
+        self.assertLess(typo[0].relevance_score, exact[0].relevance_score)
+
+    def test_suggest(self):
+        suggestions = self.search.suggest("mü", k=5)
+        self.assertTrue(suggestions)
+        self.assertLessEqual(len(suggestions), 5)
+        self.assertTrue(all("Müller" in s["label"] for s in suggestions))
+        # Label start ranks before inner words, umlaut folding and multi-word prefixes
+        self.assertEqual(suggestions[0]["label"], "Marvin Müller")
+        self.assertEqual(self.search.suggest("Marvin Mue")[0]["label"], "Marvin Müller")
+        self.assertEqual(self.search.suggest("aachener str. 7")[0]["entity_type"], "objekte")
+        self.assertEqual(self.search.suggest("zqzq"), [])
+        self.assertEqual(self.search.suggest("   "), [])
+
+
+class TestIndexSnapshot(unittest.TestCase):
+    """Persisted snapshot roundtrip and invalidation"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.data_dir = self.tmp_dir / "rag_data"
+        shutil.copytree(RAG_DATA_DIR, self.data_dir)
+        self.snapshot_dir = self.tmp_dir / "snapshots"
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _search(self, **kwargs):
+        return WincasaOptimizedSearch(rag_data_dir=str(self.data_dir), api_key_file="",
+                                      snapshot_dir=str(self.snapshot_dir), **kwargs)
+
+    def test_snapshot_roundtrip(self):
+        built = self._search()
+        self.assertIsNone(built.snapshot)
+        self.assertTrue(built.snapshot_path.exists())
+
+        loaded = self._search()
+        self.assertIsNotNone(loaded.snapshot)
+        self.assertIsInstance(loaded.name_index.base._doc_ids, np.ndarray)
+        self.assertFalse(loaded.name_index.base._doc_ids.flags.writeable)
+        self.assertEqual(len(loaded.mieter_data), len(built.mieter_data))
+        self.assertEqual(list(loaded.city_index), list(built.city_index))
+
+        for query in ("Essen", "Ess", "GmbH", "Köln"):
+            expected = built.optimized_search(query, max_results=20)
+            actual = loaded.optimized_search(query, max_results=20)
+            self.assertEqual([(r.entity_type, r.entity_data, r.relevance_score) for r in actual],
+                             [(r.entity_type, r.entity_data, r.relevance_score) for r in expected])
+
+    def test_open_hashes_only_changed_sources(self):
+        """Test reopening reads no source file unless its size/mtime differs from the snapshot header"""
+        self._search()
+        with mock.patch("wincasa.core.search_index.hashlib.sha256", wraps=hashlib.sha256) as sha256:
+            self.assertIsNotNone(self._search().snapshot)
+        self.assertEqual(sha256.call_count, 0)
+
+        # Touched but unchanged: only this file is hashed, the snapshot stays valid
+        mieter_file = self.data_dir / "mieter.json"
+        stat = mieter_file.stat()
+        os.utime(mieter_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        with mock.patch("wincasa.core.search_index.hashlib.sha256", wraps=hashlib.sha256) as sha256:
+            self.assertIsNotNone(self._search().snapshot)
+        self.assertEqual(sha256.call_count, 2)  # snapshot validation + signature of the touched file
+
+    def test_rebuild_on_source_change(self):
+        self._search()
+        objekte_file = self.data_dir / "objekte.json"
+        objekte = json.loads(objekte_file.read_text(encoding="utf-8"))
+        objekte[0]["stadt"] = "Zqhausen"
+        objekte_file.write_text(json.dumps(objekte, ensure_ascii=False), encoding="utf-8")
+
+        reopened = self._search()
+        self.assertIsNone(reopened.snapshot)
+        self.assertTrue(reopened.optimized_search("Zqhausen"))
+
+    def test_refresh_while_running(self):
+        search = self._search(source_check_interval=0)
+        self.assertFalse(search.optimized_search("Zqdorf"))
+
+        mieter_file = self.data_dir / "mieter.json"
+        mieter = json.loads(mieter_file.read_text(encoding="utf-8"))
+        mieter[0]["name"] = "Zqdorf"
+        mieter_file.write_text(json.dumps(mieter, ensure_ascii=False), encoding="utf-8")
+        stat = mieter_file.stat()
+        os.utime(mieter_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        self.assertTrue(search.optimized_search("Zqdorf"))
+
+    def test_sync_persists_snapshot(self):
+        """Test a refresh after changed sources leaves a snapshot the next start can load"""
+        search = self._search(source_check_interval=0)
+        objekte_file = self.data_dir / "objekte.json"
+        objekte = json.loads(objekte_file.read_text(encoding="utf-8"))
+        objekte[0]["stadt"] = "Zqhausen"
+        del objekte[1]
+        objekte_file.write_text(json.dumps(objekte, ensure_ascii=False), encoding="utf-8")
+        stat = objekte_file.stat()
+        os.utime(objekte_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        self.assertTrue(search.optimized_search("Zqhausen"))
+
+        reopened = self._search()
+        self.assertIsNotNone(reopened.snapshot)
+        self.assertEqual(len(reopened.objekte_data), len(objekte))
+        self.assertEqual(len(reopened.mieter_data), len(search.mieter_data))
+        for query in ("Zqhausen", "Essen", "GmbH"):
+            expected = search.optimized_search(query, max_results=500)
+            actual = reopened.optimized_search(query, max_results=500)
+            self.assertEqual(sorted((r.entity_type, json.dumps(r.entity_data, sort_keys=True), r.relevance_score)
+                                    for r in actual),
+                             sorted((r.entity_type, json.dumps(r.entity_data, sort_keys=True), r.relevance_score)
+                                    for r in expected), query)
+
+
+class TestIncrementalUpdates(unittest.TestCase):
+    """upsert_entity / remove_entity / sync_with_export"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.data_dir = self.tmp_dir / "rag_data"
+        shutil.copytree(RAG_DATA_DIR, self.data_dir)
+        self.search = WincasaOptimizedSearch(rag_data_dir=str(self.data_dir), api_key_file="",
+                                             snapshot_dir=str(self.tmp_dir / "snapshots"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_upsert_and_remove(self):
+        mieter_count = len(self.search.mieter_data)
+        key = self.search.upsert_entity("mieter", {"name": "Zqbert Neumann", "stadt": "Essen"})
+        self.assertEqual(len(self.search.mieter_data), mieter_count + 1)
+        self.assertEqual(self.search.optimized_search("Zqbert")[0].entity_data["name"], "Zqbert Neumann")
+
+        # Same key replaces the previous version
+        self.search.upsert_entity("mieter", {"name": "Zqbert Altmann", "stadt": "Essen"}, key=key)
+        names = [r.entity_data.get("name") for r in self.search.optimized_search("Zqbert", max_results=50)]
+        self.assertEqual(names, ["Zqbert Altmann"])
+        self.assertEqual(len(self.search.mieter_data), mieter_count + 1)
+
+        self.assertEqual([s["label"] for s in self.search.suggest("Zqbert")], ["Zqbert Altmann"])
+
+        self.assertTrue(self.search.remove_entity("mieter", key))
+        self.assertFalse(self.search.optimized_search("Zqbert"))
+        self.assertEqual(self.search.suggest("Zqbert"), [])
+        self.assertFalse(self.search.remove_entity("mieter", key))
+
+    def test_remove_existing_entity(self):
+        result = self.search.optimized_search("Kupferdreherstraße", max_results=1)[0]
+        key = self.search.entity_key(result.entity_type, result.entity_data)
+        self.assertTrue(self.search.remove_entity(result.entity_type, key))
+        remaining = self.search.optimized_search("Kupferdreherstraße", max_results=50)
+        self.assertNotIn(id(result.entity_data), [id(r.entity_data) for r in remaining])
+
+    def test_sync_applies_only_changes(self):
+        objekte_file = self.data_dir / "objekte.json"
+        objekte = json.loads(objekte_file.read_text(encoding="utf-8"))
+        objekte[0]["stadt"] = "Zqhausen"
+        del objekte[1]
+        objekte_file.write_text(json.dumps(objekte, ensure_ascii=False), encoding="utf-8")
+
+        stats = self.search.sync_with_export()
+        self.assertEqual((stats["added"], stats["removed"]), (1, 2))
+        self.assertEqual(len(self.search.objekte_data), len(objekte))
+        self.assertTrue(self.search.optimized_search("Zqhausen"))
+
+        # Second sync is a no-op
+        stats = self.search.sync_with_export()
+        self.assertEqual((stats["added"], stats["removed"]), (0, 0))
+
+    def test_compaction_keeps_results(self):
+        for i in range(5):
+            self.search.upsert_entity("objekte", {"adresse": f"Zqweg {i}", "stadt": "Essen"})
+        before = [r.entity_data for r in self.search.optimized_search("Zqweg", max_results=10)]
+        for index_name in self.search.INDEX_NAMES:
+            getattr(self.search, index_name).compact(self.search.entity_table.live_mask)
+        after = [r.entity_data for r in self.search.optimized_search("Zqweg", max_results=10)]
+        self.assertEqual(len(before), 5)
+        self.assertEqual(before, after)
+        self.assertEqual(self.search.address_index.posting_counts[1], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+WINCASA Singleflight - Unit Tests
+Request Coalescing für Threads und asyncio, Engine- und LLM-Handler-Anbindung
+"""
+
+import sys
+from pathlib import Path
+# Add src directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from wincasa.core.component_registry import get_registry
+from wincasa.core.deadline import Deadline, DeadlineExceeded, deadline_scope
+from wincasa.core.llm_handler import WincasaLLMHandler
+from wincasa.core.singleflight import SingleFlight
+from wincasa.core.wincasa_query_engine import WincasaQueryEngine
+
+DELAY = 0.1
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Unit tests for SingleFlight"""
+
+    def setUp(self):
+        self.flight = SingleFlight("test")
+        self.calls = 0
+
+    def compute(self, value="ok"):
+        self.calls += 1
+        time.sleep(DELAY)
+        return value
+
+    async def compute_async(self, value="ok"):
+        self.calls += 1
+        await asyncio.sleep(DELAY)
+        return value
+
+    def test_threads_share_one_call(self):
+        """Test concurrent identical calls run once and report per-key waiters"""
+        with ThreadPoolExecutor(5) as pool:
+            results = list(pool.map(lambda _: self.flight.do(("frage", "unified"), self.compute), range(5)))
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual([value for value, _ in results], ["ok"] * 5)
+        self.assertEqual(sum(coalesced for _, coalesced in results), 4)
+        stats = self.flight.get_stats()
+        self.assertEqual(stats["keys"]["frage | unified"], {"flights": 1, "waiters": 4, "max_waiters": 4})
+        self.assertEqual((stats["coalesce_rate"], stats["in_flight"]), (0.8, {}))
+
+        # Completed flights are not reused
+        self.flight.do(("frage", "unified"), self.compute)
+        self.assertEqual(self.calls, 2)
+
+    def test_errors_are_shared(self):
+        """Test waiters receive the leader's exception"""
+        def fail():
+            time.sleep(DELAY)
+            raise ValueError("kaputt")
+
+        def call(_):
+            try:
+                return self.flight.do("key", fail)
+            except ValueError as e:
+                return str(e)
+
+        with ThreadPoolExecutor(3) as pool:
+            self.assertEqual(list(pool.map(call, range(3))), ["kaputt"] * 3)
+        self.assertEqual(self.flight.get_stats()["errors"], 1)
+
+    def test_async_leader_cancel_keeps_waiters(self):
+        """Test a cancelled async leader does not cancel the shared computation"""
+        async def scenario():
+            leader = asyncio.ensure_future(self.flight.do_async("key", self.compute_async, "geteilt"))
+            await asyncio.sleep(0)
+            waiter = asyncio.ensure_future(self.flight.do_async("key", self.compute_async))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await waiter
+
+        self.assertEqual(asyncio.run(scenario()), ("geteilt", True))
+        self.assertEqual(self.calls, 1)
+
+    def test_thread_waits_for_async_leader(self):
+        """Test sync callers join a computation started by an async caller"""
+        async def scenario():
+            leader = asyncio.ensure_future(self.flight.do_async("key", self.compute_async, "async"))
+            await asyncio.sleep(0)
+            waiter = await asyncio.get_running_loop().run_in_executor(
+                None, self.flight.do, "key", self.compute)
+            return await leader, waiter
+
+        self.assertEqual(asyncio.run(scenario()), (("async", False), ("async", True)))
+        self.assertEqual(self.calls, 1)
+
+    def test_waiter_keeps_own_deadline(self):
+        """Test a waiter with a shorter budget stops waiting at its deadline"""
+        leader = threading.Thread(target=self.flight.do, args=("key", self.compute))
+        leader.start()
+        time.sleep(0.01)
+        with deadline_scope(Deadline(20)):
+            with self.assertRaises(DeadlineExceeded) as context:
+                self.flight.do("key", self.compute)
+        leader.join()
+        self.assertEqual(context.exception.stage, "coalesced")
+        self.assertEqual(self.calls, 1)
+
+
+class TestCoalescingIntegration(unittest.TestCase):
+    """Coalescing in WincasaQueryEngine and WincasaLLMHandler"""
+
+    def setUp(self):
+        get_registry().provide("config", SimpleNamespace(get_llm_config=lambda: {"model": "test-model"}))
+
+    def tearDown(self):
+        get_registry().reset("config")
+
+    def test_engine_shares_computation(self):
+        """Test identical queries from several users run the pipeline once"""
+        calls = []
+
+        def process_query(query):
+            calls.append(query)
+            time.sleep(DELAY)
+            return SimpleNamespace(final_answer=f"Template: {query}", confidence=0.9, result_count=2,
+                                   processing_path="template", processing_time_ms=DELAY * 1000)
+
+        engine = WincasaQueryEngine(config_file="does/not/exist.json",
+                                    unified_system=SimpleNamespace(process_query=process_query),
+                                    semantic_engine=False, search_system=object(), answer_cache=None)
+        queries = [("Leerstand in Essen", "user1"), ("leerstand in essen?", "user2"), ("LEERSTAND IN ESSEN", "user3")]
+        with ThreadPoolExecutor(3) as pool:
+            results = list(pool.map(lambda args: engine.process_query(*args, force_mode="unified"), queries))
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([result.user_id for result in results], ["user1", "user2", "user3"])
+        self.assertEqual(len({result.answer for result in results}), 1)
+        self.assertEqual(sorted(result.cost_estimate > 0 for result in results), [False, False, True])
+        self.assertEqual(engine.query_stats["coalesced_queries"], 2)
+        self.assertEqual(engine.inflight.get_stats()["coalesced"], 2)
+
+    def test_llm_handler_shares_call(self):
+        """Test identical LLM requests for the same mode share one API call"""
+        calls = []
+
+        def query(user_query, mode=None, model=None):
+            calls.append((user_query, mode))
+            time.sleep(DELAY)
+            return {"answer": f"Antwort: {user_query}", "mode": mode}
+
+        handler = WincasaLLMHandler.__new__(WincasaLLMHandler)
+        handler.config = get_registry().get("config")
+        handler.inflight = SingleFlight("llm_handler")
+        handler._query_llm = query
+
+        with ThreadPoolExecutor(3) as pool:
+            results = list(pool.map(lambda mode: handler.query_llm("Wer wohnt in Essen?", mode),
+                                    ["json_standard", "json_standard", "sql_vanilla"]))
+        self.assertEqual(sorted(calls), [("Wer wohnt in Essen?", "json_standard"),
+                                         ("Wer wohnt in Essen?", "sql_vanilla")])
+        self.assertEqual(sum(result.get("coalesced", False) for result in results), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
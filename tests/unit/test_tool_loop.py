@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+WINCASA Tool Loop - Unit Tests
+Mehrstufiges Tool Calling mit paralleler Ausführung und Obergrenzen
+"""
+
+import sys
+from pathlib import Path
+# Add src directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import asyncio
+import json
+import time
+import unittest
+from types import SimpleNamespace
+
+from wincasa.core.deadline import raise_if_deadline_caused, remaining_timeout
+from wincasa.core.llm_handler import ToolLoopLimits, WincasaLLMHandler
+from wincasa.core.singleflight import SingleFlight
+
+DELAY = 0.2
+QUERY = "Wem gehört das Haus Aachener Weg 3 und wer ist dort gemeldet?"
+
+
+def tool_call(call_id, name, **args):
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=json.dumps(args)))
+
+
+def completion(content=None, tool_calls=None):
+    message = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+class TestToolLoop(unittest.TestCase):
+    """Tool loop in WincasaLLMHandler._query_openai / _query_openai_async"""
+
+    def setUp(self):
+        self.requests = []
+        self.responses = []
+        handler = WincasaLLMHandler.__new__(WincasaLLMHandler)
+        handler.config = SimpleNamespace(
+            get_llm_config=lambda: {"api_key": "sk-test", "model": "test-model",
+                                    "temperature": 0.1, "max_tokens": 100},
+            load_system_prompt=lambda: "Standard-Prompt",
+            get_system_prompt_path=lambda: "does/not/exist.md")
+        handler.prompts = handler._build_prompt_cache()
+        handler.inflight = SingleFlight("llm_handler")
+        handler.client_pool = SimpleNamespace(get_client=lambda api_key: self.client(),
+                                              get_async_client=lambda api_key: self.client(is_async=True))
+        handler._knowledge_context_for_query = lambda user_query, query_id: ""
+        handler._execute_tenant_search_function = lambda args, query_id: self.slow(f"Mieter {args['street']}")
+        handler._execute_owner_search_function = lambda args, query_id: self.slow(f"Eigentümer {args['street']}")
+        self.handler = handler
+
+    def slow(self, result):
+        # Like a Firebird statement timeout: the tool round deadline cuts the query short
+        timeout = remaining_timeout("sql", DELAY)
+        time.sleep(timeout)
+        if timeout < DELAY:
+            raise_if_deadline_caused("sql", TimeoutError("statement timeout"))
+        return result
+
+    def client(self, is_async=False):
+        def create(**kwargs):
+            # Snapshot - the loop keeps appending to the same message list
+            self.requests.append(dict(kwargs, messages=list(kwargs["messages"])))
+            return self.responses.pop(0)
+
+        async def create_async(**kwargs):
+            return create(**kwargs)
+
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+            create=create_async if is_async else create)))
+
+    def both_searches(self):
+        return completion(tool_calls=[tool_call("call_1", "search_tenants_by_address", street="Marienstr. 26"),
+                                      tool_call("call_2", "search_owners_by_address", street="Marienstr. 26")])
+
+    def test_results_fed_back_for_final_answer(self):
+        """Test tool results go back to the model and its answer is returned"""
+        self.responses = [self.both_searches(), completion("Mieter: Müller, Eigentümer: Schmidt")]
+
+        answer = self.handler.query_llm(QUERY, "sql_standard")["answer"]
+
+        self.assertEqual(answer, "Mieter: Müller, Eigentümer: Schmidt")
+        final_messages = self.requests[1]["messages"]
+        self.assertEqual([message["role"] for message in final_messages], ["system", "user", "assistant", "tool", "tool"])
+        self.assertEqual([(message["tool_call_id"], message["content"]) for message in final_messages[3:]],
+                         [("call_1", "Mieter Marienstr. 26"), ("call_2", "Eigentümer Marienstr. 26")])
+        self.assertEqual(self.requests[0]["tools"][0]["type"], "function")
+
+    def test_json_tools_run_in_parallel(self):
+        """Test several JSON tools from one turn run concurrently"""
+        self.handler._execute_json_search_function = lambda args, query_id: self.slow(args["query_name"])
+        self.responses = [completion(tool_calls=[tool_call(f"call_{index}", "search_json_data", query_name=name)
+                                                 for index, name in enumerate(["01_eigentuemer", "03_aktuelle_mieter",
+                                                                               "05_objekte"])]),
+                          completion("Fertig")]
+
+        start_time = time.time()
+        self.assertEqual(self.handler.query_llm(QUERY, "json_standard")["answer"], "Fertig")
+        self.assertLess(time.time() - start_time, 2 * DELAY)
+
+    def test_round_cap_forces_answer(self):
+        """Test the model must answer without tools once the round cap is reached"""
+        self.handler.tool_limits = ToolLoopLimits(max_rounds=2)
+        self.responses = [self.both_searches(), self.both_searches(), completion("Antwort mit vorhandenen Daten")]
+
+        answer = self.handler.query_llm(QUERY, "sql_standard")["answer"]
+
+        self.assertEqual(answer, "Antwort mit vorhandenen Daten")
+        self.assertEqual([request["tool_choice"] for request in self.requests], ["auto", "auto", "none"])
+
+    def test_time_budget_bounds_tool_wait(self):
+        """Test slow tools are cut off at the tool time budget and no further tool round follows"""
+        self.handler.tool_limits = ToolLoopLimits(time_budget=DELAY / 4)
+        self.responses = [self.both_searches(), completion("Teilantwort")]
+
+        start_time = time.time()
+        answer = self.handler.query_llm(QUERY, "sql_standard")["answer"]
+
+        self.assertEqual(answer, "Teilantwort")
+        self.assertLess(time.time() - start_time, DELAY)
+        self.assertIn("Zeitlimit", self.requests[1]["messages"][3]["content"])
+        self.assertEqual(self.requests[1]["tool_choice"], "none")
+
+    def test_running_db_tool_keeps_lane_until_done(self):
+        """Test a running DB tool without statement timeout is awaited instead of reported as timed out"""
+        self.handler.tool_limits = ToolLoopLimits(time_budget=DELAY / 4)
+        self.handler._execute_tenant_search_function = lambda args, query_id: time.sleep(DELAY) or "Mieter Müller"
+        self.responses = [self.both_searches(), completion("Teilantwort")]
+
+        start_time = time.time()
+        result = asyncio.run(self.handler.query_llm_async(QUERY, "sql_standard"))
+
+        self.assertEqual(result["answer"], "Teilantwort")
+        self.assertGreaterEqual(time.time() - start_time, DELAY)
+        tool_messages = self.requests[1]["messages"][3:]
+        self.assertEqual(tool_messages[0]["content"], "Mieter Müller")
+        # The owner search was still queued behind it on the DB thread and never started
+        self.assertIn("Zeitlimit", tool_messages[1]["content"])
+
+    def test_async_loop(self):
+        """Test the async path runs the same loop with invalid arguments reported back to the model"""
+        self.responses = [completion(tool_calls=[
+                              tool_call("call_1", "search_tenants_by_address", street="Marienstr. 26"),
+                              SimpleNamespace(id="call_2", function=SimpleNamespace(
+                                  name="search_owners_by_address", arguments="{kaputt"))]),
+                          completion("Async fertig")]
+
+        result = asyncio.run(self.handler.query_llm_async(QUERY, "sql_standard"))
+
+        self.assertEqual(result["answer"], "Async fertig")
+        tool_messages = self.requests[1]["messages"][3:]
+        self.assertEqual(tool_messages[0]["content"], "Mieter Marienstr. 26")
+        self.assertIn("Ungültige Argumente", tool_messages[1]["content"])
+
+
+if __name__ == '__main__':
+    unittest.main()